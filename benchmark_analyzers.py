@@ -0,0 +1,402 @@
+# Benchmarks for the migration analyzers in test.py on synthetic portfolios, saved as JSON baselines
+# Usage: python benchmark_analyzers.py --sizes 10,100,1000,10000,50000
+#        python benchmark_analyzers.py --sizes 10,1000 --compare benchmark_results/abc1234.json --fail-on-regression
+
+import argparse
+import gc
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.py')
+DEFAULT_SIZES = [10, 100, 1000, 10000, 50000]
+ENVIRONMENT_PREFIXES = ['Prod', 'Staging', 'QA', 'Dev']
+
+
+def load_app():
+    """Import test.py without running the Streamlit page ('test' would shadow the stdlib package)"""
+    from streamlit import config, logger
+    config.set_option('logger.level', 'error')
+    logger.set_log_level('error')
+    spec = importlib.util.spec_from_file_location('migration_app', APP_PATH)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+    # Loggers created while importing the app start at the default level again
+    logger.set_log_level('error')
+    return app
+
+
+# Synthetic portfolios; the same seed always gives the same portfolio
+
+def environment_names(n: int) -> List[str]:
+    return [f"{ENVIRONMENT_PREFIXES[i % 4]}-DB-{i:05d}" for i in range(n)]
+
+
+def generate_environment_specs(n: int, seed: int = 42) -> Dict:
+    """Standard environment specs as entered on the Environment Setup page"""
+    rng = np.random.default_rng(seed)
+    cpu = rng.choice([2, 4, 8, 16, 32, 64], n)
+    return {
+        name: {
+            'cpu_cores': int(cpu[i]),
+            'ram_gb': int(cpu[i] * rng.choice([4, 8])),
+            'storage_gb': int(rng.integers(50, 8000)),
+            'iops_requirement': int(rng.integers(500, 40000)),
+            'peak_connections': int(rng.integers(20, 2000)),
+            'daily_usage_hours': int(rng.choice([8, 12, 16, 24]))
+        }
+        for i, name in enumerate(environment_names(n))
+    }
+
+
+def generate_vrops_metrics(n: int, seed: int = 42) -> Dict:
+    """vROps-style metrics per environment, keyed like process_vrops_data output"""
+    rng = np.random.default_rng(seed)
+    columns = {
+        'cpu_cores_allocated': rng.choice([4, 8, 12, 16, 32], n).astype(float),
+        'max_cpu_usage_percent': rng.uniform(20, 98, n),
+        'cpu_ready_time_ms': rng.uniform(0, 6000, n),
+        'memory_allocated_gb': rng.choice([16, 32, 48, 64, 128], n).astype(float),
+        'max_memory_usage_percent': rng.uniform(25, 97, n),
+        'memory_balloon_gb': np.where(rng.random(n) < 0.1, rng.uniform(0.1, 4, n), 0.0),
+        'memory_swapped_gb': np.where(rng.random(n) < 0.05, rng.uniform(0.1, 2, n), 0.0),
+        'max_iops_total': rng.uniform(300, 30000, n),
+        'max_disk_latency_ms': rng.uniform(2, 40, n),
+        'max_disk_throughput_mbps': rng.uniform(20, 800, n),
+        'storage_allocated_gb': rng.uniform(100, 8000, n),
+        'max_network_throughput_mbps': rng.uniform(10, 1000, n),
+        'network_latency_ms': rng.uniform(0.2, 5, n),
+        'database_size_gb': rng.uniform(20, 5000, n),
+        'observation_period_days': rng.choice([30, 60, 90], n).astype(float)
+    }
+    # Averages stay below their peaks, as in real exports
+    columns['avg_cpu_usage_percent'] = columns['max_cpu_usage_percent'] * rng.uniform(0.4, 0.85, n)
+    columns['avg_memory_usage_percent'] = columns['max_memory_usage_percent'] * rng.uniform(0.6, 0.95, n)
+    columns['avg_iops_total'] = columns['max_iops_total'] * rng.uniform(0.3, 0.8, n)
+    columns['avg_disk_latency_ms'] = columns['max_disk_latency_ms'] * rng.uniform(0.4, 0.9, n)
+    columns['storage_used_gb'] = columns['storage_allocated_gb'] * rng.uniform(0.3, 0.95, n)
+    application_types = rng.choice(['OLTP', 'OLAP', 'Mixed'], n)
+
+    environments = {}
+    for i, name in enumerate(environment_names(n)):
+        metrics = {key: float(values[i]) for key, values in columns.items()}
+        metrics.update({
+            'application_type': str(application_types[i]),
+            'peak_hours_start': 9,
+            'peak_hours_end': 17,
+            'cpu_cores': metrics['cpu_cores_allocated'],
+            'ram_gb': metrics['memory_allocated_gb'],
+            'storage_gb': metrics['storage_allocated_gb']
+        })
+        environments[name] = metrics
+    return environments
+
+
+def generate_cluster_frame(n: int, seed: int = 42) -> pd.DataFrame:
+    """Cluster configurations in the Environment Setup upload template"""
+    rng = np.random.default_rng(seed)
+    types = np.array(['Production', 'Staging', 'Testing', 'Development'])[np.arange(n) % 4]
+    cpu = rng.choice([4, 8, 16, 32, 64], n)
+    return pd.DataFrame({
+        'Environment_Name': [f"{name}-Cluster" for name in environment_names(n)],
+        'Environment_Type': types,
+        'CPU_Cores': cpu,
+        'RAM_GB': cpu * rng.choice([4, 8], n),
+        'Storage_GB': rng.integers(100, 10000, n),
+        'IOPS_Requirement': rng.integers(1000, 40000, n),
+        'Peak_Connections': rng.integers(50, 3000, n),
+        'Daily_Usage_Hours': rng.choice([12, 16, 24], n),
+        'Workload_Pattern': rng.choice(['read_heavy', 'balanced', 'write_heavy'], n),
+        'Read_Write_Ratio': rng.integers(30, 95, n),
+        'Multi_AZ_Writer': types == 'Production',
+        'Multi_AZ_Readers': (types == 'Production') & (rng.random(n) < 0.5),
+        'Num_Readers': np.where(rng.random(n) < 0.5, rng.integers(0, 4, n), np.nan),
+        'Storage_Encrypted': True,
+        'Backup_Retention_Days': rng.choice([7, 14, 30], n),
+        'Auto_Storage_Scaling': True
+    })
+
+
+def migration_params(app, environment_specs: Dict) -> Dict:
+    params = dict(app.BATCH_DEFAULT_MIGRATION_PARAMS)
+    params['data_size_gb'] = int(sum(specs.get('storage_gb', 0) for specs in environment_specs.values()))
+    return params
+
+
+# Each benchmark: setup(app, size) -> zero-argument callable; setup time is not measured
+
+def setup_vrops(app, size: int) -> Callable:
+    analyzer = app.VRopsMetricsAnalyzer()
+    metrics = generate_vrops_metrics(size)
+    return lambda: analyzer.analyze_vrops_metrics(metrics)
+
+
+def setup_costs(app, size: int) -> Callable:
+    specs = generate_environment_specs(size)
+    analyzer = app.MigrationAnalyzer()
+    recommendations = analyzer.calculate_instance_recommendations(specs)
+    params = migration_params(app, specs)
+    return lambda: analyzer.calculate_migration_costs(recommendations, params)
+
+
+def setup_cluster_costs(app, size: int) -> Callable:
+    specs = app.process_cluster_data(generate_cluster_frame(size))
+    analyzer = app.EnhancedMigrationAnalyzer()
+    params = migration_params(app, specs)
+
+    def run():
+        recommendations = analyzer.calculate_enhanced_instance_recommendations(specs)
+        return analyzer.calculate_enhanced_migration_costs(recommendations, params)
+    return run
+
+
+def setup_growth(app, size: int) -> Callable:
+    specs = generate_environment_specs(size)
+    analyzer = app.MigrationAnalyzer()
+    params = migration_params(app, specs)
+    base_costs = analyzer.calculate_migration_costs(analyzer.calculate_instance_recommendations(specs), params)
+    growth = app.GrowthAwareCostAnalyzer()
+    return lambda: growth.calculate_3_year_growth_projection(base_costs, params)
+
+
+def setup_transfer(app, size: int) -> Callable:
+    params = migration_params(app, generate_environment_specs(size))
+    network = app.NetworkTransferAnalyzer()
+    return lambda: network.calculate_transfer_analysis(params)
+
+
+def setup_risk(app, size: int) -> Callable:
+    specs = generate_environment_specs(size)
+    recommendations = app.MigrationAnalyzer().calculate_instance_recommendations(specs)
+    params = migration_params(app, specs)
+    return lambda: app.calculate_migration_risks_safe(params, recommendations)
+
+
+def setup_pdf(app, size: int) -> Callable:
+    specs = generate_environment_specs(size)
+    analyzer = app.MigrationAnalyzer()
+    recommendations = analyzer.calculate_instance_recommendations(specs)
+    params = migration_params(app, specs)
+    results = analyzer.calculate_migration_costs(recommendations, params)
+
+    def run():
+        executive = app.generate_executive_summary_pdf_robust(results, params)
+        technical = app.generate_technical_report_pdf_robust(results, recommendations, params)
+        if executive is None or technical is None:
+            raise RuntimeError("PDF generation failed")
+        return executive, technical
+    return run
+
+
+def setup_improved_pdf(app, size: int) -> Callable:
+    """Bulk-mode ImprovedReportGenerator report; every run starts cold, so sections are built and charts rendered"""
+    specs = generate_environment_specs(size)
+    analyzer = app.MigrationAnalyzer()
+    recommendations = analyzer.calculate_instance_recommendations(specs)
+    environment_costs = analyzer.calculate_migration_costs(recommendations, migration_params(app, specs))['environment_costs']
+    # One "server" per environment, shaped like the single-server analysis results the generator reads
+    analysis_results = {
+        name: {'PROD': {
+            'instance_type': rec['instance_class'],
+            'actual_vCPUs': rec['cpu_cores'],
+            'actual_RAM_GB': rec['ram_gb'],
+            'storage_GB': rec['storage_gb'],
+            'total_cost': environment_costs[name]['total_monthly'],
+            'cost_breakdown': {
+                'instance_monthly': environment_costs[name]['instance_cost'],
+                'storage_monthly': environment_costs[name]['storage_cost'],
+                'backup_monthly': environment_costs[name]['backup_cost']
+            }
+        }}
+        for name, rec in recommendations.items()
+    }
+    server_specs = [{'server_name': name, **server} for name, server in specs.items()]
+
+    def run():
+        app.report_section_cache.clear()
+        app.chart_rendering_service.clear()
+        failures = app.chart_rendering_service.stats['render_failures']
+        pdf_bytes = app.ImprovedReportGenerator().generate_improved_pdf_report(analysis_results, 'bulk', server_specs)
+        if pdf_bytes is None:
+            raise RuntimeError("Improved PDF generation failed")
+        if app.chart_rendering_service.stats['render_failures'] > failures:
+            raise RuntimeError("Kaleido could not render the report charts")
+        return pdf_bytes
+    return run
+
+
+# name -> (setup, largest size worth running); the technical PDF has one table row per environment
+BENCHMARKS = {
+    'vrops.analyze_vrops_metrics': (setup_vrops, None),
+    'costs.calculate_migration_costs': (setup_costs, None),
+    'costs.cluster_recommendations_and_costs': (setup_cluster_costs, None),
+    'growth.calculate_3_year_growth_projection': (setup_growth, None),
+    'network.calculate_transfer_analysis': (setup_transfer, None),
+    'risk.calculate_migration_risks_safe': (setup_risk, None),
+    'reports.pdf_generation': (setup_pdf, 10000),
+    'reports.improved_pdf_generation': (setup_improved_pdf, 10000)
+}
+
+
+def measure(func: Callable, repeats: int, min_seconds: float) -> Tuple[List[float], float]:
+    """Wall times of repeated runs after one warm-up, then peak traced memory of one more run"""
+    func()
+    times = []
+    # Collector pauses are excluded from timings, as timeit does
+    gc.collect()
+    gc.disable()
+    try:
+        while len(times) < repeats or (sum(times) < min_seconds and len(times) < repeats * 10):
+            started = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - started)
+            # Slow cases get fewer repeats rather than dominating the run
+            if times[-1] > 10:
+                break
+    finally:
+        gc.enable()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak_bytes
+
+
+def run_benchmarks(sizes: List[int], only: Optional[List[str]] = None, repeats: int = 3,
+                   min_seconds: float = 0.2, verbose: bool = True) -> Dict:
+    app = load_app()
+    results = {}
+    for name, (setup, max_size) in BENCHMARKS.items():
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        for size in sizes:
+            key = f"{name}@{size}"
+            if max_size and size > max_size:
+                results[key] = {'benchmark': name, 'size': size, 'skipped': f"larger than {max_size}"}
+                continue
+            try:
+                times, peak_bytes = measure(setup(app, size), repeats, min_seconds)
+            except Exception as e:
+                results[key] = {'benchmark': name, 'size': size, 'error': str(e)}
+                if verbose:
+                    print(f"{key:55s} error: {e}")
+                continue
+
+            median = statistics.median(times)
+            results[key] = {
+                'benchmark': name,
+                'size': size,
+                'repeats': len(times),
+                'median_seconds': median,
+                'min_seconds': min(times),
+                'max_seconds': max(times),
+                'throughput_per_second': size / median if median > 0 else None,
+                'peak_memory_mb': peak_bytes / 1024 / 1024
+            }
+            if verbose:
+                print(f"{key:55s} {median * 1000:10.2f} ms  {size / median:12,.0f} env/s  "
+                      f"{peak_bytes / 1024 / 1024:8.1f} MB peak")
+    return results
+
+
+def environment_metadata() -> Dict:
+    def git(*args) -> Optional[str]:
+        try:
+            return subprocess.run(['git', *args], cwd=os.path.dirname(APP_PATH), capture_output=True,
+                                  text=True, timeout=10, check=True).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {
+        'commit': git('rev-parse', '--short', 'HEAD') or 'unknown',
+        'dirty': bool(git('status', '--porcelain', '--', 'test.py')),
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def compare_baselines(baseline: Dict, current: Dict, threshold: float = 1.25) -> List[Dict]:
+    """Median-time ratio per benchmark present in both; ratio above threshold is a regression"""
+    rows = []
+    for key, result in current['results'].items():
+        base = baseline['results'].get(key)
+        if not base or 'median_seconds' not in base or 'median_seconds' not in result:
+            continue
+        ratio = result['median_seconds'] / base['median_seconds'] if base['median_seconds'] else float('inf')
+        memory_ratio = (result['peak_memory_mb'] / base['peak_memory_mb']) if base['peak_memory_mb'] else None
+        rows.append({'key': key, 'baseline_ms': base['median_seconds'] * 1000,
+                     'current_ms': result['median_seconds'] * 1000, 'ratio': ratio,
+                     'memory_ratio': memory_ratio, 'regression': ratio > threshold})
+    return rows
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the migration analyzers on synthetic portfolios")
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated portfolio sizes (environments)")
+    parser.add_argument('--only', help="comma-separated benchmark name prefixes, e.g. vrops,costs")
+    parser.add_argument('--repeats', type=int, default=3, help="timed runs per case after one warm-up")
+    parser.add_argument('--output', help="baseline JSON to write (default: benchmark_results/<commit>.json)")
+    parser.add_argument('--compare', help="earlier baseline JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=1.25, help="median-time ratio counted as a regression")
+    parser.add_argument('--fail-on-regression', action='store_true', help="exit 1 when any case regresses")
+    parser.add_argument('--list', action='store_true', help="list benchmarks and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, (_, max_size) in BENCHMARKS.items():
+            print(name + (f" (up to {max_size:,} environments)" if max_size else ''))
+        return 0
+
+    sizes = [int(size) for size in args.sizes.split(',') if size.strip()]
+    only = args.only.split(',') if args.only else None
+    report = {
+        'schema_version': 1,
+        'meta': environment_metadata(),
+        'results': run_benchmarks(sizes, only, args.repeats)
+    }
+
+    output = args.output or os.path.join('benchmark_results', f"{report['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Baseline written to {output}")
+
+    if not args.compare:
+        return 0
+
+    with open(args.compare) as f:
+        baseline = json.load(f)
+    rows = compare_baselines(baseline, report, args.threshold)
+    print(f"\nCompared with {baseline['meta'].get('commit', '?')} ({args.compare}):")
+    for row in rows:
+        flag = '  REGRESSION' if row['regression'] else ''
+        memory = f"  memory x{row['memory_ratio']:.2f}" if row['memory_ratio'] is not None else ''
+        print(f"{row['key']:55s} {row['baseline_ms']:10.2f} -> {row['current_ms']:10.2f} ms  "
+              f"x{row['ratio']:.2f}{memory}{flag}")
+    regressions = [row for row in rows if row['regression']]
+    print(f"{len(regressions)} regression(s) above x{args.threshold:g}")
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,158 @@
+# Load test for the analyzer HTTP service: throughput and latency percentiles under concurrent clients
+# Usage: python test.py serve --port 8600
+#        python load_test_service.py --url http://127.0.0.1:8600 --concurrency 32 --requests 5000 --unique 0.2
+
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+ENVIRONMENT_NAMES = ['Production', 'Staging', 'QA', 'Development']
+
+
+def make_payload(endpoint: str, rng: random.Random, unique: bool) -> Dict:
+    """Request body for an endpoint; unique bodies miss the response cache"""
+    cpu = rng.choice([2, 4, 8, 16, 32, 64]) if unique else 8
+    environments = rng.randint(1, 50) if unique else 4
+    specs = {
+        f"{ENVIRONMENT_NAMES[i % 4]}-{i}": {
+            'cpu_cores': cpu, 'ram_gb': cpu * 4, 'storage_gb': rng.randint(100, 5000) if unique else 500,
+            'daily_usage_hours': 24, 'peak_connections': 100
+        }
+        for i in range(environments)
+    }
+    params = {'region': 'us-east-1', 'target_engine': 'postgres',
+              'data_size_gb': rng.randint(100, 10000) if unique else 1000}
+
+    if endpoint == 'recommendations':
+        return {'environment_specs': specs}
+    if endpoint == 'costs':
+        recommendations = {name: {'environment_type': 'production', 'instance_class': 'db.r5.large',
+                                  'cpu_cores': s['cpu_cores'], 'ram_gb': s['ram_gb'], 'storage_gb': s['storage_gb'],
+                                  'multi_az': True, 'daily_usage_hours': 24, 'peak_connections': 100}
+                           for name, s in specs.items()}
+        return {'recommendations': recommendations, 'migration_params': params}
+    if endpoint == 'growth':
+        base_costs = {'monthly_aws_cost': 1000.0 * environments, 'environment_costs': {
+            name: {'instance_cost': 700.0, 'storage_cost': 200.0, 'backup_cost': 40.0, 'total_monthly': 940.0}
+            for name in specs
+        }}
+        return {'base_costs': base_costs, 'migration_params': params}
+    return {'migration_params': params}
+
+
+class LoadTestResults:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = []
+        self.errors = 0
+        self.status_counts = {}
+
+    def record(self, seconds: float, status: int):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.status_counts[status] = self.status_counts.get(status, 0) + 1
+            if status != 200:
+                self.errors += 1
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def client_worker(url, endpoints: List[str], count: int, unique: float, seed: int, results: LoadTestResults):
+    """One keep-alive connection sending count requests"""
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+    for _ in range(count):
+        endpoint = rng.choice(endpoints)
+        body = json.dumps(make_payload(endpoint, rng, rng.random() < unique))
+        started = time.perf_counter()
+        try:
+            connection.request('POST', f"/v1/{endpoint}", body=body, headers={'Content-Type': 'application/json'})
+            response = connection.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=60)
+            status = 0
+        results.record(time.perf_counter() - started, status)
+    connection.close()
+
+
+def fetch_health(url) -> Optional[Dict]:
+    try:
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+        connection.request('GET', '/health')
+        return json.loads(connection.getresponse().read())
+    except (OSError, ValueError, http.client.HTTPException):
+        return None
+
+
+def run_load_test(base_url: str, concurrency: int = 16, requests: int = 2000, unique: float = 0.2,
+                  endpoints: Optional[List[str]] = None, seed: int = 7) -> Dict:
+    """Drive the service from concurrency threads; returns throughput and latency percentiles"""
+    url = urlparse(base_url)
+    endpoints = endpoints or ['recommendations', 'costs', 'transfer', 'growth']
+    results = LoadTestResults()
+    per_client = [requests // concurrency + (1 if i < requests % concurrency else 0) for i in range(concurrency)]
+
+    threads = [threading.Thread(target=client_worker, args=(url, endpoints, n, unique, seed + i, results))
+               for i, n in enumerate(per_client) if n]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(results.latencies)
+    return {
+        'requests': len(latencies),
+        'errors': results.errors,
+        'status_counts': results.status_counts,
+        'seconds': elapsed,
+        'throughput_rps': len(latencies) / elapsed if elapsed else 0.0,
+        'latency_ms': {name: percentile(latencies, pct) * 1000
+                       for name, pct in [('p50', 50), ('p95', 95), ('p99', 99), ('max', 100)]},
+        'server': fetch_health(url)
+    }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Load test the analyzer HTTP service")
+    parser.add_argument('--url', default='http://127.0.0.1:8600')
+    parser.add_argument('--concurrency', type=int, default=16, help="concurrent keep-alive clients")
+    parser.add_argument('--requests', type=int, default=2000, help="total requests")
+    parser.add_argument('--unique', type=float, default=0.2, help="fraction of requests with a never-seen body")
+    parser.add_argument('--endpoints', default='recommendations,costs,transfer,growth')
+    parser.add_argument('--json', action='store_true', help="print the full result as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.url, args.concurrency, args.requests, args.unique, args.endpoints.split(','))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    latency = report['latency_ms']
+    print(f"{report['requests']} requests in {report['seconds']:.2f}s with {args.concurrency} clients "
+          f"({report['errors']} errors)")
+    print(f"Throughput: {report['throughput_rps']:,.0f} req/s")
+    print(f"Latency: p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, "
+          f"p99 {latency['p99']:.1f} ms, max {latency['max']:.1f} ms")
+    if report['server']:
+        server = report['server']
+        print(f"Server: {server['cache_hits']} cache hits, {server['coalesced']} coalesced, "
+              f"{server['batched_requests']} requests in {server['batches']} batches")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+# Local stub of the Anthropic Messages API for exercising the AI insight paths offline
+# Usage: python stub_messages_server.py --port 8765 --delay 1.0
+#        ANTHROPIC_BASE_URL=http://127.0.0.1:8765 streamlit run test.py   (any API key is accepted)
+#        python stub_messages_server.py --check [test.py]   (drive the app's AI insight paths and exit non-zero on failure)
+
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
+
+CANNED_RESPONSES = {
+    'cost': "Cost optimization: the projected spend is reasonable for this scale.\n\n- Purchase Reserved Instances for production\n- Right-size development instances after 30 days",
+    'risk': "Risk assessment: the main risks are engine compatibility and cutover downtime.\n\n- Run a full rehearsal migration\n- Keep a tested rollback plan",
+    'strategy': "Migration strategy: use a phased approach starting with non-production environments.\n\n- Use AWS DMS with CDC for minimal downtime\n- Migrate production last",
+    'timeline': "Timeline feasibility: the planned schedule is achievable with buffer for testing.\n\n- Reserve 30% of the timeline for validation\n- Schedule cutover outside peak hours",
+    'technical': "Technical considerations: convert schema objects with AWS SCT and review stored procedures.\n\n- Validate character sets and collations\n- Update connection strings",
+    'post-migration': "Post-migration optimization: tune performance once real usage is observed.\n\n- Enable Performance Insights\n- Review instance sizing after 60 days",
+}
+
+DEFAULT_RESPONSE = ("Executive summary: the migration is feasible.\n\n" +
+                    "\n\n".join(CANNED_RESPONSES.values()))
+
+
+class StubStats:
+    """In-flight request accounting, so tests can observe concurrency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+
+    def enter(self):
+        with self.lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def exit(self):
+        with self.lock:
+            self.in_flight -= 1
+
+    def snapshot(self) -> Dict:
+        with self.lock:
+            return {'in_flight': self.in_flight, 'peak_in_flight': self.peak_in_flight, 'requests': self.requests}
+
+
+def pick_response(prompt: str) -> str:
+    """Canned answer for a category prompt or a portfolio batch prompt"""
+    if 'Groups (id' in prompt:
+        # Portfolio batch prompt: one finding per group line
+        group_ids = [line.split('|', 1)[0].strip() for line in prompt.split('\n')
+                     if line.strip().startswith('G') and '|' in line]
+        return '\n'.join(f"{group_id}: Right-size this group and cover steady usage with Reserved Instances"
+                         for group_id in group_ids)
+
+    marker = 'one topic only - '
+    if marker in prompt:
+        topic = prompt.split(marker, 1)[1].lower()
+        for keyword in ['post-migration', 'cost', 'risk', 'strategy', 'timeline', 'technical']:
+            if keyword in topic:
+                return CANNED_RESPONSES[keyword]
+    return DEFAULT_RESPONSE
+
+
+class MessagesHandler(BaseHTTPRequestHandler):
+    """Handles POST /v1/messages (plain and SSE streaming) and GET /stats"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip('/') == '/stats':
+            self._send_json(200, self.server.stats.snapshot())
+        else:
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+
+    def do_POST(self):
+        if not self.path.startswith('/v1/messages'):
+            self._send_json(404, {'type': 'error', 'error': {'type': 'not_found_error', 'message': self.path}})
+            return
+
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+        prompt = ''.join(
+            message['content'] if isinstance(message.get('content'), str)
+            else ''.join(block.get('text', '') for block in message.get('content', []))
+            for message in request.get('messages', [])
+        )
+        text = pick_response(prompt)
+        model = request.get('model', 'stub-model')
+
+        self.server.stats.enter()
+        try:
+            time.sleep(self.server.delay)
+            if request.get('stream'):
+                self._stream(model, text)
+            else:
+                self._send_json(200, {
+                    'id': f"msg_{uuid.uuid4().hex[:24]}",
+                    'type': 'message',
+                    'role': 'assistant',
+                    'model': model,
+                    'content': [{'type': 'text', 'text': text}],
+                    'stop_reason': 'end_turn',
+                    'stop_sequence': None,
+                    'usage': {'input_tokens': len(prompt) // 4, 'output_tokens': len(text) // 4}
+                })
+        finally:
+            self.server.stats.exit()
+
+    def _stream(self, model: str, text: str):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def event(name: str, data: Dict):
+            self.wfile.write(f"event: {name}\ndata: {json.dumps(data)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        event('message_start', {'type': 'message_start', 'message': {
+            'id': f"msg_{uuid.uuid4().hex[:24]}", 'type': 'message', 'role': 'assistant', 'model': model,
+            'content': [], 'stop_reason': None, 'stop_sequence': None,
+            'usage': {'input_tokens': 0, 'output_tokens': 0}
+        }})
+        event('content_block_start', {'type': 'content_block_start', 'index': 0,
+                                      'content_block': {'type': 'text', 'text': ''}})
+        for i in range(0, len(text), 24):
+            event('content_block_delta', {'type': 'content_block_delta', 'index': 0,
+                                          'delta': {'type': 'text_delta', 'text': text[i:i + 24]}})
+            time.sleep(self.server.chunk_delay)
+        event('content_block_stop', {'type': 'content_block_stop', 'index': 0})
+        event('message_delta', {'type': 'message_delta', 'delta': {'stop_reason': 'end_turn', 'stop_sequence': None},
+                                'usage': {'output_tokens': len(text) // 4}})
+        event('message_stop', {'type': 'message_stop'})
+
+
+def start_stub_server(host: str = '127.0.0.1', port: int = 0, delay: float = 0.5,
+                      chunk_delay: float = 0.01, verbose: bool = False) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub on a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer((host, port), MessagesHandler)
+    server.daemon_threads = True
+    server.delay = delay
+    server.chunk_delay = chunk_delay
+    server.verbose = verbose
+    server.stats = StubStats()
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def run_app_check(app_path: str) -> int:
+    """Drive the app's concurrent AI insight paths against an in-process stub; returns a process exit status"""
+    server, base_url = start_stub_server(delay=0.05, chunk_delay=0.0)
+    os.environ['ANTHROPIC_BASE_URL'] = base_url
+
+    from streamlit import config, logger
+    config.set_option('logger.level', 'error')
+    logger.set_log_level('error')
+    spec = importlib.util.spec_from_file_location('app', app_path)
+    app = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(app)
+
+    params = dict(app.BATCH_DEFAULT_MIGRATION_PARAMS)
+    specs = {f'env-{i}': {'cpu_cores': 8, 'ram_gb': 32, 'storage_gb': 500, 'daily_usage_hours': 24,
+                          'peak_connections': 100, 'environment_type': 'production' if i % 2 else 'development'}
+             for i in range(6)}
+    recommendations = app.MigrationAnalyzer().calculate_instance_recommendations(specs)
+    cost_analysis = app.MigrationAnalyzer().calculate_migration_costs(recommendations, params)
+    failures = []
+
+    # With and without an active timing run, since spans only record (and take their args) inside one
+    for recorded in (False, True):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            cache = app.AIResponseCache(cache_dir=cache_dir)
+            before = server.stats.snapshot()['requests']
+            recorder = app.TimingRecorder('stub check')
+            with recorder.activate() if recorded else contextlib.nullcontext():
+                concurrent = asyncio.run(app.StreamlitClaudeAIAnalyzer('stub-key', response_cache=cache)
+                                         .generate_ai_insights_concurrent(cost_analysis, params))
+                portfolio = asyncio.run(app.PortfolioAIInsightsAnalyzer('stub-key', response_cache=cache)
+                                        .generate_portfolio_insights(cost_analysis, recommendations, params))
+            label = 'recorded' if recorded else 'unrecorded'
+            expected = len(app.StreamlitClaudeAIAnalyzer.CATEGORY_PROMPTS) + portfolio.get('batch_count', 0)
+            requests = server.stats.snapshot()['requests'] - before
+            if not concurrent.get('api_success'):
+                failures.append(f"{label}: concurrent insights fell back ({concurrent.get('error')})")
+            if not portfolio.get('api_success'):
+                failures.append(f"{label}: portfolio insights fell back ({portfolio.get('error')})")
+            if requests != expected:
+                failures.append(f"{label}: stub saw {requests} requests, expected {expected}")
+            spans = [span for span in recorder.snapshot()['spans'] if span['name'] == 'claude.messages.create']
+            if recorded and len(spans) != expected:
+                failures.append(f"{label}: recorded {len(spans)} API spans, expected {expected}")
+
+    server.shutdown()
+    for failure in failures:
+        print(f"FAIL {failure}")
+    print("AI insight paths OK against the stub" if not failures else f"{len(failures)} check(s) failed")
+    return 1 if failures else 0
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Stub Anthropic Messages API server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--delay', type=float, default=0.5, help="seconds before each response starts")
+    parser.add_argument('--chunk-delay', type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument('--check', metavar='APP', nargs='?', const='test.py',
+                        help="run the app's AI insight paths against an in-process stub and exit")
+    args = parser.parse_args(argv)
+
+    if args.check:
+        return run_app_check(args.check)
+
+    server, base_url = start_stub_server(args.host, args.port, args.delay, args.chunk_delay, verbose=True)
+    print(f"Stub Messages API listening on {base_url} (set ANTHROPIC_BASE_URL={base_url})")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
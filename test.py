@@ -5,6 +5,7 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import plotly.figure_factory as ff
+import plotly.io as pio
 import requests
 import json
 import boto3
@@ -17,12 +18,29 @@ import asyncio
 import hashlib
 import tempfile
 import os
+import threading
+import time
+import copy
+import uuid
+import pickle
+import sys
+import weakref
+import zlib
+import contextvars
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import re
+import math
 import anthropic 
 
 # PDF Generation imports
 from reportlab.lib import colors
 from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image, PageBreak, Flowable
+from reportlab.lib.utils import ImageReader
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.units import inch
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
@@ -136,26 +154,383 @@ def show_enhanced_environment_analysis():
 
 import asyncio
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import anthropic
 import boto3
 from typing import Dict, Optional
 import json
 
+# ===========================
+# INSTRUMENTATION
+# ===========================
+
+# Spans are only recorded while a TimingRecorder is active in the current context (script run or background job)
+@st.cache_resource
+def _timing_context_vars() -> Tuple[contextvars.ContextVar, contextvars.ContextVar]:
+    """Cached so background jobs started in an earlier rerun share the variables the current code reads"""
+    return (contextvars.ContextVar('active_timing_recorder', default=None),
+            contextvars.ContextVar('active_timing_span', default=None))
+
+_ACTIVE_TIMING, _ACTIVE_SPAN = _timing_context_vars()
+TIMING_MAX_RUNS = 10
+TIMING_MAX_SPANS_PER_RUN = 500
+
+@st.cache_resource
+def _start_memory_tracing() -> bool:
+    """tracemalloc is process-wide and slows every session, so it is a server start option, not a widget"""
+    if os.environ.get('TIMING_TRACE_MEMORY', '').lower() in ('1', 'true', 'yes') and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return tracemalloc.is_tracing()
+
+_start_memory_tracing()
+
+def _current_memory_bytes() -> Optional[int]:
+    """Traced Python heap when tracemalloc is on, otherwise process RSS (Linux); None when unavailable"""
+    if tracemalloc.is_tracing():
+        return tracemalloc.get_traced_memory()[0]
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+class TimingRecorder:
+    """Spans of one run with wall, self and CPU time plus memory deltas; exports Chrome trace events"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.wall_seconds = None
+        self.spans = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def activate(self):
+        """Record spans from this context (and asyncio tasks it starts) into this recorder"""
+        token = _ACTIVE_TIMING.set(self)
+        try:
+            yield self
+        finally:
+            _ACTIVE_TIMING.reset(token)
+            self.wall_seconds = time.perf_counter() - self._origin
+
+    def add_span(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def snapshot(self) -> Dict:
+        """Plain-dict copy, safe to pickle with job records and keep in session state"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            'name': self.name,
+            'started_at': self.started_at,
+            'wall_seconds': self.wall_seconds if self.wall_seconds is not None else time.perf_counter() - self._origin,
+            'spans': spans
+        }
+
+def summarize_timing_run(run: Dict) -> pd.DataFrame:
+    """Per-(category, name) calls, wall/self/CPU time and memory delta, slowest self time first"""
+
+    columns = ['category', 'name', 'calls', 'wall_ms', 'self_ms', 'cpu_ms', 'max_ms', 'memory_delta_mb']
+    if not run or not run.get('spans'):
+        return pd.DataFrame(columns=columns)
+
+    spans = pd.DataFrame(run['spans'])
+    summary = spans.groupby(['category', 'name'], sort=False).agg(
+        calls=('dur_us', 'size'),
+        wall_ms=('dur_us', lambda d: d.sum() / 1000),
+        self_ms=('self_us', lambda d: d.sum() / 1000),
+        cpu_ms=('cpu_ms', 'sum'),
+        max_ms=('dur_us', lambda d: d.max() / 1000),
+        memory_delta_mb=('memory_delta', lambda m: m.dropna().sum() / 1024 / 1024)
+    ).reset_index()
+    return summary.sort_values('self_ms', ascending=False)[columns].reset_index(drop=True)
+
+def compact_timing_run(run: Optional[Dict], max_spans: int = TIMING_MAX_SPANS_PER_RUN) -> Optional[Dict]:
+    """Summary of every span plus only the longest spans for the trace, so kept runs stay small"""
+    if not run or not run.get('spans') or 'summary' in run:
+        return run
+    spans = run['spans']
+    kept = sorted(spans, key=lambda span: span['dur_us'], reverse=True)[:max_spans]
+    return {
+        **run,
+        'summary': summarize_timing_run(run).to_dict('records'),
+        'spans': sorted(kept, key=lambda span: span['ts_us']),
+        'dropped_spans': len(spans) - len(kept)
+    }
+
+def timing_run_to_chrome_trace(run: Dict, pid: int = 1) -> Dict:
+    """Chrome trace-event JSON (chrome://tracing, Perfetto, speedscope)"""
+
+    events = [{'name': 'process_name', 'ph': 'M', 'pid': pid, 'tid': 0, 'args': {'name': run['name']}}]
+    thread_names = {}
+    for span in run['spans']:
+        thread_names.setdefault(span['tid'], span['thread'])
+        events.append({
+            'name': span['name'],
+            'cat': span['category'],
+            'ph': 'X',
+            'ts': span['ts_us'],
+            'dur': span['dur_us'],
+            'pid': pid,
+            'tid': span['tid'],
+            'args': {'cpu_ms': round(span['cpu_ms'], 3), 'self_ms': round(span['self_us'] / 1000, 3),
+                     'memory_delta_bytes': span['memory_delta'], **span['args']}
+        })
+    events.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': name}}
+                  for tid, name in thread_names.items())
+    return {'traceEvents': events, 'displayTimeUnit': 'ms',
+            'otherData': {'run': run['name'], 'started_at': datetime.fromtimestamp(run['started_at']).isoformat()}}
+
+@contextmanager
+def trace_span(name: str, category: str = 'app', **args):
+    """Time a block as a span of the active run; yields a dict for extra args (no-op without an active run)"""
+
+    recorder = _ACTIVE_TIMING.get()
+    if recorder is None:
+        yield args
+        return
+
+    parent = _ACTIVE_SPAN.get()
+    span = {'child_us': 0.0}
+    token = _ACTIVE_SPAN.set(span)
+    memory_before = _current_memory_bytes()
+    cpu_start = time.thread_time()
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        dur_us = (time.perf_counter() - start) * 1e6
+        cpu_ms = (time.thread_time() - cpu_start) * 1000
+        memory_after = _current_memory_bytes()
+        _ACTIVE_SPAN.reset(token)
+        if parent is not None:
+            parent['child_us'] += dur_us
+        thread = threading.current_thread()
+        recorder.add_span({
+            'name': name,
+            'category': category,
+            'ts_us': (start - recorder._origin) * 1e6,
+            'dur_us': dur_us,
+            # Concurrent asyncio children can overlap, so self time is clamped at zero
+            'self_us': max(dur_us - span['child_us'], 0.0),
+            'cpu_ms': cpu_ms,
+            'memory_delta': memory_after - memory_before if memory_before is not None and memory_after is not None else None,
+            'tid': thread.ident,
+            'thread': thread.name,
+            'args': {key: value if isinstance(value, (int, float, str, bool)) else str(value) for key, value in args.items()}
+        })
+
+def traced(category: str, name: Optional[str] = None):
+    """Decorator recording each call as a span of the active run"""
+
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if _ACTIVE_TIMING.get() is None:
+                    return await func(*args, **kwargs)
+                with trace_span(span_name, category):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _ACTIVE_TIMING.get() is None:
+                return func(*args, **kwargs)
+            with trace_span(span_name, category):
+                return func(*args, **kwargs)
+        return wrapper
+
+    return decorate
+
+def record_timing_run(run: Optional[Dict]):
+    """Keep a finished run for the sidebar timing panel (most recent first)"""
+    if not run or not run.get('spans'):
+        return
+    run = compact_timing_run(run)
+    runs = [r for r in st.session_state.get('timing_runs', []) if r['started_at'] != run['started_at']]
+    st.session_state['timing_runs'] = sorted([run] + runs, key=lambda r: r['started_at'], reverse=True)[:TIMING_MAX_RUNS]
+
+def show_timing_panel():
+    """Sidebar debug panel: per-stage timing of recent runs and Chrome trace export"""
+
+    with st.expander("⏱️ Performance Timing"):
+        if tracemalloc.is_tracing():
+            st.caption("Memory deltas: traced Python heap (TIMING_TRACE_MEMORY)")
+        else:
+            st.caption("Memory deltas: process RSS. Start the server with TIMING_TRACE_MEMORY=1 to trace the Python heap")
+
+        runs = st.session_state.get('timing_runs') or []
+        if not runs:
+            st.caption("No instrumented runs yet")
+            return
+
+        labels = [f"{run['name']} · {datetime.fromtimestamp(run['started_at']).strftime('%H:%M:%S')}" for run in runs]
+        index = st.selectbox("Run", range(len(runs)), format_func=lambda i: labels[i], key='timing_run_index')
+        run = runs[index]
+
+        summary = pd.DataFrame(run['summary']) if 'summary' in run else summarize_timing_run(run)
+        st.metric("Run wall time", f"{run['wall_seconds'] * 1000:,.0f} ms")
+        by_category = summary.groupby('category')['self_ms'].sum().sort_values(ascending=False)
+        for category, self_ms in by_category.head(5).items():
+            st.write(f"**{category}**: {self_ms:,.0f} ms")
+
+        st.dataframe(summary.round(2), use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Chrome trace (JSON)",
+            data=json.dumps(timing_run_to_chrome_trace(run)),
+            file_name=f"trace_{datetime.fromtimestamp(run['started_at']).strftime('%Y%m%d_%H%M%S')}.json",
+            mime="application/json",
+            key='timing_trace_download'
+        )
+        if run.get('dropped_spans'):
+            st.caption(f"Trace keeps the {len(run['spans']):,} longest spans; {run['dropped_spans']:,} shorter ones "
+                       f"are only in the summary")
+
+# ===========================
+# SHARED RESOURCES
+# ===========================
+
+class SharedTTLCache:
+    """Thread-safe TTL/LRU mapping shared by every session of the server process"""
+
+    def __init__(self, ttl_seconds: float = 24 * 3600, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()    # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+
+    def get(self, key, default=None):
+        """Live value for key, or default"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.time():
+                if entry is not None:
+                    del self._entries[key]
+                self.stats['misses'] += 1
+                return default
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl_seconds: Optional[float] = None):
+        """Store value, expiring after ttl_seconds (the cache default when None)"""
+        expires_at = time.time() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self.stats['sets'] += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def key_lock(self, key) -> threading.Lock:
+        """Per-key lock, so concurrent sessions missing the same key compute it once"""
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def get_or_compute(self, key, compute, ttl_seconds: Optional[float] = None):
+        """Cached value, or compute() it once across all waiting threads"""
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.key_lock(key):
+            value = self.get(key)
+            if value is None:
+                value = compute()
+                if value is not None:
+                    self.set(key, value, ttl_seconds)
+            return value
+
+    def __contains__(self, key) -> bool:
+        return self.get(key) is not None
+
+    def __getitem__(self, key):
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        with self._lock:
+            return {**self.stats, 'entries': len(self._entries), 'max_entries': self.max_entries}
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+
+# Process-wide registry. Streamlit re-executes this module on every rerun, so shared objects live in
+# st.cache_resource rather than module globals. Engines registered here hold only immutable catalogs.
+
+@st.cache_resource
+def get_shared_pricing_cache(name: str) -> SharedTTLCache:
+    """Named pricing cache shared by all sessions"""
+    return SharedTTLCache()
+
+@st.cache_resource
+def get_shared_pricing_client():
+    """One boto3 Pricing client for the process (clients are thread-safe), or None without credentials"""
+    try:
+        return boto3.client('pricing', region_name='us-east-1')
+    except Exception as e:
+        print(f"Warning: Could not initialize AWS pricing client: {e}")
+        return None
+
+@st.cache_resource
+def get_shared_pricing_api() -> 'EnhancedAWSPricingAPI':
+    return EnhancedAWSPricingAPI()
+
+@st.cache_resource
+def get_shared_real_pricing_api() -> 'RealAWSPricingAPI':
+    return RealAWSPricingAPI()
+
+@st.cache_resource
+def get_shared_vrops_analyzer() -> 'VRopsMetricsAnalyzer':
+    return VRopsMetricsAnalyzer()
+
+@st.cache_resource
+def get_shared_network_analyzer() -> 'NetworkTransferAnalyzer':
+    return NetworkTransferAnalyzer()
+
+@st.cache_resource
+def get_shared_growth_analyzer() -> 'GrowthAwareCostAnalyzer':
+    return GrowthAwareCostAnalyzer()
+
 # ADD THIS CLASS to your streamlit_app.py file (put it near the top with other classes):
 
 class EnhancedAWSPricingAPI:
     """Enhanced AWS Pricing API with Writer/Reader and Aurora support"""
     
-    def __init__(self):
+    def __init__(self, cache: Optional[SharedTTLCache] = None):
         self.base_url = "https://pricing.us-east-1.amazonaws.com"
-        self.cache = {}
+        self.cache = cache if cache is not None else get_shared_pricing_cache('rds_static')
         
+    @traced('pricing')
     def get_rds_pricing(self, region: str, engine: str, instance_class: str, multi_az: bool = False) -> Dict:
         """Get RDS pricing for specific instance with Multi-AZ support"""
         cache_key = f"{region}_{engine}_{instance_class}_{multi_az}"
         
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
         
         # Enhanced pricing data with Multi-AZ and Aurora support
         pricing_data = {
@@ -242,9 +617,10 @@ class MigrationAnalyzer:
     """Basic migration analyzer for standard environment configurations"""
     
     def __init__(self, anthropic_api_key: Optional[str] = None):
-        self.pricing_api = EnhancedAWSPricingAPI()
+        self.pricing_api = get_shared_pricing_api()
         self.anthropic_api_key = anthropic_api_key
     
+    @traced('analysis')
     def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
         """Calculate AWS instance recommendations for environments"""
         
@@ -277,6 +653,7 @@ class MigrationAnalyzer:
         
         return recommendations
     
+    @traced('analysis')
     def calculate_migration_costs(self, recommendations: Dict, migration_params: Dict) -> Dict:
         """Calculate migration costs based on recommendations"""
         
@@ -324,6 +701,7 @@ class MigrationAnalyzer:
             'transfer_costs': transfer_costs
         }
     
+@traced('ai')
 def generate_ai_insights_sync(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
     """Generate REAL Claude AI insights synchronously"""
     
@@ -468,13 +846,242 @@ def generate_ai_insights_sync(self, cost_analysis: Dict, migration_params: Dict)
             'total': min(internet_cost, dx_cost)
         }
 
+class StreamingInsightParser:
+    """Split streamed model text into paragraphs and classify each as soon as it completes"""
+    
+    def __init__(self, classify, on_section=None):
+        self.classify = classify
+        self.on_section = on_section
+        self.buffer = ''
+        self.sections = []
+        self.started_at = time.perf_counter()
+        self.time_to_first_insight = None
+    
+    def feed(self, text: str) -> List[Tuple[Optional[str], str]]:
+        """Add streamed text; returns (category, paragraph) for each newly completed paragraph"""
+        self.buffer += text
+        completed = []
+        
+        while '\n\n' in self.buffer:
+            paragraph, self.buffer = self.buffer.split('\n\n', 1)
+            completed.extend(self._emit(paragraph))
+        
+        return completed
+    
+    def close(self) -> List[Tuple[Optional[str], str]]:
+        """Flush the trailing paragraph once the stream ends"""
+        paragraph, self.buffer = self.buffer, ''
+        return self._emit(paragraph)
+    
+    def _emit(self, paragraph: str) -> List[Tuple[Optional[str], str]]:
+        if not paragraph.strip():
+            return []
+        
+        category = self.classify(paragraph)
+        self.sections.append((category, paragraph))
+        
+        if self.time_to_first_insight is None:
+            self.time_to_first_insight = time.perf_counter() - self.started_at
+        if self.on_section:
+            self.on_section(category, paragraph)
+        
+        return [(category, paragraph)]
+
+@traced('ai')
+def stream_claude_completion(client, prompt: str, classify, on_section=None,
+                             model: str = "claude-3-sonnet-20240229",
+                             max_tokens: int = 2000, temperature: float = 0.3) -> Tuple[str, Dict]:
+    """Stream a Messages API completion, classifying paragraphs as they arrive"""
+    
+    parser = StreamingInsightParser(classify, on_section)
+    chunks = []
+    time_to_first_token = None
+    
+    with client.messages.stream(
+        model=model,
+        max_tokens=max_tokens,
+        temperature=temperature,
+        messages=[{"role": "user", "content": prompt}]
+    ) as stream:
+        for text in stream.text_stream:
+            if time_to_first_token is None:
+                time_to_first_token = time.perf_counter() - parser.started_at
+            chunks.append(text)
+            parser.feed(text)
+    
+    parser.close()
+    
+    return ''.join(chunks), {
+        'time_to_first_token': time_to_first_token,
+        'time_to_first_insight': parser.time_to_first_insight,
+        'total_time': time.perf_counter() - parser.started_at,
+        'sections_streamed': len(parser.sections)
+    }
+
+# ===========================
+# AI RESPONSE CACHE
+# ===========================
+
+class AIResponseCache:
+    """Disk-backed prompt-response cache keyed by model and normalized prompt, with TTL and LRU eviction"""
+
+    NUMBER_PATTERN = re.compile(r'(?<![\w.-])\d[\d,]*(?:\.\d+)?(?!\w)')
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl_seconds: int = 7 * 24 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.environ.get(
+            'AI_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'db_migration_ai_cache')
+        )
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'expired': 0, 'writes': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def normalize_prompt(cls, prompt: str, bucket_numbers: bool = False, significant_digits: int = 2) -> str:
+        """Collapse whitespace and optionally round every number to a few significant digits"""
+        normalized = ' '.join(prompt.split())
+        if not bucket_numbers:
+            return normalized
+
+        def bucket(match):
+            value = float(match.group(0).replace(',', ''))
+            if value == 0:
+                return '0'
+            digits = significant_digits - int(math.floor(math.log10(abs(value)))) - 1
+            return f"{round(value, digits):g}"
+
+        return cls.NUMBER_PATTERN.sub(bucket, normalized)
+
+    @classmethod
+    def cache_key(cls, model: str, prompt: str, bucket_numbers: bool = False, **params) -> str:
+        """SHA-256 of model, request parameters and the normalized prompt"""
+        canonical = json.dumps({
+            'model': model,
+            'params': params,
+            'prompt': cls.normalize_prompt(prompt, bucket_numbers)
+        }, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Cached response text, or None if missing or past its TTL"""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.stats['misses'] += 1
+            return None
+
+        if time.time() - entry.get('created_at', 0) > self.ttl_seconds:
+            self.stats['expired'] += 1
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+        try:
+            os.utime(path)  # mtime is the LRU clock
+        except OSError:
+            pass
+        self.stats['hits'] += 1
+        return entry.get('response')
+
+    def put(self, key: str, response: str, model: str = ''):
+        """Store a response atomically"""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'model': model, 'created_at': time.time(), 'response': response}, f)
+            os.replace(tmp_path, path)
+            self.stats['writes'] += 1
+        except OSError as e:
+            print(f"Error writing AI response cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        self._evict()
+
+    def get_or_fetch(self, model: str, prompt: str, fetch, bucket_numbers: bool = False, **params) -> Tuple[str, bool]:
+        """Return (response, cache_hit), calling fetch() on a miss"""
+        key = self.cache_key(model, prompt, bucket_numbers, **params)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+
+        response = fetch()
+        self.put(key, response, model)
+        return response, False
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) for every cached response"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        """Remove least recently used responses until under the size bound"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    self.stats['evictions'] += 1
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        entries = self._entries()
+        return {**self.stats, 'entries': len(entries), 'total_bytes': sum(size for _, size, _ in entries),
+                'ttl_seconds': self.ttl_seconds, 'cache_dir': self.cache_dir}
+
+    def clear(self):
+        """Remove every cached response"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+# Shared by every session of this server process and persisted across restarts
+@st.cache_resource
+def get_shared_ai_response_cache() -> AIResponseCache:
+    return AIResponseCache()
+
+ai_response_cache = get_shared_ai_response_cache()
+
 # FIXED: Synchronous Claude AI Implementation for Streamlit
 class StreamlitClaudeAIAnalyzer:
     """Synchronous Claude AI integration that works with Streamlit"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, response_cache: Optional[AIResponseCache] = None,
+                 bucket_numbers: bool = False):
         self.api_key = api_key
         self.client = None
+        self.response_cache = response_cache or ai_response_cache
+        self.bucket_numbers = bucket_numbers
         
         if api_key:
             try:
@@ -482,6 +1089,7 @@ class StreamlitClaudeAIAnalyzer:
             except Exception as e:
                 print(f"Warning: Could not initialize Anthropic client: {e}")
     
+    @traced('ai')
     def generate_ai_insights_sync(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Generate AI insights synchronously for Streamlit"""
         
@@ -496,45 +1104,35 @@ class StreamlitClaudeAIAnalyzer:
             context = self._prepare_migration_context(cost_analysis, migration_params)
             
             # Create the prompt
-            prompt = f"""
-            You are an AWS migration expert analyzing a database migration project. 
-            Please provide detailed insights and recommendations based on the following migration analysis:
-
-            {context}
-
-            Please provide insights in the following categories:
-            1. Cost Analysis & Optimization
-            2. Risk Assessment
-            3. Migration Strategy Recommendations
-            4. Timeline Feasibility
-            5. Technical Considerations
-            6. Post-Migration Optimization
-
-            Format your response as a structured analysis with specific, actionable recommendations.
-            Be concise but comprehensive. Limit response to 1500 words.
-            """
+            prompt = self._build_insights_prompt(context)
             
             # Call Claude API synchronously
-            message = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=2000,
-                temperature=0.3,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+            def fetch():
+                with trace_span('claude.messages.create', 'ai'):
+                    message = self.client.messages.create(
+                        model="claude-3-sonnet-20240229",
+                        max_tokens=2000,
+                        temperature=0.3,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ]
+                    )
+                return message.content[0].text
             
-            # Parse Claude's response
-            ai_response = message.content[0].text
+            # Parse Claude's response (served from the prompt cache when inputs are unchanged)
+            ai_response, cache_hit = self.response_cache.get_or_fetch(
+                "claude-3-sonnet-20240229", prompt, fetch, self.bucket_numbers, max_tokens=2000, temperature=0.3
+            )
             
             # Structure the response
             structured_insights = self._structure_ai_response(ai_response)
             structured_insights['source'] = 'Claude AI'
             structured_insights['model'] = 'claude-3-sonnet-20240229'
             structured_insights['api_success'] = True
+            structured_insights['cache_hit'] = cache_hit
             
             return structured_insights
             
@@ -546,6 +1144,211 @@ class StreamlitClaudeAIAnalyzer:
                 'api_success': False
             }
     
+    @traced('ai')
+    def stream_ai_insights(self, cost_analysis: Dict, migration_params: Dict, on_section=None) -> Dict:
+        """Stream AI insights, calling on_section(category, paragraph) as each paragraph completes"""
+        
+        if not self.client:
+            return {
+                'error': 'Claude AI not available - using fallback insights',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params)
+            }
+        
+        try:
+            context = self._prepare_migration_context(cost_analysis, migration_params)
+            prompt = self._build_insights_prompt(context)
+            cache_key = AIResponseCache.cache_key(
+                "claude-3-sonnet-20240229", prompt, self.bucket_numbers, max_tokens=2000, temperature=0.3
+            )
+            
+            ai_response = self.response_cache.get(cache_key)
+            cache_hit = ai_response is not None
+            
+            if cache_hit:
+                # Replay the cached text through the parser so callers see the same section callbacks
+                parser = StreamingInsightParser(self._classify_section, on_section)
+                parser.feed(ai_response)
+                parser.close()
+                timing = {
+                    'time_to_first_token': 0.0,
+                    'time_to_first_insight': parser.time_to_first_insight,
+                    'total_time': time.perf_counter() - parser.started_at,
+                    'sections_streamed': len(parser.sections)
+                }
+            else:
+                ai_response, timing = stream_claude_completion(
+                    self.client, prompt, self._classify_section, on_section
+                )
+                self.response_cache.put(cache_key, ai_response, "claude-3-sonnet-20240229")
+            
+            # Final structure from the full text so it matches the non-streaming path exactly
+            structured_insights = self._structure_ai_response(ai_response)
+            structured_insights['source'] = 'Claude AI'
+            structured_insights['model'] = 'claude-3-sonnet-20240229'
+            structured_insights['api_success'] = True
+            structured_insights['cache_hit'] = cache_hit
+            structured_insights['streaming'] = timing
+            
+            return structured_insights
+            
+        except Exception as e:
+            print(f"Error streaming Claude AI: {e}")
+            return {
+                'error': f'Claude AI call failed: {str(e)}',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params),
+                'api_success': False
+            }
+
+    # One focused prompt per insight category for the concurrent path
+    CATEGORY_PROMPTS = {
+        'cost_optimization': "Cost Analysis & Optimization: assess the projected AWS spend and recommend specific savings.",
+        'risk_mitigation': "Risk Assessment: identify the main migration risks and how to mitigate each one.",
+        'migration_strategy': "Migration Strategy Recommendations: recommend the migration approach, tooling and sequencing.",
+        'timeline_recommendations': "Timeline Feasibility: assess whether the planned timeline is realistic and how to phase it.",
+        'technical_considerations': "Technical Considerations: cover schema conversion, compatibility, performance and configuration.",
+        'post_migration_optimization': "Post-Migration Optimization: recommend right-sizing, monitoring and tuning after cutover."
+    }
+
+    @traced('ai')
+    async def generate_ai_insights_concurrent(self, cost_analysis: Dict, migration_params: Dict,
+                                              max_concurrency: int = 3, timeout: float = 60.0) -> Dict:
+        """Generate AI insights by issuing one prompt per category concurrently"""
+
+        if not self.api_key:
+            return {
+                'error': 'Claude AI not available - using fallback insights',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params)
+            }
+
+        context = self._prepare_migration_context(cost_analysis, migration_params)
+        semaphore = asyncio.Semaphore(max_concurrency)
+        started_at = time.perf_counter()
+
+        async def ask(client, category: str, focus: str) -> Tuple[str, Optional[str], Dict]:
+            prompt = self._build_category_prompt(context, focus)
+            cache_key = AIResponseCache.cache_key(
+                "claude-3-sonnet-20240229", prompt, self.bucket_numbers, max_tokens=700, temperature=0.3
+            )
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return category, cached, {'ok': True, 'seconds': 0.0, 'cache_hit': True}
+            
+            async with semaphore:
+                request_start = time.perf_counter()
+                try:
+                    with trace_span('claude.messages.create', 'ai', insight_category=category):
+                        message = await asyncio.wait_for(
+                            client.messages.create(
+                                model="claude-3-sonnet-20240229",
+                                max_tokens=700,
+                                temperature=0.3,
+                                messages=[{"role": "user", "content": prompt}]
+                            ),
+                            timeout=timeout
+                        )
+                    text = message.content[0].text
+                    self.response_cache.put(cache_key, text, "claude-3-sonnet-20240229")
+                    status = {'ok': True, 'seconds': time.perf_counter() - request_start, 'cache_hit': False}
+                    return category, text, status
+                except asyncio.TimeoutError:
+                    status = {'ok': False, 'seconds': timeout, 'error': f'timed out after {timeout:g}s'}
+                except Exception as e:
+                    status = {'ok': False, 'seconds': time.perf_counter() - request_start, 'error': str(e)}
+                print(f"Error generating {category} insights: {status['error']}")
+                return category, None, status
+
+        try:
+            async with anthropic.AsyncAnthropic(api_key=self.api_key) as client:
+                results = await asyncio.gather(*[
+                    ask(client, category, focus) for category, focus in self.CATEGORY_PROMPTS.items()
+                ])
+        except Exception as e:
+            print(f"Error calling Claude AI concurrently: {e}")
+            return {
+                'error': f'Claude AI call failed: {str(e)}',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params),
+                'api_success': False
+            }
+
+        return self._merge_category_responses(results, cost_analysis, migration_params,
+                                              time.perf_counter() - started_at, max_concurrency)
+
+    def _merge_category_responses(self, results: List[Tuple[str, Optional[str], Dict]], cost_analysis: Dict,
+                                  migration_params: Dict, elapsed: float, max_concurrency: int) -> Dict:
+        """Merge per-category answers into the _structure_ai_response layout"""
+
+        answered = [(category, text) for category, text, _ in results if text]
+        category_status = {category: status for category, _, status in results}
+
+        if not answered:
+            return {
+                'error': 'Claude AI call failed: no category prompt succeeded',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params),
+                'category_status': category_status,
+                'api_success': False
+            }
+
+        structured = self._structure_ai_response('\n\n'.join(text for _, text in answered))
+
+        # Each answer belongs to the category it was asked for, whatever its keywords suggest
+        for category in self.CATEGORY_PROMPTS:
+            structured[category] = ''
+        for category, text in answered:
+            structured[category] = text.strip() + '\n\n'
+
+        # Categories whose request failed fall back to the rule-based text
+        fallback = self._get_fallback_insights(cost_analysis, migration_params)
+        for category, text, _ in results:
+            if not text:
+                structured[category] = fallback.get(category, '')
+
+        structured['source'] = 'Claude AI'
+        structured['model'] = 'claude-3-sonnet-20240229'
+        structured['api_success'] = True
+        structured['category_status'] = category_status
+        structured['concurrency'] = {
+            'max_concurrency': max_concurrency,
+            'total_time': elapsed,
+            'sum_request_time': sum(status['seconds'] for status in category_status.values()),
+            'cache_hits': sum(1 for status in category_status.values() if status.get('cache_hit')),
+            'failed_categories': [category for category, status in category_status.items() if not status['ok']]
+        }
+
+        return structured
+
+    def _build_category_prompt(self, context: str, focus: str) -> str:
+        """Prompt for a single insight category"""
+        return f"""
+            You are an AWS migration expert analyzing a database migration project.
+            Based on the following migration analysis:
+
+            {context}
+
+            Provide insights on one topic only - {focus}
+
+            Give specific, actionable recommendations as a short bulleted list. Limit response to 300 words.
+            """
+
+    def _build_insights_prompt(self, context: str) -> str:
+        """Insights prompt covering all six categories"""
+        return f"""
+            You are an AWS migration expert analyzing a database migration project. 
+            Please provide detailed insights and recommendations based on the following migration analysis:
+
+            {context}
+
+            Please provide insights in the following categories:
+            1. Cost Analysis & Optimization
+            2. Risk Assessment
+            3. Migration Strategy Recommendations
+            4. Timeline Feasibility
+            5. Technical Considerations
+            6. Post-Migration Optimization
+
+            Format your response as a structured analysis with specific, actionable recommendations.
+            Be concise but comprehensive. Limit response to 1500 words.
+            """
+    
     def _prepare_migration_context(self, cost_analysis: Dict, migration_params: Dict) -> str:
         """Prepare context for Claude AI"""
         
@@ -618,24 +1421,10 @@ class StreamlitClaudeAIAnalyzer:
         structured['key_recommendations'] = recommendations[:8]  # Top 8 recommendations
         
         # Try to extract sections based on keywords
-        current_section = ''
         for section in sections:
-            section_lower = section.lower()
-            
-            if any(keyword in section_lower for keyword in ['cost', 'pricing', 'financial', 'budget']):
-                structured['cost_optimization'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['risk', 'mitigation', 'challenges']):
-                structured['risk_mitigation'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['strategy', 'approach', 'methodology']):
-                structured['migration_strategy'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['timeline', 'schedule', 'phases']):
-                structured['timeline_recommendations'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['technical', 'architecture', 'configuration']):
-                structured['technical_considerations'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['optimization', 'performance', 'tuning']):
-                structured['post_migration_optimization'] += section + '\n\n'
-            elif any(keyword in section_lower for keyword in ['summary', 'conclusion', 'overview']):
-                structured['executive_summary'] += section + '\n\n'
+            category = self._classify_section(section)
+            if category:
+                structured[category] += section + '\n\n'
         
         # If executive summary is empty, create one from the first section
         if not structured['executive_summary'] and sections:
@@ -643,6 +1432,26 @@ class StreamlitClaudeAIAnalyzer:
         
         return structured
     
+    def _classify_section(self, section: str) -> Optional[str]:
+        """Category key for a response paragraph, by keyword"""
+        section_lower = section.lower()
+        
+        if any(keyword in section_lower for keyword in ['cost', 'pricing', 'financial', 'budget']):
+            return 'cost_optimization'
+        elif any(keyword in section_lower for keyword in ['risk', 'mitigation', 'challenges']):
+            return 'risk_mitigation'
+        elif any(keyword in section_lower for keyword in ['strategy', 'approach', 'methodology']):
+            return 'migration_strategy'
+        elif any(keyword in section_lower for keyword in ['timeline', 'schedule', 'phases']):
+            return 'timeline_recommendations'
+        elif any(keyword in section_lower for keyword in ['technical', 'architecture', 'configuration']):
+            return 'technical_considerations'
+        elif any(keyword in section_lower for keyword in ['optimization', 'performance', 'tuning']):
+            return 'post_migration_optimization'
+        elif any(keyword in section_lower for keyword in ['summary', 'conclusion', 'overview']):
+            return 'executive_summary'
+        return None
+    
     def _get_fallback_insights(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Enhanced fallback insights when AI is unavailable"""
         
@@ -696,23 +1505,309 @@ class StreamlitClaudeAIAnalyzer:
         }
 
 
-# FIXED: Synchronous Migration Analyzer for Streamlit
-class StreamlitMigrationAnalyzer:
-    """Migration analyzer that works synchronously with Streamlit"""
-    
-    def __init__(self, anthropic_api_key: Optional[str] = None):
-        self.pricing_api = RealAWSPricingAPI()
-        self.ai_analyzer = StreamlitClaudeAIAnalyzer(anthropic_api_key)
-        self.anthropic_api_key = anthropic_api_key
-    
-    def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
-        """Calculate AWS instance recommendations using real pricing"""
-        
-        recommendations = {}
-        
-        for env_name, specs in environment_specs.items():
-            cpu_cores = specs['cpu_cores']
-            ram_gb = specs['ram_gb']
+# ===========================
+# PORTFOLIO AI INSIGHTS
+# ===========================
+
+class PortfolioAIInsightsAnalyzer:
+    """Environment-group AI insights for large portfolios, batched under a token budget"""
+
+    def __init__(self, api_key: Optional[str] = None, response_cache: Optional[AIResponseCache] = None,
+                 tokens_per_batch: int = 2500, max_concurrency: int = 3, requests_per_minute: int = 50,
+                 timeout: float = 60.0):
+        self.api_key = api_key
+        self.response_cache = response_cache or ai_response_cache
+        self.tokens_per_batch = tokens_per_batch
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self.timeout = timeout
+        self.model = "claude-3-sonnet-20240229"
+        self._initialize_grouping()
+
+    def _initialize_grouping(self):
+        """Cost tiers and per-group limits that keep prompt size independent of environment count"""
+        self.cost_tier_bounds = [0, 500, 2000, 10000, float('inf')]
+        self.cost_tier_labels = ['small', 'medium', 'large', 'xlarge']
+        self.max_outliers_per_group = 3
+        self.outlier_factor = 2.0
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """Rough token count (about four characters per token)"""
+        return len(text) // 4 + 1
+
+    def summarize_environments(self, cost_analysis: Dict, recommendations: Dict) -> pd.DataFrame:
+        """One row per environment with the fields the grouping needs"""
+
+        rows = []
+        for env_name, costs in (cost_analysis.get('environment_costs') or {}).items():
+            rec = (recommendations or {}).get(env_name, {})
+            writer = rec.get('writer', {})
+            costs = costs if isinstance(costs, dict) else {'total_monthly': float(costs or 0)}
+            rows.append({
+                'environment': env_name,
+                'environment_type': rec.get('environment_type', 'production'),
+                'instance_class': rec.get('instance_class') or writer.get('instance_class', 'unknown'),
+                'monthly_cost': costs.get('total_monthly', 0),
+                'cpu_cores': rec.get('cpu_cores', 0),
+                'ram_gb': rec.get('ram_gb', 0),
+                'storage_gb': rec.get('storage_gb') or rec.get('storage', {}).get('size_gb', 0),
+                'multi_az': bool(rec.get('multi_az', writer.get('multi_az', False)))
+            })
+
+        return pd.DataFrame(rows, columns=['environment', 'environment_type', 'instance_class', 'monthly_cost',
+                                           'cpu_cores', 'ram_gb', 'storage_gb', 'multi_az'])
+
+    def group_environments(self, env_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, str]]:
+        """Aggregate environments by type, instance family and cost tier; returns (groups, environment -> group id)"""
+
+        if env_df.empty:
+            return pd.DataFrame(), {}
+
+        env_df = env_df.copy()
+        env_df['instance_family'] = env_df['instance_class'].astype(str).str.rsplit('.', n=1).str[0]
+        env_df['cost_tier'] = pd.cut(env_df['monthly_cost'], self.cost_tier_bounds,
+                                     labels=self.cost_tier_labels, right=False).astype(str)
+        keys = ['environment_type', 'instance_family', 'cost_tier']
+
+        grouped = env_df.groupby(keys, sort=False)
+        groups = grouped.agg(
+            environments=('environment', 'size'),
+            total_monthly=('monthly_cost', 'sum'),
+            median_monthly=('monthly_cost', 'median'),
+            p95_monthly=('monthly_cost', lambda s: s.quantile(0.95)),
+            multi_az_count=('multi_az', 'sum'),
+            avg_cpu=('cpu_cores', 'mean'),
+            avg_ram_gb=('ram_gb', 'mean'),
+            avg_storage_gb=('storage_gb', 'mean')
+        ).reset_index().sort_values('total_monthly', ascending=False).reset_index(drop=True)
+        groups.insert(0, 'group_id', [f"G{i + 1:02d}" for i in range(len(groups))])
+
+        # Outliers: the few most expensive environments well above their group median
+        env_df = env_df.merge(groups[keys + ['group_id', 'median_monthly']], on=keys)
+        outliers = env_df[env_df['monthly_cost'] > env_df['median_monthly'] * self.outlier_factor]
+        outliers = (outliers.sort_values('monthly_cost', ascending=False)
+                    .groupby('group_id').head(self.max_outliers_per_group))
+        outlier_text = {}
+        for group_id, name, cost in zip(outliers['group_id'], outliers['environment'], outliers['monthly_cost']):
+            outlier_text.setdefault(group_id, []).append(f"{name} (${cost:,.0f})")
+        groups['outliers'] = groups['group_id'].map(lambda group_id: ', '.join(outlier_text.get(group_id, [])))
+
+        return groups, dict(zip(env_df['environment'], env_df['group_id']))
+
+    def describe_group(self, group: Dict) -> str:
+        """Compact one-line summary of a group for the prompt"""
+        line = (f"{group['group_id']} | {group['environment_type']} | {group['instance_family']} | {group['cost_tier']} tier | "
+                f"{group['environments']} envs | ${group['total_monthly']:,.0f}/mo total | "
+                f"median ${group['median_monthly']:,.0f} | p95 ${group['p95_monthly']:,.0f} | "
+                f"{int(group['multi_az_count'])} Multi-AZ | avg {group['avg_cpu']:.0f} vCPU / "
+                f"{group['avg_ram_gb']:.0f} GB RAM / {group['avg_storage_gb']:,.0f} GB storage")
+        if group.get('outliers'):
+            line += f" | outliers: {group['outliers']}"
+        return line
+
+    def build_batches(self, group_lines: List[Tuple[str, str]], header_tokens: int = 0) -> List[List[Tuple[str, str]]]:
+        """Pack (group_id, line) pairs greedily into batches under the token budget"""
+
+        budget = max(self.tokens_per_batch - header_tokens, 1)
+        batches, current, current_tokens = [], [], 0
+
+        for group_id, line in group_lines:
+            line_tokens = self.estimate_tokens(line)
+            if current and current_tokens + line_tokens > budget:
+                batches.append(current)
+                current, current_tokens = [], 0
+            current.append((group_id, line))
+            current_tokens += line_tokens
+
+        if current:
+            batches.append(current)
+        return batches
+
+    @traced('ai')
+    async def generate_portfolio_insights(self, cost_analysis: Dict, recommendations: Dict,
+                                          migration_params: Dict) -> Dict:
+        """Group environments, send token-budgeted batches concurrently and merge per-group findings"""
+
+        started_at = time.perf_counter()
+        env_df = self.summarize_environments(cost_analysis, recommendations)
+        groups, environment_groups = self.group_environments(env_df)
+
+        if groups.empty:
+            return {'error': 'No environments to analyze', 'groups': [], 'environment_groups': {}}
+
+        group_records = groups.to_dict('records')
+        header = self._build_portfolio_header(cost_analysis, migration_params, len(env_df), len(groups))
+        batches = self.build_batches([(g['group_id'], self.describe_group(g)) for g in group_records],
+                                     self.estimate_tokens(header))
+
+        findings = {}
+        batch_status = []
+        if self.api_key:
+            findings, batch_status = await self._run_batches(header, batches)
+
+        # Groups the model did not cover (no key, failed batch, unparsed answer) get rule-based findings
+        for group in group_records:
+            if findings.get(group['group_id']):
+                group['findings'] = findings[group['group_id']]
+                group['source'] = 'Claude AI'
+            else:
+                group['findings'] = self._fallback_group_findings(group)
+                group['source'] = 'Rule-based'
+
+        prompts_tokens = [self.estimate_tokens(header) + sum(self.estimate_tokens(line) for _, line in batch)
+                          for batch in batches]
+
+        result = {
+            'groups': group_records,
+            'environment_groups': environment_groups,
+            'environment_count': len(env_df),
+            'group_count': len(group_records),
+            'batch_count': len(batches),
+            'estimated_input_tokens': sum(prompts_tokens),
+            'max_batch_tokens': max(prompts_tokens),
+            'batch_status': batch_status,
+            'cache_hits': sum(1 for status in batch_status if status.get('cache_hit')),
+            'failed_batches': sum(1 for status in batch_status if not status['ok']),
+            'wall_time': time.perf_counter() - started_at,
+            'source': 'Claude AI' if any(g['source'] == 'Claude AI' for g in group_records) else 'Rule-based',
+            'api_success': any(status['ok'] for status in batch_status)
+        }
+        if not self.api_key:
+            result['error'] = 'Claude AI not available - using rule-based group findings'
+
+        return result
+
+    async def _run_batches(self, header: str, batches: List[List[Tuple[str, str]]]) -> Tuple[Dict[str, List[str]], List[Dict]]:
+        """Send batches with a concurrency cap and a requests-per-minute limit"""
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        rate_lock = asyncio.Lock()
+        interval = 60.0 / max(self.requests_per_minute, 1)
+        next_start = [time.perf_counter()]
+
+        async def wait_for_slot():
+            async with rate_lock:
+                now = time.perf_counter()
+                delay = next_start[0] - now
+                next_start[0] = max(now, next_start[0]) + interval
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        async def ask(client, index: int, batch: List[Tuple[str, str]]) -> Tuple[Dict[str, List[str]], Dict]:
+            group_ids = [group_id for group_id, _ in batch]
+            prompt = self._build_batch_prompt(header, [line for _, line in batch])
+            cache_key = AIResponseCache.cache_key(self.model, prompt, max_tokens=1500, temperature=0.3)
+
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return self._parse_group_findings(cached, group_ids), {'batch': index, 'ok': True, 'seconds': 0.0, 'cache_hit': True}
+
+            async with semaphore:
+                await wait_for_slot()
+                request_start = time.perf_counter()
+                try:
+                    with trace_span('claude.messages.create', 'ai', batch=index):
+                        message = await asyncio.wait_for(
+                            client.messages.create(
+                                model=self.model,
+                                max_tokens=1500,
+                                temperature=0.3,
+                                messages=[{"role": "user", "content": prompt}]
+                            ),
+                            timeout=self.timeout
+                        )
+                    text = message.content[0].text
+                    self.response_cache.put(cache_key, text, self.model)
+                    status = {'batch': index, 'ok': True, 'seconds': time.perf_counter() - request_start, 'cache_hit': False}
+                    return self._parse_group_findings(text, group_ids), status
+                except asyncio.TimeoutError:
+                    status = {'batch': index, 'ok': False, 'seconds': self.timeout, 'error': f'timed out after {self.timeout:g}s'}
+                except Exception as e:
+                    status = {'batch': index, 'ok': False, 'seconds': time.perf_counter() - request_start, 'error': str(e)}
+                print(f"Error generating portfolio insights for batch {index}: {status['error']}")
+                return {}, status
+
+        try:
+            async with anthropic.AsyncAnthropic(api_key=self.api_key) as client:
+                results = await asyncio.gather(*[ask(client, i, batch) for i, batch in enumerate(batches)])
+        except Exception as e:
+            print(f"Error calling Claude AI for portfolio insights: {e}")
+            return {}, [{'batch': i, 'ok': False, 'seconds': 0.0, 'error': str(e)} for i in range(len(batches))]
+
+        findings = {}
+        for batch_findings, _ in results:
+            findings.update(batch_findings)
+        return findings, [status for _, status in results]
+
+    def _build_portfolio_header(self, cost_analysis: Dict, migration_params: Dict,
+                                environment_count: int, group_count: int) -> str:
+        """Portfolio-wide context shared by every batch"""
+        return f"""
+            You are an AWS migration expert reviewing a large database migration portfolio.
+            Source: {migration_params.get('source_engine', 'Unknown')} -> Target: {migration_params.get('target_engine', 'Unknown')}
+            Region: {migration_params.get('region', 'us-east-1')}, timeline {migration_params.get('migration_timeline_weeks', 0)} weeks
+            Portfolio: {environment_count} environments in {group_count} groups, ${cost_analysis.get('monthly_aws_cost', 0):,.0f}/month total
+
+            Environments are grouped by type, instance family and monthly cost tier. For each group below give 1-3
+            specific findings (right-sizing, Reserved Instances, Multi-AZ, outliers, migration wave placement).
+            Start every finding on its own line with the group id and a colon, for example "G01: ...".
+
+            Groups (id | type | family | tier | count | total | median | p95 | Multi-AZ | average size | outliers):
+            """
+
+    def _build_batch_prompt(self, header: str, lines: List[str]) -> str:
+        return header + '\n'.join(lines)
+
+    def _parse_group_findings(self, text: str, group_ids: List[str]) -> Dict[str, List[str]]:
+        """Collect 'Gnn: finding' lines for the groups a batch asked about"""
+
+        wanted = set(group_ids)
+        findings = {}
+        for line in text.split('\n'):
+            match = re.match(r'^[\s*•\-]*\**(G\d+)\**\s*[:\-–]\s*(.+)$', line.strip())
+            if match and match.group(1) in wanted:
+                findings.setdefault(match.group(1), []).append(match.group(2).strip())
+        return findings
+
+    def _fallback_group_findings(self, group: Dict) -> List[str]:
+        """Rule-based findings for a group"""
+
+        findings = []
+        envs = group['environments']
+
+        if group['environment_type'] in ['production', 'staging'] and group['multi_az_count'] < envs:
+            findings.append(f"{envs - int(group['multi_az_count'])} of {envs} {group['environment_type']} environments lack Multi-AZ")
+        if group['environment_type'] == 'production' and group['cost_tier'] in ['large', 'xlarge']:
+            findings.append(f"Reserved Instances on {group['instance_family']} could save 30-40% of ${group['total_monthly']:,.0f}/month")
+        if group['environment_type'] in ['development', 'testing']:
+            findings.append(f"Schedule stop/start for these {envs} non-production environments outside working hours")
+        if group.get('outliers'):
+            findings.append(f"Review sizing of outliers above {self.outlier_factor:g}x the group median: {group['outliers']}")
+        if not findings:
+            findings.append(f"{envs} environments at median ${group['median_monthly']:,.0f}/month; revisit sizing after 30 days of metrics")
+
+        return findings
+
+
+# FIXED: Synchronous Migration Analyzer for Streamlit
+class StreamlitMigrationAnalyzer:
+    """Migration analyzer that works synchronously with Streamlit"""
+    
+    def __init__(self, anthropic_api_key: Optional[str] = None):
+        self.pricing_api = get_shared_real_pricing_api()
+        self.ai_analyzer = StreamlitClaudeAIAnalyzer(anthropic_api_key)
+        self.anthropic_api_key = anthropic_api_key
+    
+    @traced('analysis')
+    def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
+        """Calculate AWS instance recommendations using real pricing"""
+        
+        recommendations = {}
+        
+        for env_name, specs in environment_specs.items():
+            cpu_cores = specs['cpu_cores']
+            ram_gb = specs['ram_gb']
             storage_gb = specs['storage_gb']
             
             # Determine environment type
@@ -737,6 +1832,7 @@ class StreamlitMigrationAnalyzer:
         
         return recommendations
     
+    @traced('analysis')
     def calculate_migration_costs(self, recommendations: Dict, migration_params: Dict) -> Dict:
         """Calculate migration costs using real AWS pricing"""
         
@@ -785,6 +1881,7 @@ class StreamlitMigrationAnalyzer:
             'transfer_costs': transfer_costs
         }
     
+    @traced('ai')
     def generate_ai_insights_sync(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Generate AI insights synchronously for Streamlit"""
         return self.ai_analyzer.generate_ai_insights_sync(cost_analysis, migration_params)
@@ -1041,8 +2138,6 @@ def show_analysis_section_fixed():
      # Add this line before the analysis button
     #check_and_refresh_growth_metrics()
     
-    # Run analysis button
-    if st.button("🚀 Run Comprehensive Analysis", type="primary", use_container_width=True):
     
     # API status check
     show_api_status_inline()
@@ -1091,9 +2186,10 @@ class MigrationAnalyzer:
     """Basic migration analyzer for standard environment configurations"""
     
     def __init__(self, anthropic_api_key: Optional[str] = None):
-        self.pricing_api = EnhancedAWSPricingAPI()
+        self.pricing_api = get_shared_pricing_api()
         self.anthropic_api_key = anthropic_api_key
     
+    @traced('analysis')
     def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
         """Calculate AWS instance recommendations for environments"""
         
@@ -1129,6 +2225,7 @@ class MigrationAnalyzer:
        
         return recommendations
     
+    @traced('analysis')
     def calculate_migration_costs(self, recommendations: Dict, migration_params: Dict) -> Dict:
         """Calculate migration costs based on recommendations"""
         
@@ -1182,15 +2279,13 @@ class MigrationAnalyzer:
         
         if not self.anthropic_api_key:
             return {'error': 'No API key provided'}
-        
+
         try:
-            # Simple insights without actual API call for now
-            insights = {
-                'cost_efficiency': f"Monthly AWS cost of ${cost_analysis['monthly_aws_cost']:,.0f} represents efficient cloud migration",
-                'migration_strategy': f"Recommended {migration_params.get('migration_timeline_weeks', 12)}-week timeline is appropriate for this scale",
-                'risk_assessment': "Migration complexity is manageable with proper planning and resources"
-            }
-            return insights
+            # Six category prompts in flight at once over the async client
+            ai_analyzer = StreamlitClaudeAIAnalyzer(
+                self.anthropic_api_key, bucket_numbers=migration_params.get('ai_cache_bucket_numbers', False)
+            )
+            return await ai_analyzer.generate_ai_insights_concurrent(cost_analysis, migration_params)
         except Exception as e:
             return {'error': str(e)}
     
@@ -1291,6 +2386,207 @@ class MigrationAnalyzer:
             'total': min(internet_cost, dx_cost)
         }
         
+# ===========================
+# CHART RENDERING SERVICE
+# ===========================
+
+class ChartRenderingService:
+    """Batched Plotly-to-PNG rendering with a content-addressed in-memory cache"""
+
+    def __init__(self, max_entries: int = 256, max_workers: int = 4):
+        self.max_entries = max_entries
+        self.max_workers = max_workers
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'render_sessions': 0, 'render_failures': 0}
+
+    @staticmethod
+    def chart_key(fig, width: int, height: int, scale: float = 2) -> str:
+        """SHA-256 of the figure JSON plus output size"""
+        fig_json = pio.to_json(fig, validate=False, remove_uids=True)
+        return hashlib.sha256(f"{fig_json}|{width}x{height}@{scale}".encode('utf-8')).hexdigest()
+
+    def render(self, fig, width: int = 600, height: int = 400, scale: float = 2) -> Optional[bytes]:
+        """Render a single figure to PNG bytes"""
+        return self.render_batch([(fig, width, height)], scale=scale)[0]
+
+    @traced('charts')
+    def render_batch(self, charts: List[Tuple[Any, int, int]], scale: float = 2) -> List[Optional[bytes]]:
+        """Render (fig, width, height) tuples, serving repeats from cache and the rest in one session"""
+
+        keys = [self.chart_key(fig, width, height, scale) for fig, width, height in charts]
+        results = [None] * len(charts)
+        pending = {}
+
+        with self._lock:
+            for i, key in enumerate(keys):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    results[i] = self._cache[key]
+                    self.stats['hits'] += 1
+                elif key not in pending:
+                    pending[key] = charts[i]
+                    self.stats['misses'] += 1
+                else:
+                    self.stats['hits'] += 1
+
+        if pending:
+            rendered = self._render_session(list(pending.values()), scale)
+
+            with self._lock:
+                for key, png_bytes in zip(pending.keys(), rendered):
+                    if png_bytes:
+                        self._cache[key] = png_bytes
+                        self._cache.move_to_end(key)
+                    else:
+                        self.stats['render_failures'] += 1
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+            rendered_by_key = dict(zip(pending.keys(), rendered))
+            results = [result if result is not None else rendered_by_key.get(key) for result, key in zip(results, keys)]
+
+        return results
+
+    @traced('charts', 'kaleido.render_session')
+    def _render_session(self, charts: List[Tuple[Any, int, int]], scale: float) -> List[Optional[bytes]]:
+        """Render uncached charts in a single Kaleido browser session"""
+
+        self.stats['render_sessions'] += 1
+
+        try:
+            import kaleido
+        except ImportError:
+            print("Kaleido not installed; charts will be omitted from reports")
+            return [None] * len(charts)
+
+        # Kaleido >= 1.0 drives Chromium; open it once and render every chart over its tabs
+        if hasattr(kaleido, 'Kaleido'):
+            async def render_all():
+                async with kaleido.Kaleido(n=min(self.max_workers, len(charts))) as session:
+                    return await asyncio.gather(*[
+                        session.calc_fig(fig, opts={'format': 'png', 'width': width, 'height': height, 'scale': scale})
+                        for fig, width, height in charts
+                    ], return_exceptions=True)
+
+            try:
+                try:
+                    asyncio.get_running_loop()
+                    # Already inside an event loop: run the session on a worker thread
+                    from concurrent.futures import ThreadPoolExecutor
+                    with ThreadPoolExecutor(max_workers=1) as executor:
+                        outputs = executor.submit(asyncio.run, render_all()).result()
+                except RuntimeError:
+                    outputs = asyncio.run(render_all())
+            except Exception as e:
+                print(f"Error in batched chart rendering: {e}")
+                return [None] * len(charts)
+
+            results = []
+            for output in outputs:
+                if isinstance(output, Exception):
+                    print(f"Error rendering chart: {output}")
+                    results.append(None)
+                else:
+                    results.append(output)
+            return results
+
+        # Legacy Kaleido keeps one persistent subprocess across to_image calls
+        results = []
+        for fig, width, height in charts:
+            try:
+                results.append(fig.to_image(format="png", width=width, height=height, scale=scale))
+            except Exception as e:
+                print(f"Error rendering chart: {e}")
+                results.append(None)
+        return results
+
+    def get_stats(self) -> Dict:
+        """Cache and rendering statistics"""
+        with self._lock:
+            return {**self.stats, 'cached_charts': len(self._cache),
+                    'cached_bytes': sum(len(v) for v in self._cache.values())}
+
+    def clear(self):
+        """Drop all cached images"""
+        with self._lock:
+            self._cache.clear()
+
+# Shared across report generators so repeated charts are rendered once per process
+@st.cache_resource
+def get_shared_chart_rendering_service() -> ChartRenderingService:
+    return ChartRenderingService()
+
+chart_rendering_service = get_shared_chart_rendering_service()
+
+class PendingChart(Flowable):
+    """Placeholder for a chart queued for batched rendering"""
+
+    def __init__(self, fig, width: int, height: int, draw_width: float, draw_height: float):
+        Flowable.__init__(self)
+        self.fig = fig
+        self.render_width = width
+        self.render_height = height
+        self.draw_width = draw_width
+        self.draw_height = draw_height
+
+    def wrap(self, availWidth, availHeight):
+        return self.draw_width, self.draw_height
+
+    def draw(self):
+        # Only reached if the story was built without render_pending_charts
+        png_bytes = chart_rendering_service.render(self.fig, self.render_width, self.render_height)
+        if png_bytes:
+            self.canv.drawImage(ImageReader(io.BytesIO(png_bytes)), 0, 0,
+                                width=self.draw_width, height=self.draw_height)
+
+class ReportSectionCache:
+    """LRU of built report sections (flowable bundles) keyed by section name and input digest"""
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._sections = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'builds': 0}
+
+    def get_or_build(self, section: str, input_digest: str, builder) -> List:
+        """Cached flowables for a section, building them only when its inputs changed"""
+        key = (section, input_digest)
+
+        with self._lock:
+            if key in self._sections:
+                self._sections.move_to_end(key)
+                self.stats['hits'] += 1
+                # ReportLab stores layout state on flowables during wrap; give each build its own copies
+                return [copy.copy(flowable) for flowable in self._sections[key]]
+
+        flowables = builder()
+
+        with self._lock:
+            self.stats['builds'] += 1
+            self._sections[key] = list(flowables)
+            while len(self._sections) > self.max_entries:
+                self._sections.popitem(last=False)
+
+        return list(flowables)
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        with self._lock:
+            return {**self.stats, 'cached_sections': len(self._sections)}
+
+    def clear(self):
+        """Drop all cached sections"""
+        with self._lock:
+            self._sections.clear()
+
+# Shared so a new generator per request still reuses unchanged sections
+@st.cache_resource
+def get_shared_report_section_cache() -> ReportSectionCache:
+    return ReportSectionCache()
+
+report_section_cache = get_shared_report_section_cache()
+
 class ImprovedReportGenerator:
     """Enhanced PDF Report Generator with Better Formatting and Layout"""
     
@@ -1299,6 +2595,8 @@ class ImprovedReportGenerator:
         self.styles = getSampleStyleSheet()
         self.chart_width = 5.5*inch
         self.chart_height = 3.5*inch
+        self.chart_renderer = chart_rendering_service
+        self.section_cache = report_section_cache
         self.setup_custom_styles()
         
         # Debug: Verify styles are created
@@ -1468,6 +2766,7 @@ class ImprovedReportGenerator:
             print(f"Style '{style_name}' not found, using '{fallback}'")
             return self.styles[fallback]
     
+    @traced('reports')
     def create_improved_cost_chart(self, analysis_results, analysis_mode):
         """Create an improved cost breakdown chart with better formatting"""
         try:
@@ -1616,23 +2915,73 @@ class ImprovedReportGenerator:
             return None
     
     def create_plotly_chart_image(self, fig, width=600, height=400):
-        """Convert Plotly figure to image for PDF inclusion with improved quality"""
+        """Queue Plotly figure for batched rendering; resolved by render_pending_charts"""
         try:
-            # Convert plotly figure to image bytes with high quality
-            img_bytes = fig.to_image(format="png", width=width, height=height, scale=2)
-            
-            # Create a temporary file to store the image
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-                tmp_file.write(img_bytes)
-                tmp_file.flush()
-                
-                # Create ReportLab Image object with appropriate sizing
-                img = Image(tmp_file.name, width=self.chart_width, height=self.chart_height)
-                return img
+            return PendingChart(fig, width, height, self.chart_width, self.chart_height)
         except Exception as e:
             print(f"Error creating chart image: {e}")
             return None
     
+    @staticmethod
+    def _child_flowables(item):
+        """Nested flowable lists of a container: Table rows, or the content of KeepTogether and other _Container flowables"""
+        if isinstance(item, Table):
+            return item._cellvalues
+        content = getattr(item, '_content', None)
+        return [content] if isinstance(content, list) else []
+    
+    def _collect_pending_charts(self, items, pending):
+        for item in items:
+            if isinstance(item, PendingChart):
+                pending.append(item)
+            elif isinstance(item, (list, tuple)):
+                self._collect_pending_charts(item, pending)
+            else:
+                for children in self._child_flowables(item):
+                    self._collect_pending_charts(children, pending)
+        return pending
+    
+    def _swap_pending_charts(self, item, images, placeholder):
+        """Return item with its charts swapped for images; containers are copied so cached sections stay untouched"""
+        if isinstance(item, PendingChart):
+            return images.get(id(item), placeholder)
+        if isinstance(item, (list, tuple)):
+            # Charts that failed to render are dropped from flowable lists, as before
+            return [self._swap_pending_charts(child, images, None) for child in item
+                    if not isinstance(child, PendingChart) or id(child) in images]
+        if isinstance(item, Table):
+            if not self._collect_pending_charts(item._cellvalues, []):
+                return item
+            swapped = copy.copy(item)
+            # Table cells keep their position, so a failed chart leaves an empty cell
+            swapped._cellvalues = [[self._swap_pending_charts(cell, images, '') for cell in row]
+                                   for row in item._cellvalues]
+            return swapped
+        content = getattr(item, '_content', None)
+        if isinstance(content, list) and self._collect_pending_charts(content, []):
+            swapped = copy.copy(item)
+            swapped._content = self._swap_pending_charts(content, images, None)
+            return swapped
+        return item
+    
+    @traced('reports')
+    def render_pending_charts(self, story):
+        """Render all queued charts, including those nested in tables or grouped flowables, in one session and swap in in-memory ReportLab images"""
+        pending = self._collect_pending_charts(story, [])
+        if not pending:
+            return story
+        
+        rendered = self.chart_renderer.render_batch(
+            [(chart.fig, chart.render_width, chart.render_height) for chart in pending]
+        )
+        images = {
+            id(chart): Image(io.BytesIO(png_bytes), width=chart.draw_width, height=chart.draw_height)
+            for chart, png_bytes in zip(pending, rendered) if png_bytes
+        }
+        
+        return self._swap_pending_charts(story, images, None)
+    
+    @traced('reports')
     def create_improved_technical_table(self, analysis_results, server_specs, env_name):
         """Create an improved technical specifications table"""
         try:
@@ -1769,6 +3118,7 @@ class ImprovedReportGenerator:
         
         return formatted_paragraphs[:5]  # Limit to 5 paragraphs for PDF
     
+    @traced('reports')
     def generate_improved_pdf_report(self, analysis_results, analysis_mode, server_specs=None, ai_insights=None, transfer_results=None):
         """Generate improved PDF report with better formatting and layout"""
         buffer = io.BytesIO()
@@ -1784,35 +3134,51 @@ class ImprovedReportGenerator:
         story = []
         
         try:
+            # Each section is memoized on just the inputs it reads
+            results_key = ReportArtifactCache.input_digest(analysis_results=analysis_results, analysis_mode=analysis_mode)
+            specs_key = ReportArtifactCache.input_digest(server_specs=server_specs)
+            generated_at = datetime.now().strftime("%Y-%m-%d %H:%M")  # title page shows generation time
+            
             # Title Page
-            story.extend(self._create_title_page(analysis_mode, analysis_results))
+            story.extend(self.section_cache.get_or_build(
+                'title_page', f"{results_key}:{generated_at}",
+                lambda: self._create_title_page(analysis_mode, analysis_results)))
             story.append(PageBreak())
             
             # Executive Summary with Chart
-            story.extend(self._create_executive_summary(analysis_results, analysis_mode, ai_insights))
+            story.extend(self.section_cache.get_or_build(
+                'executive_summary', results_key,
+                lambda: self._create_executive_summary(analysis_results, analysis_mode, ai_insights)))
             story.append(PageBreak())
             
             # Technical Analysis
-            story.extend(self._create_technical_analysis(analysis_results, analysis_mode, server_specs))
+            story.extend(self.section_cache.get_or_build(
+                'technical_analysis', f"{results_key}:{specs_key}",
+                lambda: self._create_technical_analysis(analysis_results, analysis_mode, server_specs)))
             story.append(PageBreak())
             
             # Financial Analysis
-            story.extend(self._create_financial_analysis(analysis_results, analysis_mode))
+            story.extend(self.section_cache.get_or_build(
+                'financial_analysis', results_key,
+                lambda: self._create_financial_analysis(analysis_results, analysis_mode)))
             story.append(PageBreak())
             
             # Migration Strategy
-            story.extend(self._create_migration_strategy())
+            story.extend(self.section_cache.get_or_build('migration_strategy', 'static', self._create_migration_strategy))
             story.append(PageBreak())
             
             # AI Insights (if available)
             if ai_insights:
-                story.extend(self._create_ai_insights_section(ai_insights))
+                story.extend(self.section_cache.get_or_build(
+                    'ai_insights', ReportArtifactCache.input_digest(ai_insights=ai_insights),
+                    lambda: self._create_ai_insights_section(ai_insights)))
                 story.append(PageBreak())
             
             # Implementation Roadmap
-            story.extend(self._create_implementation_roadmap())
+            story.extend(self.section_cache.get_or_build('implementation_roadmap', 'static', self._create_implementation_roadmap))
             
             # Build the PDF
+            story = self.render_pending_charts(story)
             doc.build(story)
             buffer.seek(0)
             return buffer.getvalue()
@@ -2027,167 +3393,167 @@ class ImprovedReportGenerator:
         story.append(aggregate_table)        
         return story
    
-def _create_financial_analysis(self, analysis_results, analysis_mode):
-       """Create improved financial analysis section"""
-       story = []
+    def _create_financial_analysis(self, analysis_results, analysis_mode):
+        """Create improved financial analysis section"""
+        story = []
        
-       section_style = self.safe_get_style('SectionHeader', 'Heading1')
-       story.append(Paragraph("Financial Analysis & ROI Projection", section_style))
-       story.append(Spacer(1, 15))
+        section_style = self.safe_get_style('SectionHeader', 'Heading1')
+        story.append(Paragraph("Financial Analysis & ROI Projection", section_style))
+        story.append(Spacer(1, 15))
        
-       # Calculate costs
-       if analysis_mode == 'single':
-           valid_results = {k: v for k, v in analysis_results.items() if 'error' not in v}
-           if valid_results:
-               prod_result = valid_results.get('PROD', list(valid_results.values())[0])
-               monthly_cost = prod_result.get('total_cost', 0)
+        # Calculate costs
+        if analysis_mode == 'single':
+            valid_results = {k: v for k, v in analysis_results.items() if 'error' not in v}
+            if valid_results:
+                prod_result = valid_results.get('PROD', list(valid_results.values())[0])
+                monthly_cost = prod_result.get('total_cost', 0)
                
-               financial_data = [
-                   ['Cost Component', 'Monthly', 'Annual', '3-Year Total'],
-                   ['AWS Infrastructure', f'${monthly_cost:,.2f}', f'${monthly_cost*12:,.2f}', f'${monthly_cost*36:,.2f}'],
-                   ['Migration Costs (One-time)', '-', f'${monthly_cost*2:,.2f}', f'${monthly_cost*2:,.2f}'],
-                   ['Training & Support', '-', f'${monthly_cost*0.5:,.2f}', f'${monthly_cost*1.5:,.2f}'],
-                   ['Total Investment', f'${monthly_cost:,.2f}', f'${monthly_cost*14.5:,.2f}', f'${monthly_cost*39.5:,.2f}']
-               ]
-       else:
-           total_monthly_cost = sum(
-               result.get('PROD', {}).get('total_cost', 0) 
-               for result in analysis_results.values() 
-               if 'error' not in result and 'PROD' in result
-           )
+                financial_data = [
+                    ['Cost Component', 'Monthly', 'Annual', '3-Year Total'],
+                    ['AWS Infrastructure', f'${monthly_cost:,.2f}', f'${monthly_cost*12:,.2f}', f'${monthly_cost*36:,.2f}'],
+                    ['Migration Costs (One-time)', '-', f'${monthly_cost*2:,.2f}', f'${monthly_cost*2:,.2f}'],
+                    ['Training & Support', '-', f'${monthly_cost*0.5:,.2f}', f'${monthly_cost*1.5:,.2f}'],
+                    ['Total Investment', f'${monthly_cost:,.2f}', f'${monthly_cost*14.5:,.2f}', f'${monthly_cost*39.5:,.2f}']
+                ]
+        else:
+            total_monthly_cost = sum(
+                result.get('PROD', {}).get('total_cost', 0) 
+                for result in analysis_results.values() 
+                if 'error' not in result and 'PROD' in result
+            )
            
-           financial_data = [
-               ['Cost Component', 'Monthly', 'Annual', '3-Year Total'],
-               ['AWS Infrastructure', f'${total_monthly_cost:,.2f}', f'${total_monthly_cost*12:,.2f}', f'${total_monthly_cost*36:,.2f}'],
-               ['Migration Costs (One-time)', '-', f'${total_monthly_cost*3:,.2f}', f'${total_monthly_cost*3:,.2f}'],
-               ['Training & Support', '-', f'${total_monthly_cost*1:,.2f}', f'${total_monthly_cost*3:,.2f}'],
-               ['Total Investment', f'${total_monthly_cost:,.2f}', f'${total_monthly_cost*16:,.2f}', f'${total_monthly_cost*42:,.2f}']
-           ]
+            financial_data = [
+                ['Cost Component', 'Monthly', 'Annual', '3-Year Total'],
+                ['AWS Infrastructure', f'${total_monthly_cost:,.2f}', f'${total_monthly_cost*12:,.2f}', f'${total_monthly_cost*36:,.2f}'],
+                ['Migration Costs (One-time)', '-', f'${total_monthly_cost*3:,.2f}', f'${total_monthly_cost*3:,.2f}'],
+                ['Training & Support', '-', f'${total_monthly_cost*1:,.2f}', f'${total_monthly_cost*3:,.2f}'],
+                ['Total Investment', f'${total_monthly_cost:,.2f}', f'${total_monthly_cost*16:,.2f}', f'${total_monthly_cost*42:,.2f}']
+            ]
        
-       # Create financial table
-       financial_table = Table(financial_data, colWidths=[2.2*inch, 1.4*inch, 1.4*inch, 1.4*inch])
-       financial_table.setStyle(TableStyle([
-           ('BACKGROUND', (0, 0), (-1, 0), colors.darkred),
-           ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-           ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-           ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-           ('FONTSIZE', (0, 0), (-1, 0), 11),
-           ('FONTSIZE', (0, 1), (-1, -1), 10),
-           ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-           ('BACKGROUND', (0, 1), (-1, -2), colors.mistyrose),
-           ('BACKGROUND', (0, -1), (-1, -1), colors.yellow),
-           ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-           ('GRID', (0, 0), (-1, -1), 1, colors.black),
-           ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-           ('TOPPADDING', (0, 0), (-1, -1), 8),
-           ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-       ]))
-       story.append(financial_table)
+        # Create financial table
+        financial_table = Table(financial_data, colWidths=[2.2*inch, 1.4*inch, 1.4*inch, 1.4*inch])
+        financial_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.darkred),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('FONTSIZE', (0, 1), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+            ('BACKGROUND', (0, 1), (-1, -2), colors.mistyrose),
+            ('BACKGROUND', (0, -1), (-1, -1), colors.yellow),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]))
+        story.append(financial_table)
        
-       return story
-   
-def _create_migration_strategy(self):
-       """Create migration strategy section"""
-       story = []
+        return story
+    
+    def _create_migration_strategy(self):
+        """Create migration strategy section"""
+        story = []
        
-       section_style = self.safe_get_style('SectionHeader', 'Heading1')
-       story.append(Paragraph("Migration Strategy & Implementation Timeline", section_style))
-       story.append(Spacer(1, 15))
+        section_style = self.safe_get_style('SectionHeader', 'Heading1')
+        story.append(Paragraph("Migration Strategy & Implementation Timeline", section_style))
+        story.append(Spacer(1, 15))
        
-       subsection_style = self.safe_get_style('SubsectionHeader', 'Heading2')
-       story.append(Paragraph("Migration Strategy Overview:", subsection_style))
+        subsection_style = self.safe_get_style('SubsectionHeader', 'Heading2')
+        story.append(Paragraph("Migration Strategy Overview:", subsection_style))
        
-       bullet_style = self.safe_get_style('BulletPoint', 'Normal')
-       migration_phases = [
-           "<b>Assessment Phase:</b> Complete discovery and compatibility analysis",
-           "<b>Planning Phase:</b> Detailed migration planning and resource allocation",
-           "<b>Execution Phase:</b> Phased migration with minimal downtime",
-           "<b>Validation Phase:</b> Comprehensive testing and performance validation",
-           "<b>Optimization Phase:</b> Post-migration tuning and optimization"
-       ]
+        bullet_style = self.safe_get_style('BulletPoint', 'Normal')
+        migration_phases = [
+            "<b>Assessment Phase:</b> Complete discovery and compatibility analysis",
+            "<b>Planning Phase:</b> Detailed migration planning and resource allocation",
+            "<b>Execution Phase:</b> Phased migration with minimal downtime",
+            "<b>Validation Phase:</b> Comprehensive testing and performance validation",
+            "<b>Optimization Phase:</b> Post-migration tuning and optimization"
+        ]
        
-       for phase in migration_phases:
-           story.append(Paragraph(f"• {phase}", bullet_style))
-           story.append(Spacer(1, 6))
+        for phase in migration_phases:
+            story.append(Paragraph(f"• {phase}", bullet_style))
+            story.append(Spacer(1, 6))
        
-       return story
-   
-def _create_ai_insights_section(self, ai_insights):
-       """Create improved AI insights section"""
-       story = []
+        return story
+    
+    def _create_ai_insights_section(self, ai_insights):
+        """Create improved AI insights section"""
+        story = []
        
-       section_style = self.safe_get_style('SectionHeader', 'Heading1')
-       story.append(Paragraph("AI-Powered Insights & Recommendations", section_style))
-       story.append(Spacer(1, 15))
+        section_style = self.safe_get_style('SectionHeader', 'Heading1')
+        story.append(Paragraph("AI-Powered Insights & Recommendations", section_style))
+        story.append(Spacer(1, 15))
        
-       # AI analysis
-       ai_text = ai_insights.get("ai_analysis", "")
-       if ai_text:
-           formatted_paragraphs = self.format_ai_insights_text(ai_text)
+        # AI analysis
+        ai_text = ai_insights.get("ai_analysis", "")
+        if ai_text:
+            formatted_paragraphs = self.format_ai_insights_text(ai_text)
            
-           body_style = self.safe_get_style('BodyText', 'Normal')
-           for paragraph in formatted_paragraphs:
-               story.append(Paragraph(paragraph, body_style))
-               story.append(Spacer(1, 10))
-       else:
-           # Default AI insights
-           bullet_style = self.safe_get_style('BulletPoint', 'Normal')
-           default_insights = [
-               "Migration analysis indicates favorable conditions for AWS RDS migration",
-               "Recommended architecture provides optimal balance of performance and cost",
-               "Risk assessment suggests manageable migration with proper planning",
-               "Cost optimization opportunities identified for long-term efficiency"
-           ]
+            body_style = self.safe_get_style('BodyText', 'Normal')
+            for paragraph in formatted_paragraphs:
+                story.append(Paragraph(paragraph, body_style))
+                story.append(Spacer(1, 10))
+        else:
+            # Default AI insights
+            bullet_style = self.safe_get_style('BulletPoint', 'Normal')
+            default_insights = [
+                "Migration analysis indicates favorable conditions for AWS RDS migration",
+                "Recommended architecture provides optimal balance of performance and cost",
+                "Risk assessment suggests manageable migration with proper planning",
+                "Cost optimization opportunities identified for long-term efficiency"
+            ]
            
-           for insight in default_insights:
-               story.append(Paragraph(f"• {insight}", bullet_style))
-               story.append(Spacer(1, 6))
+            for insight in default_insights:
+                story.append(Paragraph(f"• {insight}", bullet_style))
+                story.append(Spacer(1, 6))
        
-       return story
-   
-def _create_implementation_roadmap(self):
-       """Create implementation roadmap section"""
-       story = []
+        return story
+    
+    def _create_implementation_roadmap(self):
+        """Create implementation roadmap section"""
+        story = []
        
-       section_style = self.safe_get_style('SectionHeader', 'Heading1')
-       story.append(Paragraph("Implementation Roadmap & Next Steps", section_style))
-       story.append(Spacer(1, 15))
+        section_style = self.safe_get_style('SectionHeader', 'Heading1')
+        story.append(Paragraph("Implementation Roadmap & Next Steps", section_style))
+        story.append(Spacer(1, 15))
        
-       subsection_style = self.safe_get_style('SubsectionHeader', 'Heading2')
-       story.append(Paragraph("Implementation Roadmap:", subsection_style))
+        subsection_style = self.safe_get_style('SubsectionHeader', 'Heading2')
+        story.append(Paragraph("Implementation Roadmap:", subsection_style))
        
-       bullet_style = self.safe_get_style('BulletPoint', 'Normal')
-       roadmap_phases = [
-           "<b>Phase 1 - Planning:</b> Finalize migration strategy and resource allocation",
-           "<b>Phase 2 - Preparation:</b> Set up AWS environment and migration tools",
-           "<b>Phase 3 - Migration:</b> Execute data and application migration",
-           "<b>Phase 4 - Testing:</b> Comprehensive validation and performance testing",
-           "<b>Phase 5 - Go-Live:</b> Production cutover and monitoring",
-           "<b>Phase 6 - Optimization:</b> Post-migration tuning and optimization"
-       ]
+        bullet_style = self.safe_get_style('BulletPoint', 'Normal')
+        roadmap_phases = [
+            "<b>Phase 1 - Planning:</b> Finalize migration strategy and resource allocation",
+            "<b>Phase 2 - Preparation:</b> Set up AWS environment and migration tools",
+            "<b>Phase 3 - Migration:</b> Execute data and application migration",
+            "<b>Phase 4 - Testing:</b> Comprehensive validation and performance testing",
+            "<b>Phase 5 - Go-Live:</b> Production cutover and monitoring",
+            "<b>Phase 6 - Optimization:</b> Post-migration tuning and optimization"
+        ]
        
-       for phase in roadmap_phases:
-           story.append(Paragraph(f"• {phase}", bullet_style))
-           story.append(Spacer(1, 6))
+        for phase in roadmap_phases:
+            story.append(Paragraph(f"• {phase}", bullet_style))
+            story.append(Spacer(1, 6))
        
-       story.append(Spacer(1, 20))
+        story.append(Spacer(1, 20))
        
-       # Success criteria
-       story.append(Paragraph("Success Criteria:", subsection_style))
+        # Success criteria
+        story.append(Paragraph("Success Criteria:", subsection_style))
        
-       success_criteria = [
-           "Zero data loss during migration",
-           "Minimal downtime during cutover",
-           "Performance meets or exceeds baseline",
-           "Cost targets achieved within budget",
-           "Team readiness and knowledge transfer complete"
-       ]
+        success_criteria = [
+            "Zero data loss during migration",
+            "Minimal downtime during cutover",
+            "Performance meets or exceeds baseline",
+            "Cost targets achieved within budget",
+            "Team readiness and knowledge transfer complete"
+        ]
        
-       for criteria in success_criteria:
-           story.append(Paragraph(f"• {criteria}", bullet_style))
-           story.append(Spacer(1, 6))
+        for criteria in success_criteria:
+            story.append(Paragraph(f"• {criteria}", bullet_style))
+            story.append(Spacer(1, 6))
        
-       return story
+        return story
 
 
 # Helper function to use the improved generator
@@ -2207,13 +3573,13 @@ def generate_improved_pdf_report(analysis_results, analysis_mode, server_specs=N
            return None
        
        print("Generating improved PDF...")
-       pdf_bytes = generate_improved_pdf_report(
-        analysis_results=current_analysis_results,
-        analysis_mode=analysis_mode_for_pdf,
-        server_specs=current_server_specs_for_pdf,
-        ai_insights=ai_insights_for_pdf,
-        transfer_results=transfer_results_for_pdf
-         )
+       pdf_bytes = improved_generator.generate_improved_pdf_report(
+           analysis_results=analysis_results,
+           analysis_mode=analysis_mode,
+           server_specs=server_specs,
+           ai_insights=ai_insights,
+           transfer_results=transfer_results
+       )
        
        if pdf_bytes:
            print(f"Improved PDF generated successfully. Size: {len(pdf_bytes)} bytes")
@@ -2228,70 +3594,238 @@ def generate_improved_pdf_report(analysis_results, analysis_mode, server_specs=N
        traceback.print_exc()
        return None
 
-# ALTERNATIVE: Cached version for better performance
-@st.cache_data(ttl=300)  # Cache for 5 minutes
-def generate_comprehensive_pdf_report_cached(analysis_results_str, analysis_mode, server_specs_str=None, ai_insights_str=None, transfer_results_str=None):
-   """
-   Cached version of PDF generator (converts strings back to objects)
-   Use this if you're generating the same report multiple times
-   """
-   import json
-   
-   try:
-       # Convert string parameters back to objects
-       analysis_results = json.loads(analysis_results_str) if analysis_results_str else None
-       server_specs = json.loads(server_specs_str) if server_specs_str else None
-       ai_insights = json.loads(ai_insights_str) if ai_insights_str else None
-       transfer_results = json.loads(transfer_results_str) if transfer_results_str else None
-       
-       # Call the main function
-       return generate_improved_pdf_report(
-           analysis_results=analysis_results,
-           analysis_mode=analysis_mode,
-           server_specs=server_specs,
-           ai_insights=ai_insights,
-           transfer_results=transfer_results
-       )
-   
-   except json.JSONDecodeError as e:
-       print(f"Error parsing cached parameters: {e}")
-       return None
+# ===========================
+# REPORT ARTIFACT CACHE
+# ===========================
 
+# Bump when the bundled pricing tables change; the date part picks up live AWS price refreshes
+PRICING_DATA_VERSION = '2024.1'
 
-class DatabaseEngine:
-    """Database engine definitions and compatibility matrix"""
-    
-    ENGINES = {
-        'oracle-ee': {
-            'name': 'Oracle Enterprise Edition',
-            'features': ['Advanced Analytics', 'Partitioning', 'Advanced Security', 'RAC'],
-            'aws_targets': ['oracle-ee', 'postgres', 'aurora-postgresql'],
-            'complexity_multiplier': 1.0
-        },
-        'oracle-se': {
-            'name': 'Oracle Standard Edition',
-            'features': ['Basic Analytics', 'Standard Security'],
-            'aws_targets': ['oracle-se', 'postgres', 'aurora-postgresql'],
-            'complexity_multiplier': 0.8
-        },
-        'postgres': {
-            'name': 'PostgreSQL',
-            'features': ['JSON Support', 'Advanced Indexing', 'Extensions'],
-            'aws_targets': ['postgres', 'aurora-postgresql'],
-            'complexity_multiplier': 0.5
-        },
-        'mysql': {
-            'name': 'MySQL',
-            'features': ['InnoDB', 'MyISAM', 'Replication'],
-            'aws_targets': ['mysql', 'aurora-mysql'],
-            'complexity_multiplier': 0.6
-        },
-        'sql-server': {
-            'name': 'Microsoft SQL Server',
-            'features': ['T-SQL', 'SSRS', 'SSIS', 'Analysis Services'],
-            'aws_targets': ['sql-server', 'postgres', 'aurora-postgresql'],
-            'complexity_multiplier': 1.2
-        },
+def get_pricing_version() -> str:
+    """Pricing version component of report cache keys"""
+    return f"{PRICING_DATA_VERSION}:{datetime.now().strftime('%Y-%m-%d')}"
+
+class ReportArtifactCache:
+    """Content-addressed on-disk cache for generated PDF/CSV/ZIP artifacts with LRU eviction"""
+
+    SECRET_KEY_MARKERS = ('api_key', 'secret', 'token', 'password')
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: int = 512 * 1024 * 1024):
+        self.cache_dir = cache_dir or os.environ.get(
+            'REPORT_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'db_migration_report_cache')
+        )
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def _redact(cls, value):
+        """Drop credentials so they never become part of a cache key"""
+        if isinstance(value, dict):
+            return {
+                str(k): cls._redact(v) for k, v in value.items()
+                if not any(marker in str(k).lower() for marker in cls.SECRET_KEY_MARKERS)
+            }
+        if isinstance(value, (list, tuple)):
+            return [cls._redact(v) for v in value]
+        return value
+
+    @classmethod
+    def input_digest(cls, **inputs) -> str:
+        """Stable SHA-256 of the report inputs (canonical, key-sorted JSON)"""
+        canonical = json.dumps(cls._redact(inputs), sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _path(self, digest: str, artifact: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}_{artifact}")
+
+    def get_path(self, digest: str, artifact: str) -> Optional[str]:
+        """Path of a cached artifact, marking it recently used"""
+        path = self._path(digest, artifact)
+        try:
+            os.utime(path)  # mtime doubles as the LRU clock, so recency survives restarts
+        except OSError:
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return path
+
+    def get(self, digest: str, artifact: str) -> Optional[bytes]:
+        """Cached artifact bytes, or None"""
+        path = self.get_path(digest, artifact)
+        if not path:
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, digest: str, artifact: str, data) -> Optional[str]:
+        """Store bytes or a file-like object atomically and return its path"""
+        path = self._path(digest, artifact)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        try:
+            with open(tmp_path, 'wb') as f:
+                if isinstance(data, (bytes, bytearray, memoryview)):
+                    f.write(data)
+                else:
+                    import shutil
+                    data.seek(0)
+                    shutil.copyfileobj(data, f)
+                    data.seek(0)
+            os.replace(tmp_path, path)
+            self.stats['writes'] += 1
+        except OSError as e:
+            print(f"Error writing report cache entry: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+        # The entry just written is never its own eviction victim, even when it alone exceeds the bound
+        self._evict(keep=path)
+        return path
+
+    def get_or_create(self, digest: str, artifact: str, builder) -> Optional[bytes]:
+        """Serve a cached artifact or build, store and return it"""
+        cached = self.get(digest, artifact)
+        if cached is not None:
+            return cached
+
+        data = builder()
+        if data is None:
+            return None
+        if hasattr(data, 'getvalue'):
+            data = data.getvalue()
+
+        self.put(digest, artifact, data)
+        return data
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        """(mtime, size, path) for every cached artifact"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _evict(self, keep: Optional[str] = None):
+        """Remove least recently used artifacts, other than keep, until under the size bound"""
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    self.stats['evictions'] += 1
+                except OSError:
+                    pass
+
+    def get_stats(self) -> Dict:
+        """Cache statistics"""
+        entries = self._entries()
+        return {**self.stats, 'entries': len(entries), 'total_bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes, 'cache_dir': self.cache_dir}
+
+    def clear(self):
+        """Remove every cached artifact"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+# Shared by all sessions of this server process; entries persist across restarts
+@st.cache_resource
+def get_shared_report_artifact_cache() -> ReportArtifactCache:
+    return ReportArtifactCache()
+
+report_artifact_cache = get_shared_report_artifact_cache()
+
+def report_inputs_digest(environment_specs, migration_params, **extra) -> str:
+    """Digest of the analysis inputs a report is derived from"""
+    return ReportArtifactCache.input_digest(
+        environment_specs=environment_specs or {},
+        migration_params=migration_params or {},
+        pricing_version=get_pricing_version(),
+        **extra
+    )
+
+@traced('reports')
+def generate_comprehensive_pdf_report_cached(analysis_results, analysis_mode, server_specs=None, ai_insights=None, transfer_results=None, input_digest=None):
+   """
+   Cached version of PDF generator keyed by a digest of the report inputs
+   Pass input_digest (see report_inputs_digest) to skip hashing the full result set
+   """
+   digest = input_digest or ReportArtifactCache.input_digest(
+       analysis_results=analysis_results,
+       analysis_mode=analysis_mode,
+       server_specs=server_specs,
+       ai_insights=ai_insights,
+       transfer_results=transfer_results,
+       pricing_version=get_pricing_version()
+   )
+
+   return report_artifact_cache.get_or_create(
+       digest, 'comprehensive.pdf',
+       lambda: generate_improved_pdf_report(
+           analysis_results=analysis_results,
+           analysis_mode=analysis_mode,
+           server_specs=server_specs,
+           ai_insights=ai_insights,
+           transfer_results=transfer_results
+       )
+   )
+
+
+class DatabaseEngine:
+    """Database engine definitions and compatibility matrix"""
+    
+    ENGINES = {
+        'oracle-ee': {
+            'name': 'Oracle Enterprise Edition',
+            'features': ['Advanced Analytics', 'Partitioning', 'Advanced Security', 'RAC'],
+            'aws_targets': ['oracle-ee', 'postgres', 'aurora-postgresql'],
+            'complexity_multiplier': 1.0
+        },
+        'oracle-se': {
+            'name': 'Oracle Standard Edition',
+            'features': ['Basic Analytics', 'Standard Security'],
+            'aws_targets': ['oracle-se', 'postgres', 'aurora-postgresql'],
+            'complexity_multiplier': 0.8
+        },
+        'postgres': {
+            'name': 'PostgreSQL',
+            'features': ['JSON Support', 'Advanced Indexing', 'Extensions'],
+            'aws_targets': ['postgres', 'aurora-postgresql'],
+            'complexity_multiplier': 0.5
+        },
+        'mysql': {
+            'name': 'MySQL',
+            'features': ['InnoDB', 'MyISAM', 'Replication'],
+            'aws_targets': ['mysql', 'aurora-mysql'],
+            'complexity_multiplier': 0.6
+        },
+        'sql-server': {
+            'name': 'Microsoft SQL Server',
+            'features': ['T-SQL', 'SSRS', 'SSIS', 'Analysis Services'],
+            'aws_targets': ['sql-server', 'postgres', 'aurora-postgresql'],
+            'complexity_multiplier': 1.2
+        },
         'mariadb': {
             'name': 'MariaDB',
             'features': ['MySQL Compatibility', 'Columnar Storage'],
@@ -2491,6 +4025,7 @@ class GrowthAwareCostAnalyzer:
             }
         }
     
+    @traced('growth')
     def calculate_3_year_growth_projection(self, base_costs: Dict, migration_params: Dict) -> Dict:
         """Calculate 3-year cost projection with growth"""
         
@@ -2953,7 +4488,8 @@ class VRopsMetricsAnalyzer:
             }
         }
     
-    def analyze_vrops_metrics(self, environment_specs: Dict) -> Dict:
+    @traced('vrops')
+    def analyze_vrops_metrics(self, environment_specs: Dict, progress_callback=None) -> Dict:
         """Analyze vROps metrics and provide AWS sizing recommendations"""
         
         analysis_results = {}
@@ -2961,6 +4497,8 @@ class VRopsMetricsAnalyzer:
         for env_name, metrics in environment_specs.items():
             env_analysis = self._analyze_single_environment(env_name, metrics)
             analysis_results[env_name] = env_analysis
+            if progress_callback:
+                progress_callback(len(analysis_results), len(environment_specs))
         
         # Generate overall recommendations
         analysis_results['overall_recommendations'] = self._generate_overall_recommendations(analysis_results)
@@ -3548,11 +5086,8 @@ def show_enhanced_environment_setup_with_vrops():
         st.warning("⚠️ Please complete Migration Configuration first.")
         return
     
-    # Initialize vROps analyzer
-    if 'vrops_analyzer' not in st.session_state:
-        st.session_state.vrops_analyzer = VRopsMetricsAnalyzer()
-    
-    analyzer = st.session_state.vrops_analyzer
+    # vROps analyzer shared by all sessions; its catalogs are built once per process
+    analyzer = get_shared_vrops_analyzer()
     
     # Configuration method selection
     st.markdown("### 🔧 Configuration Method")
@@ -4287,13 +5822,15 @@ def process_enhanced_bulk_upload(uploaded_file, analyzer: VRopsMetricsAnalyzer):
                 st.session_state.environment_specs = environments
                 st.success(f"✅ Processed {len(environments)} environments!")
                 
-                # Run comprehensive analysis
-                with st.spinner("🔄 Running comprehensive analysis..."):
-                    analysis_results = analyzer.analyze_vrops_metrics(environments)
-                    st.session_state.vrops_analysis = analysis_results
-                
-                st.success("✅ Analysis complete!")
-                show_vrops_analysis_summary(analysis_results)
+                # Run comprehensive analysis in the background so widget changes don't restart it
+                start_background_job('vrops', vrops_analysis_job, analyzer, environments,
+                                     label=f"vROps analysis of {len(environments)} environments")
+        
+        def show_completed_vrops(job):
+            st.success("✅ Analysis complete!")
+            show_vrops_analysis_summary(job['result']['analysis'])
+        
+        show_background_job('vrops', on_complete=show_completed_vrops)
     
     except Exception as e:
         st.error(f"❌ Error processing file: {str(e)}")
@@ -4403,34 +5940,43 @@ def integrate_enhanced_environment_module():
 class RealAWSPricingAPI:
     """Real AWS Pricing API that fetches live pricing data"""
     
-    def __init__(self):
+    # Static fallbacks are cached briefly so a failing API is retried, but not on every lookup
+    FALLBACK_TTL_SECONDS = 15 * 60
+    
+    def __init__(self, cache: Optional[SharedTTLCache] = None):
         self.base_url = "https://pricing.us-east-1.amazonaws.com"
-        self.cache = {}
-        # Initialize boto3 pricing client
-        try:
-            self.pricing_client = boto3.client('pricing', region_name='us-east-1')
-        except Exception as e:
-            print(f"Warning: Could not initialize AWS pricing client: {e}")
-            self.pricing_client = None
+        self.cache = cache if cache is not None else get_shared_pricing_cache('rds_live')
+        # Shared boto3 pricing client
+        self.pricing_client = get_shared_pricing_client()
     
+    @traced('pricing')
     def get_rds_pricing(self, region: str, engine: str, instance_class: str, multi_az: bool = False) -> Dict:
         """Get real RDS pricing from AWS Pricing API"""
         cache_key = f"{region}_{engine}_{instance_class}_{multi_az}"
         
-        if cache_key in self.cache:
-            return self.cache[cache_key]
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
         
-        try:
-            # Try to get real pricing from AWS
-            real_pricing = self._fetch_real_aws_pricing(region, engine, instance_class, multi_az)
-            if real_pricing:
-                self.cache[cache_key] = real_pricing
-                return real_pricing
-        except Exception as e:
-            print(f"Error fetching real AWS pricing: {e}")
-        
-        # Fallback to static pricing if API fails
-        return self._get_fallback_pricing(region, engine, instance_class, multi_az)
+        # One live lookup per key, however many sessions ask at once
+        with self.cache.key_lock(cache_key):
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            try:
+                # Try to get real pricing from AWS
+                real_pricing = self._fetch_real_aws_pricing(region, engine, instance_class, multi_az)
+                if real_pricing:
+                    self.cache.set(cache_key, real_pricing)
+                    return real_pricing
+            except Exception as e:
+                print(f"Error fetching real AWS pricing: {e}")
+            
+            # Fallback to static pricing if API fails
+            fallback = self._get_fallback_pricing(region, engine, instance_class, multi_az)
+            self.cache.set(cache_key, fallback, ttl_seconds=self.FALLBACK_TTL_SECONDS)
+            return fallback
     
     def _fetch_real_aws_pricing(self, region: str, engine: str, instance_class: str, multi_az: bool) -> Optional[Dict]:
         """Fetch real pricing from AWS Pricing API"""
@@ -4562,9 +6108,12 @@ class RealAWSPricingAPI:
 class RealClaudeAIAnalyzer:
     """Real Claude AI integration for migration insights"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, response_cache: Optional[AIResponseCache] = None,
+                 bucket_numbers: bool = False):
         self.api_key = api_key
         self.client = None
+        self.response_cache = response_cache or ai_response_cache
+        self.bucket_numbers = bucket_numbers
         
         if api_key:
             try:
@@ -4572,6 +6121,7 @@ class RealClaudeAIAnalyzer:
             except Exception as e:
                 print(f"Warning: Could not initialize Anthropic client: {e}")
     
+    @traced('ai')
     async def generate_real_ai_insights(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Generate real AI insights using Claude"""
         
@@ -4586,43 +6136,34 @@ class RealClaudeAIAnalyzer:
             context = self._prepare_migration_context(cost_analysis, migration_params)
             
             # Create the prompt
-            prompt = f"""
-            You are an AWS migration expert analyzing a database migration project. 
-            Please provide detailed insights and recommendations based on the following migration analysis:
-
-            {context}
-
-            Please provide insights in the following categories:
-            1. Cost Analysis & Optimization
-            2. Risk Assessment
-            3. Migration Strategy Recommendations
-            4. Timeline Feasibility
-            5. Technical Considerations
-            6. Post-Migration Optimization
-
-            Format your response as a structured analysis with specific, actionable recommendations.
-            """
+            prompt = self._build_insights_prompt(context)
             
             # Call Claude API
-            message = self.client.messages.create(
-                model="claude-3-sonnet-20240229",
-                max_tokens=2000,
-                temperature=0.3,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
+            def fetch():
+                with trace_span('claude.messages.create', 'ai'):
+                    message = self.client.messages.create(
+                        model="claude-3-sonnet-20240229",
+                        max_tokens=2000,
+                        temperature=0.3,
+                        messages=[
+                            {
+                                "role": "user",
+                                "content": prompt
+                            }
+                        ]
+                    )
+                return message.content[0].text
             
-            # Parse Claude's response
-            ai_response = message.content[0].text
+            # Parse Claude's response (served from the prompt cache when inputs are unchanged)
+            ai_response, cache_hit = self.response_cache.get_or_fetch(
+                "claude-3-sonnet-20240229", prompt, fetch, self.bucket_numbers, max_tokens=2000, temperature=0.3
+            )
             
             # Structure the response
             structured_insights = self._structure_ai_response(ai_response)
             structured_insights['source'] = 'Claude AI'
             structured_insights['model'] = 'claude-3-sonnet-20240229'
+            structured_insights['cache_hit'] = cache_hit
             
             return structured_insights
             
@@ -4633,6 +6174,56 @@ class RealClaudeAIAnalyzer:
                 'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params)
             }
     
+    @traced('ai')
+    def stream_real_ai_insights(self, cost_analysis: Dict, migration_params: Dict, on_section=None) -> Dict:
+        """Stream real AI insights, calling on_section(category, paragraph) as each paragraph completes"""
+        
+        if not self.client:
+            return {
+                'error': 'Claude AI not available - using fallback insights',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params)
+            }
+        
+        try:
+            context = self._prepare_migration_context(cost_analysis, migration_params)
+            
+            ai_response, timing = stream_claude_completion(
+                self.client, self._build_insights_prompt(context), self._classify_section, on_section
+            )
+            
+            structured_insights = self._structure_ai_response(ai_response)
+            structured_insights['source'] = 'Claude AI'
+            structured_insights['model'] = 'claude-3-sonnet-20240229'
+            structured_insights['streaming'] = timing
+            
+            return structured_insights
+            
+        except Exception as e:
+            print(f"Error streaming Claude AI: {e}")
+            return {
+                'error': f'Claude AI call failed: {str(e)}',
+                'fallback_insights': self._get_fallback_insights(cost_analysis, migration_params)
+            }
+    
+    def _build_insights_prompt(self, context: str) -> str:
+        """Insights prompt covering all six categories"""
+        return f"""
+            You are an AWS migration expert analyzing a database migration project. 
+            Please provide detailed insights and recommendations based on the following migration analysis:
+
+            {context}
+
+            Please provide insights in the following categories:
+            1. Cost Analysis & Optimization
+            2. Risk Assessment
+            3. Migration Strategy Recommendations
+            4. Timeline Feasibility
+            5. Technical Considerations
+            6. Post-Migration Optimization
+
+            Format your response as a structured analysis with specific, actionable recommendations.
+            """
+    
     def _prepare_migration_context(self, cost_analysis: Dict, migration_params: Dict) -> str:
         """Prepare context for Claude AI"""
         
@@ -4679,25 +6270,31 @@ class RealClaudeAIAnalyzer:
         }
         
         # Try to extract sections (basic implementation)
-        current_section = 'general_insights'
         for section in sections:
-            section_lower = section.lower()
-            
-            if 'cost' in section_lower:
-                structured['cost_analysis'] += section + '\n\n'
-            elif 'risk' in section_lower:
-                structured['risk_assessment'] += section + '\n\n'
-            elif 'strategy' in section_lower or 'migration' in section_lower:
-                structured['migration_strategy'] += section + '\n\n'
-            elif 'timeline' in section_lower or 'schedule' in section_lower:
-                structured['timeline_analysis'] += section + '\n\n'
-            elif 'technical' in section_lower:
-                structured['technical_recommendations'] += section + '\n\n'
-            elif 'optimization' in section_lower:
-                structured['optimization_opportunities'] += section + '\n\n'
+            category = self._classify_section(section)
+            if category:
+                structured[category] += section + '\n\n'
         
         return structured
     
+    def _classify_section(self, section: str) -> Optional[str]:
+        """Category key for a response paragraph, by keyword"""
+        section_lower = section.lower()
+        
+        if 'cost' in section_lower:
+            return 'cost_analysis'
+        elif 'risk' in section_lower:
+            return 'risk_assessment'
+        elif 'strategy' in section_lower or 'migration' in section_lower:
+            return 'migration_strategy'
+        elif 'timeline' in section_lower or 'schedule' in section_lower:
+            return 'timeline_analysis'
+        elif 'technical' in section_lower:
+            return 'technical_recommendations'
+        elif 'optimization' in section_lower:
+            return 'optimization_opportunities'
+        return None
+    
     def _get_fallback_insights(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Fallback insights when AI is unavailable"""
         
@@ -4780,35 +6377,485 @@ class DatabaseClusterConfiguration:
         except ValueError:
             # If writer instance not in hierarchy, default to r5.large
             return 'db.r5.large'
-        
-# Updated Migration Analyzer with Real APIs
-class RealMigrationAnalyzer:
-    """Migration analyzer with real AWS pricing and Claude AI"""
-    
+
+    # Instance classes the capacity model chooses from: (vCPUs, RAM GB, on-demand hourly USD in us-east-1)
+    CAPACITY_INSTANCE_CATALOG = {
+        'db.t3.medium': (2, 4, 0.072),
+        'db.t3.large': (2, 8, 0.145),
+        'db.r5.large': (2, 16, 0.24),
+        'db.r5.xlarge': (4, 32, 0.48),
+        'db.r5.2xlarge': (8, 64, 0.96),
+        'db.r5.4xlarge': (16, 128, 1.92),
+        'db.r5.8xlarge': (32, 256, 3.84),
+        'db.r5.12xlarge': (48, 384, 5.76)
+    }
+
+    @staticmethod
+    def erlang_c(servers, offered_load) -> np.ndarray:
+        """Probability that a query has to queue in an M/M/c system (Erlang C), elementwise"""
+
+        servers, offered_load = np.broadcast_arrays(np.asarray(servers, dtype=float),
+                                                    np.asarray(offered_load, dtype=float))
+
+        # Erlang B by its stable recursion, frozen once k reaches each element's server count
+        blocking = np.ones(servers.shape)
+        for k in range(1, int(servers.max(initial=0)) + 1):
+            step = offered_load * blocking / (k + offered_load * blocking)
+            blocking = np.where(k <= servers, step, blocking)
+
+        utilization = offered_load / servers
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wait_probability = blocking / (1 - utilization * (1 - blocking))
+        return np.where(utilization < 1, wait_probability, 1.0)
+
+    @staticmethod
+    def response_time_percentile_ms(servers, arrival_qps, service_ms, percentile: float = 0.95) -> np.ndarray:
+        """Response-time percentile of an M/M/c queue, as wait quantile plus service quantile (conservative)"""
+
+        servers = np.asarray(servers, dtype=float)
+        arrival_qps = np.asarray(arrival_qps, dtype=float)
+        service_ms = np.asarray(service_ms, dtype=float)
+
+        service_rate = 1000.0 / service_ms                   # queries/s per vCPU
+        wait_probability = DatabaseClusterConfiguration.erlang_c(servers, arrival_qps / service_rate)
+        drain_rate = servers * service_rate - arrival_qps     # P(W > t) = C * exp(-drain_rate * t)
+        tail = 1 - percentile
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            wait_ms = np.where(wait_probability > tail, np.log(wait_probability / tail) / drain_rate * 1000, 0.0)
+        response_ms = wait_ms + service_ms * np.log(1 / tail)
+        return np.where(drain_rate > 0, response_ms, np.inf)
+
+    @staticmethod
+    def size_cluster_fleets(clusters: pd.DataFrame, hourly_prices: Optional[Dict[str, float]] = None,
+                            max_readers: int = 15, max_utilization: float = 0.75,
+                            percentile: float = 0.95, memory_floor: float = 1.0,
+                            vcpu_floor: float = 0.5) -> pd.DataFrame:
+        """Cheapest writer/reader mix per cluster that meets its latency SLO, sized with M/M/c queues"""
+
+        columns = ['writer_class', 'reader_class', 'reader_count', 'writer_p95_ms', 'reader_p95_ms',
+                   'writer_utilization', 'reader_utilization', 'hourly_cost', 'meets_slo']
+        if clusters.empty:
+            return pd.DataFrame(columns=columns, index=clusters.index)
+
+        catalog = DatabaseClusterConfiguration.CAPACITY_INSTANCE_CATALOG
+        classes = np.array(list(catalog))
+        vcpus = np.array([spec[0] for spec in catalog.values()], dtype=float)
+        ram = np.array([spec[1] for spec in catalog.values()], dtype=float)
+        # RDS default max_connections: DBInstanceClassMemory / 9531392, capped at 5000
+        max_connections = np.minimum(np.array([spec[1] for spec in catalog.values()]) * 1024 ** 3 / 9531392, 5000)
+        prices = np.array([(hourly_prices or {}).get(name, spec[2]) for name, spec in catalog.items()])
+
+        n = len(clusters)
+
+        def column(name, default):
+            if name not in clusters.columns:
+                return np.full(n, default, dtype=float)
+            return pd.to_numeric(clusters[name], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+        read_qps = column('read_qps', 0.0)
+        write_qps = column('write_qps', 0.0)
+        read_ms = column('read_service_ms', 2.0)
+        write_ms = column('write_service_ms', 5.0)
+        connections = column('peak_connections', 100)
+        slo_ms = column('p95_latency_slo_ms', 50.0)
+
+        environment_type = (clusters['environment_type'].astype(str).str.lower().to_numpy()
+                            if 'environment_type' in clusters.columns else np.full(n, 'production'))
+        min_readers = column('min_readers', np.nan)
+        min_readers = np.where(np.isnan(min_readers), (environment_type == 'production').astype(float), min_readers)
+        fixed_readers = column('num_readers', np.nan)   # an explicit replica count pins the fleet size
+        writer_factor = np.where(column('multi_az_writer', 0) > 0, 2.0, 1.0)   # Multi-AZ standby doubles writer cost
+        read_share = read_qps / np.maximum(read_qps + write_qps, 1e-9)
+
+        # Queueing load alone can pick a class far smaller than the source host: every instance must hold the
+        # source's memory (the working set) and a share of its cores, which the QPS figures do not capture
+        fits_host = ((ram[None, :] >= column('ram_gb', 0.0)[:, None] * memory_floor) &
+                     (vcpus[None, :] >= column('cpu_cores', 0.0)[:, None] * vcpu_floor))
+
+        # Option A: writer alone serves reads and writes at the blended service time (N x K)
+        blended_ms = (read_qps * read_ms + write_qps * write_ms) / np.maximum(read_qps + write_qps, 1e-9)
+        blended_ms = np.where(read_qps + write_qps > 0, blended_ms, write_ms)
+        solo_p95 = DatabaseClusterConfiguration.response_time_percentile_ms(
+            vcpus[None, :], (read_qps + write_qps)[:, None], blended_ms[:, None], percentile)
+        solo_util = (read_qps + write_qps)[:, None] * blended_ms[:, None] / 1000 / vcpus[None, :]
+        solo_ok = ((solo_p95 <= slo_ms[:, None]) & (solo_util <= max_utilization) &
+                   (connections[:, None] <= max_connections[None, :]) & (min_readers[:, None] == 0) &
+                   ~(fixed_readers[:, None] > 0) & fits_host)
+        solo_cost = np.where(solo_ok, prices[None, :] * writer_factor[:, None], np.inf)
+        solo_pick = solo_cost.argmin(axis=1)
+        solo_best = solo_cost[np.arange(n), solo_pick]
+
+        # Option B: writer serves writes, reads spread evenly over r readers of one class
+        writer_p95 = DatabaseClusterConfiguration.response_time_percentile_ms(
+            vcpus[None, :], write_qps[:, None], write_ms[:, None], percentile)
+        writer_util = write_qps[:, None] * write_ms[:, None] / 1000 / vcpus[None, :]
+        writer_ok = ((writer_p95 <= slo_ms[:, None]) & (writer_util <= max_utilization) &
+                     (connections[:, None] * (1 - read_share[:, None]) <= max_connections[None, :]) & fits_host)
+        writer_cost = np.where(writer_ok, prices[None, :] * writer_factor[:, None], np.inf)
+        writer_pick = writer_cost.argmin(axis=1)
+
+        reader_counts = np.arange(1, max_readers + 1, dtype=float)
+        per_reader_qps = read_qps[:, None, None] / reader_counts[None, None, :]              # N x K x R
+        reader_p95 = DatabaseClusterConfiguration.response_time_percentile_ms(
+            vcpus[None, :, None], per_reader_qps, read_ms[:, None, None], percentile)
+        reader_util = per_reader_qps * read_ms[:, None, None] / 1000 / vcpus[None, :, None]
+        reader_ok = ((reader_p95 <= slo_ms[:, None, None]) & (reader_util <= max_utilization) &
+                     (connections[:, None, None] * read_share[:, None, None] / reader_counts[None, None, :]
+                      <= max_connections[None, :, None]) &
+                     (reader_counts[None, None, :] >= min_readers[:, None, None]) &
+                     (np.isnan(fixed_readers)[:, None, None] | (reader_counts[None, None, :] == fixed_readers[:, None, None])) &
+                     fits_host[:, :, None])
+        reader_cost = np.where(reader_ok, prices[None, :, None] * reader_counts[None, None, :], np.inf)
+        reader_flat = reader_cost.reshape(n, -1).argmin(axis=1)
+        reader_pick, count_pick = np.unravel_index(reader_flat, reader_cost.shape[1:])
+
+        rows = np.arange(n)
+        split_best = writer_cost[rows, writer_pick] + reader_cost[rows, reader_pick, count_pick]
+
+        use_split = split_best < solo_best
+        meets_slo = np.isfinite(np.minimum(split_best, solo_best))
+        # Nothing fits: largest writer plus the most (or the pinned number of) readers, flagged as missing the SLO
+        use_split = np.where(meets_slo, use_split, fixed_readers != 0)
+        largest = len(classes) - 1
+        writer_pick = np.where(meets_slo, np.where(use_split, writer_pick, solo_pick), largest)
+        reader_pick = np.where(meets_slo, reader_pick, largest)
+        fallback_count = np.where(np.isnan(fixed_readers), max_readers, np.clip(fixed_readers, 1, max_readers)) - 1
+        count_pick = np.where(meets_slo, count_pick, fallback_count.astype(int))
+
+        reader_count = np.where(use_split, reader_counts[count_pick], 0).astype(int)
+        writer_p95_ms = np.where(use_split, writer_p95[rows, writer_pick], solo_p95[rows, writer_pick])
+        writer_utilization = np.where(use_split, writer_util[rows, writer_pick], solo_util[rows, writer_pick])
+        reader_p95_ms = np.where(use_split, reader_p95[rows, reader_pick, count_pick], np.nan)
+        reader_utilization = np.where(use_split, reader_util[rows, reader_pick, count_pick], np.nan)
+        hourly_cost = prices[writer_pick] * writer_factor + reader_count * prices[reader_pick]
+
+        return pd.DataFrame({
+            'writer_class': classes[writer_pick],
+            'reader_class': np.where(use_split, classes[reader_pick], None),
+            'reader_count': reader_count,
+            'writer_p95_ms': writer_p95_ms,
+            'reader_p95_ms': reader_p95_ms,
+            'writer_utilization': writer_utilization,
+            'reader_utilization': reader_utilization,
+            'hourly_cost': hourly_cost,
+            'meets_slo': meets_slo
+        }, index=clusters.index)
+
+# ===========================
+# CLUSTER COST ENGINE
+# ===========================
+
+class EnhancedMigrationAnalyzer(MigrationAnalyzer):
+    """Writer/reader cluster analyzer that sizes and prices every cluster in one columnar pass"""
+
     def __init__(self, anthropic_api_key: Optional[str] = None):
-        self.pricing_api = RealAWSPricingAPI()
-        self.ai_analyzer = RealClaudeAIAnalyzer(anthropic_api_key)
-        self.anthropic_api_key = anthropic_api_key
-    
-    def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
-        """Calculate AWS instance recommendations using real pricing"""
-        
+        super().__init__(anthropic_api_key)
+        self._initialize_cost_model()
+
+    def _initialize_cost_model(self):
+        """Rates for the cost components not covered by instance pricing"""
+        self.cost_model = {
+            'hours_per_day_month': 30,            # monthly hours = daily usage hours x 30
+            'gp3_baseline_iops': 3000,
+            'gp3_iops_price': 0.02,               # per provisioned IOPS above baseline
+            'io1_iops_threshold': 12000,          # above this, recommend io1
+            'aurora_io_utilization': 0.1,         # average fraction of peak IOPS actually issued
+            'seconds_per_month': 30 * 24 * 3600,
+            'backup_daily_change_rate': 0.05,     # incremental backup growth per retained day
+            'backup_storage_price': 0.095,        # per GB-month beyond the free allowance (= DB size)
+            'monitoring_per_instance': 10.0,      # Enhanced Monitoring / CloudWatch per instance
+            'performance_insights_production': 25.0,
+            'cross_az_price_gb': 0.02,            # $0.01/GB each direction
+            'daily_write_change_rate': 0.05       # share of the dataset rewritten per day at 50% writes
+        }
+
+    @staticmethod
+    def _map_unique(df: pd.DataFrame, columns: List[str], func) -> pd.Series:
+        """Evaluate a scalar rule once per distinct input combination and broadcast the result"""
+        unique = df[columns].drop_duplicates()
+        unique = unique.assign(_result=[func(*values) for values in unique.itertuples(index=False, name=None)])
+        return df[columns].merge(unique, on=columns, how='left')['_result'].set_axis(df.index)
+
+    def _cluster_frame(self, environment_specs: Dict) -> pd.DataFrame:
+        """Environment specs as columns, with process_cluster_data defaults for missing fields"""
+
+        df = pd.DataFrame.from_dict(environment_specs, orient='index')
+        defaults = {
+            'cpu_cores': 4, 'ram_gb': 16, 'storage_gb': 500, 'iops_requirement': 3000,
+            'peak_connections': 100, 'daily_usage_hours': 24, 'workload_pattern': 'balanced',
+            'read_write_ratio': 70, 'environment_type': None, 'multi_az_writer': None,
+            'multi_az_readers': False, 'num_readers': None, 'reader_instance_override': None,
+            'storage_encrypted': True, 'backup_retention': 7, 'auto_storage_scaling': True,
+            'read_qps': None, 'write_qps': None, 'read_service_ms': None, 'write_service_ms': None,
+            'p95_latency_slo_ms': None
+        }
+        for column, default in defaults.items():
+            if column not in df.columns:
+                df[column] = default
+            elif default is not None:
+                df[column] = df[column].fillna(default)
+
+        # Environment type from the upload when given, otherwise from the name
+        names = pd.Series(df.index, index=df.index)
+        df['environment_type'] = df['environment_type'].where(
+            df['environment_type'].notna(), names.map(self._categorize_environment)
+        ).astype(str).str.lower()
+
+        return df
+
+    @traced('analysis')
+    def calculate_enhanced_instance_recommendations(self, environment_specs: Dict) -> Dict:
+        """Writer, reader and storage recommendations for every cluster"""
+
+        if not environment_specs:
+            return {}
+
+        df = self._cluster_frame(environment_specs)
+
+        writer_class = self._map_unique(df, ['cpu_cores', 'ram_gb', 'environment_type'], self._calculate_instance_class)
+        writer_multi_az = df['multi_az_writer'].where(
+            df['multi_az_writer'].notna(), df['environment_type'].isin(['production', 'staging'])
+        ).astype(bool)
+
+        optimal_readers = self._map_unique(df, ['environment_type', 'workload_pattern', 'peak_connections'],
+                                           DatabaseClusterConfiguration.calculate_optimal_readers)
+        reader_count = pd.to_numeric(df['num_readers'], errors='coerce').fillna(optimal_readers).astype(int)
+
+        df['writer_class'] = writer_class
+        df['read_ratio'] = df['read_write_ratio'].astype(float) / 100
+        reader_class = self._map_unique(df, ['writer_class', 'read_ratio'],
+                                        DatabaseClusterConfiguration.recommend_reader_instance_size)
+        reader_class = df['reader_instance_override'].where(df['reader_instance_override'].notna(), reader_class)
+
+        # Clusters with measured QPS are sized by the queueing model; explicit reader settings still win
+        capacity = [None] * len(df)
+        measured = df['read_qps'].notna() & df['write_qps'].notna()
+        if measured.any():
+            sized = DatabaseClusterConfiguration.size_cluster_fleets(
+                df.loc[measured].assign(multi_az_writer=writer_multi_az[measured])
+            )
+            writer_class = writer_class.where(~measured, sized['writer_class'].reindex(df.index))
+            reader_count = reader_count.where(~measured | df['num_readers'].notna(),
+                                              sized['reader_count'].reindex(df.index)).astype(int)
+            model_reader_class = sized['reader_class'].reindex(df.index)
+            reader_class = reader_class.where(
+                ~measured | df['reader_instance_override'].notna() | model_reader_class.isna(), model_reader_class
+            )
+            slo_ms = pd.to_numeric(df.loc[measured, 'p95_latency_slo_ms'], errors='coerce').fillna(50.0)
+            for position, row, slo in zip(np.flatnonzero(measured.to_numpy()), sized.itertuples(), slo_ms):
+                capacity[position] = {
+                    'model': 'M/M/c (Erlang C)',
+                    'p95_latency_slo_ms': float(slo),
+                    'writer_p95_ms': float(row.writer_p95_ms),
+                    'reader_p95_ms': None if pd.isna(row.reader_p95_ms) else float(row.reader_p95_ms),
+                    'writer_utilization': float(row.writer_utilization),
+                    'reader_utilization': None if pd.isna(row.reader_utilization) else float(row.reader_utilization),
+                    'meets_slo': bool(row.meets_slo)
+                }
+
+        iops = df['iops_requirement'].astype(int)
+        storage_type = np.where(iops.to_numpy() > self.cost_model['io1_iops_threshold'], 'io1', 'gp3')
+        storage_iops = np.maximum(iops.to_numpy(), self.cost_model['gp3_baseline_iops'])
+
+        # Plain Python columns, so building the per-cluster dicts stays cheap
+        rows = zip(
+            df.index,
+            df['environment_type'].tolist(), df['workload_pattern'].tolist(),
+            df['read_write_ratio'].astype(int).tolist(), df['peak_connections'].astype(int).tolist(),
+            df['daily_usage_hours'].astype(float).tolist(),
+            df['cpu_cores'].astype(int).tolist(), df['ram_gb'].astype(int).tolist(), df['storage_gb'].astype(int).tolist(),
+            writer_class.tolist(), writer_multi_az.tolist(),
+            reader_count.tolist(), reader_class.tolist(), df['multi_az_readers'].astype(bool).tolist(),
+            storage_type.tolist(), storage_iops.astype(int).tolist(),
+            df['storage_encrypted'].astype(bool).tolist(), df['backup_retention'].astype(int).tolist(),
+            df['auto_storage_scaling'].astype(bool).tolist(), capacity
+        )
+
         recommendations = {}
-        
-        for env_name, specs in environment_specs.items():
-            cpu_cores = specs['cpu_cores']
-            ram_gb = specs['ram_gb']
-            storage_gb = specs['storage_gb']
-            
-            # Determine environment type
-            environment_type = self._categorize_environment(env_name)
-            
-            # Calculate instance class
-            instance_class = self._calculate_instance_class(cpu_cores, ram_gb, environment_type)
-            
-            # Multi-AZ recommendation
-            multi_az = environment_type in ['production', 'staging']
-            
+        for (env_name, env_type, workload, read_write_ratio, connections, daily_hours, cpu_cores, ram_gb, storage_gb,
+             writer, writer_az, readers, reader, reader_az, storage, iops_value, encrypted, retention, auto_scaling,
+             capacity_model) in rows:
+            recommendations[env_name] = {
+                'environment_type': env_type,
+                'workload_pattern': workload,
+                'read_write_ratio': read_write_ratio,
+                'connections': connections,
+                'daily_usage_hours': daily_hours,
+                'writer': {
+                    'instance_class': writer,
+                    'multi_az': writer_az,
+                    'cpu_cores': cpu_cores,
+                    'ram_gb': ram_gb
+                },
+                'readers': {
+                    'count': readers,
+                    'instance_class': reader,
+                    'multi_az': reader_az
+                },
+                'storage': {
+                    'size_gb': storage_gb,
+                    'type': storage,
+                    'iops': iops_value,
+                    'encrypted': encrypted,
+                    'backup_retention_days': retention,
+                    'auto_scaling': auto_scaling
+                },
+                # Flat writer fields for consumers of standard recommendations
+                'instance_class': writer,
+                'cpu_cores': cpu_cores,
+                'ram_gb': ram_gb,
+                'storage_gb': storage_gb,
+                'multi_az': writer_az
+            }
+            if capacity_model:
+                recommendations[env_name]['capacity'] = capacity_model
+
+        return recommendations
+
+    def _recommendation_frame(self, recommendations: Dict) -> pd.DataFrame:
+        """Flatten cluster recommendations into one row per cluster"""
+        return pd.DataFrame({
+            'environment': list(recommendations.keys()),
+            'environment_type': [rec.get('environment_type', 'production') for rec in recommendations.values()],
+            'writer_class': [rec['writer']['instance_class'] for rec in recommendations.values()],
+            'writer_multi_az': [bool(rec['writer']['multi_az']) for rec in recommendations.values()],
+            'reader_count': [rec['readers']['count'] for rec in recommendations.values()],
+            'reader_class': [rec['readers']['instance_class'] for rec in recommendations.values()],
+            'reader_multi_az': [bool(rec['readers']['multi_az']) for rec in recommendations.values()],
+            'storage_gb': [rec['storage']['size_gb'] for rec in recommendations.values()],
+            'storage_type': [rec['storage']['type'] for rec in recommendations.values()],
+            'iops': [rec['storage']['iops'] for rec in recommendations.values()],
+            'backup_retention': [rec['storage'].get('backup_retention_days', 7) for rec in recommendations.values()],
+            'read_write_ratio': [rec.get('read_write_ratio', 70) for rec in recommendations.values()],
+            'daily_usage_hours': [rec.get('daily_usage_hours', 24) for rec in recommendations.values()]
+        })
+
+    def _batch_pricing(self, instance_classes: pd.Series, multi_az: pd.Series, region: str,
+                       target_engine: str) -> pd.DataFrame:
+        """Look up each distinct (instance class, Multi-AZ) pair once and broadcast the prices"""
+        pairs = pd.DataFrame({'instance_class': instance_classes.values, 'multi_az': multi_az.values})
+        unique = pairs.drop_duplicates()
+        prices = [self.pricing_api.get_rds_pricing(region, target_engine, instance_class, bool(az))
+                  for instance_class, az in unique.itertuples(index=False, name=None)]
+        unique = unique.assign(
+            hourly=[price['hourly'] for price in prices],
+            storage_gb_price=[price['storage_gb'] for price in prices],
+            iops_price=[price.get('iops_gb', 0.10) for price in prices],
+            io_request_price=[price.get('io_request', 0.20) for price in prices]
+        )
+        return pairs.merge(unique, on=['instance_class', 'multi_az'], how='left')
+
+    @traced('analysis')
+    def calculate_enhanced_migration_costs(self, recommendations: Dict, migration_params: Dict) -> Dict:
+        """Price writer, readers, storage, backup, monitoring and cross-AZ transfer for every cluster"""
+
+        region = migration_params.get('region', 'us-east-1')
+        target_engine = migration_params.get('target_engine', 'postgres')
+        is_aurora = 'aurora' in target_engine
+        model = self.cost_model
+
+        # Migration project costs do not depend on the clusters
+        cost_analysis = super().calculate_migration_costs({}, migration_params)
+        if not recommendations:
+            return cost_analysis
+
+        df = self._recommendation_frame(recommendations)
+        writer_prices = self._batch_pricing(df['writer_class'], df['writer_multi_az'], region, target_engine)
+        reader_prices = self._batch_pricing(df['reader_class'], df['reader_multi_az'], region, target_engine)
+
+        monthly_hours = df['daily_usage_hours'].to_numpy(dtype=float) * model['hours_per_day_month']
+        reader_count = df['reader_count'].to_numpy(dtype=float)
+        storage_gb = df['storage_gb'].to_numpy(dtype=float)
+        iops = df['iops'].to_numpy(dtype=float)
+
+        writer_instance_cost = writer_prices['hourly'].to_numpy() * monthly_hours
+        reader_costs = reader_count * reader_prices['hourly'].to_numpy() * monthly_hours
+
+        # Aurora readers share the cluster volume; RDS replicas each carry a full copy
+        storage_copies = 1 if is_aurora else 1 + reader_count
+        storage_cost = storage_gb * writer_prices['storage_gb_price'].to_numpy() * storage_copies
+        if is_aurora:
+            io_requests_millions = iops * model['aurora_io_utilization'] * model['seconds_per_month'] / 1e6
+            io_cost = io_requests_millions * writer_prices['io_request_price'].to_numpy()
+        else:
+            io1 = df['storage_type'].to_numpy() == 'io1'
+            io_cost = np.where(
+                io1,
+                iops * writer_prices['iops_price'].to_numpy(),
+                np.maximum(iops - model['gp3_baseline_iops'], 0) * model['gp3_iops_price']
+            ) * storage_copies
+        storage_cost = storage_cost + io_cost
+
+        backup_gb = storage_gb * model['backup_daily_change_rate'] * df['backup_retention'].to_numpy(dtype=float)
+        backup_cost = backup_gb * model['backup_storage_price']
+
+        instance_count = 1 + reader_count
+        monitoring_cost = instance_count * model['monitoring_per_instance'] + np.where(
+            df['environment_type'].to_numpy() == 'production', model['performance_insights_production'], 0
+        )
+
+        # Replication to each RDS replica crosses AZs; Aurora replicates through its storage layer
+        write_factor = (100 - df['read_write_ratio'].to_numpy(dtype=float)) / 50
+        monthly_write_gb = storage_gb * model['daily_write_change_rate'] * write_factor * 30
+        cross_az_cost = np.zeros(len(df)) if is_aurora else reader_count * monthly_write_gb * model['cross_az_price_gb']
+
+        total_monthly = writer_instance_cost + reader_costs + storage_cost + backup_cost + monitoring_cost + cross_az_cost
+
+        columns = {
+            'writer_instance_cost': writer_instance_cost,
+            'reader_costs': reader_costs,
+            'storage_cost': storage_cost,
+            'backup_cost': backup_cost,
+            'monitoring_cost': monitoring_cost,
+            'cross_az_cost': cross_az_cost,
+            'total_monthly': total_monthly
+        }
+        environment_costs = {}
+        for i, env_name in enumerate(df['environment']):
+            env_costs = {key: float(values[i]) for key, values in columns.items()}
+            env_costs['instance_cost'] = env_costs['writer_instance_cost']
+            env_costs['reader_count'] = int(reader_count[i])
+            env_costs['pricing_source'] = 'Batch Pricing Lookup'
+            environment_costs[env_name] = env_costs
+
+        total_monthly_cost = float(total_monthly.sum())
+        cost_analysis.update({
+            'monthly_aws_cost': total_monthly_cost,
+            'annual_aws_cost': total_monthly_cost * 12,
+            'environment_costs': environment_costs
+        })
+        return cost_analysis
+
+# Updated Migration Analyzer with Real APIs
+class RealMigrationAnalyzer:
+    """Migration analyzer with real AWS pricing and Claude AI"""
+    
+    def __init__(self, anthropic_api_key: Optional[str] = None):
+        self.pricing_api = get_shared_real_pricing_api()
+        self.ai_analyzer = RealClaudeAIAnalyzer(anthropic_api_key)
+        self.anthropic_api_key = anthropic_api_key
+    
+    @traced('analysis')
+    def calculate_instance_recommendations(self, environment_specs: Dict) -> Dict:
+        """Calculate AWS instance recommendations using real pricing"""
+        
+        recommendations = {}
+        
+        for env_name, specs in environment_specs.items():
+            cpu_cores = specs['cpu_cores']
+            ram_gb = specs['ram_gb']
+            storage_gb = specs['storage_gb']
+            
+            # Determine environment type
+            environment_type = self._categorize_environment(env_name)
+            
+            # Calculate instance class
+            instance_class = self._calculate_instance_class(cpu_cores, ram_gb, environment_type)
+            
+            # Multi-AZ recommendation
+            multi_az = environment_type in ['production', 'staging']
+            
             recommendations[env_name] = {
                 'environment_type': environment_type,
                 'instance_class': instance_class,
@@ -4822,6 +6869,7 @@ class RealMigrationAnalyzer:
         
         return recommendations
     
+    @traced('analysis')
     def calculate_migration_costs(self, recommendations: Dict, migration_params: Dict) -> Dict:
         """Calculate migration costs using REAL AWS pricing"""
         
@@ -4902,6 +6950,7 @@ class RealMigrationAnalyzer:
             'pricing_source': pricing.get('source', 'Unknown')
         }
     
+    @traced('ai')
     async def generate_real_ai_insights(self, cost_analysis: Dict, migration_params: Dict) -> Dict:
         """Generate REAL AI insights using Claude"""
         return await self.ai_analyzer.generate_real_ai_insights(cost_analysis, migration_params)
@@ -4975,18 +7024,11 @@ def run_real_migration_analysis():
     """Run migration analysis with REAL AWS pricing and Claude AI"""
     
     try:
-        # Initialize REAL analyzer
         anthropic_api_key = st.session_state.migration_params.get('anthropic_api_key')
-        analyzer = RealMigrationAnalyzer(anthropic_api_key)
         
-        # Step 1: Calculate recommendations with REAL AWS pricing
-        st.write("📊 Calculating instance recommendations with live AWS pricing...")
-        recommendations = analyzer.calculate_instance_recommendations(st.session_state.environment_specs)
-        st.session_state.recommendations = recommendations
-        
-        # Step 2: Calculate costs with REAL AWS pricing
-        st.write("💰 Analyzing costs with real-time AWS pricing...")
-        cost_analysis = analyzer.calculate_migration_costs(recommendations, st.session_state.migration_params)
+        # Recommendations, costs, risk and AI insights with REAL AWS pricing; unchanged stages are reused
+        outputs = run_analysis_pipeline('real', targets=ANALYSIS_PIPELINE_TARGETS)
+        cost_analysis = outputs['costs']
         
         # Check pricing sources
         pricing_sources = set()
@@ -4998,28 +7040,12 @@ def run_real_migration_analysis():
         else:
             st.warning("⚠️ Using fallback pricing data (AWS API unavailable)")
         
-        st.session_state.analysis_results = cost_analysis
-        
-        # Step 3: Risk assessment
-        st.write("⚠️ Assessing risks...")
-        risk_assessment = create_default_risk_assessment()
-        st.session_state.risk_assessment = risk_assessment
-        
-        # Step 4: REAL AI insights
         if anthropic_api_key:
-            st.write("🤖 Generating AI insights with Claude...")
-            try:
-                ai_insights = analyzer.generate_ai_insights_sync(cost_analysis, st.session_state.migration_params)
-                st.session_state.ai_insights = ai_insights
-                
-                if ai_insights.get('source') == 'Claude AI':
-                    st.success("✅ AI insights generated by Claude AI")
-                else:
-                    st.warning("⚠️ Using fallback AI insights (Claude API unavailable)")
-                    
-            except Exception as e:
-                st.warning(f"Claude AI call failed: {str(e)}")
-                st.session_state.ai_insights = {'error': str(e)}
+            ai_insights = outputs.get('ai_insights') or {}
+            if ai_insights.get('source') == 'Claude AI':
+                st.success("✅ AI insights generated by Claude AI")
+            else:
+                st.warning("⚠️ Using fallback AI insights (Claude API unavailable)")
         else:
             st.info("ℹ️ Provide Anthropic API key for Claude AI insights")
         
@@ -5163,6 +7189,26 @@ class NetworkTransferAnalyzer:
                 'cons': ['Highest cost', 'Complex configuration', 'Over-engineering for most use cases'],
                 'security_level': 'Very High',
                 'complexity': 'Very High'
+            },
+            'snowball_dx_cdc': {
+                'name': 'Snowball Seed + DX CDC',
+                'description': 'Full load seeded via Snowball, change data capture replicated over Direct Connect',
+                'components': ['AWS Snowball', 'S3 Bucket', 'AWS Direct Connect', 'DMS Replication Instance (CDC)'],
+                'use_cases': ['Very large databases with existing Direct Connect', 'High change rate workloads', 'Short cutover windows'],
+                'pros': ['No bulk load over the wire', 'Predictable CDC bandwidth', 'Low data transfer costs'],
+                'cons': ['Device logistics plus DX provisioning', 'Two transfer paths to coordinate', 'Highest setup effort'],
+                'security_level': 'High',
+                'complexity': 'Very High'
+            },
+            'snowball_vpn_cdc': {
+                'name': 'Snowball Seed + VPN CDC',
+                'description': 'Full load seeded via Snowball, change data capture replicated over site-to-site VPN',
+                'components': ['AWS Snowball', 'S3 Bucket', 'VPN Gateway', 'DMS Replication Instance (CDC)'],
+                'use_cases': ['Large databases without Direct Connect', 'Moderate change rate workloads', 'Encrypted CDC path required'],
+                'pros': ['No bulk load over the wire', 'Encrypted CDC channel', 'No circuit provisioning lead time'],
+                'cons': ['VPN throughput caps CDC catch-up', 'Physical device handling', 'Internet egress pricing for CDC'],
+                'security_level': 'High',
+                'complexity': 'High'
             }
         }
     
@@ -5176,6 +7222,7 @@ class NetworkTransferAnalyzer:
             'ap-northeast-1': {'max_dx_gbps': 100, 'typical_internet_mbps': 800}
         }
     
+    @traced('network')
     def calculate_transfer_analysis(self, migration_params: Dict) -> Dict:
         """Calculate comprehensive transfer analysis for all patterns"""
         
@@ -5222,7 +7269,11 @@ class NetworkTransferAnalyzer:
             return self._calc_hybrid_snowball(data_size_gb, bandwidth_mbps, region)
         elif pattern_id == 'multipath_redundant':
             return self._calc_multipath_redundant(data_size_gb, bandwidth_mbps, region)
-        
+        elif pattern_id == 'snowball_dx_cdc':
+            return self._calc_snowball_seed_cdc(data_size_gb, bandwidth_mbps, region, 'dx')
+        elif pattern_id == 'snowball_vpn_cdc':
+            return self._calc_snowball_seed_cdc(data_size_gb, bandwidth_mbps, region, 'vpn')
+
         return {}
     
     def _calc_internet_dms(self, data_size_gb: int, bandwidth_mbps: int, region: str) -> Dict:
@@ -5402,58 +7453,190 @@ class NetworkTransferAnalyzer:
             'security_score': 95,
             'complexity_score': 100
         }
-    
+
+    def _calc_snowball_seed_cdc(self, data_size_gb: int, bandwidth_mbps: int, region: str, cdc_link: str) -> Dict:
+        """Calculate Snowball seed + online CDC combination pattern metrics"""
+
+        # Full load ships on Snowball; ~20% of the volume (changes accrued while
+        # devices are in transit plus catch-up) replicates over the CDC link
+        snowball_devices = max(1, int(np.ceil(data_size_gb / (80 * 1024))))  # 80TB per device
+        snowball_cost = snowball_devices * 250
+        snowball_shipping_days = 5
+        cdc_data_gb = data_size_gb * 0.2
+
+        if cdc_link == 'dx':
+            cdc_metrics = self._calc_dx_dms(cdc_data_gb, bandwidth_mbps, region)
+            reliability_score, security_score, complexity_score = 93, 88, 90
+        else:
+            cdc_metrics = self._calc_vpn_dms(cdc_data_gb, bandwidth_mbps, region)
+            reliability_score, security_score, complexity_score = 88, 88, 80
+
+        # Snowball orchestration on top of the CDC link setup
+        setup_cost = cdc_metrics['setup_cost'] + 10000
+        total_transfer_days = snowball_shipping_days + cdc_metrics['transfer_time_days']
+        total_cost = snowball_cost + cdc_metrics['data_transfer_cost'] + cdc_metrics['infrastructure_cost'] + setup_cost
+
+        return {
+            'transfer_time_hours': total_transfer_days * 24,
+            'transfer_time_days': total_transfer_days,
+            'data_transfer_cost': snowball_cost + cdc_metrics['data_transfer_cost'],
+            'infrastructure_cost': cdc_metrics['infrastructure_cost'],
+            'setup_cost': setup_cost,
+            'total_cost': total_cost,
+            'bandwidth_utilization': cdc_metrics['bandwidth_utilization'],
+            'reliability_score': reliability_score,
+            'security_score': security_score,
+            'complexity_score': complexity_score
+        }
+
+    # Objectives used for multi-objective ranking, in metric-matrix column order
+    RANKING_OBJECTIVES = ['cost', 'time', 'security', 'reliability', 'simplicity']
+    DEFAULT_RANKING_WEIGHTS = {
+        'cost': 0.25,
+        'time': 0.25,
+        'security': 0.20,
+        'reliability': 0.20,
+        'simplicity': 0.10
+    }
+
     def _generate_recommendations(self, results: Dict, migration_params: Dict) -> Dict:
         """Generate AI-style recommendations for network transfer patterns"""
-        
+
         data_size_gb = migration_params.get('data_size_gb', 1000)
         timeline_weeks = migration_params.get('migration_timeline_weeks', 12)
         budget_level = migration_params.get('budget_constraints', 'medium')
         security_req = migration_params.get('security_requirements', 'standard')
-        
+        recommendation_mode = migration_params.get('recommendation_mode', 'weighted')
+
+        # Precompute the pattern x objective matrices once; re-ranking reuses them
+        metric_matrix = self._build_metric_matrix(results, budget_level, timeline_weeks)
+        pareto_flags = self._compute_pareto_frontier(np.array(metric_matrix['objective_values']))
+        metric_matrix['pareto_optimal'] = [
+            pattern_id for pattern_id, on_frontier in zip(metric_matrix['pattern_ids'], pareto_flags) if on_frontier
+        ]
+
+        composite_scores = np.array(metric_matrix['score_matrix']) @ self._weights_vector(self.DEFAULT_RANKING_WEIGHTS)
+
         # Score each pattern
         pattern_scores = {}
-        
-        for pattern_id, metrics in results.items():
-            if pattern_id == 'recommendations':
-                continue
-                
-            # Calculate composite score based on multiple factors
-            cost_score = self._score_cost(metrics['total_cost'], budget_level)
-            time_score = self._score_time(metrics['transfer_time_days'], timeline_weeks)
-            security_score = metrics['security_score']
-            reliability_score = metrics['reliability_score']
-            complexity_penalty = 100 - metrics['complexity_score']
-            
-            # Weighted scoring
-            composite_score = (
-                cost_score * 0.25 +
-                time_score * 0.25 +
-                security_score * 0.20 +
-                reliability_score * 0.20 +
-                complexity_penalty * 0.10
-            )
-            
+
+        for idx, pattern_id in enumerate(metric_matrix['pattern_ids']):
+            cost_score, time_score = metric_matrix['score_matrix'][idx][:2]
+
             pattern_scores[pattern_id] = {
-                'composite_score': composite_score,
+                'composite_score': float(composite_scores[idx]),
                 'cost_score': cost_score,
                 'time_score': time_score,
-                'metrics': metrics
+                'pareto_optimal': bool(pareto_flags[idx]),
+                'metrics': results[pattern_id]
             }
-        
-        # Sort by composite score
-        sorted_patterns = sorted(pattern_scores.items(), key=lambda x: x[1]['composite_score'], reverse=True)
-        
+
+        # Sort by composite score; in pareto mode non-dominated patterns rank first
+        if recommendation_mode == 'pareto':
+            sorted_patterns = sorted(pattern_scores.items(),
+                                     key=lambda x: (x[1]['pareto_optimal'], x[1]['composite_score']), reverse=True)
+        else:
+            sorted_patterns = sorted(pattern_scores.items(), key=lambda x: x[1]['composite_score'], reverse=True)
+
         # Generate recommendations
         recommendations = {
             'primary_recommendation': self._get_primary_recommendation(sorted_patterns, migration_params),
             'alternative_options': self._get_alternative_options(sorted_patterns[:3], migration_params),
             'cost_optimization': self._get_cost_optimization_tips(sorted_patterns, migration_params),
             'risk_considerations': self._get_risk_considerations(sorted_patterns, migration_params),
-            'timeline_impact': self._get_timeline_impact(sorted_patterns, migration_params)
+            'timeline_impact': self._get_timeline_impact(sorted_patterns, migration_params),
+            'recommendation_mode': recommendation_mode,
+            'pareto_analysis': metric_matrix
         }
-        
+
         return recommendations
+
+    def _build_metric_matrix(self, results: Dict, budget_level: str, timeline_weeks: int) -> Dict:
+        """Build pattern x objective matrices for Pareto filtering and weighted re-ranking"""
+
+        pattern_ids = [pattern_id for pattern_id in results if pattern_id != 'recommendations']
+
+        score_matrix = []
+        objective_values = []
+
+        for pattern_id in pattern_ids:
+            metrics = results[pattern_id]
+
+            # 0-100 scores, higher is better (same scoring as the weighted composite)
+            score_matrix.append([
+                self._score_cost(metrics['total_cost'], budget_level),
+                self._score_time(metrics['transfer_time_days'], timeline_weeks),
+                metrics['security_score'],
+                metrics['reliability_score'],
+                100 - metrics['complexity_score']
+            ])
+
+            # Raw objectives oriented so higher is better, used for dominance checks
+            objective_values.append([
+                -metrics['total_cost'],
+                -metrics['transfer_time_days'],
+                metrics['security_score'],
+                metrics['reliability_score'],
+                -metrics['complexity_score']
+            ])
+
+        return {
+            'pattern_ids': pattern_ids,
+            'pattern_names': [self.transfer_patterns[p]['name'] for p in pattern_ids],
+            'objectives': list(self.RANKING_OBJECTIVES),
+            'score_matrix': score_matrix,
+            'objective_values': objective_values,
+            'default_weights': dict(self.DEFAULT_RANKING_WEIGHTS)
+        }
+
+    @staticmethod
+    def _compute_pareto_frontier(objective_values: np.ndarray) -> np.ndarray:
+        """Return a boolean mask of non-dominated rows (all objectives maximised)"""
+
+        if objective_values.size == 0:
+            return np.zeros(0, dtype=bool)
+
+        # dominates[j, i]: row j is >= row i on every objective and > on at least one
+        at_least = (objective_values[:, None, :] >= objective_values[None, :, :]).all(axis=2)
+        strictly = (objective_values[:, None, :] > objective_values[None, :, :]).any(axis=2)
+        dominated = (at_least & strictly).any(axis=0)
+
+        return ~dominated
+
+    def _weights_vector(self, weights: Dict) -> np.ndarray:
+        """Normalise an objective -> weight mapping into a vector in matrix column order"""
+
+        vector = np.array([float(weights.get(obj, 0.0)) for obj in self.RANKING_OBJECTIVES])
+        total = vector.sum()
+
+        if total <= 0:
+            vector = np.array([self.DEFAULT_RANKING_WEIGHTS[obj] for obj in self.RANKING_OBJECTIVES])
+            total = vector.sum()
+
+        return vector / total
+
+    def rerank_patterns(self, pareto_analysis: Dict, weights: Dict, pareto_only: bool = False) -> List[Dict]:
+        """Re-rank patterns for new objective weights using the precomputed metric matrix"""
+
+        score_matrix = np.asarray(pareto_analysis['score_matrix'], dtype=float)
+        scores = score_matrix @ self._weights_vector(weights)
+        pareto_set = set(pareto_analysis.get('pareto_optimal', []))
+
+        ranked = []
+        for idx in np.argsort(-scores, kind='stable'):
+            pattern_id = pareto_analysis['pattern_ids'][idx]
+
+            if pareto_only and pattern_id not in pareto_set:
+                continue
+
+            ranked.append({
+                'pattern_id': pattern_id,
+                'pattern_name': pareto_analysis['pattern_names'][idx],
+                'score': float(scores[idx]),
+                'pareto_optimal': pattern_id in pareto_set
+            })
+
+        return ranked
     
     def _score_cost(self, total_cost: float, budget_level: str) -> float:
         """Score based on cost relative to budget constraints"""
@@ -5608,6 +7791,20 @@ class NetworkTransferAnalyzer:
                 "Set up redundant DMS instances",
                 "Test failover scenarios",
                 "Execute migration with active monitoring"
+            ],
+            'snowball_dx_cdc': [
+                "Order Snowball devices and establish AWS Direct Connect in parallel",
+                "Capture source log position and extract full load to Snowball",
+                "Ship devices and import full load to S3, then load target",
+                "Start DMS CDC task over DX from the captured log position",
+                "Cut over once CDC replication lag reaches zero"
+            ],
+            'snowball_vpn_cdc': [
+                "Order Snowball devices and set up site-to-site VPN",
+                "Capture source log position and extract full load to Snowball",
+                "Ship devices and import full load to S3, then load target",
+                "Start DMS CDC task over VPN from the captured log position",
+                "Cut over once CDC replication lag reaches zero"
             ]
         }
         
@@ -5622,7 +7819,9 @@ class NetworkTransferAnalyzer:
             'dx_datasync_vpc': "6-8 weeks (complex VPC setup)",
             'vpn_dms': "2-3 weeks",
             'hybrid_snowball_dms': "8-12 weeks (includes shipping)",
-            'multipath_redundant': "8-10 weeks (dual-path complexity)"
+            'multipath_redundant': "8-10 weeks (dual-path complexity)",
+            'snowball_dx_cdc': "6-8 weeks (DX provisioning overlaps shipping)",
+            'snowball_vpn_cdc': "4-6 weeks (includes shipping)"
         }
         
         return timeline_map.get(pattern_id, "Timeline varies")
@@ -5637,7 +7836,9 @@ class NetworkTransferAnalyzer:
             'dx_datasync_vpc': "Maximum security but highest complexity",
             'vpn_dms': "Good security balance with moderate setup",
             'hybrid_snowball_dms': "Fastest for large data but complex coordination",
-            'multipath_redundant': "Maximum reliability but highest cost"
+            'multipath_redundant': "Maximum reliability but highest cost",
+            'snowball_dx_cdc': "Shortest cutover for large data but needs both Snowball and DX",
+            'snowball_vpn_cdc': "Offline seed without circuit lead time, CDC limited by VPN throughput"
         }
         
         return trade_offs.get(pattern_id, "Different cost/performance trade-offs")
@@ -5731,7 +7932,7 @@ def create_network_comparison_chart(transfer_analysis: Dict) -> go.Figure:
         if pattern_id == 'recommendations':
             continue
             
-        pattern_info = NetworkTransferAnalyzer().transfer_patterns[pattern_id]
+        pattern_info = get_shared_network_analyzer().transfer_patterns[pattern_id]
         patterns.append(pattern_info['name'])
         costs.append(metrics['total_cost'])
         durations.append(metrics['transfer_time_days'])
@@ -5797,7 +7998,7 @@ def create_cost_duration_optimization_chart(transfer_analysis: Dict) -> go.Figur
     durations = []
     scores = []
     
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     
     for pattern_id, metrics in transfer_analysis.items():
         if pattern_id == 'recommendations':
@@ -5855,13 +8056,59 @@ def create_cost_duration_optimization_chart(transfer_analysis: Dict) -> go.Figur
     
     return fig
 
+def create_pareto_frontier_chart(transfer_analysis: Dict, ranked_patterns: Optional[List[Dict]] = None) -> go.Figure:
+    """Create cost vs duration chart highlighting the Pareto-optimal patterns"""
+
+    pareto_analysis = transfer_analysis.get('recommendations', {}).get('pareto_analysis', {})
+    pareto_set = set(pareto_analysis.get('pareto_optimal', []))
+    score_lookup = {p['pattern_id']: p['score'] for p in (ranked_patterns or [])}
+
+    fig = go.Figure()
+
+    for on_frontier, label, color in [(True, 'Pareto-optimal', '#38a169'), (False, 'Dominated', '#a0aec0')]:
+        pattern_ids = [p for p in pareto_analysis.get('pattern_ids', []) if (p in pareto_set) == on_frontier]
+        if not pattern_ids:
+            continue
+
+        names = [pareto_analysis['pattern_names'][pareto_analysis['pattern_ids'].index(p)] for p in pattern_ids]
+
+        fig.add_trace(go.Scatter(
+            x=[transfer_analysis[p]['transfer_time_days'] for p in pattern_ids],
+            y=[transfer_analysis[p]['total_cost'] for p in pattern_ids],
+            mode='markers+text',
+            text=names,
+            textposition="top center",
+            name=label,
+            marker=dict(
+                size=[12 + score_lookup.get(p, 50) * 0.3 for p in pattern_ids],
+                color=color,
+                symbol='diamond' if on_frontier else 'circle',
+                line=dict(width=1, color='#2d3748')
+            ),
+            customdata=[score_lookup.get(p, 0) for p in pattern_ids],
+            hovertemplate='<b>%{text}</b><br>' +
+                          'Duration: %{x:.1f} days<br>' +
+                          'Cost: $%{y:,.0f}<br>' +
+                          'Weighted Score: %{customdata:.1f}<br>' +
+                          '<extra></extra>'
+        ))
+
+    fig.update_layout(
+        title='Pareto Frontier: Cost vs Duration (all five objectives considered)',
+        xaxis_title='Transfer Duration (days)',
+        yaxis_title='Total Cost ($)',
+        height=500
+    )
+
+    return fig
+
 def create_network_architecture_diagram(selected_pattern: str) -> go.Figure:
     """Create network architecture diagram for selected pattern"""
     
     # Simplified architecture representation using plotly
     # In production, you might use more sophisticated diagramming tools
     
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     pattern_info = analyzer.transfer_patterns.get(selected_pattern, {})
     
     # Create a simple flow diagram
@@ -5935,11 +8182,8 @@ def show_network_transfer_analysis():
         st.warning("⚠️ Please complete Migration Configuration first.")
         return
     
-    # Initialize network analyzer
-    if 'network_analyzer' not in st.session_state:
-        st.session_state.network_analyzer = NetworkTransferAnalyzer()
-    
-    analyzer = st.session_state.network_analyzer
+    # Network analyzer shared by all sessions
+    analyzer = get_shared_network_analyzer()
     
     # Network-specific parameters
     st.markdown("### 🔧 Network Configuration")
@@ -5987,7 +8231,15 @@ def show_network_transfer_analysis():
             max_value=100000,
             value=25000
         )
-    
+
+    recommendation_mode = st.radio(
+        "Recommendation Mode",
+        ["weighted", "pareto"],
+        format_func=lambda x: "Weighted Score" if x == "weighted" else "Multi-Objective (Pareto Frontier)",
+        horizontal=True,
+        help="Pareto mode only recommends patterns that no other pattern beats on every objective"
+    )
+
     # Update migration params with network-specific settings
     network_params = st.session_state.migration_params.copy()
     network_params.update({
@@ -5997,14 +8249,18 @@ def show_network_transfer_analysis():
         'security_requirements': security_level,
         'compliance_requirements': compliance_requirements,
         'budget_constraints': budget_level,
-        'max_setup_cost': max_setup_cost
+        'max_setup_cost': max_setup_cost,
+        'recommendation_mode': recommendation_mode
     })
     
     # Run network analysis
     if st.button("🚀 Analyze Network Transfer Options", type="primary", use_container_width=True):
         with st.spinner("🔄 Analyzing network transfer patterns..."):
             
-            transfer_analysis = analyzer.calculate_transfer_analysis(network_params)
+            # Shares the analysis pipeline's memoized transfer stage
+            transfer_analysis = get_analysis_pipeline('standard').run(
+                getattr(st.session_state, 'environment_specs', {}), network_params, targets=['transfer']
+            )['transfer']
             st.session_state.transfer_analysis = transfer_analysis
             
             st.success("✅ Network analysis complete!")
@@ -6014,6 +8270,9 @@ def show_network_transfer_analysis():
         show_network_analysis_results()
     else:
         st.info("ℹ️ Run the network analysis to see results and recommendations.")
+
+    st.markdown("---")
+    show_migration_wave_planner(network_params)
     
 
 def show_network_analysis_results():
@@ -6122,6 +8381,64 @@ def show_network_recommendations(transfer_analysis: Dict):
         for risk in risks:
             st.markdown(f"• {risk}")
 
+    # Multi-objective trade-offs
+    if recommendations.get('pareto_analysis'):
+        show_pareto_tradeoff_explorer(transfer_analysis)
+
+def show_pareto_tradeoff_explorer(transfer_analysis: Dict):
+    """Show Pareto frontier and slider-driven re-ranking of network patterns"""
+
+    st.markdown("#### ⚖️ Multi-Objective Trade-offs")
+
+    pareto_analysis = transfer_analysis['recommendations']['pareto_analysis']
+    default_weights = pareto_analysis.get('default_weights', NetworkTransferAnalyzer.DEFAULT_RANKING_WEIGHTS)
+
+    analyzer = get_shared_network_analyzer()
+
+    pareto_names = [
+        name for pattern_id, name in zip(pareto_analysis['pattern_ids'], pareto_analysis['pattern_names'])
+        if pattern_id in pareto_analysis.get('pareto_optimal', [])
+    ]
+    st.info(f"🏅 **Pareto-optimal patterns ({len(pareto_names)}):** {', '.join(pareto_names)}")
+
+    # Sliders only re-weight the precomputed score matrix - pattern metrics are not recalculated
+    weight_labels = {
+        'cost': "💰 Cost",
+        'time': "⏱️ Time",
+        'security': "🔒 Security",
+        'reliability': "🛡️ Reliability",
+        'simplicity': "🧩 Simplicity"
+    }
+
+    weights = {}
+    cols = st.columns(len(pareto_analysis['objectives']))
+    for col, objective in zip(cols, pareto_analysis['objectives']):
+        with col:
+            weights[objective] = st.slider(
+                weight_labels.get(objective, objective.title()),
+                min_value=0, max_value=100,
+                value=int(round(default_weights.get(objective, 0) * 100)),
+                key=f"pareto_weight_{objective}"
+            )
+
+    pareto_only = st.checkbox("Show Pareto-optimal patterns only", value=False, key="pareto_only_filter")
+
+    ranked_patterns = analyzer.rerank_patterns(pareto_analysis, weights, pareto_only=pareto_only)
+
+    ranking_df = pd.DataFrame([
+        {
+            'Rank': rank,
+            'Pattern': p['pattern_name'],
+            'Weighted Score': f"{p['score']:.1f}",
+            'Pareto-Optimal': '✅' if p['pareto_optimal'] else '❌'
+        }
+        for rank, p in enumerate(ranked_patterns, 1)
+    ])
+    st.dataframe(ranking_df, use_container_width=True, hide_index=True)
+
+    pareto_fig = create_pareto_frontier_chart(transfer_analysis, ranked_patterns)
+    st.plotly_chart(pareto_fig, use_container_width=True, key="network_pareto_frontier_chart")
+
 def show_pattern_comparison(transfer_analysis: Dict):
     """Show pattern comparison visualizations"""
     
@@ -6138,7 +8455,7 @@ def show_pattern_comparison(transfer_analysis: Dict):
     # Detailed comparison table
     st.markdown("#### 📋 Detailed Metrics Comparison")
     
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     comparison_data = []
     
     for pattern_id, metrics in transfer_analysis.items():
@@ -6215,7 +8532,7 @@ def show_network_timeline_analysis(transfer_analysis: Dict):
         if pattern_id == 'recommendations':
             continue
             
-        analyzer = NetworkTransferAnalyzer()
+        analyzer = get_shared_network_analyzer()
         pattern_info = analyzer.transfer_patterns[pattern_id]
         
         patterns.append(pattern_info['name'])
@@ -6263,7 +8580,7 @@ def show_network_architecture(transfer_analysis: Dict):
     st.markdown("### 🏗️ Network Architecture")
     
     # Pattern selector
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     pattern_options = list(analyzer.transfer_patterns.keys())
     pattern_names = [analyzer.transfer_patterns[p]['name'] for p in pattern_options]
     
@@ -6332,7 +8649,7 @@ def show_network_cost_analysis(transfer_analysis: Dict):
     st.markdown("### 💰 Network Cost Analysis")
     
     # Cost breakdown for each pattern
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     chart_counter = 0
     
     for pattern_id, metrics in transfer_analysis.items():
@@ -6423,7 +8740,7 @@ def show_network_timeline_analysis(transfer_analysis: Dict):
         if pattern_id == 'recommendations':
             continue
             
-        analyzer = NetworkTransferAnalyzer()
+        analyzer = get_shared_network_analyzer()
         pattern_info = analyzer.transfer_patterns[pattern_id]
         
         patterns.append(pattern_info['name'])
@@ -6471,7 +8788,7 @@ def show_network_architecture(transfer_analysis: Dict):
     st.markdown("### 🏗️ Network Architecture")
     
     # Pattern selector
-    analyzer = NetworkTransferAnalyzer()
+    analyzer = get_shared_network_analyzer()
     pattern_options = list(analyzer.transfer_patterns.keys())
     pattern_names = [analyzer.transfer_patterns[p]['name'] for p in pattern_options]
     
@@ -6547,65 +8864,582 @@ def add_network_module_to_main_app():
     
     pass
 
-# # ===========================
-# ROBUST RISK ASSESSMENT FIX
+# ===========================
+# MIGRATION WAVE PLANNING MODULE
 # ===========================
 
-def ensure_risk_assessment_exists():
-    """Ensure risk assessment exists in session state with valid data"""
-    
-    if not hasattr(st.session_state, 'risk_assessment') or st.session_state.risk_assessment is None:
-        st.session_state.risk_assessment = create_default_risk_assessment()
-        return False  # Indicates we created a default
-    return True  # Indicates existing assessment was found
+class MigrationWavePlanner:
+    """Schedule a database portfolio into migration waves under weekly link capacity"""
 
-def create_default_risk_assessment():
-    """Create a default risk assessment when none exists"""
-    
-    # Try to use actual migration params if available
-    migration_params = getattr(st.session_state, 'migration_params', {})
-    recommendations = getattr(st.session_state, 'recommendations', {}) or getattr(st.session_state, 'enhanced_recommendations', {})
-    
-    # Calculate risks based on available data
-    try:
-        if migration_params and recommendations:
-            return calculate_migration_risks_safe(migration_params, recommendations)
-        else:
-            return get_fallback_risk_assessment()
-    except:
-        return get_fallback_risk_assessment()
+    def __init__(self):
+        self.environment_priorities = self._initialize_environment_priorities()
+        self.cutover_windows = self._initialize_cutover_windows()
 
-def calculate_migration_risks_safe(migration_params: Dict, recommendations: Dict) -> Dict:
-    """Safe version of risk calculation that never fails"""
-    
-    try:
-        # Get basic parameters with safe defaults
-        source_engine = migration_params.get('source_engine', 'unknown')
-        target_engine = migration_params.get('target_engine', 'unknown')
-        data_size_gb = int(migration_params.get('data_size_gb', 1000))
-        timeline_weeks = int(migration_params.get('migration_timeline_weeks', 12))
-        team_size = int(migration_params.get('team_size', 5))
-        migration_budget = int(migration_params.get('migration_budget', 500000))
-        
-        # Calculate technical risks
-        engine_risk = calculate_engine_compatibility_risk(source_engine, target_engine)
-        data_risk = calculate_data_complexity_risk(data_size_gb)
-        app_risk = calculate_application_risk(migration_params)
-        perf_risk = calculate_performance_risk(recommendations)
-        
-        technical_risks = {
-            'engine_compatibility': engine_risk,
-            'data_migration_complexity': data_risk,
-            'application_integration': app_risk,
-            'performance_risk': perf_risk
+    def _initialize_environment_priorities(self) -> Dict:
+        """Lower value migrates earlier when scheduling priorities tie"""
+        return {
+            'development': 0,
+            'testing': 1,
+            'qa': 1,
+            'staging': 2,
+            'production': 3
         }
-        
-        # Calculate business risks
-        timeline_risk = calculate_timeline_risk(timeline_weeks, data_size_gb, team_size)
-        cost_risk = calculate_cost_risk(migration_budget, data_size_gb, timeline_weeks)
-        continuity_risk = calculate_continuity_risk(recommendations)
-        resource_risk = calculate_resource_risk(team_size, migration_params.get('team_expertise', 'medium'))
-        
+
+    def _initialize_cutover_windows(self) -> Dict:
+        """Days of CDC replication kept running before cutover, by environment type"""
+        return {
+            'development': 1,
+            'testing': 2,
+            'qa': 2,
+            'staging': 3,
+            'production': 7
+        }
+
+    @staticmethod
+    def link_capacity_gb_per_week(bandwidth_mbps: float, efficiency: float = 0.8,
+                                  hours_per_day: float = 24) -> float:
+        """Convert link bandwidth into usable GB per week"""
+        return bandwidth_mbps * efficiency * 3600 * hours_per_day * 7 / (8 * 1024)
+
+    def build_portfolio(self, environment_specs: Dict) -> List[Dict]:
+        """Normalise environment specs into the planner's database list"""
+
+        portfolio = []
+
+        for db_name, specs in environment_specs.items():
+            env_type = str(specs.get('environment_type') or
+                           ('production' if 'prod' in db_name.lower() else 'development')).lower()
+
+            dependencies = specs.get('dependencies', specs.get('depends_on', []))
+            if isinstance(dependencies, str):
+                dependencies = [d.strip() for d in dependencies.replace(';', ',').split(',') if d.strip()]
+            elif not isinstance(dependencies, (list, tuple, set)):
+                dependencies = []
+
+            portfolio.append({
+                'name': str(db_name),
+                'size_gb': float(specs.get('data_size_gb', specs.get('storage_gb', 0)) or 0),
+                'change_rate_percent': float(specs.get('change_rate_percent', 2.0) or 0),
+                'environment_type': env_type,
+                'dependencies': [str(d) for d in dependencies]
+            })
+
+        return portfolio
+
+    def portfolio_from_dataframe(self, df: pd.DataFrame) -> List[Dict]:
+        """Build a portfolio from an uploaded CSV/Excel frame"""
+
+        columns = {c.lower().strip(): c for c in df.columns}
+        name_col = next((columns[c] for c in ['database', 'database_name', 'name', 'environment', 'environment_name'] if c in columns), None)
+        size_col = next((columns[c] for c in ['size_gb', 'data_size_gb', 'storage_gb'] if c in columns), None)
+
+        if name_col is None or size_col is None:
+            raise ValueError("Portfolio file needs a database name column and a size_gb column")
+
+        change_col = columns.get('change_rate_percent')
+        env_col = columns.get('environment_type')
+        deps_col = columns.get('depends_on', columns.get('dependencies'))
+
+        specs = {}
+        for row in df.itertuples(index=False):
+            row = row._asdict() if hasattr(row, '_asdict') else dict(zip(df.columns, row))
+            spec = {'data_size_gb': row[size_col]}
+            if change_col and pd.notna(row.get(change_col)):
+                spec['change_rate_percent'] = row[change_col]
+            if env_col and pd.notna(row.get(env_col)):
+                spec['environment_type'] = row[env_col]
+            if deps_col and pd.notna(row.get(deps_col)):
+                spec['dependencies'] = str(row[deps_col])
+            specs[str(row[name_col])] = spec
+
+        return self.build_portfolio(specs)
+
+    def plan_waves(self, portfolio: List[Dict], weekly_capacity_gb, objective: str = 'duration',
+                   max_dms_instances: Optional[int] = None, target_weeks: Optional[int] = None) -> Dict:
+        """Plan migration waves for a portfolio.
+
+        objective='duration' packs transfers to finish as early as possible;
+        objective='peak_dms' finds the smallest concurrent DMS instance count that
+        still finishes within target_weeks (defaults to the minimum-duration plan).
+        """
+
+        try:
+            graph = self._build_dependency_graph(portfolio)
+            volumes = self._transfer_volumes(portfolio)
+            priorities = self._critical_volume_priorities(graph, volumes, portfolio)
+
+            if objective == 'peak_dms':
+                baseline = self._list_schedule(graph, volumes, priorities, weekly_capacity_gb, max_dms_instances)
+                deadline = target_weeks or baseline['total_weeks']
+
+                low, high = 1, max_dms_instances or max(1, len(graph['order']))
+                best = baseline
+                while low <= high:
+                    cap = (low + high) // 2
+                    trial = self._list_schedule(graph, volumes, priorities, weekly_capacity_gb, cap)
+                    if trial['total_weeks'] <= deadline:
+                        best, high = trial, cap - 1
+                    else:
+                        low = cap + 1
+                schedule = best
+            else:
+                schedule = self._list_schedule(graph, volumes, priorities, weekly_capacity_gb, max_dms_instances)
+
+            return self._summarize_plan(portfolio, graph, volumes, schedule, objective)
+
+        except Exception as e:
+            print(f"Error planning migration waves: {e}")
+            return self._get_fallback_plan(portfolio, str(e))
+
+    def _build_dependency_graph(self, portfolio: List[Dict]) -> Dict:
+        """Index databases and order them topologically (Kahn), reporting cycles"""
+
+        names = [db['name'] for db in portfolio]
+        index = {name: i for i, name in enumerate(names)}
+        predecessors = [[] for _ in names]
+        successors = [[] for _ in names]
+        missing = []
+
+        for i, db in enumerate(portfolio):
+            for dep in db['dependencies']:
+                j = index.get(dep)
+                if j is None:
+                    missing.append({'database': db['name'], 'missing_dependency': dep})
+                elif j != i:
+                    predecessors[i].append(j)
+                    successors[j].append(i)
+
+        indegree = [len(p) for p in predecessors]
+        queue = [i for i, d in enumerate(indegree) if d == 0]
+        order = []
+        head = 0
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            order.append(node)
+            for nxt in successors[node]:
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    queue.append(nxt)
+
+        # Nodes never released by Kahn's pass sit on (or downstream of) a cycle
+        cyclic_index = [i for i, d in enumerate(indegree) if d > 0]
+
+        return {
+            'names': names,
+            'predecessors': predecessors,
+            'successors': successors,
+            'order': order,
+            'cyclic': [names[i] for i in cyclic_index],
+            'cyclic_index': cyclic_index,
+            'missing_dependencies': missing
+        }
+
+    def _transfer_volumes(self, portfolio: List[Dict]) -> np.ndarray:
+        """Full load plus CDC volume replicated during the cutover window"""
+
+        sizes = np.array([db['size_gb'] for db in portfolio], dtype=float)
+        change_rates = np.array([db['change_rate_percent'] for db in portfolio], dtype=float) / 100
+        cdc_days = np.array([self.cutover_windows.get(db['environment_type'], 3) for db in portfolio], dtype=float)
+
+        return sizes * (1 + change_rates * cdc_days)
+
+    def _critical_volume_priorities(self, graph: Dict, volumes: np.ndarray, portfolio: List[Dict]) -> List[Tuple]:
+        """Priority = volume on the longest downstream chain, ties broken by environment order"""
+
+        tail = volumes.copy()
+        for node in reversed(graph['order']):
+            succ = graph['successors'][node]
+            if succ:
+                tail[node] = volumes[node] + max(tail[s] for s in succ)
+
+        return [
+            (-float(tail[i]), self.environment_priorities.get(portfolio[i]['environment_type'], 2), i)
+            for i in range(len(volumes))
+        ]
+
+    def _list_schedule(self, graph: Dict, volumes: np.ndarray, priorities: List[Tuple],
+                       weekly_capacity_gb, max_dms_instances: Optional[int]) -> Dict:
+        """Serial list scheduling into time-indexed weekly bandwidth bins"""
+
+        import heapq
+
+        if isinstance(weekly_capacity_gb, (list, tuple, np.ndarray)):
+            capacity_plan = [float(c) for c in weekly_capacity_gb] or [0.0]
+        else:
+            capacity_plan = [float(weekly_capacity_gb)]
+
+        # Weeks beyond an explicit capacity plan repeat its last value
+        def week_capacity(week):
+            return capacity_plan[week] if week < len(capacity_plan) else capacity_plan[-1]
+
+        if max(capacity_plan[-1], 0) <= 0:
+            raise ValueError("Weekly link capacity must be positive")
+
+        remaining = []
+        active = []
+
+        def ensure_week(week):
+            while len(remaining) <= week:
+                remaining.append(week_capacity(len(remaining)))
+                active.append(0)
+
+        predecessors = graph['predecessors']
+        successors = graph['successors']
+        cyclic = set(graph['cyclic_index'])
+
+        pending = [len(p) for p in predecessors]
+        ready_week = [0] * len(volumes)
+        start = [None] * len(volumes)
+        finish = [None] * len(volumes)
+        weekly_gb = {}
+        eps = 1e-9
+
+        heap = [(priorities[i], i) for i in range(len(volumes)) if pending[i] == 0 and i not in cyclic]
+        heapq.heapify(heap)
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            week = ready_week[node]
+
+            while True:
+                # Earliest week with spare bandwidth and a free DMS slot
+                while True:
+                    ensure_week(week)
+                    slot_free = max_dms_instances is None or active[week] < max_dms_instances
+                    if slot_free and (remaining[week] > eps or volumes[node] <= eps):
+                        break
+                    week += 1
+
+                # Occupy one DMS instance per week until the volume is transferred
+                begin = week
+                to_move = volumes[node]
+                allocations = []
+                blocked = False
+                while True:
+                    ensure_week(week)
+                    if max_dms_instances is not None and active[week] >= max_dms_instances:
+                        blocked = True
+                        break
+                    moved = min(remaining[week], to_move)
+                    remaining[week] -= moved
+                    active[week] += 1
+                    allocations.append((week, moved))
+                    to_move -= moved
+                    if to_move <= eps:
+                        break
+                    week += 1
+
+                if not blocked:
+                    break
+
+                # No DMS slot mid-transfer: roll back and retry after the blocked week
+                for w, gb in allocations:
+                    remaining[w] += gb
+                    active[w] -= 1
+                week += 1
+
+            start[node] = begin
+            finish[node] = week
+            weekly_gb[node] = allocations
+
+            for nxt in successors[node]:
+                ready_week[nxt] = max(ready_week[nxt], week + 1)
+                pending[nxt] -= 1
+                if pending[nxt] == 0 and nxt not in cyclic:
+                    heapq.heappush(heap, (priorities[nxt], nxt))
+
+        scheduled = [i for i in range(len(volumes)) if finish[i] is not None]
+        total_weeks = (max(finish[i] for i in scheduled) + 1) if scheduled else 0
+
+        return {
+            'start': start,
+            'finish': finish,
+            'allocations': weekly_gb,
+            'remaining': remaining[:total_weeks],
+            'active': active[:total_weeks],
+            'capacity': [week_capacity(w) for w in range(total_weeks)],
+            'total_weeks': total_weeks,
+            'max_dms_instances': max_dms_instances
+        }
+
+    def _summarize_plan(self, portfolio: List[Dict], graph: Dict, volumes: np.ndarray,
+                        schedule: Dict, objective: str) -> Dict:
+        """Group scheduled databases into waves by start week and compute utilisation"""
+
+        database_schedule = {}
+        waves = {}
+
+        for i, db in enumerate(portfolio):
+            if schedule['finish'][i] is None:
+                continue
+
+            start_week = schedule['start'][i] + 1
+            end_week = schedule['finish'][i] + 1
+
+            database_schedule[db['name']] = {
+                'wave': start_week,
+                'start_week': start_week,
+                'end_week': end_week,
+                'transfer_gb': float(volumes[i]),
+                'environment_type': db['environment_type'],
+                'dependencies': db['dependencies']
+            }
+
+            wave = waves.setdefault(start_week, {
+                'wave': start_week,
+                'start_week': start_week,
+                'end_week': end_week,
+                'databases': [],
+                'total_gb': 0.0
+            })
+            wave['databases'].append(db['name'])
+            wave['total_gb'] += float(volumes[i])
+            wave['end_week'] = max(wave['end_week'], end_week)
+
+        # Renumber waves consecutively in start order
+        wave_list = []
+        for number, start_week in enumerate(sorted(waves), 1):
+            wave = waves[start_week]
+            wave['wave'] = number
+            wave['dms_instances'] = len(wave['databases'])
+            for name in wave['databases']:
+                database_schedule[name]['wave'] = number
+            wave_list.append(wave)
+
+        weekly_utilization = []
+        for week, capacity in enumerate(schedule['capacity']):
+            used = capacity - schedule['remaining'][week]
+            weekly_utilization.append({
+                'week': week + 1,
+                'capacity_gb': capacity,
+                'used_gb': used,
+                'utilization_percent': (used / capacity * 100) if capacity > 0 else 0,
+                'active_dms': schedule['active'][week]
+            })
+
+        active_weeks = sum(schedule['active'])
+        peak_dms = max(schedule['active']) if schedule['active'] else 0
+        total_weeks = schedule['total_weeks']
+
+        return {
+            'waves': wave_list,
+            'database_schedule': database_schedule,
+            'weekly_utilization': weekly_utilization,
+            'summary': {
+                'objective': objective,
+                'total_databases': len(portfolio),
+                'scheduled_databases': len(database_schedule),
+                'total_weeks': total_weeks,
+                'total_waves': len(wave_list),
+                'peak_dms_instances': peak_dms,
+                'dms_instance_weeks': active_weeks,
+                # Same DMS hourly rate as MigrationAnalyzer.calculate_migration_costs
+                'estimated_dms_cost': active_weeks * 0.2 * 24 * 7,
+                'total_transfer_gb': float(volumes.sum()),
+                'average_utilization': float(np.mean([w['utilization_percent'] for w in weekly_utilization])) if weekly_utilization else 0
+            },
+            'dependency_cycles': graph['cyclic'],
+            'missing_dependencies': graph['missing_dependencies']
+        }
+
+    def _get_fallback_plan(self, portfolio: List[Dict], error: str) -> Dict:
+        """Single-wave plan used when scheduling fails"""
+        return {
+            'waves': [{
+                'wave': 1, 'start_week': 1, 'end_week': 1,
+                'databases': [db['name'] for db in portfolio],
+                'total_gb': sum(db['size_gb'] for db in portfolio),
+                'dms_instances': len(portfolio)
+            }],
+            'database_schedule': {},
+            'weekly_utilization': [],
+            'summary': {
+                'objective': 'fallback', 'total_databases': len(portfolio), 'scheduled_databases': 0,
+                'total_weeks': 0, 'total_waves': 1, 'peak_dms_instances': len(portfolio),
+                'dms_instance_weeks': 0, 'estimated_dms_cost': 0,
+                'total_transfer_gb': sum(db['size_gb'] for db in portfolio), 'average_utilization': 0
+            },
+            'dependency_cycles': [],
+            'missing_dependencies': [],
+            'error': error
+        }
+
+def create_wave_plan_chart(wave_plan: Dict) -> go.Figure:
+    """Create weekly bandwidth utilisation and DMS concurrency chart for a wave plan"""
+
+    weekly = wave_plan.get('weekly_utilization', [])
+    weeks = [w['week'] for w in weekly]
+
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+
+    fig.add_trace(go.Bar(x=weeks, y=[w['used_gb'] for w in weekly], name='Transferred (GB)',
+                         marker_color='#3182ce'), secondary_y=False)
+    fig.add_trace(go.Scatter(x=weeks, y=[w['capacity_gb'] for w in weekly], name='Link Capacity (GB)',
+                             mode='lines', line=dict(color='#e53e3e', dash='dash')), secondary_y=False)
+    fig.add_trace(go.Scatter(x=weeks, y=[w['active_dms'] for w in weekly], name='Active DMS Instances',
+                             mode='lines+markers', line=dict(color='#38a169')), secondary_y=True)
+
+    fig.update_layout(title='Migration Waves: Weekly Bandwidth & DMS Concurrency', height=450,
+                      xaxis_title='Week')
+    fig.update_yaxes(title_text='GB per Week', secondary_y=False)
+    fig.update_yaxes(title_text='DMS Instances', secondary_y=True)
+
+    return fig
+
+def show_migration_wave_planner(network_params: Dict):
+    """Show migration wave planning for the configured database portfolio"""
+
+    st.markdown("### 🌊 Migration Wave Planning")
+
+    planner = MigrationWavePlanner()
+
+    source = st.radio(
+        "Portfolio Source",
+        ["Configured Environments", "Upload Portfolio CSV"],
+        horizontal=True,
+        key="wave_portfolio_source",
+        help="CSV columns: database, size_gb, change_rate_percent, environment_type, depends_on (semicolon separated)"
+    )
+
+    portfolio = []
+    if source == "Upload Portfolio CSV":
+        uploaded = st.file_uploader("Upload database portfolio", type=['csv'], key="wave_portfolio_upload")
+        if uploaded is not None:
+            try:
+                portfolio = planner.portfolio_from_dataframe(pd.read_csv(uploaded))
+            except Exception as e:
+                st.error(f"Error reading portfolio: {str(e)}")
+    else:
+        portfolio = planner.build_portfolio(st.session_state.environment_specs or {})
+
+    if not portfolio:
+        st.info("ℹ️ Configure environments or upload a portfolio to plan migration waves.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+
+    with col1:
+        default_capacity = planner.link_capacity_gb_per_week(network_params.get('bandwidth_mbps', 1000))
+        weekly_capacity = st.number_input("Link Capacity (GB/week)", min_value=1.0,
+                                          value=float(round(default_capacity)), key="wave_capacity")
+
+    with col2:
+        objective = st.selectbox(
+            "Optimization Objective",
+            ["duration", "peak_dms"],
+            format_func=lambda x: "Minimize Total Duration" if x == "duration" else "Minimize Peak DMS Instances",
+            key="wave_objective"
+        )
+
+    with col3:
+        limit_dms = st.number_input("Max Concurrent DMS Instances (0 = unlimited)", min_value=0,
+                                    max_value=500, value=0, key="wave_max_dms")
+
+    if st.button("🌊 Plan Migration Waves", use_container_width=True, key="plan_waves_btn"):
+        with st.spinner(f"Scheduling {len(portfolio)} databases..."):
+            st.session_state.wave_plan = planner.plan_waves(
+                portfolio, weekly_capacity, objective=objective,
+                max_dms_instances=limit_dms or None,
+                target_weeks=network_params.get('migration_timeline_weeks') if objective == 'peak_dms' else None
+            )
+
+    wave_plan = st.session_state.get('wave_plan')
+    if not wave_plan:
+        return
+
+    summary = wave_plan['summary']
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Total Duration", f"{summary['total_weeks']} weeks")
+    with col2:
+        st.metric("Migration Waves", summary['total_waves'])
+    with col3:
+        st.metric("Peak DMS Instances", summary['peak_dms_instances'])
+    with col4:
+        st.metric("Est. DMS Cost", f"${summary['estimated_dms_cost']:,.0f}")
+
+    if wave_plan.get('dependency_cycles'):
+        st.warning(f"⚠️ Dependency cycle - not scheduled: {', '.join(wave_plan['dependency_cycles'][:10])}")
+    if wave_plan.get('missing_dependencies'):
+        st.warning(f"⚠️ {len(wave_plan['missing_dependencies'])} dependencies reference unknown databases and were ignored")
+
+    if wave_plan['weekly_utilization']:
+        st.plotly_chart(create_wave_plan_chart(wave_plan), use_container_width=True, key="wave_plan_chart")
+
+    waves_df = pd.DataFrame([
+        {
+            'Wave': w['wave'],
+            'Weeks': f"{w['start_week']}-{w['end_week']}",
+            'Databases': len(w['databases']),
+            'Transfer (GB)': f"{w['total_gb']:,.0f}",
+            'Members': ', '.join(w['databases'][:8]) + (' ...' if len(w['databases']) > 8 else '')
+        }
+        for w in wave_plan['waves']
+    ])
+    st.dataframe(waves_df, use_container_width=True, hide_index=True)
+
+# # ===========================
+# ROBUST RISK ASSESSMENT FIX
+# ===========================
+
+def ensure_risk_assessment_exists():
+    """Ensure risk assessment exists in session state with valid data"""
+    
+    if not hasattr(st.session_state, 'risk_assessment') or st.session_state.risk_assessment is None:
+        st.session_state.risk_assessment = create_default_risk_assessment()
+        return False  # Indicates we created a default
+    return True  # Indicates existing assessment was found
+
+def create_default_risk_assessment():
+    """Create a default risk assessment when none exists"""
+    
+    # Try to use actual migration params if available
+    migration_params = getattr(st.session_state, 'migration_params', {})
+    recommendations = getattr(st.session_state, 'recommendations', {}) or getattr(st.session_state, 'enhanced_recommendations', {})
+    
+    # Calculate risks based on available data
+    try:
+        if migration_params and recommendations:
+            analysis_results = getattr(st.session_state, 'analysis_results', None)
+            return assess_migration_risks(migration_params, recommendations, analysis_results)
+        else:
+            return get_fallback_risk_assessment()
+    except:
+        return get_fallback_risk_assessment()
+
+def calculate_migration_risks_safe(migration_params: Dict, recommendations: Dict) -> Dict:
+    """Safe version of risk calculation that never fails"""
+    
+    try:
+        # Get basic parameters with safe defaults
+        source_engine = migration_params.get('source_engine', 'unknown')
+        target_engine = migration_params.get('target_engine', 'unknown')
+        data_size_gb = int(migration_params.get('data_size_gb', 1000))
+        timeline_weeks = int(migration_params.get('migration_timeline_weeks', 12))
+        team_size = int(migration_params.get('team_size', 5))
+        migration_budget = int(migration_params.get('migration_budget', 500000))
+        
+        # Calculate technical risks
+        engine_risk = calculate_engine_compatibility_risk(source_engine, target_engine)
+        data_risk = calculate_data_complexity_risk(data_size_gb)
+        app_risk = calculate_application_risk(migration_params)
+        perf_risk = calculate_performance_risk(recommendations)
+        
+        technical_risks = {
+            'engine_compatibility': engine_risk,
+            'data_migration_complexity': data_risk,
+            'application_integration': app_risk,
+            'performance_risk': perf_risk
+        }
+        
+        # Calculate business risks
+        timeline_risk = calculate_timeline_risk(timeline_weeks, data_size_gb, team_size)
+        cost_risk = calculate_cost_risk(migration_budget, data_size_gb, timeline_weeks)
+        continuity_risk = calculate_continuity_risk(recommendations)
+        resource_risk = calculate_resource_risk(team_size, migration_params.get('team_expertise', 'medium'))
+        
         business_risks = {
             'timeline_risk': timeline_risk,
             'cost_overrun_risk': cost_risk,
@@ -6774,6 +9608,8 @@ def calculate_resource_risk(team_size: int, expertise: str) -> float:
     elif team_size > 10:
         base_risk += 5  # Too large can also be a problem
     
+    # Case-insensitive, like the portfolio (vectorized) scoring and the risk simulator
+    expertise = str(expertise or 'medium').lower()
     if expertise == 'high':
         base_risk -= 15
     elif expertise == 'low':
@@ -6979,6 +9815,11 @@ def show_risk_assessment_robust():
             </div>
             """, unsafe_allow_html=True)
     
+    st.plotly_chart(create_risk_heatmap(risk_assessment), use_container_width=True, key="risk_assessment_heatmap")
+    
+    st.markdown("---")
+    show_risk_simulation_results(risk_assessment)
+    
     # Risk mitigation strategies
     st.markdown("---")
     st.markdown("#### 🛡️ Risk Mitigation Strategies")
@@ -7001,54 +9842,1351 @@ def show_risk_assessment_robust():
                     st.markdown(f"**Cost Impact:** <span style='color: {cost_color}; font-weight: bold;'>{cost_impact}</span>", unsafe_allow_html=True)
     else:
         st.info("✅ Current risk levels are manageable with standard migration best practices.")
+    
+    st.markdown("---")
+    show_portfolio_risk_scoring()
+
+# ===========================
+# ANALYSIS PIPELINE
+# ===========================
+
+class TrackedParams(dict):
+    """Copy of migration_params that records which keys a stage reads"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.accessed = set()
+        self.read_all = False
+
+    def __getitem__(self, key):
+        self.accessed.add(key)
+        return super().__getitem__(key)
+
+    def get(self, key, default=None):
+        self.accessed.add(key)
+        return super().get(key, default)
+
+    def __contains__(self, key):
+        self.accessed.add(key)
+        return super().__contains__(key)
+
+    # Anything that walks the whole mapping (copies, **unpacking, json.dumps) depends on every key
+    def __iter__(self):
+        self.read_all = True
+        return super().__iter__()
+
+    def keys(self):
+        self.read_all = True
+        return super().keys()
+
+    def items(self):
+        self.read_all = True
+        return super().items()
+
+    def values(self):
+        self.read_all = True
+        return super().values()
+
+    def copy(self):
+        self.read_all = True
+        return dict(super().items())
+
+class PipelineStage:
+    """One node of the analysis DAG"""
+
+    def __init__(self, name: str, func, deps: Tuple[str, ...] = (), uses_specs: bool = False,
+                 session_keys: Tuple[str, ...] = (), label: str = ''):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.uses_specs = uses_specs
+        self.session_keys = tuple(session_keys)
+        self.label = label or name
+
+class AnalysisPipeline:
+    """Analysis stages as a DAG with outputs memoized on a content hash of everything each stage read"""
+
+    VARIANTS = ['standard', 'real', 'enhanced']
+
+    def __init__(self, variant: str = 'standard', max_entries_per_stage: int = 8):
+        if variant not in self.VARIANTS:
+            raise ValueError(f"Unknown analysis pipeline variant: {variant}")
+        self.variant = variant
+        self.max_entries_per_stage = max_entries_per_stage
+        self.stages = OrderedDict()
+        self._memo = {}
+        self.last_run = {}
+        self._lock = threading.RLock()   # background jobs and the script thread may share a session's pipeline
+        self._initialize_stages()
+
+    def _initialize_stages(self):
+        """Register the stages for this variant"""
+
+        if self.variant == 'enhanced':
+            self.add_stage('recommendations', self._enhanced_recommendations, uses_specs=True,
+                           session_keys=('enhanced_recommendations',), label="📊 Calculating cluster recommendations")
+            self.add_stage('costs', self._enhanced_costs, deps=('recommendations',),
+                           session_keys=('enhanced_analysis_results',), label="💰 Analyzing cluster costs")
+            self.add_stage('reports', self._report_digest, deps=('recommendations', 'costs'),
+                           label="📄 Preparing report inputs")
+            return
+
+        self.add_stage('recommendations', self._recommendations, uses_specs=True,
+                       session_keys=('recommendations',), label="📊 Calculating instance recommendations")
+        self.add_stage('costs', self._costs, deps=('recommendations',),
+                       session_keys=('analysis_results',), label="💰 Analyzing costs")
+        self.add_stage('risk', self._risk, deps=('recommendations', 'costs'),
+                       session_keys=('risk_assessment',), label="⚠️ Assessing risks")
+        self.add_stage('growth', self._growth, deps=('costs',),
+                       session_keys=('growth_analysis',), label="📈 Calculating 3-year growth projections")
+        self.add_stage('transfer', self._transfer,
+                       session_keys=('transfer_analysis',), label="🌐 Analyzing network transfer options")
+        self.add_stage('ai_insights', self._ai_insights, deps=('costs',),
+                       session_keys=('ai_insights',), label="🤖 Generating AI insights")
+        self.add_stage('reports', self._report_digest, deps=('recommendations', 'costs', 'risk', 'growth', 'ai_insights'),
+                       label="📄 Preparing report inputs")
+
+    def add_stage(self, name: str, func, deps: Tuple[str, ...] = (), uses_specs: bool = False,
+                  session_keys: Tuple[str, ...] = (), label: str = ''):
+        """Register a stage; dependencies must already exist"""
+        missing = [dep for dep in deps if dep not in self.stages]
+        if missing:
+            raise ValueError(f"Stage {name} depends on unknown stages: {missing}")
+        self.stages[name] = PipelineStage(name, func, deps, uses_specs, session_keys, label)
+        self._memo[name] = OrderedDict()
+
+    def execution_order(self, targets: Optional[List[str]] = None) -> List[str]:
+        """Stages needed for the targets, dependencies first"""
+        needed = OrderedDict()
+
+        def visit(name):
+            if name in needed:
+                return
+            for dep in self.stages[name].deps:
+                visit(dep)
+            needed[name] = True
+
+        for name in (targets or list(self.stages)):
+            visit(name)
+        return list(needed)
+
+    @staticmethod
+    def _digest_default(value):
+        if isinstance(value, np.ndarray):
+            return hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest() + str(value.shape)
+        if isinstance(value, np.generic):
+            return value.item()
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.to_json()
+        return str(value)
+
+    @classmethod
+    def content_digest(cls, value) -> str:
+        """SHA-256 of canonical JSON"""
+        canonical = json.dumps(value, sort_keys=True, separators=(',', ':'), default=cls._digest_default)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _projection_digest(self, value, keys: Optional[List[str]]) -> str:
+        """Digest of just the top-level keys a stage read (all of it when keys is None)"""
+        if keys is None or not isinstance(value, dict):
+            return self.content_digest(value)
+        return self.content_digest({key: value[key] if key in value else '<missing>' for key in keys})
+
+    def _reads_digest(self, reads: Dict[str, Optional[List[str]]], migration_params: Dict, outputs: Dict[str, Any]) -> str:
+        return self.content_digest({
+            source: self._projection_digest(migration_params if source == 'migration_params' else outputs[source], keys)
+            for source, keys in reads.items()
+        })
+
+    def run(self, environment_specs: Dict, migration_params: Dict, targets: Optional[List[str]] = None,
+            on_stage=None) -> Dict[str, Any]:
+        """Run the needed stages, reusing memoized outputs whose inputs are unchanged"""
+        with self._lock:
+            return self._run_stages(environment_specs, migration_params, targets, on_stage)
+
+    def _run_stages(self, environment_specs: Dict, migration_params: Dict, targets: Optional[List[str]],
+                    on_stage) -> Dict[str, Any]:
+        migration_params = migration_params or {}
+        specs_digest = self.content_digest(environment_specs or {})
+        outputs = {}
+        self.last_run = {}
+
+        for name in self.execution_order(targets):
+            stage = self.stages[name]
+            base = self.content_digest({
+                'variant': self.variant,
+                'stage': name,
+                'specs': specs_digest if stage.uses_specs else None
+            })
+
+            started = time.perf_counter()
+            with trace_span(f"stage: {name}", 'pipeline', variant=self.variant) as span_args:
+                entry = self._lookup(name, base, migration_params, outputs)
+                cached = entry is not None
+                span_args['cached'] = cached
+
+                if cached:
+                    output = copy.deepcopy(entry['output'])
+                else:
+                    # Params and upstream outputs are tracked so the memo key covers exactly what the stage read
+                    tracked = {'migration_params': TrackedParams(copy.deepcopy(migration_params))}
+                    for dep in stage.deps:
+                        upstream = copy.deepcopy(outputs[dep])
+                        tracked[dep] = TrackedParams(upstream) if isinstance(upstream, dict) else upstream
+                    context = {
+                        'environment_specs': environment_specs or {},
+                        'migration_params': tracked['migration_params'],
+                        'inputs': {dep: tracked[dep] for dep in stage.deps}
+                    }
+                    output = stage.func(context)
+                    reads = {
+                        source: None if not isinstance(value, TrackedParams) or value.read_all else sorted(value.accessed)
+                        for source, value in tracked.items()
+                    }
+                    entry = {
+                        'base': base,
+                        'reads': reads,
+                        'reads_digest': self._reads_digest(reads, migration_params, outputs),
+                        'output': copy.deepcopy(output)
+                    }
+                    # Failed stages are retried on the next run rather than remembered
+                    if not (isinstance(output, dict) and 'error' in output):
+                        self._store(name, entry)
+
+            outputs[name] = output
+            self.last_run[name] = {
+                'cached': cached,
+                'seconds': time.perf_counter() - started,
+                'reads': entry['reads']
+            }
+            if on_stage:
+                on_stage(stage, cached, output)
+
+        return outputs
+
+    def _lookup(self, name: str, base: str, migration_params: Dict, outputs: Dict[str, Any]) -> Optional[Dict]:
+        memo = self._memo[name]
+        for key, entry in memo.items():
+            if entry['base'] == base and entry['reads_digest'] == self._reads_digest(entry['reads'], migration_params, outputs):
+                memo.move_to_end(key)
+                return entry
+        return None
+
+    def _store(self, name: str, entry: Dict):
+        memo = self._memo[name]
+        key = (entry['base'], entry['reads_digest'])
+        memo[key] = entry
+        memo.move_to_end(key)
+        while len(memo) > self.max_entries_per_stage:
+            memo.popitem(last=False)
+
+    def publish(self, outputs: Dict[str, Any], session_state):
+        """Write stage outputs to their session_state keys"""
+        for name, output in outputs.items():
+            for key in self.stages[name].session_keys:
+                session_state[key] = output
+        if 'reports' in outputs:
+            digests = dict(session_state.get('report_digests') or {})
+            digests['enhanced' if self.variant == 'enhanced' else 'standard'] = outputs['reports']['report_digest']
+            session_state['report_digests'] = digests
+
+    def clear(self):
+        for memo in self._memo.values():
+            memo.clear()
+
+    # Stage implementations
+
+    def _analyzer(self, migration_params: Dict):
+        if self.variant == 'real':
+            return RealMigrationAnalyzer(migration_params.get('anthropic_api_key'))
+        return MigrationAnalyzer(migration_params.get('anthropic_api_key'))
+
+    def _recommendations(self, context: Dict) -> Dict:
+        analyzer = RealMigrationAnalyzer() if self.variant == 'real' else MigrationAnalyzer()
+        return analyzer.calculate_instance_recommendations(context['environment_specs'])
+
+    def _costs(self, context: Dict) -> Dict:
+        analyzer = RealMigrationAnalyzer() if self.variant == 'real' else MigrationAnalyzer()
+        return analyzer.calculate_migration_costs(context['inputs']['recommendations'], context['migration_params'])
+
+    def _risk(self, context: Dict) -> Dict:
+        return assess_migration_risks(context['migration_params'], context['inputs']['recommendations'],
+                                      context['inputs']['costs'])
+
+    def _growth(self, context: Dict) -> Dict:
+        return get_shared_growth_analyzer().calculate_3_year_growth_projection(context['inputs']['costs'],
+                                                                            context['migration_params'])
+
+    def _transfer(self, context: Dict) -> Dict:
+        return get_shared_network_analyzer().calculate_transfer_analysis(context['migration_params'])
+
+    def _ai_insights(self, context: Dict) -> Optional[Dict]:
+        params = context['migration_params']
+        if not params.get('anthropic_api_key'):
+            return None
+        cost_analysis = context['inputs']['costs']
+        try:
+            if self.variant == 'real':
+                return asyncio.run(self._analyzer(params).generate_real_ai_insights(cost_analysis, params))
+            return asyncio.run(self._analyzer(params).generate_ai_insights(cost_analysis, params))
+        except Exception as e:
+            return {
+                'summary': f"Migration analysis complete. Monthly cost: ${cost_analysis['monthly_aws_cost']:,.0f}",
+                'error': str(e)
+            }
+
+    def _enhanced_recommendations(self, context: Dict) -> Dict:
+        return EnhancedMigrationAnalyzer().calculate_enhanced_instance_recommendations(context['environment_specs'])
+
+    def _enhanced_costs(self, context: Dict) -> Dict:
+        return EnhancedMigrationAnalyzer().calculate_enhanced_migration_costs(context['inputs']['recommendations'],
+                                                                             context['migration_params'])
+
+    def _report_digest(self, context: Dict) -> Dict:
+        # Reports are rendered from the full stage outputs, so their digests identify the report content
+        return {
+            'report_digest': ReportArtifactCache.input_digest(
+                variant=self.variant,
+                upstream={dep: self.content_digest(value) for dep, value in context['inputs'].items()},
+                pricing_version=get_pricing_version()
+            )
+        }
+
+# Stages the analysis runners need; transfer is run from the network tab with its own parameters
+ANALYSIS_PIPELINE_TARGETS = ['recommendations', 'costs', 'risk', 'growth', 'ai_insights', 'reports']
+
+def get_analysis_pipeline(variant: str = 'standard') -> AnalysisPipeline:
+    """Per-session pipeline, so memoized outputs survive reruns but are never shared between users"""
+    if 'analysis_pipelines' not in st.session_state:
+        st.session_state.analysis_pipelines = {}
+    pipelines = st.session_state.analysis_pipelines
+    if variant not in pipelines:
+        pipelines[variant] = AnalysisPipeline(variant)
+    return pipelines[variant]
+
+def run_analysis_pipeline(variant: str = 'standard', targets: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Run the session's pipeline, report each stage and publish outputs to session_state"""
+
+    pipeline = get_analysis_pipeline(variant)
+
+    def on_stage(stage, cached, output):
+        st.write(f"{stage.label}... {'♻️ unchanged, reused' if cached else '✅'}")
+
+    outputs = pipeline.run(st.session_state.environment_specs, st.session_state.migration_params,
+                           targets=targets, on_stage=on_stage)
+    pipeline.publish(outputs, st.session_state)
+    return outputs
+
+# ===========================
+# BACKGROUND JOBS
+# ===========================
+
+def private_state_dir(env_var: str, default_name: str) -> str:
+    """Directory for pickled server state, private to the server's user (unpickling a planted file runs its code)"""
+
+    uid = os.getuid() if hasattr(os, 'getuid') else None
+    path = os.environ.get(env_var) or os.path.join(
+        tempfile.gettempdir(), default_name if uid is None else f"{default_name}-{uid}"
+    )
+    try:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        if uid is not None:
+            stat = os.lstat(path)
+            if not os.path.isdir(path) or os.path.islink(path) or stat.st_uid != uid:
+                raise PermissionError(f"{path} is not a directory owned by this user")
+            if stat.st_mode & 0o077:
+                os.chmod(path, 0o700)
+        return path
+    except OSError as e:
+        # A fresh private directory still works; its contents just do not outlive this process
+        fallback = tempfile.mkdtemp(prefix=f"{default_name}-")
+        print(f"Error using {path} for server state ({e}); using {fallback} instead")
+        return fallback
+
+def is_private_state_file(path: str) -> bool:
+    """Whether a state file was written by this user, so it is safe to unpickle"""
+    if not hasattr(os, 'getuid'):
+        return True
+    try:
+        return os.lstat(path).st_uid == os.getuid() and os.path.isfile(path) and not os.path.islink(path)
+    except OSError:
+        return False
+
+class JobCancelled(Exception):
+    """Raised inside a job once its cancellation has been requested"""
+
+class JobContext:
+    """Handle a running job uses to report progress and partial results"""
+
+    def __init__(self, runner: 'BackgroundJobRunner', job_id: str):
+        self.runner = runner
+        self.job_id = job_id
+
+    @property
+    def cancelled(self) -> bool:
+        return self.runner.is_cancel_requested(self.job_id)
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None, partial: Optional[Dict] = None):
+        """Record progress (0-1), a status line and/or partial results; raises JobCancelled if cancelled"""
+        self.runner._update(self.job_id, progress, message, partial)
+        self.raise_if_cancelled()
+
+    def raise_if_cancelled(self):
+        # Raised from here so the runner that catches it sees the same class even after a rerun redefines it
+        if self.cancelled:
+            raise JobCancelled(self.job_id)
+
+class BackgroundJobRunner:
+    """Thread pool that runs long analyses off the Streamlit script thread, with jobs kept in an on-disk store"""
+
+    ACTIVE_STATUSES = ('queued', 'running')
+
+    def __init__(self, store_dir: Optional[str] = None, max_workers: int = 2, max_finished_jobs: int = 100):
+        self.store_dir = store_dir or private_state_dir('JOB_STORE_DIR', 'db_migration_jobs')
+        self.max_finished_jobs = max_finished_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._cancel_requested = set()
+        os.makedirs(self.store_dir, mode=0o700, exist_ok=True)
+        self._load_store()
+
+    def submit(self, kind: str, func, *args, owner: Optional[str] = None, label: str = '', **kwargs) -> str:
+        """Queue func(job_context, *args, **kwargs) and return its job id"""
+
+        job_id = uuid.uuid4().hex[:12]
+        job = {
+            'id': job_id,
+            'kind': kind,
+            'label': label or kind,
+            'owner': owner,
+            'status': 'queued',
+            'progress': 0.0,
+            'message': 'Queued',
+            'partial': {},
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'timing': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            snapshot = dict(job)
+        self._persist(snapshot)
+
+        self._executor.submit(self._run, job_id, func, args, kwargs)
+        return job_id
+
+    def _run(self, job_id: str, func, args, kwargs):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job_id in self._cancel_requested:
+                job.update(status='cancelled', message='Cancelled before start', finished_at=time.time())
+            else:
+                job.update(status='running', message='Running', started_at=time.time())
+            snapshot = dict(job)
+        self._persist(snapshot)
+        if snapshot['status'] == 'cancelled':
+            return
+
+        timing = TimingRecorder(f"job: {snapshot['label']}")
+        try:
+            with timing.activate():
+                result = func(JobContext(self, job_id), *args, **kwargs)
+            final = {'status': 'completed', 'progress': 1.0, 'message': 'Completed', 'result': result}
+        except JobCancelled:
+            final = {'status': 'cancelled', 'message': 'Cancelled'}
+        except Exception as e:
+            print(f"Error in background job {job_id}: {e}")
+            final = {'status': 'failed', 'message': f"Failed: {e}", 'error': str(e)}
+        final['timing'] = compact_timing_run(timing.snapshot())
+
+        with self._lock:
+            job.update(final, finished_at=time.time())
+            self._cancel_requested.discard(job_id)
+            snapshot = dict(job)
+        self._persist(snapshot)
+        self._prune()
+
+    def _update(self, job_id: str, progress: Optional[float], message: Optional[str], partial: Optional[Dict]):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            if progress is not None:
+                job['progress'] = min(max(float(progress), 0.0), 1.0)
+            if message is not None:
+                job['message'] = message
+            if partial:
+                # Replaced rather than mutated, so readers holding a snapshot never see it change
+                job['partial'] = {**job['partial'], **partial}
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """Snapshot of a job, or None"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def list_jobs(self, owner: Optional[str] = None, kinds: Optional[List[str]] = None) -> List[Dict]:
+        """Job snapshots, newest first"""
+        with self._lock:
+            jobs = [dict(job) for job in self._jobs.values()
+                    if (owner is None or job['owner'] == owner) and (kinds is None or job['kind'] in kinds)]
+        return sorted(jobs, key=lambda job: job['created_at'], reverse=True)
+
+    def cancel(self, job_id: str):
+        """Ask a job to stop at its next progress update"""
+        with self._lock:
+            if job_id in self._jobs and self._jobs[job_id]['status'] in self.ACTIVE_STATUSES:
+                self._cancel_requested.add(job_id)
+                self._jobs[job_id]['message'] = 'Cancelling...'
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            return job_id in self._cancel_requested
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.store_dir, f"{job_id}.pkl")
+
+    def _persist(self, job: Dict):
+        """Write a job snapshot atomically"""
+        path = self._path(job['id'])
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(job, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error persisting background job {job['id']}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _load_store(self):
+        """Reload jobs from earlier server processes; ones that were still running are marked interrupted"""
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.pkl'):
+                continue
+            path = os.path.join(self.store_dir, name)
+            if not is_private_state_file(path):
+                print(f"Skipping background job {name}: not written by this server's user")
+                continue
+            try:
+                with open(path, 'rb') as f:
+                    job = pickle.load(f)
+            except Exception as e:
+                print(f"Error loading background job {name}: {e}")
+                continue
+            if job['status'] in self.ACTIVE_STATUSES:
+                job.update(status='interrupted', message='Interrupted by a server restart', finished_at=time.time())
+                self._persist(job)
+            self._jobs[job['id']] = job
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention bound"""
+        with self._lock:
+            finished = sorted((job for job in self._jobs.values() if job['status'] not in self.ACTIVE_STATUSES),
+                              key=lambda job: job['created_at'])
+            expired = finished[:max(0, len(finished) - self.max_finished_jobs)]
+            for job in expired:
+                del self._jobs[job['id']]
+        for job in expired:
+            try:
+                os.remove(self._path(job['id']))
+            except OSError:
+                pass
+
+@st.cache_resource
+def get_background_jobs() -> BackgroundJobRunner:
+    """Process-wide runner; cached because Streamlit re-executes this module on every rerun"""
+    return BackgroundJobRunner()
+
+JOB_POLL_SECONDS = 1.0
+
+def get_job_owner() -> str:
+    """Browser-tab id kept in the URL, so a refreshed page finds its jobs again; the id is the only access check"""
+
+    if 'job_owner' not in st.session_state:
+        if hasattr(st, 'query_params'):
+            owner = st.query_params.get('session')
+        else:
+            owner = (st.experimental_get_query_params().get('session') or [None])[0]
+
+        if not owner:
+            owner = uuid.uuid4().hex  # full 128 bits, so another tab's id cannot be guessed
+            if hasattr(st, 'query_params'):
+                st.query_params['session'] = owner
+            else:
+                st.experimental_set_query_params(session=owner)
+
+        st.session_state.job_owner = owner
+    return st.session_state.job_owner
+
+def start_background_job(kind: str, func, *args, label: str = '', **kwargs) -> str:
+    """Submit a job for this browser tab"""
+    return get_background_jobs().submit(kind, func, *args, owner=get_job_owner(), label=label, **kwargs)
+
+def get_latest_job(kind: str) -> Optional[Dict]:
+    """This tab's most recent job of a kind"""
+    jobs = get_background_jobs().list_jobs(owner=get_job_owner(), kinds=[kind])
+    return jobs[0] if jobs else None
+
+# Job functions run on pool threads: they take plain inputs and never touch st.*
+
+def analysis_pipeline_job(job: JobContext, pipeline: AnalysisPipeline, environment_specs: Dict,
+                          migration_params: Dict, targets: Optional[List[str]] = None) -> Dict:
+    """Run an analysis pipeline, publishing each finished stage as partial results"""
+
+    order = pipeline.execution_order(targets)
+    completed = []
+
+    def on_stage(stage, cached, output):
+        completed.append(f"{stage.label}{' (reused)' if cached else ''}")
+        partial = {'completed_stages': list(completed)}
+        if stage.name == 'costs' and isinstance(output, dict) and 'monthly_aws_cost' in output:
+            partial['monthly_aws_cost'] = output['monthly_aws_cost']
+            partial['migration_cost'] = output.get('migration_costs', {}).get('total')
+        elif stage.name == 'risk' and isinstance(output, dict):
+            partial['risk_level'] = output.get('risk_level', {}).get('level')
+        job.update(len(completed) / len(order), stage.label, partial)
+
+    outputs = pipeline.run(environment_specs, migration_params, targets=targets, on_stage=on_stage)
+    return {
+        'variant': pipeline.variant,
+        'outputs': outputs,
+        'environment_specs': environment_specs,
+        'migration_params': migration_params
+    }
+
+def vrops_analysis_job(job: JobContext, analyzer: 'VRopsMetricsAnalyzer', environments: Dict) -> Dict:
+    """Analyze vROps metrics environment by environment"""
+
+    def progress(done, total):
+        job.update(done / (total + 1), f"Analyzed {done}/{total} environments", {'environments_done': done})
+
+    return {
+        'environment_specs': environments,
+        'analysis': analyzer.analyze_vrops_metrics(environments, progress_callback=progress)
+    }
+
+def bulk_reports_job(job: JobContext, results: Dict, recommendations: Dict, migration_params: Dict,
+                     report_digest: str, stream_to_disk: bool = True) -> Dict:
+    """Build the all-reports ZIP into the report cache"""
+
+    zip_path = report_artifact_cache.get_path(report_digest, 'all_reports.zip')
+    if not zip_path:
+        def progress(done, total):
+            job.update(0.95 * done / max(total, 1), f"Environment reports: {done}/{total} complete",
+                       {'reports_done': done, 'reports_total': total})
+
+        builder = create_bulk_reports_zip_streaming if stream_to_disk else create_bulk_reports_zip
+        zip_buffer = builder(results, recommendations, migration_params, progress_callback=progress)
+        job.raise_if_cancelled()
+        if zip_buffer:
+            zip_path = report_artifact_cache.put(report_digest, 'all_reports.zip', zip_buffer)
+            zip_buffer.close()
+
+    if not zip_path:
+        raise RuntimeError("Failed to generate reports package")
+    return {'zip_path': zip_path, 'report_digest': report_digest}
+
+# Applying results and rendering progress happen on the script thread
+
+def apply_analysis_job_result(result: Dict):
+    if not st.session_state.get('environment_specs'):
+        st.session_state.environment_specs = result['environment_specs']
+    if not st.session_state.get('migration_params'):
+        st.session_state.migration_params = dict(result['migration_params'])
+
+    outputs = result['outputs']
+    get_analysis_pipeline(result['variant']).publish(outputs, st.session_state)
+    if result['variant'] == 'enhanced':
+        generate_enhanced_cost_visualizations()
+    elif isinstance(outputs.get('costs'), dict) and 'migration_costs' in outputs['costs']:
+        st.session_state.migration_params['estimated_migration_cost'] = outputs['costs']['migration_costs']['total']
+    st.session_state.chart_session_id = int(time.time())
+
+def apply_vrops_job_result(result: Dict):
+    if not st.session_state.get('environment_specs'):
+        st.session_state.environment_specs = result['environment_specs']
+    st.session_state.vrops_analysis = result['analysis']
+
+def apply_reports_job_result(result: Dict):
+    st.session_state.bulk_reports_zip = result
+
+JOB_RESULT_APPLIERS = {
+    'analysis': apply_analysis_job_result,
+    'vrops': apply_vrops_job_result,
+    'reports': apply_reports_job_result
+}
+
+def apply_job_result(job: Dict) -> bool:
+    """Copy a completed job's result into this session once"""
+
+    applied = st.session_state.setdefault('applied_jobs', set())
+    if job['status'] != 'completed' or job['id'] in applied:
+        return False
+
+    applied.add(job['id'])
+    try:
+        JOB_RESULT_APPLIERS[job['kind']](job['result'])
+        record_timing_run(job.get('timing'))
+        return True
+    except Exception as e:
+        print(f"Error applying background job {job['id']}: {e}")
+        return False
+
+def restore_background_job_results():
+    """Apply this tab's latest completed job of each kind, e.g. after a browser refresh"""
+    for kind in JOB_RESULT_APPLIERS:
+        job = get_latest_job(kind)
+        if job:
+            apply_job_result(job)
+
+def show_job_partial_results(job: Dict):
+    """Partial results published so far"""
+
+    partial = job.get('partial') or {}
+    if job['kind'] == 'analysis':
+        if partial.get('monthly_aws_cost') is not None or partial.get('risk_level'):
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                if partial.get('monthly_aws_cost') is not None:
+                    st.metric("Monthly Cost", f"${partial['monthly_aws_cost']:,.0f}")
+            with col2:
+                if partial.get('migration_cost') is not None:
+                    st.metric("Migration Cost", f"${partial['migration_cost']:,.0f}")
+            with col3:
+                if partial.get('risk_level'):
+                    st.metric("Risk Level", partial['risk_level'])
+        for stage in partial.get('completed_stages', []):
+            st.write(f"{stage} ✅")
+    elif job['kind'] == 'reports' and partial.get('reports_total'):
+        st.caption(f"📄 {partial['reports_done']}/{partial['reports_total']} environment reports rendered")
+
+def _rerun_app():
+    if hasattr(st, 'rerun'):
+        st.rerun()
+    else:
+        st.experimental_rerun()
+
+def _render_job_progress(job_id: str):
+    job = get_background_jobs().get(job_id)
+    if job is None:
+        return
+
+    elapsed = time.time() - (job['started_at'] or job['created_at'])
+    st.progress(job['progress'], text=f"⏳ {job['label']}: {job['message']} ({elapsed:.0f}s)")
+    show_job_partial_results(job)
+
+    if job['status'] in BackgroundJobRunner.ACTIVE_STATUSES:
+        if st.button("⏹️ Cancel", key=f"cancel_job_{job_id}"):
+            get_background_jobs().cancel(job_id)
+    else:
+        # Finished: rerun the whole page so it picks up the result
+        _rerun_app()
+
+def show_background_job(kind: str, on_complete=None) -> Optional[Dict]:
+    """Progress of this tab's latest job of a kind; polls while it runs and applies its result once done"""
+
+    job = get_latest_job(kind)
+    if job is None:
+        return None
+
+    if job['status'] in BackgroundJobRunner.ACTIVE_STATUSES:
+        if hasattr(st, 'fragment'):
+            # Only the fragment reruns while polling, so the rest of the page stays interactive
+            st.fragment(run_every=JOB_POLL_SECONDS)(_render_job_progress)(job['id'])
+        else:
+            _render_job_progress(job['id'])
+            time.sleep(JOB_POLL_SECONDS)
+            _rerun_app()
+        return job
+
+    apply_job_result(job)
+    if job['status'] == 'completed':
+        if on_complete:
+            on_complete(job)
+    elif job['status'] == 'failed':
+        st.error(f"❌ {job['label']} failed: {job['error']}")
+    else:
+        st.warning(f"⚠️ {job['label']} {job['status']}: {job['message']}")
+    return job
+
+def show_background_jobs_panel():
+    """Sidebar list of this tab's recent jobs"""
+
+    jobs = get_background_jobs().list_jobs(owner=get_job_owner())[:5]
+    if not jobs:
+        return
+
+    status_icons = {'queued': '🕒', 'running': '⏳', 'completed': '✅', 'failed': '❌',
+                    'cancelled': '⏹️', 'interrupted': '⚠️'}
+    with st.expander("⏳ Background Jobs", expanded=any(job['status'] in BackgroundJobRunner.ACTIVE_STATUSES for job in jobs)):
+        for job in jobs:
+            progress = f" {job['progress']:.0%}" if job['status'] == 'running' else ''
+            st.write(f"{status_icons.get(job['status'], '•')} {job['label']}{progress}")
+            st.caption(f"{datetime.fromtimestamp(job['created_at']).strftime('%H:%M:%S')} · {job['message']}")
+
+# ===========================
+# SESSION RESULT STORE
+# ===========================
+
+# Large analysis results the store may compact and spill; other session_state entries are left alone
+SESSION_RESULT_KEYS = (
+    'analysis_results', 'enhanced_analysis_results', 'recommendations', 'enhanced_recommendations',
+    'vrops_analysis', 'growth_analysis', 'growth_projections', 'transfer_analysis', 'network_analysis',
+    'risk_assessment', 'ai_insights', 'wave_plan'
+)
+
+# Results each page reads; pages not listed restore everything
+PAGE_RESULT_KEYS = {
+    "🔧 Migration Configuration": (),
+    "📊 Environment Setup": ('enhanced_recommendations',),
+    "🌐 Network Analysis": ('transfer_analysis', 'recommendations', 'wave_plan'),
+    "🚀 Analysis & Recommendations": ('analysis_results', 'enhanced_analysis_results', 'recommendations',
+                                     'risk_assessment', 'growth_analysis', 'ai_insights')
+}
+
+class SpilledResult:
+    """Session-state placeholder for a result held on disk; reads load it on demand, small top-level fields stay inline"""
+
+    SCALARS = (str, int, float, bool, np.number, type(None))
+
+    def __init__(self, key: str, path: str, nbytes: int, resident_bytes: int, value=None):
+        self.key = key
+        self.path = path
+        self.nbytes = nbytes
+        self.resident_bytes = resident_bytes
+        self.spilled_at = time.time()
+        # Status lines read a few scalars (monthly cost, totals) on every page; answer those without a decode
+        self._keys = list(value.keys()) if isinstance(value, dict) else None
+        self._inline = {k: v for k, v in value.items() if self._is_small(v)} if isinstance(value, dict) else {}
+        self._value = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def _is_small(cls, value) -> bool:
+        if isinstance(value, cls.SCALARS):
+            return True
+        return isinstance(value, dict) and len(value) <= 32 and all(isinstance(v, cls.SCALARS) for v in value.values())
+
+    def load(self):
+        """The decoded result, read from disk at most once until released"""
+        with self._lock:
+            if self._value is None:
+                if not is_private_state_file(self.path):
+                    raise PermissionError(f"{self.path} was not written by this server's user")
+                with open(self.path, 'rb') as f:
+                    self._value = ResultFrameCodec.decode(f.read())
+            return self._value
+
+    def release(self):
+        with self._lock:
+            self._value = None
+
+    def __getitem__(self, name):
+        if name in self._inline:
+            return self._inline[name]
+        return self.load()[name]
+
+    def get(self, name, default=None):
+        if name in self._inline:
+            return self._inline[name]
+        return self.load().get(name, default)
+
+    def __contains__(self, name):
+        return name in self._keys if self._keys is not None else name in self.load()
+
+    def __iter__(self):
+        return iter(self.load())
+
+    def __len__(self):
+        return len(self._keys) if self._keys is not None else len(self.load())
+
+    def keys(self):
+        return self.load().keys()
+
+    def values(self):
+        return self.load().values()
+
+    def items(self):
+        return self.load().items()
+
+    def __bool__(self):
+        return True
+
+    def __repr__(self):
+        return f"SpilledResult({self.key!r}, {self.nbytes:,} bytes on disk)"
+
+class _NotColumnar(Exception):
+    pass
+
+class ResultFrameCodec:
+    """Serializes nested results, storing per-environment mappings as columnar frames (Parquet when available)"""
+
+    SEPARATOR = '\x1f'
+    MIN_ROWS = 2
+
+    @classmethod
+    def encode(cls, value) -> bytes:
+        return zlib.compress(pickle.dumps(cls._compact(value), protocol=pickle.HIGHEST_PROTOCOL), 1)
+
+    @classmethod
+    def decode(cls, data: bytes):
+        return cls._expand(pickle.loads(zlib.decompress(data)))
+
+    @classmethod
+    def _compact(cls, value):
+        if isinstance(value, dict):
+            rows = {k: v for k, v in value.items() if isinstance(k, str) and isinstance(v, dict)}
+            if len(rows) >= cls.MIN_ROWS:
+                try:
+                    frame, types = cls._to_frame(rows)
+                except _NotColumnar:
+                    pass
+                else:
+                    return {
+                        'frame': cls._frame_bytes(frame),
+                        'types': types,
+                        'rest': {k: cls._compact(v) for k, v in value.items() if k not in rows},
+                        'order': list(value.keys())
+                    }
+            return {'dict': [(k, cls._compact(v)) for k, v in value.items()]}
+        return {'value': value}
+
+    @classmethod
+    def _expand(cls, node):
+        if 'value' in node:
+            return node['value']
+        if 'dict' in node:
+            return {k: cls._expand(v) for k, v in node['dict']}
+
+        rows = cls._from_frame(cls._frame_from_bytes(node['frame']), node['types'])
+        rest = {k: cls._expand(v) for k, v in node['rest'].items()}
+        return {k: rows[k] if k in rows else rest[k] for k in node['order']}
+
+    @classmethod
+    def _flatten(cls, mapping: Dict, prefix: Tuple = ()):
+        for key, value in mapping.items():
+            if not isinstance(key, str):
+                raise _NotColumnar(key)
+            if isinstance(value, dict):
+                if not value:
+                    raise _NotColumnar(key)
+                yield from cls._flatten(value, prefix + (key,))
+            else:
+                yield prefix + (key,), value
+
+    @staticmethod
+    def _scalar_type(value) -> Optional[str]:
+        if value is None:
+            return None
+        if isinstance(value, (bool, np.bool_)):
+            return 'bool'
+        if isinstance(value, (int, np.integer)):
+            if not -2 ** 63 <= int(value) < 2 ** 63:
+                raise _NotColumnar(value)
+            return 'int'
+        if isinstance(value, (float, np.floating)):
+            return 'float'
+        if isinstance(value, str):
+            return 'str'
+        if isinstance(value, list):
+            try:
+                if json.loads(json.dumps(value)) == value:
+                    return 'json'
+            except (TypeError, ValueError):
+                pass
+        raise _NotColumnar(type(value))
+
+    @classmethod
+    def _to_frame(cls, rows: Dict[str, Dict]) -> Tuple[pd.DataFrame, List[Tuple[Tuple, str]]]:
+        """Rows with one schema become a frame; anything irregular raises _NotColumnar"""
+
+        columns = OrderedDict()
+        for i, row in enumerate(rows.values()):
+            flat = dict(cls._flatten(row))
+            if i == 0:
+                for path in flat:
+                    columns[path] = []
+            elif len(flat) != len(columns) or any(path not in columns for path in flat):
+                raise _NotColumnar('schema')
+            for path, value in flat.items():
+                columns[path].append(value)
+
+        data, types = {}, []
+        for path, values in columns.items():
+            kinds = {cls._scalar_type(v) for v in values} - {None}
+            has_null = any(v is None for v in values)
+            if len(kinds) > 1 or (has_null and kinds not in ({'str'}, {'json'})):
+                raise _NotColumnar(path)
+            kind = kinds.pop() if kinds else 'none'
+            name = cls.SEPARATOR.join(path)
+            if kind == 'json':
+                data[name] = [None if v is None else json.dumps(v) for v in values]
+            elif kind == 'int':
+                data[name] = np.array(values, dtype=np.int64)
+            elif kind == 'float':
+                data[name] = np.array(values, dtype=np.float64)
+            elif kind == 'bool':
+                data[name] = np.array(values, dtype=bool)
+            else:
+                data[name] = np.array(values, dtype=object)
+            types.append((path, kind))
+
+        return pd.DataFrame(data, index=pd.Index(list(rows.keys()), name='__environment__')), types
+
+    @classmethod
+    def _from_frame(cls, frame: pd.DataFrame, types: List[Tuple[Tuple, str]]) -> Dict[str, Dict]:
+        columns = []
+        for path, kind in types:
+            values = frame[cls.SEPARATOR.join(path)].tolist()
+            if kind == 'json':
+                values = [None if v is None or (isinstance(v, float) and np.isnan(v)) else json.loads(v) for v in values]
+            elif kind in ('str', 'none'):
+                values = [None if v is None or (isinstance(v, float) and np.isnan(v)) else v for v in values]
+            columns.append((path, values))
+
+        rows = {}
+        for i, env_name in enumerate(frame.index.tolist()):
+            row = {}
+            for path, values in columns:
+                target = row
+                for part in path[:-1]:
+                    target = target.setdefault(part, {})
+                target[path[-1]] = values[i]
+            rows[env_name] = row
+        return rows
+
+    @staticmethod
+    def _frame_bytes(frame: pd.DataFrame) -> bytes:
+        buffer = io.BytesIO()
+        try:
+            frame.to_parquet(buffer, compression='zstd')
+            return b'PQ' + buffer.getvalue()
+        except Exception:
+            # No working Parquet engine: keep the columnar frame, pickled
+            return b'PK' + pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _frame_from_bytes(data: bytes) -> pd.DataFrame:
+        if data[:2] == b'PQ':
+            return pd.read_parquet(io.BytesIO(data[2:]))
+        return pickle.loads(data[2:])
+
+def estimate_resident_bytes(value, _seen: Optional[set] = None) -> int:
+    """Approximate deep in-memory size of a nested result"""
+
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_resident_bytes(k, seen) + estimate_resident_bytes(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_resident_bytes(v, seen) for v in value)
+    elif isinstance(value, pd.DataFrame):
+        size = int(value.memory_usage(deep=True).sum())
+    elif isinstance(value, np.ndarray):
+        size = value.nbytes
+    return size
+
+class SessionResultStore:
+    """Keeps each session's large results under a memory budget by spilling them to disk, restoring them per page"""
+
+    def __init__(self, spill_dir: Optional[str] = None, budget_bytes: Optional[int] = None,
+                 cold_after_seconds: Optional[float] = None, sweep_interval: float = 60.0,
+                 closed_grace_seconds: Optional[float] = None):
+        self.spill_dir = spill_dir or private_state_dir('SESSION_SPILL_DIR', 'db_migration_sessions')
+        self.budget_bytes = budget_bytes or int(float(os.environ.get('SESSION_RESULT_BUDGET_MB', 128)) * 1024 * 1024)
+        self.cold_after_seconds = cold_after_seconds or float(os.environ.get('SESSION_COLD_AFTER_SECONDS', 600))
+        self.sweep_interval = sweep_interval
+        self.closed_grace_seconds = closed_grace_seconds or self._default_closed_grace()
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._sweeper = None
+        self.stats = {'spills': 0, 'respills': 0, 'restores': 0, 'spilled_bytes': 0, 'cold_spills': 0}
+        os.makedirs(self.spill_dir, mode=0o700, exist_ok=True)
+        self._remove_stale_spills()
+
+    @staticmethod
+    def _default_closed_grace() -> float:
+        # A disconnected session can reconnect until Streamlit drops it, so its files must outlive that window
+        try:
+            return float(st.get_option('server.disconnectedSessionTTL')) + 180
+        except Exception:
+            return 300.0
+
+    def _session(self, session_id: str, state=None) -> Dict:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = {'lock': threading.RLock(), 'sizes': {}, 'restored': {}, 'state': None,
+                           'running': False, 'last_active': time.time(), 'inactive_since': None}
+                self._sessions[session_id] = session
+            if state is not None:
+                # The per-run SafeSessionState wrapper is discarded after each run; keep the session's own state
+                session['state'] = getattr(state, '_state', state)
+            return session
+
+    def activate(self, session_id: str, state, keys: Optional[Tuple[str, ...]] = ()) -> int:
+        """Start of a run: restore the given spilled results (all when keys is None); returns how many were restored"""
+
+        session = self._session(session_id, state)
+        with session['lock']:
+            session['running'] = True
+            session['last_active'] = time.time()
+            restored = self._restore(session, state, SESSION_RESULT_KEYS if keys is None else keys)
+        self._ensure_sweeper()
+        return restored
+
+    def restore(self, session_id: str, state, keys: Optional[Tuple[str, ...]] = None) -> int:
+        """Restore the spilled results a page is about to read (all when keys is None)"""
+        session = self._session(session_id)
+        with session['lock']:
+            return self._restore(session, state, SESSION_RESULT_KEYS if keys is None else keys)
+
+    def _restore(self, session: Dict, state, keys) -> int:
+        restored = 0
+        for key in keys:
+            handle = state[key] if key in state else None
+            if not isinstance(handle, SpilledResult):
+                continue
+            try:
+                value = handle.load()
+            except Exception as e:
+                print(f"Error restoring session result {key}: {e}")
+                state[key] = None
+                continue
+            state[key] = value
+            # Until the result is replaced, its spill file stays valid and a later spill can reuse it
+            session['restored'][key] = (value, handle)
+            session['sizes'][key] = (value, handle.resident_bytes)
+            self.stats['restores'] += 1
+            restored += 1
+        return restored
+
+    def checkpoint(self, session_id: str, state) -> int:
+        """End of a run: spill the largest results until the session is within budget; returns spilled bytes"""
+
+        session = self._session(session_id, state)
+        with session['lock']:
+            session['running'] = False
+            session['last_active'] = time.time()
+            sizes = self._resident_sizes(session, state)
+            total = sum(sizes.values())
+            spilled = 0
+            for key, nbytes in sorted(sizes.items(), key=lambda item: item[1], reverse=True):
+                if total <= self.budget_bytes:
+                    break
+                if self._spill(session_id, session, state, key):
+                    total -= nbytes
+                    spilled += nbytes
+            # Results read straight through a placeholder during the run are dropped again
+            for key in SESSION_RESULT_KEYS:
+                handle = state[key] if key in state else None
+                if isinstance(handle, SpilledResult):
+                    handle.release()
+            return spilled
+
+    def spill_session(self, session_id: str, state) -> int:
+        """Spill every large result of an idle session and drop its memoized pipeline outputs"""
+
+        session = self._session(session_id)
+        with session['lock']:
+            count = sum(1 for key in SESSION_RESULT_KEYS if self._spill(session_id, session, state, key))
+            pipelines = state['analysis_pipelines'] if 'analysis_pipelines' in state else None
+            for pipeline in (pipelines or {}).values():
+                pipeline.clear()
+            return count
+
+    def _resident_sizes(self, session: Dict, state) -> Dict[str, int]:
+        # Sizes are remembered per object, so unchanged results are not re-measured every run
+        sizes = {}
+        for key in SESSION_RESULT_KEYS:
+            value = state[key] if key in state else None
+            if value is None or isinstance(value, SpilledResult):
+                session['sizes'].pop(key, None)
+                continue
+            cached = session['sizes'].get(key)
+            if cached is None or cached[0] is not value:
+                cached = (value, estimate_resident_bytes(value))
+                session['sizes'][key] = cached
+            sizes[key] = cached[1]
+        return sizes
+
+    def _spill(self, session_id: str, session: Dict, state, key: str) -> bool:
+        value = state[key] if key in state else None
+        restored = session['restored'].pop(key, None)
+        if value is None or isinstance(value, SpilledResult):
+            return False
+
+        cached = session['sizes'].pop(key, None)
+        if restored is not None and restored[0] is value and os.path.exists(restored[1].path):
+            # Restored earlier and never replaced: the file on disk is still current, so skip the encode
+            handle = restored[1]
+            handle.release()
+            state[key] = handle
+            self.stats['respills'] += 1
+            return True
+
+        resident_bytes = cached[1] if cached and cached[0] is value else estimate_resident_bytes(value)
+        session_dir = os.path.join(self.spill_dir, session_id)
+        path = os.path.join(session_dir, f"{key}.bin")
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+
+        try:
+            data = ResultFrameCodec.encode(value)
+            os.makedirs(session_dir, exist_ok=True)
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            print(f"Error spilling session result {key}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+
+        state[key] = SpilledResult(key, path, len(data), resident_bytes, value)
+        self.stats['spills'] += 1
+        self.stats['spilled_bytes'] += len(data)
+        return True
+
+    def _ensure_sweeper(self):
+        with self._lock:
+            if self._sweeper is None or not self._sweeper.is_alive():
+                self._sweeper = threading.Thread(target=self._sweep_loop, name='session-result-sweeper', daemon=True)
+                self._sweeper.start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error sweeping session results: {e}")
+
+    def _session_closed(self, session_id: str, session: Dict, now: float) -> bool:
+        """True once the runtime has not known the session for longer than the reconnect grace period"""
+        try:
+            from streamlit.runtime import Runtime
+            if not Runtime.exists():
+                return False
+            active = Runtime.instance().is_active_session(session_id)
+        except Exception:
+            return False
+        if active:
+            session['inactive_since'] = None
+            return False
+        if session['inactive_since'] is None:
+            session['inactive_since'] = now
+        return now - session['inactive_since'] >= self.closed_grace_seconds
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Spill sessions idle longer than cold_after_seconds; forget sessions the runtime has closed"""
+
+        now = now or time.time()
+        with self._lock:
+            sessions = list(self._sessions.items())
+
+        cold = 0
+        for session_id, session in sessions:
+            if self._session_closed(session_id, session, now):
+                with self._lock:
+                    self._sessions.pop(session_id, None)
+                self._remove_session_files(session_id)
+                continue
+            with session['lock']:
+                idle = not session['running'] and now - session['last_active'] >= self.cold_after_seconds
+                if idle and session['state'] is not None and self.spill_session(session_id, session['state']):
+                    cold += 1
+                    self.stats['cold_spills'] += 1
+        return cold
+
+    def _remove_session_files(self, session_id: str):
+        import shutil
+        shutil.rmtree(os.path.join(self.spill_dir, session_id), ignore_errors=True)
+
+    def _remove_stale_spills(self, max_age_seconds: float = 24 * 3600):
+        """Spill files of sessions from an earlier server process can never be restored"""
+        for name in os.listdir(self.spill_dir):
+            path = os.path.join(self.spill_dir, name)
+            try:
+                if time.time() - os.path.getmtime(path) > max_age_seconds:
+                    self._remove_session_files(name)
+            except OSError:
+                pass
+
+    def get_stats(self, session_id: Optional[str] = None, state=None) -> Dict:
+        """Store statistics, plus resident and spilled sizes for one session"""
+        stats = {**self.stats, 'sessions': len(self._sessions), 'budget_bytes': self.budget_bytes}
+        if session_id and state is not None:
+            session = self._session(session_id)
+            with session['lock']:
+                stats['resident_bytes'] = sum(self._resident_sizes(session, state).values())
+                stats['spilled_keys'] = [key for key in SESSION_RESULT_KEYS
+                                         if key in state and isinstance(state[key], SpilledResult)]
+        return stats
+
+@st.cache_resource
+def get_session_result_store() -> SessionResultStore:
+    """Process-wide store; cached because Streamlit re-executes this module on every rerun"""
+    return SessionResultStore()
+
+def _current_session():
+    """(session id, thread-safe session state) of the running script, or (None, None) outside Streamlit"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        ctx = get_script_run_ctx()
+    except Exception:
+        return None, None
+    if ctx is None:
+        return None, None
+    return ctx.session_id, ctx.session_state
+
+def activate_session_results():
+    """Mark this session's run as started, so the sweeper leaves its results alone"""
+    session_id, state = _current_session()
+    if session_id:
+        get_session_result_store().activate(session_id, state)
+
+def restore_session_results(page: str):
+    """Bring back just the spilled results this page reads; other reads go through the placeholder"""
+    session_id, state = _current_session()
+    if session_id:
+        get_session_result_store().restore(session_id, state, PAGE_RESULT_KEYS.get(page))
+
+def checkpoint_session_results():
+    """Enforce this session's result memory budget once the page has rendered"""
+    session_id, state = _current_session()
+    if session_id:
+        get_session_result_store().checkpoint(session_id, state)
 
 # UPDATED run_migration_analysis function
 def run_migration_analysis_robust():
     """Run comprehensive migration analysis - ROBUST VERSION"""
     
     try:
-        # Initialize analyzer
         anthropic_api_key = st.session_state.migration_params.get('anthropic_api_key')
-        analyzer = MigrationAnalyzer(anthropic_api_key)
         
-        # Step 1: Calculate recommendations
-        st.write("📊 Calculating instance recommendations...")
-        recommendations = analyzer.calculate_instance_recommendations(st.session_state.environment_specs)
-        st.session_state.recommendations = recommendations
-        
-        # Step 2: Calculate costs
-        st.write("💰 Analyzing costs...")
-        cost_analysis = analyzer.calculate_migration_costs(recommendations, st.session_state.migration_params)
+        # Steps 1-4: recommendations, costs, risk and AI insights; stages whose inputs are unchanged are reused
+        outputs = run_analysis_pipeline('standard', targets=ANALYSIS_PIPELINE_TARGETS)
+        cost_analysis = outputs['costs']
         
         # Update migration params with estimated cost
         st.session_state.migration_params['estimated_migration_cost'] = cost_analysis['migration_costs']['total']
-        st.session_state.analysis_results = cost_analysis
-        
-        # Step 3: Risk assessment - ROBUST VERSION
-        st.write("⚠️ Assessing risks...")
-        
-        # Force create risk assessment
-        risk_assessment = create_default_risk_assessment()
-        st.session_state.risk_assessment = risk_assessment
-        st.write("✅ Risk assessment completed successfully")
         
-      # Step 4: AI insights
         if anthropic_api_key:
-            st.write("🤖 Generating AI insights...")
-            try:
-                ai_insights = analyzer.generate_ai_insights_sync(cost_analysis, st.session_state.migration_params)
-                
-                if ai_insights.get('success'):
-                    st.success("✅ Real Claude AI analysis complete!")
-                    st.info(f"Model: {ai_insights.get('model', 'Unknown')}")
-                else:
-                    st.warning(f"⚠️ Claude AI failed: {ai_insights.get('error')}")
-                
-                st.session_state.ai_insights = ai_insights
-                
-            except Exception as e:
-                st.warning(f"AI insights generation failed: {str(e)}")
-                st.session_state.ai_insights = {'error': str(e)}
+            ai_insights = outputs.get('ai_insights') or {}
+            if ai_insights.get('api_success'):
+                st.success("✅ Real Claude AI analysis complete!")
+                st.info(f"Model: {ai_insights.get('model', 'Unknown')}")
+            else:
+                st.warning(f"⚠️ Claude AI failed: {ai_insights.get('error')}")
         else:
             st.info("ℹ️ Provide Anthropic API key for Claude AI insights")
         
@@ -7079,6 +11217,621 @@ def run_migration_analysis_robust():
             st.session_state.risk_assessment = get_fallback_risk_assessment()
             st.info("🛡️ Fallback risk assessment created")
             
+# ===========================
+# PORTFOLIO RISK SCORING MODULE
+# ===========================
+
+# Column order for portfolio risk tables and heatmaps
+PORTFOLIO_TECHNICAL_RISKS = ['engine_compatibility', 'data_migration_complexity', 'application_integration', 'performance_risk']
+PORTFOLIO_BUSINESS_RISKS = ['timeline_risk', 'cost_overrun_risk', 'business_continuity', 'resource_availability']
+
+def build_engine_compatibility_matrix(engines: List[str]) -> np.ndarray:
+    """Dense source x target risk matrix matching calculate_engine_compatibility_risk"""
+
+    position = {engine: i for i, engine in enumerate(engines)}
+    matrix = np.full((len(engines), len(engines)), 50.0)
+    np.fill_diagonal(matrix, 15.0)
+
+    # Probe the scalar scorer for every known pair so both paths share one table
+    for source in engines:
+        for target in engines:
+            if source != target:
+                matrix[position[source], position[target]] = calculate_engine_compatibility_risk(source, target)
+
+    return matrix
+
+def calculate_engine_compatibility_risk_vectorized(source: pd.Series, target: pd.Series) -> np.ndarray:
+    """Vectorized engine compatibility lookup via categorical codes into the pair matrix"""
+
+    source = source.fillna('unknown').astype(str)
+    target = target.fillna('unknown').astype(str)
+    engines = sorted(set(source.unique()) | set(target.unique()))
+
+    matrix = build_engine_compatibility_matrix(engines)
+    src_codes = pd.Categorical(source, categories=engines).codes
+    tgt_codes = pd.Categorical(target, categories=engines).codes
+
+    return matrix[src_codes, tgt_codes]
+
+def calculate_data_complexity_risk_vectorized(data_size_gb: np.ndarray) -> np.ndarray:
+    """Array version of calculate_data_complexity_risk"""
+    bins = np.array([100, 1000, 10000])
+    scores = np.array([20.0, 40.0, 60.0, 80.0])
+    return scores[np.searchsorted(bins, data_size_gb, side='right')]
+
+def calculate_application_risk_vectorized(num_apps: np.ndarray, num_procedures: np.ndarray) -> np.ndarray:
+    """Array version of calculate_application_risk"""
+    base_risk = np.minimum(80, 20 + num_apps * 10)
+    procedure_risk = np.minimum(25, num_procedures / 20)
+    return np.minimum(90, base_risk + procedure_risk)
+
+def calculate_performance_risk_vectorized(prod_envs: np.ndarray, adequate_prod_envs: np.ndarray,
+                                          has_recommendations: np.ndarray) -> np.ndarray:
+    """Array version of calculate_performance_risk from per-migration environment counts"""
+    adequacy_ratio = np.divide(adequate_prod_envs, prod_envs, out=np.zeros(len(prod_envs)), where=prod_envs > 0)
+    return np.where(~has_recommendations, 50.0, np.where(prod_envs == 0, 30.0, 70 - adequacy_ratio * 40))
+
+def calculate_timeline_risk_vectorized(timeline_weeks: np.ndarray, data_size_gb: np.ndarray,
+                                       team_size: np.ndarray) -> np.ndarray:
+    """Array version of calculate_timeline_risk"""
+    risk = 30.0 + np.select([timeline_weeks < 8, timeline_weeks < 12], [30, 15], 0)
+    risk += np.select([data_size_gb > 10000, data_size_gb > 5000], [20, 10], 0)
+    risk += np.select([team_size < 3, team_size < 5], [20, 10], 0)
+    return np.minimum(90, risk)
+
+def calculate_cost_risk_vectorized(budget: np.ndarray, data_size_gb: np.ndarray,
+                                   timeline_weeks: np.ndarray) -> np.ndarray:
+    """Array version of calculate_cost_risk"""
+    estimated_cost = data_size_gb * 50 + timeline_weeks * 8000
+    ratio = np.divide(estimated_cost, budget, out=np.zeros(len(budget)), where=budget > 0)
+    scores = np.array([20.0, 40.0, 60.0, 85.0])
+    risk = scores[np.searchsorted(np.array([0.5, 0.8, 1.0]), ratio, side='right')]
+    return np.where(budget <= 0, 60.0, risk)
+
+def calculate_continuity_risk_vectorized(num_environments: np.ndarray) -> np.ndarray:
+    """Array version of calculate_continuity_risk (0 environments = no recommendations)"""
+    return np.select([num_environments == 0, num_environments == 1, num_environments < 4], [50.0, 40.0, 50.0], 60.0)
+
+def calculate_resource_risk_vectorized(team_size: np.ndarray, expertise: pd.Series) -> np.ndarray:
+    """Array version of calculate_resource_risk"""
+    risk = 40.0 + np.select([team_size < 3, team_size < 5, team_size > 10], [25, 10, 5], 0)
+    expertise = expertise.fillna('medium').astype(str).str.lower().to_numpy()
+    risk += np.select([expertise == 'high', expertise == 'low'], [-15, 20], 0)
+    return np.clip(risk, 15, 85)
+
+def calculate_portfolio_risks(portfolio_df: pd.DataFrame) -> Dict:
+    """Score every migration in a portfolio frame at once
+
+    Columns mirror migration_params (source_engine, target_engine, data_size_gb,
+    migration_timeline_weeks, team_size, migration_budget, team_expertise,
+    num_applications, num_stored_procedures) plus optional num_environments,
+    production_environments and adequately_sized_production. Missing columns
+    fall back to the same defaults as calculate_migration_risks_safe.
+    """
+
+    try:
+        df = portfolio_df.reset_index(drop=True)
+        n = len(df)
+
+        def numeric(column, default):
+            if column not in df.columns:
+                return np.full(n, float(default))
+            return pd.to_numeric(df[column], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+        def text(column, default):
+            return df[column] if column in df.columns else pd.Series([default] * n)
+
+        data_size_gb = np.trunc(numeric('data_size_gb', 1000))
+        timeline_weeks = np.trunc(numeric('migration_timeline_weeks', 12))
+        team_size = np.trunc(numeric('team_size', 5))
+        budget = np.trunc(numeric('migration_budget', 500000))
+        num_environments = numeric('num_environments', 0)
+        prod_envs = numeric('production_environments', 0)
+        adequate_prod = numeric('adequately_sized_production', 0)
+
+        scores = pd.DataFrame({
+            'engine_compatibility': calculate_engine_compatibility_risk_vectorized(
+                text('source_engine', 'unknown'), text('target_engine', 'unknown')),
+            'data_migration_complexity': calculate_data_complexity_risk_vectorized(data_size_gb),
+            'application_integration': calculate_application_risk_vectorized(
+                numeric('num_applications', 1), numeric('num_stored_procedures', 0)),
+            'performance_risk': calculate_performance_risk_vectorized(
+                prod_envs, adequate_prod, num_environments > 0),
+            'timeline_risk': calculate_timeline_risk_vectorized(timeline_weeks, data_size_gb, team_size),
+            'cost_overrun_risk': calculate_cost_risk_vectorized(budget, data_size_gb, timeline_weeks),
+            'business_continuity': calculate_continuity_risk_vectorized(num_environments),
+            'resource_availability': calculate_resource_risk_vectorized(team_size, text('team_expertise', 'medium'))
+        })
+
+        risk_matrix = scores.to_numpy()
+        overall = (risk_matrix[:, :4].mean(axis=1) + risk_matrix[:, 4:].mean(axis=1)) / 2
+
+        level_names = np.array(['Low', 'Medium', 'High', 'Critical'])
+        levels = level_names[np.searchsorted(np.array([30, 50, 70]), overall, side='right')]
+
+        id_column = next((c for c in ['migration_id', 'name', 'database', 'application'] if c in df.columns), None)
+        migration_ids = df[id_column].astype(str) if id_column else pd.Series([f"Migration {i + 1}" for i in range(n)])
+
+        risk_table = scores.copy()
+        risk_table.insert(0, 'migration', migration_ids.to_numpy())
+        risk_table['overall_score'] = overall
+        risk_table['risk_level'] = levels
+        risk_table['top_risk_driver'] = np.array(scores.columns)[risk_matrix.argmax(axis=1)] if n else []
+        risk_table = risk_table.sort_values('overall_score', ascending=False, kind='stable').reset_index(drop=True)
+        risk_table.insert(0, 'rank', np.arange(1, n + 1))
+
+        level_counts = pd.Series(levels).value_counts()
+
+        return {
+            'risk_table': risk_table,
+            'heatmap_data': {
+                'z': risk_table[PORTFOLIO_TECHNICAL_RISKS + PORTFOLIO_BUSINESS_RISKS].to_numpy(),
+                'x': [c.replace('_', ' ').title() for c in PORTFOLIO_TECHNICAL_RISKS + PORTFOLIO_BUSINESS_RISKS],
+                'y': risk_table['migration'].tolist()
+            },
+            'summary': {
+                'total_migrations': n,
+                'average_score': float(overall.mean()) if n else 0.0,
+                'max_score': float(overall.max()) if n else 0.0,
+                'level_counts': {level: int(level_counts.get(level, 0)) for level in level_names},
+                'dimension_averages': scores.mean().to_dict()
+            }
+        }
+
+    except Exception as e:
+        print(f"Error in portfolio risk scoring: {e}")
+        return {'risk_table': pd.DataFrame(), 'heatmap_data': {'z': [], 'x': [], 'y': []},
+                'summary': {'total_migrations': 0, 'error': str(e)}}
+
+def create_portfolio_risk_heatmap(portfolio_risks: Dict, top_n: int = 40) -> go.Figure:
+    """Create migration x risk-dimension heatmap for the highest-risk migrations"""
+
+    heatmap = portfolio_risks['heatmap_data']
+    z = np.asarray(heatmap['z'])[:top_n]
+
+    fig = go.Figure(data=go.Heatmap(
+        z=z,
+        x=heatmap['x'],
+        y=heatmap['y'][:top_n],
+        zmin=0, zmax=100,
+        colorscale=[
+            [0, '#38a169'],
+            [0.3, '#d69e2e'],
+            [0.6, '#e53e3e'],
+            [1, '#9f1239']
+        ],
+        colorbar=dict(title="Risk Score")
+    ))
+
+    fig.update_layout(
+        title=f'Portfolio Risk Heatmap (Top {min(top_n, len(z))} by Overall Score)',
+        height=max(400, 22 * len(z) + 150),
+        yaxis=dict(autorange="reversed"),
+        xaxis_tickangle=-30
+    )
+
+    return fig
+
+def show_portfolio_risk_scoring():
+    """Show bulk risk scoring for a portfolio of migrations"""
+
+    st.markdown("#### 📁 Portfolio Risk Scoring")
+
+    template = pd.DataFrame({
+        'migration_id': ['CRM-DB', 'Billing-DB', 'Analytics-DW'],
+        'source_engine': ['oracle-ee', 'mysql', 'sql-server'],
+        'target_engine': ['aurora-postgresql', 'aurora-mysql', 'postgres'],
+        'data_size_gb': [2500, 400, 15000],
+        'migration_timeline_weeks': [16, 8, 20],
+        'team_size': [5, 3, 6],
+        'migration_budget': [400000, 80000, 900000],
+        'team_expertise': ['medium', 'high', 'low'],
+        'num_applications': [6, 2, 4],
+        'num_stored_procedures': [300, 20, 120],
+        'num_environments': [4, 2, 3],
+        'production_environments': [1, 1, 1],
+        'adequately_sized_production': [1, 1, 0]
+    })
+
+    st.download_button(
+        label="📥 Download Portfolio Template",
+        data=template.to_csv(index=False),
+        file_name="portfolio_risk_template.csv",
+        mime="text/csv",
+        key="portfolio_risk_template"
+    )
+
+    uploaded_file = st.file_uploader("Upload migration portfolio", type=['csv'], key="portfolio_risk_upload")
+
+    if uploaded_file is None:
+        return
+
+    try:
+        portfolio_risks = calculate_portfolio_risks(pd.read_csv(uploaded_file))
+    except Exception as e:
+        st.error(f"Error reading portfolio: {str(e)}")
+        return
+
+    summary = portfolio_risks['summary']
+    if summary.get('error'):
+        st.error(f"Portfolio scoring failed: {summary['error']}")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Migrations Scored", f"{summary['total_migrations']:,}")
+    with col2:
+        st.metric("Average Risk", f"{summary['average_score']:.1f}/100")
+    with col3:
+        st.metric("High + Critical", f"{summary['level_counts']['High'] + summary['level_counts']['Critical']:,}")
+    with col4:
+        st.metric("Highest Risk", f"{summary['max_score']:.1f}/100")
+
+    st.plotly_chart(create_portfolio_risk_heatmap(portfolio_risks), use_container_width=True, key="portfolio_risk_heatmap")
+
+    st.dataframe(portfolio_risks['risk_table'].round(1), use_container_width=True, hide_index=True)
+
+    st.download_button(
+        label="📥 Download Ranked Risk Table",
+        data=portfolio_risks['risk_table'].to_csv(index=False),
+        file_name=f"portfolio_risk_ranking_{datetime.now().strftime('%Y%m%d')}.csv",
+        mime="text/csv",
+        key="portfolio_risk_download"
+    )
+
+# ===========================
+# MONTE CARLO RISK SIMULATION MODULE
+# ===========================
+
+class MigrationRiskSimulator:
+    """Vectorized Monte Carlo simulation of migration schedule and cost overrun"""
+
+    def __init__(self):
+        self.distributions = self._initialize_distributions()
+
+    def _initialize_distributions(self) -> Dict:
+        """Sampling assumptions for each uncertain input"""
+        return {
+            # Triangular multiplier on each planned task duration (optimistic, most likely, pessimistic)
+            'task_duration': {'low': 0.8, 'mode': 1.0, 'high': 1.4},
+            # Share of the team's time actually available, relative to the planned share
+            'team_availability': {'alpha': 9.0, 'beta': 2.0, 'planned': 0.8, 'floor': 0.4},
+            # Achieved share of link bandwidth for bulk data transfer
+            'throughput_direct_connect': {'alpha': 8.0, 'beta': 2.0},
+            'throughput_vpn': {'alpha': 4.0, 'beta': 3.0},
+            # Lognormal sigma on AWS service prices and professional services rates
+            'aws_price_sigma': 0.10,
+            'labour_rate_sigma': 0.08,
+            # Bulk load share of the data migration phase; the rest is validation and CDC catch-up
+            'transfer_share': 0.5,
+            # Effort baseline: the standard phase plan at its unscaled length, adjusted for the team
+            'reference_plan_weeks': 15,
+            'expertise_factor': {'high': 0.9, 'medium': 1.0, 'low': 1.2}
+        }
+
+    def simulate(self, migration_params: Dict, migration_costs: Optional[Dict] = None,
+                 n_simulations: int = 20000, seed: Optional[int] = None,
+                 task_graph: Optional['MigrationTaskGraph'] = None) -> Dict:
+        """Run n_simulations project simulations and summarise schedule/budget overrun risk"""
+
+        try:
+            # Simulate the effort-based plan, not one already stretched to fit the target timeline
+            graph = task_graph or MigrationTaskGraph.default_migration_plan(
+                {'migration_timeline_weeks': self.distributions['reference_plan_weeks']}
+            )
+            rng = np.random.default_rng(seed)
+            n_simulations = max(100, int(n_simulations))
+
+            timeline_weeks = float(migration_params.get('migration_timeline_weeks', 12))
+            budget = float(migration_params.get('migration_budget', 500000) or 0)
+
+            samples = self._sample_inputs(rng, n_simulations, len(graph.task_ids), migration_params)
+            schedule = self._simulate_schedule(graph, samples, migration_params)
+            cost = self._simulate_costs(schedule['duration_weeks'], samples, migration_params, migration_costs)
+
+            duration_weeks = schedule['duration_weeks']
+            drivers = self._build_driver_matrix(graph, samples)
+            sensitivity = self._sensitivity(drivers, duration_weeks, cost)
+
+            return {
+                'success': True,
+                'simulations': n_simulations,
+                'timeline_weeks': timeline_weeks,
+                'budget': budget,
+                'p_miss_timeline': float(np.mean(duration_weeks > timeline_weeks)),
+                'p_exceed_budget': float(np.mean(cost > budget)) if budget > 0 else None,
+                'duration_weeks': self._percentiles(duration_weeks),
+                'cost': self._percentiles(cost),
+                'sensitivity': sensitivity,
+                'top_drivers': [s['driver'] for s in sensitivity[:3]],
+                'task_criticality': dict(zip(graph.names, schedule['criticality'].round(3).tolist())),
+                # Binned for the charts; the raw samples would be kept in session state and every pipeline memo entry
+                'histograms': {'duration_weeks': self._histogram(duration_weeks), 'cost': self._histogram(cost)}
+            }
+
+        except Exception as e:
+            print(f"Error in Monte Carlo risk simulation: {e}")
+            return self._get_fallback_simulation(str(e))
+
+    def _sample_inputs(self, rng: np.random.Generator, n_sims: int, n_tasks: int, migration_params: Dict) -> Dict:
+        """Draw every uncertain input for all simulations at once"""
+
+        dist = self.distributions
+        task = dist['task_duration']
+        team = dist['team_availability']
+        link = dist['throughput_direct_connect'] if migration_params.get('use_direct_connect', True) else dist['throughput_vpn']
+
+        availability = np.maximum(team['floor'], rng.beta(team['alpha'], team['beta'], n_sims))
+
+        return {
+            'task_multipliers': rng.triangular(task['low'], task['mode'], task['high'], (n_sims, n_tasks)),
+            'team_availability': availability,
+            'availability_factor': np.maximum(1.0, team['planned'] / availability),
+            'throughput_utilization': np.maximum(0.05, rng.beta(link['alpha'], link['beta'], n_sims)),
+            'aws_price_factor': rng.lognormal(0.0, dist['aws_price_sigma'], n_sims),
+            'labour_rate_factor': rng.lognormal(0.0, dist['labour_rate_sigma'], n_sims)
+        }
+
+    def _simulate_schedule(self, graph: 'MigrationTaskGraph', samples: Dict, migration_params: Dict) -> Dict:
+        """Forward/backward CPM pass over the task graph, vectorized across simulations"""
+
+        team_size = max(1, int(migration_params.get('team_size', 5)))
+        expertise = str(migration_params.get('team_expertise', 'medium')).lower()
+
+        # Tasks needing more people than the team has stretch proportionally
+        staffing = np.maximum(1.0, np.asarray(graph.resource_units, dtype=float) / team_size)
+        planned = np.asarray(graph.durations, dtype=float) * staffing
+        planned *= self.distributions['expertise_factor'].get(expertise, 1.0)
+
+        durations = planned * samples['task_multipliers'] * samples['availability_factor'][:, None]
+
+        # Bulk load time is bound by the link, not the team
+        transfer_idx = graph.index.get('data_migration')
+        if transfer_idx is not None:
+            data_size_gb = float(migration_params.get('data_size_gb', 1000))
+            bandwidth_mbps = max(1.0, float(migration_params.get('bandwidth_mbps', 1000)))
+            transfer_days = data_size_gb * 8000 / (bandwidth_mbps * samples['throughput_utilization'] * 86400)
+            share = self.distributions['transfer_share']
+            work_days = durations[:, transfer_idx] * (1 - share)
+            durations[:, transfer_idx] = work_days + np.maximum(durations[:, transfer_idx] * share, transfer_days)
+
+        levels, cyclic = graph._topological_levels()
+        order = [int(i) for i in np.argsort(levels, kind='stable') if levels[i] >= 0]
+
+        predecessors = {i: [] for i in order}
+        successors = {i: [] for i in order}
+        for s, d in zip(graph.edge_src, graph.edge_dst):
+            if levels[s] >= 0 and levels[d] >= 0:
+                predecessors[d].append(s)
+                successors[s].append(d)
+
+        n_sims = durations.shape[0]
+        early_finish = np.zeros_like(durations)
+        for node in order:
+            preds = predecessors[node]
+            start = early_finish[:, preds].max(axis=1) if preds else np.zeros(n_sims)
+            early_finish[:, node] = start + durations[:, node]
+
+        project_days = early_finish[:, order].max(axis=1) if order else np.zeros(n_sims)
+
+        late_start = np.zeros_like(durations)
+        for node in reversed(order):
+            succs = successors[node]
+            finish = late_start[:, succs].min(axis=1) if succs else project_days
+            late_start[:, node] = finish - durations[:, node]
+
+        slack = late_start - (early_finish - durations)
+        criticality = (slack <= 1e-6).mean(axis=0)
+        if cyclic:
+            criticality[cyclic] = 0.0
+
+        return {'duration_weeks': project_days / 7, 'criticality': criticality}
+
+    def _simulate_costs(self, duration_weeks: np.ndarray, samples: Dict, migration_params: Dict,
+                        migration_costs: Optional[Dict]) -> np.ndarray:
+        """Realised migration cost per simulation from the MigrationAnalyzer cost model"""
+
+        timeline_weeks = max(1.0, float(migration_params.get('migration_timeline_weeks', 12)))
+        data_size_gb = float(migration_params.get('data_size_gb', 1000))
+        migration_costs = migration_costs or {}
+
+        # Weekly run-rates implied by the planned cost breakdown
+        dms_weekly = migration_costs.get('dms_instance', 0.2 * 24 * 7 * timeline_weeks) / timeline_weeks
+        ps_weekly = migration_costs.get('professional_services', 8000 * timeline_weeks) / timeline_weeks
+        transfer_cost = migration_costs.get('data_transfer', data_size_gb * 0.09)
+
+        aws_cost = (dms_weekly * duration_weeks + transfer_cost) * samples['aws_price_factor']
+        labour_cost = ps_weekly * duration_weeks * samples['labour_rate_factor']
+
+        return aws_cost + labour_cost
+
+    def _build_driver_matrix(self, graph: 'MigrationTaskGraph', samples: Dict) -> pd.DataFrame:
+        """Collect sampled inputs as named driver columns"""
+
+        drivers = {f"{name} duration": samples['task_multipliers'][:, i] for i, name in enumerate(graph.names)}
+        drivers['Team availability'] = samples['team_availability']
+        drivers['Transfer throughput'] = samples['throughput_utilization']
+        drivers['AWS price variance'] = samples['aws_price_factor']
+        drivers['Labour rate variance'] = samples['labour_rate_factor']
+
+        return pd.DataFrame(drivers)
+
+    def _sensitivity(self, drivers: pd.DataFrame, duration_weeks: np.ndarray, cost: np.ndarray) -> List[Dict]:
+        """Spearman rank correlation of each driver with duration and cost, strongest first"""
+
+        def ranks(values: np.ndarray) -> np.ndarray:
+            r = np.empty(values.shape, dtype=float)
+            idx = np.argsort(values, axis=0, kind='stable')
+            if values.ndim == 1:
+                r[idx] = np.arange(len(values))
+            else:
+                np.put_along_axis(r, idx, np.arange(values.shape[0])[:, None].astype(float), axis=0)
+            return r
+
+        def correlate(driver_ranks: np.ndarray, target: np.ndarray) -> np.ndarray:
+            t = ranks(target)
+            t = (t - t.mean()) / (t.std() or 1.0)
+            d = driver_ranks - driver_ranks.mean(axis=0)
+            std = d.std(axis=0)
+            std[std == 0] = 1.0
+            return (d / std * t[:, None]).mean(axis=0)
+
+        driver_ranks = ranks(drivers.to_numpy())
+        duration_corr = correlate(driver_ranks, duration_weeks)
+        cost_corr = correlate(driver_ranks, cost)
+
+        sensitivity = [
+            {
+                'driver': name,
+                'duration_correlation': float(duration_corr[i]),
+                'cost_correlation': float(cost_corr[i]),
+                'impact': float(max(abs(duration_corr[i]), abs(cost_corr[i])))
+            }
+            for i, name in enumerate(drivers.columns)
+        ]
+
+        return sorted(sensitivity, key=lambda s: s['impact'], reverse=True)
+
+    def _percentiles(self, values: np.ndarray) -> Dict:
+        """Summary statistics for a simulated outcome"""
+        p10, p50, p80, p90 = np.percentile(values, [10, 50, 80, 90])
+        return {'mean': float(values.mean()), 'p10': float(p10), 'p50': float(p50),
+                'p80': float(p80), 'p90': float(p90)}
+
+    def _histogram(self, values: np.ndarray, bins: int = 50) -> Dict:
+        """Bin counts and edges of a simulated outcome"""
+        counts, edges = np.histogram(values, bins=bins)
+        return {'counts': counts.tolist(), 'edges': edges.round(4).tolist()}
+
+    def _get_fallback_simulation(self, error: str) -> Dict:
+        """Fallback result when simulation fails"""
+        return {
+            'success': False,
+            'error': error,
+            'simulations': 0,
+            'p_miss_timeline': None,
+            'p_exceed_budget': None,
+            'sensitivity': [],
+            'top_drivers': []
+        }
+
+@traced('risk')
+def assess_migration_risks(migration_params: Dict, recommendations: Dict, cost_analysis: Optional[Dict] = None,
+                           n_simulations: int = 20000) -> Dict:
+    """Score migration risks and attach the Monte Carlo schedule/cost simulation"""
+
+    risk_assessment = calculate_migration_risks_safe(migration_params, recommendations)
+
+    migration_costs = (cost_analysis or {}).get('migration_costs')
+    simulation = MigrationRiskSimulator().simulate(migration_params, migration_costs, n_simulations=n_simulations)
+
+    if simulation.get('success'):
+        risk_assessment['simulation'] = simulation
+
+    return risk_assessment
+
+def create_simulation_distribution_chart(simulation: Dict) -> go.Figure:
+    """Create duration and cost distribution histograms with the planned targets marked"""
+
+    fig = make_subplots(rows=1, cols=2, subplot_titles=('Project Duration (weeks)', 'Migration Cost ($)'))
+
+    def histogram_bars(histogram: Dict, color: str, name: str) -> go.Bar:
+        edges = np.asarray(histogram['edges'])
+        return go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=histogram['counts'], width=np.diff(edges),
+                      marker_color=color, name=name)
+
+    fig.add_trace(histogram_bars(simulation['histograms']['duration_weeks'], '#3182ce', 'Duration'), row=1, col=1)
+    fig.add_vline(x=simulation['timeline_weeks'], line_dash='dash', line_color='#e53e3e', row=1, col=1)
+
+    fig.add_trace(histogram_bars(simulation['histograms']['cost'], '#38a169', 'Cost'), row=1, col=2)
+    if simulation.get('budget'):
+        fig.add_vline(x=simulation['budget'], line_dash='dash', line_color='#e53e3e', row=1, col=2)
+
+    fig.update_layout(
+        title=f"Monte Carlo Outcomes ({simulation['simulations']:,} simulations)",
+        height=400,
+        showlegend=False
+    )
+
+    return fig
+
+def create_sensitivity_tornado_chart(simulation: Dict, top_n: int = 8) -> go.Figure:
+    """Create tornado chart of rank correlations between risk drivers and outcomes"""
+
+    drivers = simulation['sensitivity'][:top_n][::-1]
+
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=[d['driver'] for d in drivers],
+        x=[d['duration_correlation'] for d in drivers],
+        orientation='h',
+        name='Duration',
+        marker_color='#3182ce'
+    ))
+    fig.add_trace(go.Bar(
+        y=[d['driver'] for d in drivers],
+        x=[d['cost_correlation'] for d in drivers],
+        orientation='h',
+        name='Cost',
+        marker_color='#38a169'
+    ))
+
+    fig.update_layout(
+        title='Top Risk Drivers (Rank Correlation)',
+        xaxis_title='Spearman Correlation',
+        barmode='group',
+        height=400
+    )
+
+    return fig
+
+def show_risk_simulation_results(risk_assessment: Dict):
+    """Show Monte Carlo schedule and budget overrun results"""
+
+    st.markdown("#### 🎲 Schedule & Budget Simulation")
+
+    col1, col2 = st.columns([3, 1])
+    with col2:
+        n_simulations = st.selectbox("Simulations", [5000, 20000, 50000], index=1, key="risk_sim_count")
+        if st.button("🎲 Re-run Simulation", key="risk_sim_rerun"):
+            migration_costs = (st.session_state.get('analysis_results') or {}).get('migration_costs')
+            simulation = MigrationRiskSimulator().simulate(
+                st.session_state.get('migration_params', {}), migration_costs, n_simulations=n_simulations
+            )
+            if simulation.get('success'):
+                risk_assessment['simulation'] = simulation
+
+    simulation = risk_assessment.get('simulation')
+    if not simulation:
+        st.info("ℹ️ Run the migration analysis to simulate schedule and budget outcomes.")
+        return
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("P(Miss Timeline)", f"{simulation['p_miss_timeline']:.0%}",
+                  help=f"Probability the project runs past {simulation['timeline_weeks']:.0f} weeks")
+    with col2:
+        p_budget = simulation['p_exceed_budget']
+        st.metric("P(Exceed Budget)", f"{p_budget:.0%}" if p_budget is not None else "N/A")
+    with col3:
+        st.metric("P80 Duration", f"{simulation['duration_weeks']['p80']:.1f} weeks",
+                  delta=f"{simulation['duration_weeks']['p80'] - simulation['timeline_weeks']:+.1f} weeks",
+                  delta_color="inverse")
+    with col4:
+        st.metric("P80 Cost", f"${simulation['cost']['p80']:,.0f}")
+
+    st.plotly_chart(create_simulation_distribution_chart(simulation), use_container_width=True, key="risk_sim_distribution")
+    st.plotly_chart(create_sensitivity_tornado_chart(simulation), use_container_width=True, key="risk_sim_tornado")
+
+    with st.expander("📋 Task Criticality Index"):
+        criticality_df = pd.DataFrame({
+            'Task': list(simulation['task_criticality'].keys()),
+            'Critical in % of Simulations': [f"{v:.0%}" for v in simulation['task_criticality'].values()]
+        })
+        st.dataframe(criticality_df, use_container_width=True, hide_index=True)
+
 # ===========================
 # VISUALIZATION FUNCTIONS
 # ===========================
@@ -7135,6 +11888,17 @@ def create_risk_heatmap(risk_assessment: Dict) -> go.Figure:
     risk_scores = list(tech_risks.values()) + list(business_risks.values())
     risk_types = ['Technical'] * len(tech_risks) + ['Business'] * len(business_risks)
     
+    # Simulated overrun probabilities on the same 0-100 scale
+    simulation = risk_assessment.get('simulation')
+    if simulation:
+        risk_categories.append('simulated_schedule_overrun_%')
+        risk_scores.append(simulation['p_miss_timeline'] * 100)
+        risk_types.append('Simulated')
+        if simulation.get('p_exceed_budget') is not None:
+            risk_categories.append('simulated_budget_overrun_%')
+            risk_scores.append(simulation['p_exceed_budget'] * 100)
+            risk_types.append('Simulated')
+    
     # Create heatmap data
     heatmap_data = []
     for i, (category, score, risk_type) in enumerate(zip(risk_categories, risk_scores, risk_types)):
@@ -7152,6 +11916,7 @@ def create_risk_heatmap(risk_assessment: Dict) -> go.Figure:
         ],
         text=[[f'{score:.0f}' for score in row] for row in heatmap_data],
         texttemplate='%{text}',
+        zmin=0, zmax=100,
         colorbar=dict(title="Risk Level")
     ))
     
@@ -8052,46 +12817,553 @@ def create_environment_comparison_chart(environment_costs: Dict) -> go.Figure:
     
     return fig
 
-def create_migration_timeline_gantt(migration_params: Dict) -> go.Figure:
-    """Create migration timeline Gantt chart"""
-    
-    timeline_weeks = migration_params.get('migration_timeline_weeks', 12)
-    
-    # Define migration phases
-    phases = [
-        {'name': 'Assessment & Planning', 'start': 0, 'duration': 2},
-        {'name': 'Environment Setup', 'start': 1, 'duration': 3},
-        {'name': 'Schema Migration', 'start': 3, 'duration': 2},
-        {'name': 'Data Migration', 'start': 4, 'duration': 4},
-        {'name': 'Application Testing', 'start': 6, 'duration': 3},
-        {'name': 'User Acceptance Testing', 'start': 8, 'duration': 2},
-        {'name': 'Go-Live Preparation', 'start': 9, 'duration': 2},
-        {'name': 'Production Cutover', 'start': 11, 'duration': 1}
-    ]
-    
-    # Create simple bar chart instead of Gantt to avoid dependencies
+def create_migration_timeline_gantt(migration_params: Dict) -> go.Figure:
+    """Create migration timeline Gantt chart"""
+    
+    graph = MigrationTaskGraph.default_migration_plan(migration_params)
+    cpm = graph.compute_critical_path()
+    levelled = graph.resource_levelled_schedule({'team': migration_params.get('team_size', 5)}, cpm)
+    
+    return create_task_graph_gantt(levelled['schedule'], 'levelled_start', 'levelled_finish')
+
+# ===========================
+# MIGRATION TASK GRAPH MODULE
+# ===========================
+
+class MigrationTaskGraph:
+    """Array-backed task dependency graph with critical path and resource levelling"""
+
+    def __init__(self):
+        self.task_ids = []
+        self.index = {}
+        self.names = []
+        self.durations = []
+        self.resources = []
+        self.resource_units = []
+        self.edge_src = []
+        self.edge_dst = []
+        self.missing_dependencies = []
+
+    def add_task(self, task_id: str, duration_days: float, name: Optional[str] = None,
+                 resource: Optional[str] = None, resource_units: float = 1) -> int:
+        """Add (or update) a task and return its node index"""
+
+        task_id = str(task_id)
+        idx = self.index.get(task_id)
+
+        if idx is None:
+            idx = len(self.task_ids)
+            self.index[task_id] = idx
+            self.task_ids.append(task_id)
+            self.names.append(name or task_id)
+            self.durations.append(max(0.0, float(duration_days)))
+            self.resources.append(resource)
+            self.resource_units.append(float(resource_units))
+        else:
+            self.names[idx] = name or self.names[idx]
+            self.durations[idx] = max(0.0, float(duration_days))
+            self.resources[idx] = resource
+            self.resource_units[idx] = float(resource_units)
+
+        return idx
+
+    def add_dependency(self, predecessor: str, successor: str):
+        """Add a finish-to-start edge; unknown task ids are recorded and skipped"""
+
+        src = self.index.get(str(predecessor))
+        dst = self.index.get(str(successor))
+
+        if src is None or dst is None:
+            self.missing_dependencies.append({'predecessor': str(predecessor), 'successor': str(successor)})
+        elif src != dst:
+            self.edge_src.append(src)
+            self.edge_dst.append(dst)
+
+    @classmethod
+    def from_dataframes(cls, tasks_df: pd.DataFrame, edges_df: Optional[pd.DataFrame] = None) -> 'MigrationTaskGraph':
+        """Build a graph from a task CSV (and optional edge-list CSV)
+
+        Tasks: task_id, duration_days or duration_weeks, optional name, resource,
+        resource_units and depends_on (semicolon separated task ids).
+        Edges: predecessor/successor (or source/target, from/to) columns.
+        """
+
+        graph = cls()
+        columns = {c.lower().strip(): c for c in tasks_df.columns}
+
+        id_col = columns.get('task_id', columns.get('id', columns.get('task')))
+        if id_col is None:
+            raise ValueError("Task file needs a task_id column")
+
+        if 'duration_days' in columns:
+            durations = pd.to_numeric(tasks_df[columns['duration_days']], errors='coerce').fillna(0)
+        elif 'duration_weeks' in columns:
+            durations = pd.to_numeric(tasks_df[columns['duration_weeks']], errors='coerce').fillna(0) * 7
+        else:
+            raise ValueError("Task file needs a duration_days or duration_weeks column")
+
+        ids = tasks_df[id_col].astype(str).tolist()
+        names = tasks_df[columns['name']].astype(str).tolist() if 'name' in columns else ids
+        resources = tasks_df[columns['resource']].where(tasks_df[columns['resource']].notna(), None).tolist() if 'resource' in columns else [None] * len(ids)
+        units = pd.to_numeric(tasks_df[columns['resource_units']], errors='coerce').fillna(1).tolist() if 'resource_units' in columns else [1] * len(ids)
+
+        for task_id, name, duration, resource, unit in zip(ids, names, durations.tolist(), resources, units):
+            graph.add_task(task_id, duration, name=name, resource=resource, resource_units=unit)
+
+        if 'depends_on' in columns:
+            for task_id, deps in zip(ids, tasks_df[columns['depends_on']].tolist()):
+                if pd.isna(deps):
+                    continue
+                for dep in str(deps).replace(',', ';').split(';'):
+                    if dep.strip():
+                        graph.add_dependency(dep.strip(), task_id)
+
+        if edges_df is not None and not edges_df.empty:
+            edge_columns = {c.lower().strip(): c for c in edges_df.columns}
+            pred_col = next((edge_columns[c] for c in ['predecessor', 'source', 'from'] if c in edge_columns), None)
+            succ_col = next((edge_columns[c] for c in ['successor', 'target', 'to'] if c in edge_columns), None)
+            if pred_col is None or succ_col is None:
+                raise ValueError("Edge file needs predecessor and successor columns")
+
+            for pred, succ in zip(edges_df[pred_col].astype(str).tolist(), edges_df[succ_col].astype(str).tolist()):
+                graph.add_dependency(pred, succ)
+
+        return graph
+
+    @classmethod
+    def default_migration_plan(cls, migration_params: Dict) -> 'MigrationTaskGraph':
+        """Standard database migration phases, scaled so the critical path fits the timeline"""
+
+        timeline_weeks = migration_params.get('migration_timeline_weeks', 12)
+
+        # (task_id, name, weeks, team members, depends_on)
+        phases = [
+            ('assessment', 'Assessment & Planning', 2, 2, []),
+            ('environment_setup', 'Environment Setup', 3, 2, ['assessment']),
+            ('schema_migration', 'Schema Migration', 2, 3, ['assessment']),
+            ('data_migration', 'Data Migration', 4, 2, ['environment_setup', 'schema_migration']),
+            ('application_testing', 'Application Testing', 3, 3, ['data_migration']),
+            ('uat', 'User Acceptance Testing', 2, 2, ['application_testing']),
+            ('golive_preparation', 'Go-Live Preparation', 2, 2, ['application_testing']),
+            ('production_cutover', 'Production Cutover', 1, 4, ['uat', 'golive_preparation'])
+        ]
+
+        scale = timeline_weeks / 15  # unscaled critical path is 15 weeks
+
+        graph = cls()
+        for task_id, name, weeks, team, _ in phases:
+            graph.add_task(task_id, max(1, round(weeks * 7 * scale)), name=name, resource='team', resource_units=team)
+        for task_id, _, _, _, depends_on in phases:
+            for dep in depends_on:
+                graph.add_dependency(dep, task_id)
+
+        return graph
+
+    def _topological_levels(self) -> Tuple[np.ndarray, List[int]]:
+        """Longest-edge-count level per node (Kahn); -1 marks nodes on or behind a cycle"""
+
+        n = len(self.task_ids)
+        src = np.asarray(self.edge_src, dtype=np.int64)
+        dst = np.asarray(self.edge_dst, dtype=np.int64)
+
+        # CSR adjacency of successors
+        order = np.argsort(src, kind='stable')
+        succ = dst[order].tolist()
+        offsets = np.searchsorted(src[order], np.arange(n + 1)).tolist()
+
+        indegree = np.bincount(dst, minlength=n).tolist() if n else []
+        level = [0] * n
+        queue = [i for i in range(n) if indegree[i] == 0]
+        head = 0
+
+        while head < len(queue):
+            node = queue[head]
+            head += 1
+            next_level = level[node] + 1
+            for k in range(offsets[node], offsets[node + 1]):
+                nxt = succ[k]
+                if level[nxt] < next_level:
+                    level[nxt] = next_level
+                indegree[nxt] -= 1
+                if indegree[nxt] == 0:
+                    queue.append(nxt)
+
+        levels = np.asarray(level, dtype=np.int64)
+        cyclic = [i for i in range(n) if indegree[i] > 0]
+        if cyclic:
+            levels[cyclic] = -1
+
+        return levels, cyclic
+
+    def compute_critical_path(self) -> Dict:
+        """Forward/backward pass (CPM) giving early/late dates, slack and the critical path"""
+
+        n = len(self.task_ids)
+        duration = np.asarray(self.durations, dtype=float)
+        levels, cyclic = self._topological_levels()
+
+        src = np.asarray(self.edge_src, dtype=np.int64)
+        dst = np.asarray(self.edge_dst, dtype=np.int64)
+        valid_edges = (levels[src] >= 0) & (levels[dst] >= 0) if len(src) else np.zeros(0, dtype=bool)
+        src, dst = src[valid_edges], dst[valid_edges]
+
+        valid = levels >= 0
+        max_level = int(levels.max()) if n and valid.any() else -1
+        nodes_by_level = np.argsort(levels, kind='stable')
+        level_bounds = np.searchsorted(levels[nodes_by_level], np.arange(-1, max_level + 2))
+
+        early_start = np.zeros(n)
+        early_finish = duration.copy()
+
+        # Forward pass one level at a time; predecessors always sit on lower levels
+        fwd_order = np.argsort(levels[dst], kind='stable')
+        fwd_src, fwd_dst = src[fwd_order], dst[fwd_order]
+        fwd_bounds = np.searchsorted(levels[fwd_dst], np.arange(max_level + 2))
+
+        for lvl in range(1, max_level + 1):
+            e_lo, e_hi = fwd_bounds[lvl], fwd_bounds[lvl + 1]
+            if e_hi > e_lo:
+                np.maximum.at(early_start, fwd_dst[e_lo:e_hi], early_finish[fwd_src[e_lo:e_hi]])
+            nodes = nodes_by_level[level_bounds[lvl + 1]:level_bounds[lvl + 2]]
+            early_finish[nodes] = early_start[nodes] + duration[nodes]
+
+        project_duration = float(early_finish[valid].max()) if valid.any() else 0.0
+
+        late_finish = np.full(n, project_duration)
+        late_start = late_finish - duration
+
+        # Backward pass from the last level down
+        bwd_order = np.argsort(levels[src], kind='stable')
+        bwd_src, bwd_dst = src[bwd_order], dst[bwd_order]
+        bwd_bounds = np.searchsorted(levels[bwd_src], np.arange(max_level + 2))
+
+        for lvl in range(max_level - 1, -1, -1):
+            e_lo, e_hi = bwd_bounds[lvl], bwd_bounds[lvl + 1]
+            if e_hi > e_lo:
+                np.minimum.at(late_finish, bwd_src[e_lo:e_hi], late_start[bwd_dst[e_lo:e_hi]])
+            nodes = nodes_by_level[level_bounds[lvl + 1]:level_bounds[lvl + 2]]
+            late_start[nodes] = late_finish[nodes] - duration[nodes]
+
+        slack = late_start - early_start
+        critical = valid & (slack <= 1e-9)
+
+        # Trace one critical chain back from a task finishing at the project end
+        critical_path = []
+        if valid.any():
+            tight = critical[src] & critical[dst] & np.isclose(early_finish[src], early_start[dst])
+            critical_pred = dict(zip(dst[tight].tolist(), src[tight].tolist()))
+            candidates = np.flatnonzero(critical & np.isclose(early_finish, project_duration))
+            node = int(candidates[0]) if len(candidates) else None
+            while node is not None:
+                critical_path.append(self.task_ids[node])
+                node = critical_pred.get(node)
+            critical_path.reverse()
+
+        schedule = pd.DataFrame({
+            'task_id': self.task_ids,
+            'name': self.names,
+            'duration_days': duration,
+            'early_start': early_start,
+            'early_finish': early_finish,
+            'late_start': late_start,
+            'late_finish': late_finish,
+            'slack_days': slack,
+            'critical': critical,
+            'resource': self.resources,
+            'resource_units': self.resource_units
+        })
+        if cyclic:
+            schedule = schedule.drop(index=cyclic).reset_index(drop=True)
+
+        return {
+            'schedule': schedule,
+            'critical_path': critical_path,
+            'project_duration_days': project_duration,
+            'task_count': n,
+            'edge_count': len(self.edge_src),
+            'dependency_cycles': [self.task_ids[i] for i in cyclic],
+            'missing_dependencies': self.missing_dependencies
+        }
+
+    def resource_levelled_schedule(self, resource_capacity: Dict, cpm: Optional[Dict] = None) -> Dict:
+        """Serial schedule generation: least-late-start first, each task at its earliest resource-feasible day"""
+
+        import heapq
+
+        cpm = cpm or self.compute_critical_path()
+        n = len(self.task_ids)
+        cyclic = set(self.index[t] for t in cpm['dependency_cycles'])
+
+        late_start = np.zeros(n)
+        late_start[[self.index[t] for t in cpm['schedule']['task_id']]] = cpm['schedule']['late_start'].to_numpy()
+        duration = np.ceil(np.asarray(self.durations, dtype=float)).astype(int)
+
+        predecessors_left = np.bincount(np.asarray(self.edge_dst, dtype=np.int64), minlength=n).tolist() if n else []
+        successors = [[] for _ in range(n)]
+        for s, d in zip(self.edge_src, self.edge_dst):
+            successors[s].append(d)
+
+        usage = {res: np.zeros(max(64, int(cpm['project_duration_days']) * 2 + 1)) for res in resource_capacity}
+        saturated_until = {res: 0 for res in resource_capacity}
+        min_units = {res: min([u for r, u in zip(self.resources, self.resource_units) if r == res] or [1])
+                     for res in resource_capacity}
+        ready_time = [0] * n
+        start = np.full(n, np.nan)
+        finish = np.full(n, np.nan)
+        over_capacity = []
+
+        heap = [(late_start[i], i) for i in range(n) if predecessors_left[i] == 0 and i not in cyclic]
+        heapq.heapify(heap)
+
+        while heap:
+            _, node = heapq.heappop(heap)
+            t = ready_time[node]
+            d = duration[node]
+            res = self.resources[node]
+
+            if res in usage and d > 0:
+                cap = float(resource_capacity[res])
+                demand = self.resource_units[node]
+                if demand > cap:
+                    over_capacity.append(self.task_ids[node])
+                    demand = cap
+
+                # Days before saturated_until cannot fit even the smallest demand
+                t = max(t, saturated_until[res])
+                t = self._find_resource_slot(usage, res, t, d, demand, cap)
+                usage[res][t:t + d] += demand
+
+                profile = usage[res]
+                min_demand = min(min_units[res], cap)  # demands above capacity are clamped to it
+                while saturated_until[res] < len(profile) and profile[saturated_until[res]] + min_demand > cap + 1e-9:
+                    saturated_until[res] += 1
+
+            start[node] = t
+            finish[node] = t + d
+
+            for nxt in successors[node]:
+                ready_time[nxt] = max(ready_time[nxt], t + d)
+                predecessors_left[nxt] -= 1
+                if predecessors_left[nxt] == 0 and nxt not in cyclic:
+                    heapq.heappush(heap, (late_start[nxt], nxt))
+
+        scheduled = ~np.isnan(finish)
+        project_duration = float(finish[scheduled].max()) if scheduled.any() else 0.0
+
+        schedule = cpm['schedule'].copy()
+        rows = [self.index[t] for t in schedule['task_id']]
+        schedule['levelled_start'] = start[rows]
+        schedule['levelled_finish'] = finish[rows]
+        schedule['levelling_delay_days'] = schedule['levelled_start'] - schedule['early_start']
+        schedule['levelled_critical'] = self._levelled_critical(start, finish, project_duration)[rows]
+
+        horizon = int(np.ceil(project_duration))
+        return {
+            'schedule': schedule,
+            'project_duration_days': project_duration,
+            'cpm_duration_days': cpm['project_duration_days'],
+            'resource_profile': {res: profile[:horizon].tolist() for res, profile in usage.items()},
+            'resource_capacity': dict(resource_capacity),
+            'over_capacity_tasks': over_capacity
+        }
+
+    def _levelled_critical(self, start: np.ndarray, finish: np.ndarray, project_duration: float) -> np.ndarray:
+        """Tasks whose delay would delay the levelled finish: zero-gap chains back from the last tasks, where a task
+        started later than its predecessors allow is driven by the same-resource tasks that freed capacity for it"""
+
+        n = len(start)
+        critical = np.zeros(n, dtype=bool)
+        scheduled = ~np.isnan(finish)
+        if not scheduled.any():
+            return critical
+
+        src = np.asarray(self.edge_src, dtype=np.int64)
+        dst = np.asarray(self.edge_dst, dtype=np.int64)
+        both = scheduled[src] & scheduled[dst] if len(src) else np.zeros(0, dtype=bool)
+        src, dst = src[both], dst[both]
+
+        ready = np.zeros(n)
+        np.maximum.at(ready, dst, finish[src])
+        resource_delayed = scheduled & (start > ready + 1e-9)
+
+        precedence_drivers = [[] for _ in range(n)]
+        tight = np.isclose(finish[src], start[dst])
+        for s, d in zip(src[tight].tolist(), dst[tight].tolist()):
+            precedence_drivers[d].append(s)
+
+        released_at = {}
+        for i in np.flatnonzero(scheduled).tolist():
+            released_at.setdefault((self.resources[i], float(finish[i])), []).append(i)
+
+        stack = np.flatnonzero(scheduled & np.isclose(finish, project_duration)).tolist()
+        while stack:
+            node = stack.pop()
+            if critical[node]:
+                continue
+            critical[node] = True
+            if resource_delayed[node]:
+                drivers = released_at.get((self.resources[node], float(start[node])), [])
+            else:
+                drivers = precedence_drivers[node]
+            stack.extend(d for d in drivers if not critical[d])
+
+        return critical
+
+    @staticmethod
+    def _find_resource_slot(usage: Dict, res: str, t: int, d: int, demand: float, cap: float) -> int:
+        """Earliest day >= t with d consecutive days of spare capacity (vectorised gap search)"""
+
+        window = max(4 * d, 256)
+
+        while True:
+            profile = usage[res]
+            if t + window > len(profile):
+                profile = np.concatenate([profile, np.zeros(max(len(profile), t + window - len(profile)))])
+                usage[res] = profile
+
+            blocked = np.flatnonzero(profile[t:t + window] + demand > cap + 1e-9)
+            if not len(blocked):
+                return t
+
+            gap_starts = np.concatenate(([0], blocked + 1))
+            gap_ends = np.concatenate((blocked, [window]))
+            fits = np.flatnonzero(gap_ends - gap_starts >= d)
+            if len(fits):
+                return t + int(gap_starts[fits[0]])
+
+            # The trailing gap may continue past the window; widen the next scan
+            t += int(gap_starts[-1])
+            window *= 2
+
+def create_task_graph_gantt(schedule: pd.DataFrame, start_col: str = 'early_start',
+                            finish_col: str = 'early_finish', max_tasks: int = 150,
+                            critical_col: str = 'critical', note_col: str = 'slack_days',
+                            note_label: str = 'Slack') -> go.Figure:
+    """Create a Gantt chart (days from project start) highlighting critical tasks"""
+
+    if len(schedule) > max_tasks:
+        # Keep every critical task, fill the rest with the earliest starting tasks
+        critical = schedule[schedule[critical_col]]
+        others = schedule[~schedule[critical_col]].nsmallest(max(0, max_tasks - len(critical)), start_col)
+        schedule = pd.concat([critical, others]).head(max_tasks)
+
+    schedule = schedule.sort_values(start_col, ascending=False)
+    durations = (schedule[finish_col] - schedule[start_col]).tolist()
+    slack_text = [f"{note_label}: {s:.1f} days" for s in schedule[note_col]]
+
     fig = go.Figure()
-    
-    for i, phase in enumerate(phases):
+
+    for is_critical, label, color in [(True, 'Critical Path', '#e53e3e'), (False, 'Non-critical', '#3182ce')]:
+        mask = (schedule[critical_col] == is_critical).tolist()
+        if not any(mask):
+            continue
+
         fig.add_trace(go.Bar(
-            name=phase['name'],
-            x=[phase['name']],
-            y=[phase['duration']],
-            text=f"{phase['duration']} weeks",
-            textposition='auto'
+            y=[n for n, m in zip(schedule['name'], mask) if m],
+            x=[d for d, m in zip(durations, mask) if m],
+            base=[s for s, m in zip(schedule[start_col], mask) if m],
+            orientation='h',
+            name=label,
+            marker_color=color,
+            text=[t for t, m in zip(slack_text, mask) if m],
+            hovertemplate='<b>%{y}</b><br>Start: day %{base:.0f}<br>Duration: %{x:.0f} days<br>%{text}<extra></extra>'
         ))
-    
+
     fig.update_layout(
-        title='Migration Phase Duration',
-        xaxis_title='Phase',
-        yaxis_title='Duration (weeks)',
-        showlegend=False,
-        height=400,
-        xaxis_tickangle=-45
+        title='Migration Schedule (Gantt)',
+        xaxis_title='Days from Project Start',
+        barmode='overlay',
+        height=max(400, 28 * len(schedule) + 120),
+        yaxis=dict(automargin=True)
     )
-    
+
     return fig
 
+def show_task_graph_analysis(migration_params: Dict):
+    """Show dependency-graph ingestion, critical path and resource-levelled Gantt"""
+
+    st.markdown("#### 🗺️ Dependency Graph & Critical Path")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        tasks_file = st.file_uploader(
+            "Task CSV (task_id, name, duration_days, resource, resource_units, depends_on)",
+            type=['csv'], key="task_graph_tasks"
+        )
+
+    with col2:
+        edges_file = st.file_uploader(
+            "Dependency Edges CSV (predecessor, successor) - optional",
+            type=['csv'], key="task_graph_edges"
+        )
+
+    try:
+        if tasks_file is not None:
+            graph = MigrationTaskGraph.from_dataframes(
+                pd.read_csv(tasks_file),
+                pd.read_csv(edges_file) if edges_file is not None else None
+            )
+        else:
+            graph = MigrationTaskGraph.default_migration_plan(migration_params)
+    except Exception as e:
+        st.error(f"Error loading task graph: {str(e)}")
+        return
+
+    resource_names = sorted(set(r for r in graph.resources if r is not None))
+    resource_capacity = {}
+
+    if resource_names:
+        cols = st.columns(min(len(resource_names), 4))
+        for i, res in enumerate(resource_names):
+            with cols[i % len(cols)]:
+                resource_capacity[res] = st.number_input(
+                    f"Capacity: {res}", min_value=1,
+                    value=int(migration_params.get('team_size', 5)) if res == 'team' else 5,
+                    key=f"task_graph_capacity_{res}"
+                )
+
+    cpm = graph.compute_critical_path()
+    levelled = graph.resource_levelled_schedule(resource_capacity, cpm)
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("Tasks", f"{cpm['task_count']:,}")
+    with col2:
+        st.metric("Critical Path", f"{cpm['project_duration_days'] / 7:.1f} weeks")
+    with col3:
+        st.metric("Resource-Levelled", f"{levelled['project_duration_days'] / 7:.1f} weeks",
+                  delta=f"+{(levelled['project_duration_days'] - cpm['project_duration_days']) / 7:.1f} weeks",
+                  delta_color="inverse")
+    with col4:
+        st.metric("Critical Tasks", f"{int(cpm['schedule']['critical'].sum()):,}")
+
+    if cpm['dependency_cycles']:
+        st.warning(f"⚠️ {len(cpm['dependency_cycles'])} tasks are on or behind a dependency cycle and were not scheduled")
+    if cpm['missing_dependencies']:
+        st.warning(f"⚠️ {len(cpm['missing_dependencies'])} dependencies reference unknown tasks and were ignored")
+
+    view = st.radio("Schedule View", ["Resource-Levelled", "Critical Path (unconstrained)"],
+                    horizontal=True, key="task_graph_view")
+
+    if view == "Resource-Levelled":
+        # Levelling moves the critical chain, so highlight what is critical in the levelled schedule
+        gantt = create_task_graph_gantt(levelled['schedule'], 'levelled_start', 'levelled_finish',
+                                        critical_col='levelled_critical', note_col='levelling_delay_days',
+                                        note_label='Levelling delay')
+    else:
+        gantt = create_task_graph_gantt(cpm['schedule'])
+
+    st.plotly_chart(gantt, use_container_width=True, key="task_graph_gantt")
+
+    with st.expander("🔍 Critical Path & Slack"):
+        st.markdown(" → ".join(cpm['critical_path'][:50]) + (" → ..." if len(cpm['critical_path']) > 50 else ""))
+        st.dataframe(
+            levelled['schedule'].sort_values('slack_days').head(500),
+            use_container_width=True, hide_index=True
+        )
+
 # ===========================
 # PDF REPORT GENERATION
 # ===========================
@@ -8309,7 +13581,8 @@ def initialize_session_state():
         'vrops_analyzer': None,        
         'enhanced_cost_chart': None,
         'growth_analysis': None,
-        'growth_projections': None
+        'growth_projections': None,
+        'wave_plan': None
     
     }
     
@@ -8360,6 +13633,8 @@ def main():
     """Main Streamlit application"""
     
     initialize_session_state()
+    activate_session_results()
+    restore_background_job_results()
     
     # Header
     st.markdown("""
@@ -8383,6 +13658,9 @@ def main():
                 "📄 Reports & Export"
             ]
         )
+        show_background_jobs_panel()
+        show_timing_panel()
+    restore_session_results(page)
     
     if hasattr(st.session_state, 'vrops_analysis') and st.session_state.vrops_analysis:
         st.success("✅ vROps analysis complete")
@@ -8471,22 +13749,29 @@ def main():
                 st.write("Enhanced data:", is_enhanced_environment_data(st.session_state.environment_specs))
     
     # Main content area - THIS IS THE KEY FIX
-    if page == "🔧 Migration Configuration":
-        show_migration_configuration()
-    elif page == "📊 Environment Setup":
-        show_enhanced_environment_setup_with_cluster_config()
-    elif page == "🌐 Network Analysis":
-        show_network_transfer_analysis()
-    elif page == "🚀 Analysis & Recommendations":
-        show_analysis_section_fixed()
-    elif page == "📈 Results Dashboard":
-        show_results_dashboard()
-    elif page == "📄 Reports & Export":
-        show_reports_section()
-    else:
-        # Default page
-        st.markdown("## Welcome to the AWS Database Migration Tool")
-        st.markdown("Please select a section from the sidebar to get started.")
+    timing = TimingRecorder(f"page: {page}")
+    try:
+        with timing.activate():
+            if page == "🔧 Migration Configuration":
+                show_migration_configuration()
+            elif page == "📊 Environment Setup":
+                show_enhanced_environment_setup_with_cluster_config()
+            elif page == "🌐 Network Analysis":
+                show_network_transfer_analysis()
+            elif page == "🚀 Analysis & Recommendations":
+                show_analysis_section_fixed()
+            elif page == "📈 Results Dashboard":
+                show_results_dashboard()
+            elif page == "📄 Reports & Export":
+                show_reports_section()
+            else:
+                # Default page
+                st.markdown("## Welcome to the AWS Database Migration Tool")
+                st.markdown("Please select a section from the sidebar to get started.")
+    finally:
+        # Also runs on st.rerun/st.stop, so the session's memory budget holds between runs
+        checkpoint_session_results()
+        record_timing_run(timing.snapshot())
 
 def show_migration_configuration():
     """Show migration configuration interface with growth planning"""
@@ -8626,6 +13911,12 @@ def show_migration_configuration():
         help="Provide your Anthropic API key for AI-powered insights"
     )
     
+    ai_cache_bucket_numbers = st.checkbox(
+        "Reuse AI insights for near-identical analyses",
+        value=False,
+        help="Round costs and sizes to two significant digits when matching cached AI responses"
+    )
+    
     if st.button("💾 Save Configuration", type="primary", use_container_width=True):
         st.session_state.migration_params = {
             'source_engine': source_engine,
@@ -8641,6 +13932,7 @@ def show_migration_configuration():
             'bandwidth_mbps': bandwidth_mbps,
             'migration_budget': migration_budget,
             'anthropic_api_key': anthropic_api_key,
+            'ai_cache_bucket_numbers': ai_cache_bucket_numbers,
             'estimated_migration_cost': 0,
             # ADD THESE NEW GROWTH PARAMETERS:
             'annual_data_growth': annual_data_growth,
@@ -8975,6 +14267,13 @@ def show_analysis_section_fixed():
     else:
         st.info("📊 Standard configuration detected - Basic RDS analysis will be performed")
     
+    run_in_background = st.checkbox(
+        "⏳ Run in background",
+        value=True,
+        key="analysis_in_background",
+        help="Keep the analysis running while you use other widgets; results are kept if the page is refreshed"
+    )
+    
     # Run analysis - USE THE FIXED FUNCTION
     if st.button("🚀 Run Comprehensive Analysis", type="primary", use_container_width=True):
         # Clear any previous results
@@ -8982,8 +14281,23 @@ def show_analysis_section_fixed():
         if hasattr(st.session_state, 'enhanced_analysis_results'):
             st.session_state.enhanced_analysis_results = None
         
-        with st.spinner("🔄 Analyzing migration requirements..."):
-            run_streamlit_migration_analysis()  # Use the fixed function
+        if run_in_background:
+            start_background_job(
+                'analysis', analysis_pipeline_job, get_analysis_pipeline('standard'),
+                copy.deepcopy(st.session_state.environment_specs), copy.deepcopy(st.session_state.migration_params),
+                ANALYSIS_PIPELINE_TARGETS, label="Comprehensive analysis"
+            )
+        else:
+            with st.spinner("🔄 Analyzing migration requirements..."):
+                run_streamlit_migration_analysis()  # Use the fixed function
+    
+    def show_completed_analysis(job):
+        if st.session_state.analysis_results:
+            st.success(f"✅ Analysis complete ({job['finished_at'] - job['started_at']:.1f}s in background)")
+            show_simple_analysis_summary()
+            st.info("📈 View detailed results in the 'Results Dashboard' section")
+    
+    show_background_job('analysis', on_complete=show_completed_analysis)
 
 # ADD THIS FUNCTION to your streamlit_app.py file:
 
@@ -8991,50 +14305,22 @@ def run_streamlit_migration_analysis():
     """Run migration analysis - FIXED VERSION without auto-rerun"""
     
     try:
-        # Initialize analyzer
         anthropic_api_key = st.session_state.migration_params.get('anthropic_api_key')
-        analyzer = MigrationAnalyzer(anthropic_api_key)
-        
-        # Step 1: Calculate recommendations
-        st.write("📊 Calculating instance recommendations...")
-        recommendations = analyzer.calculate_instance_recommendations(st.session_state.environment_specs)
-        st.session_state.recommendations = recommendations
-        
-        # Step 2: Calculate costs
-        st.write("💰 Analyzing costs...")
-        cost_analysis = analyzer.calculate_migration_costs(recommendations, st.session_state.migration_params)
-        st.session_state.analysis_results = cost_analysis
-        
-        # Step 3: Risk assessment
-        st.write("⚠️ Assessing risks...")
-        risk_assessment = create_default_risk_assessment()
-        st.session_state.risk_assessment = risk_assessment
         
-        # Step 4: Growth Analysis - NO AUTO-RERUN
-        st.write("📈 Calculating 3-year growth projections...")
-        growth_analyzer = GrowthAwareCostAnalyzer()
-        growth_analysis = growth_analyzer.calculate_3_year_growth_projection(
-            cost_analysis, st.session_state.migration_params
-        )
-        st.session_state.growth_analysis = growth_analysis
+        # Steps 1-5: recommendations, costs, risk, growth and AI insights - NO AUTO-RERUN.
+        # Stages whose inputs are unchanged since the last run are reused instead of recomputed
+        outputs = run_analysis_pipeline('standard', targets=ANALYSIS_PIPELINE_TARGETS)
         
         # Generate a new chart session ID to ensure unique keys
         import time
         st.session_state.chart_session_id = int(time.time())
         
-        # Step 5: AI insights
         if anthropic_api_key:
-            st.write("🤖 Generating AI insights...")
-            try:
-                ai_insights = asyncio.run(analyzer.generate_ai_insights(cost_analysis, st.session_state.migration_params))
-                st.session_state.ai_insights = ai_insights
+            ai_insights = outputs.get('ai_insights') or {}
+            if 'error' in ai_insights:
+                st.warning(f"AI insights failed: {ai_insights['error']}")
+            else:
                 st.success("✅ AI insights generated")
-            except Exception as e:
-                st.warning(f"AI insights failed: {str(e)}")
-                st.session_state.ai_insights = {
-                    'summary': f"Migration analysis complete. Monthly cost: ${cost_analysis['monthly_aws_cost']:,.0f}",
-                    'error': str(e)
-                }
         else:
             st.info("ℹ️ Provide Anthropic API key for AI insights")
         
@@ -9240,15 +14526,18 @@ def show_results_dashboard():
             show_basic_cost_summary()
 
     with tab5:
-        show_environment_analysis_tab()
+        show_risk_assessment_tab()
 
     with tab6:
-        show_visualizations_tab()
+        show_environment_analysis_tab()
 
     with tab7:
-        show_ai_insights_tab()
+        show_visualizations_tab()
 
     with tab8:
+        show_ai_insights_tab()
+
+    with tab9:
         show_timeline_analysis_tab()
 
 def show_basic_cost_summary():
@@ -9462,6 +14751,8 @@ def show_growth_analysis_dashboard():
         for rec in default_recommendations:
             st.markdown(rec)
 
+    show_reserved_capacity_plan()
+
 def show_risk_assessment_tab():
     """Show risk assessment results"""
     
@@ -9589,9 +14880,60 @@ def show_visualizations_tab():
     except Exception as e:
         st.error(f"Error creating visualizations: {str(e)}")
 
+AI_INSIGHT_SECTIONS = [
+    ('executive_summary', '📝 Executive Summary'),
+    ('cost_optimization', '💰 Cost Optimization'),
+    ('risk_mitigation', '⚠️ Risk Mitigation'),
+    ('migration_strategy', '🧭 Migration Strategy'),
+    ('timeline_recommendations', '📅 Timeline Recommendations'),
+    ('technical_considerations', '🔧 Technical Considerations'),
+    ('post_migration_optimization', '🚀 Post-Migration Optimization'),
+]
+
+def stream_live_ai_insights(api_key: str, cost_analysis: Dict, migration_params: Dict) -> Dict:
+    """Stream Claude insights into per-category placeholders as paragraphs complete"""
+    
+    analyzer = StreamlitClaudeAIAnalyzer(api_key, bucket_numbers=migration_params.get('ai_cache_bucket_numbers', False))
+    
+    status = st.empty()
+    status.info("⚡ Waiting for first insight...")
+    
+    placeholders = {}
+    for key, title in AI_INSIGHT_SECTIONS:
+        st.markdown(f"#### {title}")
+        placeholders[key] = st.empty()
+    
+    streamed_text = {key: '' for key, _ in AI_INSIGHT_SECTIONS}
+    first_paragraph = []
+    
+    def on_section(category, paragraph):
+        # Same rule as _structure_ai_response, so the final view matches: unclassified paragraphs are dropped,
+        # and the first paragraph stands in for the executive summary until one is classified as such
+        if not first_paragraph:
+            first_paragraph.append(paragraph)
+            if category != 'executive_summary':
+                placeholders['executive_summary'].markdown(paragraph)
+        if category:
+            streamed_text[category] += paragraph + '\n\n'
+            placeholders[category].markdown(streamed_text[category])
+        status.info(f"⚡ Streaming... {sum(1 for text in streamed_text.values() if text)} sections received")
+    
+    insights = analyzer.stream_ai_insights(cost_analysis, migration_params, on_section=on_section)
+    status.empty()
+    
+    return insights
+
 def show_ai_insights_tab():
     """Show AI insights if available"""
     
+    params = st.session_state.migration_params or {}
+    cost_analysis = getattr(st.session_state, 'analysis_results', None)
+    
+    if params.get('anthropic_api_key') and cost_analysis:
+        if st.button("⚡ Stream Live AI Insights", key="stream_ai_insights"):
+            st.markdown("### 🤖 AI-Powered Insights (Live)")
+            st.session_state.ai_insights = stream_live_ai_insights(params['anthropic_api_key'], cost_analysis, params)
+    
     if hasattr(st.session_state, 'ai_insights') and st.session_state.ai_insights:
         st.markdown("### 🤖 AI-Powered Insights")
         
@@ -9601,6 +14943,17 @@ def show_ai_insights_tab():
             st.warning(f"AI insights partially available: {insights.get('summary', 'Analysis complete')}")
             st.error(f"Error: {insights['error']}")
         else:
+            streaming = insights.get('streaming')
+            if streaming:
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    first_insight = streaming.get('time_to_first_insight')
+                    st.metric("Time to First Insight", f"{first_insight:.1f}s" if first_insight is not None else "N/A")
+                with col2:
+                    st.metric("Total Response Time", f"{streaming.get('total_time', 0):.1f}s")
+                with col3:
+                    st.metric("Sections Streamed", streaming.get('sections_streamed', 0))
+            
             # Show AI insights
             if 'summary' in insights:
                 st.markdown("#### 📝 Executive Summary")
@@ -9611,11 +14964,92 @@ def show_ai_insights_tab():
                 for rec in insights['recommendations']:
                     st.markdown(f"• {rec}")
             
-            if 'cost_optimization' in insights:
-                st.markdown("#### 💰 Cost Optimization")
-                st.write(insights['cost_optimization'])
+            if insights.get('key_recommendations'):
+                st.markdown("#### 💡 Key Recommendations")
+                for rec in insights['key_recommendations']:
+                    st.markdown(f"• {rec}")
+            
+            for key, title in AI_INSIGHT_SECTIONS:
+                if key == 'executive_summary' and 'summary' in insights:
+                    continue
+                if insights.get(key):
+                    st.markdown(f"#### {title}")
+                    st.write(insights[key])
     else:
         st.info("🤖 AI insights not available. Provide an Anthropic API key in the configuration to enable AI-powered analysis.")
+    
+    if cost_analysis and cost_analysis.get('environment_costs'):
+        show_portfolio_ai_insights(cost_analysis, params)
+
+def show_portfolio_ai_insights(cost_analysis: Dict, params: Dict):
+    """Per-environment-group AI insights for large portfolios"""
+    
+    st.markdown("---")
+    st.markdown("#### 🏢 Portfolio Insights by Environment Group")
+    
+    recommendations = getattr(st.session_state, 'enhanced_recommendations', None) or getattr(st.session_state, 'recommendations', None) or {}
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        tokens_per_batch = st.number_input("Token budget per request", min_value=500, max_value=8000, value=2500, step=500,
+                                           key="portfolio_ai_tokens_per_batch")
+    with col2:
+        requests_per_minute = st.number_input("Requests per minute", min_value=1, max_value=500, value=50,
+                                              key="portfolio_ai_rpm")
+    
+    if st.button("🏢 Generate Portfolio Insights", key="generate_portfolio_ai_insights"):
+        analyzer = PortfolioAIInsightsAnalyzer(
+            params.get('anthropic_api_key'),
+            tokens_per_batch=int(tokens_per_batch),
+            requests_per_minute=int(requests_per_minute)
+        )
+        with st.spinner("Grouping environments and generating insights..."):
+            st.session_state.portfolio_ai_insights = asyncio.run(
+                analyzer.generate_portfolio_insights(cost_analysis, recommendations, params)
+            )
+    
+    portfolio = getattr(st.session_state, 'portfolio_ai_insights', None)
+    if not portfolio or not portfolio.get('groups'):
+        return
+    
+    if 'error' in portfolio:
+        st.info(f"ℹ️ {portfolio['error']}")
+    
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Environments", f"{portfolio['environment_count']:,}")
+    with col2:
+        st.metric("Groups / Requests", f"{portfolio['group_count']} / {portfolio['batch_count']}")
+    with col3:
+        st.metric("Est. Input Tokens", f"{portfolio['estimated_input_tokens']:,}")
+    with col4:
+        st.metric("Wall Time", f"{portfolio['wall_time']:.1f}s")
+    
+    groups_df = pd.DataFrame([{
+        'Group': g['group_id'],
+        'Type': g['environment_type'].title(),
+        'Family': g['instance_family'],
+        'Tier': g['cost_tier'].title(),
+        'Environments': g['environments'],
+        'Monthly Cost': f"${g['total_monthly']:,.0f}",
+        'Source': g['source']
+    } for g in portfolio['groups']])
+    st.dataframe(groups_df, use_container_width=True, hide_index=True)
+    
+    for group in portfolio['groups']:
+        with st.expander(f"{group['group_id']} · {group['environment_type'].title()} · {group['instance_family']} · "
+                         f"{group['environments']} environments"):
+            for finding in group['findings']:
+                st.markdown(f"• {finding}")
+    
+    environment = st.selectbox("Findings for environment", sorted(portfolio['environment_groups']),
+                               key="portfolio_ai_environment")
+    if environment:
+        group_id = portfolio['environment_groups'][environment]
+        group = next(g for g in portfolio['groups'] if g['group_id'] == group_id)
+        st.markdown(f"**{environment}** is in group **{group_id}**:")
+        for finding in group['findings']:
+            st.markdown(f"• {finding}")
 
 def show_timeline_analysis_tab():
     """Show migration timeline analysis"""
@@ -9689,6 +15123,8 @@ def show_timeline_analysis_tab():
         weekly_budget = budget / timeline_weeks if timeline_weeks > 0 else 0
         st.write(f"Weekly Budget: ${weekly_budget:,.0f}")
 
+    show_task_graph_analysis(params)
+
 def show_reports_section():
     """Show reports and export section - ROBUST VERSION"""
     
@@ -9730,6 +15166,16 @@ def show_reports_section():
         recommendations = getattr(st.session_state, 'recommendations', {})
         st.info("📊 Using Standard Analysis Results")
     
+    # Identical inputs produce identical reports, so artifacts are served from the disk cache.
+    # Prefer the pipeline's digest of the results actually shown; it is unaffected by unsaved edits
+    report_digest = (getattr(st.session_state, 'report_digests', None) or {}).get(
+        'enhanced' if has_enhanced_results else 'standard'
+    ) or report_inputs_digest(
+        st.session_state.environment_specs,
+        st.session_state.migration_params,
+        results_source='enhanced' if has_enhanced_results else 'standard'
+    )
+    
     # Report generation options
     st.markdown("### 📊 Available Reports")
     
@@ -9747,15 +15193,15 @@ def show_reports_section():
         if st.button("📄 Generate Executive PDF", key="exec_pdf", use_container_width=True):
             with st.spinner("Generating executive summary..."):
                 try:
-                    pdf_buffer = generate_executive_summary_pdf_robust(
-                        results,
-                        st.session_state.migration_params
+                    pdf_bytes = report_artifact_cache.get_or_create(
+                        report_digest, 'executive_summary.pdf',
+                        lambda: generate_executive_summary_pdf_robust(results, st.session_state.migration_params)
                     )
                     
-                    if pdf_buffer:
+                    if pdf_bytes:
                         st.download_button(
                             label="📥 Download Executive Summary",
-                            data=pdf_buffer.getvalue(),
+                            data=pdf_bytes,
                             file_name=f"AWS_Migration_Executive_Summary_{datetime.now().strftime('%Y%m%d')}.pdf",
                             mime="application/pdf",
                             use_container_width=True
@@ -9777,16 +15223,15 @@ def show_reports_section():
         if st.button("📄 Generate Technical PDF", key="tech_pdf", use_container_width=True):
             with st.spinner("Generating technical report..."):
                 try:
-                    pdf_buffer = generate_technical_report_pdf_robust(
-                        results,
-                        recommendations,
-                        st.session_state.migration_params
+                    pdf_bytes = report_artifact_cache.get_or_create(
+                        report_digest, 'technical_report.pdf',
+                        lambda: generate_technical_report_pdf_robust(results, recommendations, st.session_state.migration_params)
                     )
                     
-                    if pdf_buffer:
+                    if pdf_bytes:
                         st.download_button(
                             label="📥 Download Technical Report",
-                            data=pdf_buffer.getvalue(),
+                            data=pdf_bytes,
                             file_name=f"AWS_Migration_Technical_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
                             mime="application/pdf",
                             use_container_width=True
@@ -9807,12 +15252,14 @@ def show_reports_section():
         
         if st.button("📊 Export Data (CSV)", key="csv_export", use_container_width=True):
             try:
+                def build_csv():
+                    csv_data = prepare_csv_export_data(results, recommendations)
+                    return csv_data.to_csv(index=False).encode('utf-8') if csv_data is not None else None
+                
                 # Prepare CSV data
-                csv_data = prepare_csv_export_data(results, recommendations)
+                csv_string = report_artifact_cache.get_or_create(report_digest, 'analysis_data.csv', build_csv)
                 
-                if csv_data:
-                    csv_string = csv_data.to_csv(index=False)
-                    
+                if csv_string:
                     st.download_button(
                         label="📥 Download CSV Data",
                         data=csv_string,
@@ -9829,24 +15276,47 @@ def show_reports_section():
     st.markdown("---")
     st.markdown("### 📦 Bulk Download")
     
+    stream_to_disk = st.checkbox(
+        "💾 Stream bundle to disk",
+        value=True,
+        key="bulk_reports_streaming",
+        help="Write each report into the ZIP as it is produced instead of holding the whole bundle in memory"
+    )
+    
     if st.button("📊 Generate All Reports", key="bulk_reports", use_container_width=True):
-        with st.spinner("Generating all reports... This may take a moment..."):
-            try:
-                # Create ZIP file with all reports
-                zip_buffer = create_bulk_reports_zip(results, recommendations, st.session_state.migration_params)
-                
-                if zip_buffer:
-                    st.download_button(
-                        label="📥 Download All Reports (ZIP)",
-                        data=zip_buffer.getvalue(),
-                        file_name=f"AWS_Migration_Complete_Analysis_{datetime.now().strftime('%Y%m%d')}.zip",
-                        mime="application/zip",
-                        use_container_width=True
-                    )
-                else:
-                    st.error("Failed to generate reports package")
-            except Exception as e:
-                st.error(f"Error generating bulk reports: {str(e)}")
+        # Rendered by a background job so the page stays usable and the bundle survives reruns
+        start_background_job(
+            'reports', bulk_reports_job, results, recommendations, copy.deepcopy(st.session_state.migration_params),
+            report_digest, stream_to_disk, label="All reports bundle"
+        )
+    
+    def show_completed_bundle(job):
+        zip_path = job['result']['zip_path']
+        if job['result']['report_digest'] != report_digest:
+            st.info("ℹ️ The analysis changed since this bundle was generated; generate it again for current results")
+        if not os.path.exists(zip_path):
+            st.warning("⚠️ The generated bundle has been evicted from the report cache; please generate it again")
+            return
+        
+        def read_bundle():
+            with open(zip_path, 'rb') as zip_file:
+                return zip_file.read()
+        
+        download_args = dict(
+            label="📥 Download All Reports (ZIP)",
+            file_name=f"AWS_Migration_Complete_Analysis_{datetime.now().strftime('%Y%m%d')}.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
+        try:
+            # Deferred download: the ZIP is read from the cache when clicked, not on every rerun of the page
+            st.download_button(data=read_bundle, **download_args)
+        except StreamlitAPIException:
+            # Streamlit releases without deferred downloads only load the bundle after an explicit request
+            if st.button("📦 Prepare ZIP Download", key="prepare_bundle_download", use_container_width=True):
+                st.download_button(data=read_bundle(), **download_args)
+    
+    show_background_job('reports', on_complete=show_completed_bundle)
 
 def prepare_csv_export_data(results, recommendations):
     """Prepare CSV data for export"""
@@ -9889,6 +15359,7 @@ def prepare_csv_export_data(results, recommendations):
         print(f"Error preparing CSV data: {e}")
         return None
 
+@traced('reports')
 def generate_executive_summary_pdf_robust(results, migration_params):
     """Generate executive summary PDF - ROBUST VERSION"""
     
@@ -9964,6 +15435,7 @@ def generate_executive_summary_pdf_robust(results, migration_params):
         print(f"Error generating executive PDF: {e}")
         return None
 
+@traced('reports')
 def generate_technical_report_pdf_robust(results, recommendations, migration_params):
     """Generate technical report PDF - ROBUST VERSION"""
     
@@ -10040,7 +15512,190 @@ def generate_technical_report_pdf_robust(results, recommendations, migration_par
         print(f"Error generating technical PDF: {e}")
         return None
 
-def create_bulk_reports_zip(results, recommendations, migration_params):
+@traced('reports')
+def generate_environment_report_pdf_robust(env_name, env_costs, env_recommendation, migration_params):
+    """Generate a single-environment PDF report - ROBUST VERSION"""
+
+    try:
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.75*inch, bottomMargin=0.75*inch)
+
+        styles = getSampleStyleSheet()
+        story = []
+
+        story.append(Paragraph(f"AWS Database Migration - {env_name} Environment", styles['Title']))
+        story.append(Paragraph(f"Generated: {datetime.now().strftime('%B %d, %Y')}", styles['Normal']))
+        story.append(Spacer(1, 20))
+
+        # Recommended configuration
+        story.append(Paragraph("Recommended Configuration", styles['Heading2']))
+
+        env_recommendation = env_recommendation or {}
+        if 'writer' in env_recommendation:  # Enhanced recommendations
+            writer = env_recommendation['writer']
+            readers = env_recommendation.get('readers', {})
+            storage = env_recommendation.get('storage', {})
+            config_data = [
+                ['Parameter', 'Value'],
+                ['Target Engine', migration_params.get('target_engine', 'N/A')],
+                ['Writer Instance', writer.get('instance_class', 'N/A')],
+                ['Writer Multi-AZ', 'Yes' if writer.get('multi_az') else 'No'],
+                ['Readers', f"{readers.get('count', 0)} x {readers.get('instance_class', 'N/A')}"],
+                ['Storage', f"{storage.get('size_gb', 0):,} GB {storage.get('type', '')}"],
+                ['Environment Type', str(env_recommendation.get('environment_type', 'N/A')).title()]
+            ]
+        else:  # Regular recommendations
+            config_data = [
+                ['Parameter', 'Value'],
+                ['Target Engine', migration_params.get('target_engine', 'N/A')],
+                ['Instance Class', env_recommendation.get('instance_class', 'N/A')],
+                ['Compute', f"{env_recommendation.get('cpu_cores', 'N/A')} cores, {env_recommendation.get('ram_gb', 'N/A')} GB"],
+                ['Storage', f"{env_recommendation.get('storage_gb', 0):,} GB"],
+                ['Multi-AZ', 'Yes' if env_recommendation.get('multi_az', False) else 'No'],
+                ['Environment Type', str(env_recommendation.get('environment_type', 'N/A')).title()]
+            ]
+
+        config_table = Table(config_data, colWidths=[2.5*inch, 3*inch])
+        config_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#4a5568')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+
+        story.append(config_table)
+        story.append(Spacer(1, 20))
+
+        # Monthly cost breakdown
+        story.append(Paragraph("Monthly Cost Breakdown", styles['Heading2']))
+
+        env_costs = env_costs if isinstance(env_costs, dict) else {'total_monthly': float(env_costs or 0)}
+        cost_rows = [
+            ('Instance / Writer', env_costs.get('instance_cost', env_costs.get('writer_instance_cost', 0))),
+            ('Readers', env_costs.get('reader_costs', 0)),
+            ('Storage', env_costs.get('storage_cost', 0)),
+            ('Backup', env_costs.get('backup_cost', 0)),
+        ]
+        total_monthly = env_costs.get('total_monthly', sum(cost for _, cost in cost_rows))
+
+        cost_data = [['Component', 'Monthly', 'Annual']]
+        cost_data.extend([label, f"${cost:,.2f}", f"${cost * 12:,.2f}"] for label, cost in cost_rows if cost)
+        cost_data.append(['Total', f"${total_monthly:,.2f}", f"${total_monthly * 12:,.2f}"])
+
+        cost_table = Table(cost_data, colWidths=[2.5*inch, 1.5*inch, 1.5*inch])
+        cost_table.setStyle(TableStyle([
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#38a169')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+            ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+        ]))
+
+        story.append(cost_table)
+
+        doc.build(story)
+        return buffer.getvalue()
+
+    except Exception as e:
+        print(f"Error generating {env_name} environment PDF: {e}")
+        return None
+
+# ===========================
+# PARALLEL REPORT PIPELINE
+# ===========================
+
+def _render_report_chunk(job_kind: str, jobs: List[Dict]) -> List[Tuple[str, Optional[bytes]]]:
+    """Worker entry point: render a chunk of report jobs in one process"""
+
+    outputs = []
+
+    if job_kind == 'environment':
+        for job in jobs:
+            outputs.append((job['name'], generate_environment_report_pdf_robust(
+                job['name'], job['env_costs'], job['recommendation'], job['migration_params']
+            )))
+
+    else:
+        raise ValueError(f"Unknown report job kind: {job_kind}")
+
+    return outputs
+
+def iter_parallel_report_jobs(job_kind: str, jobs: List[Dict], max_workers: Optional[int] = None):
+    """Yield (name, pdf_bytes) as report chunks finish, rendering across a process pool"""
+
+    total = len(jobs)
+    if total == 0:
+        return
+
+    max_workers = max(1, min(max_workers or os.cpu_count() or 1, total))
+
+    # A few chunks per worker keeps all cores busy without per-report IPC overhead
+    chunk_size = max(1, -(-total // (max_workers * 4)))
+    chunks = [jobs[i:i + chunk_size] for i in range(0, total, chunk_size)]
+    done = set()
+
+    if max_workers > 1:
+        try:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            import multiprocessing
+
+            # Forking the multithreaded server (or a background job thread) can deadlock a worker on a
+            # lock held by another thread, so workers start from a fresh interpreter and import the app script
+            mp_context = multiprocessing.get_context('spawn')
+
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=mp_context) as executor:
+                futures = [executor.submit(_render_report_chunk, job_kind, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    for name, pdf_bytes in future.result():
+                        done.add(name)
+                        yield name, pdf_bytes
+            return
+
+        except Exception as e:
+            print(f"Parallel report generation unavailable, rendering serially: {e}")
+
+    for chunk in chunks:
+        remaining = [job for job in chunk if job['name'] not in done]
+        if remaining:
+            for name, pdf_bytes in _render_report_chunk(job_kind, remaining):
+                done.add(name)
+                yield name, pdf_bytes
+
+def run_parallel_report_jobs(job_kind: str, jobs: List[Dict], max_workers: Optional[int] = None,
+                             progress_callback=None) -> Dict[str, Optional[bytes]]:
+    """Render report jobs across a process pool, falling back to serial rendering"""
+
+    results = {}
+    for name, pdf_bytes in iter_parallel_report_jobs(job_kind, jobs, max_workers):
+        results[name] = pdf_bytes
+        if progress_callback:
+            progress_callback(len(results), len(jobs))
+
+    return results
+
+def build_environment_report_jobs(results, recommendations, migration_params) -> List[Dict]:
+    """One report job per environment in the cost results"""
+
+    env_costs = results.get('environment_costs', {}) if results else {}
+    return [
+        {
+            'name': env_name,
+            'env_costs': costs,
+            'recommendation': (recommendations or {}).get(env_name, {}),
+            'migration_params': migration_params or {}
+        }
+        for env_name, costs in env_costs.items()
+    ]
+
+def generate_environment_reports_parallel(results, recommendations, migration_params, max_workers=None, progress_callback=None):
+    """Render one PDF per environment in parallel"""
+
+    jobs = build_environment_report_jobs(results, recommendations, migration_params)
+    return run_parallel_report_jobs('environment', jobs, max_workers, progress_callback)
+
+def create_bulk_reports_zip(results, recommendations, migration_params, progress_callback=None):
     """Create ZIP file with all reports"""
     
     try:
@@ -10070,6 +15725,14 @@ def create_bulk_reports_zip(results, recommendations, migration_params):
                     f"Migration_Analysis_Data_{datetime.now().strftime('%Y%m%d')}.csv",
                     csv_data.to_csv(index=False)
                 )
+            
+            # Per-environment reports, rendered across a process pool
+            env_reports = generate_environment_reports_parallel(
+                results, recommendations, migration_params, progress_callback=progress_callback
+            )
+            for env_name, pdf_bytes in env_reports.items():
+                if pdf_bytes:
+                    zip_file.writestr(f"Environment_Reports/{env_name}_Report.pdf", pdf_bytes)
         
         zip_buffer.seek(0)
         return zip_buffer
@@ -10078,6 +15741,74 @@ def create_bulk_reports_zip(results, recommendations, migration_params):
         print(f"Error creating ZIP file: {e}")
         return None
 
+# PDFs are already deflate-compressed internally; recompressing them only costs CPU
+REPORT_ZIP_COMPRESSION = {
+    '.pdf': (zipfile.ZIP_STORED, None),
+    '.csv': (zipfile.ZIP_DEFLATED, 6)
+}
+
+def _zip_entry_compression(entry_name: str, compression_levels: Dict) -> Dict:
+    """ZipFile keyword arguments for an entry based on its extension"""
+    compress_type, compresslevel = compression_levels.get(
+        os.path.splitext(entry_name)[1].lower(), (zipfile.ZIP_DEFLATED, 6)
+    )
+    return {'compress_type': compress_type, 'compresslevel': compresslevel}
+
+def create_bulk_reports_zip_streaming(results, recommendations, migration_params, progress_callback=None,
+                                      compression_levels=None, spool_max_size=32 * 1024 * 1024):
+    """Create ZIP of all reports incrementally in a spooled temp file - memory stays flat"""
+    
+    compression_levels = {**REPORT_ZIP_COMPRESSION, **(compression_levels or {})}
+    date_suffix = datetime.now().strftime('%Y%m%d')
+    
+    # Small bundles stay in memory; larger ones roll over to disk automatically
+    zip_file_obj = tempfile.SpooledTemporaryFile(max_size=spool_max_size, suffix='.zip')
+    
+    try:
+        with zipfile.ZipFile(zip_file_obj, 'w') as zip_file:
+            
+            def write_entry(entry_name, data):
+                zip_file.writestr(entry_name, data, **_zip_entry_compression(entry_name, compression_levels))
+            
+            # Each artifact is written as soon as it is produced and then released
+            exec_pdf = generate_executive_summary_pdf_robust(results, migration_params)
+            if exec_pdf:
+                write_entry(f"Executive_Summary_{date_suffix}.pdf", exec_pdf.getbuffer())
+            del exec_pdf
+            
+            tech_pdf = generate_technical_report_pdf_robust(results, recommendations, migration_params)
+            if tech_pdf:
+                write_entry(f"Technical_Report_{date_suffix}.pdf", tech_pdf.getbuffer())
+            del tech_pdf
+            
+            # CSV is streamed straight into its ZIP entry
+            csv_data = prepare_csv_export_data(results, recommendations)
+            if csv_data is not None:
+                csv_name = f"Migration_Analysis_Data_{date_suffix}.csv"
+                compression = _zip_entry_compression(csv_name, compression_levels)
+                # ZipFile.open(name, 'w') takes the archive-level compression settings
+                zip_file.compression = compression['compress_type']
+                zip_file.compresslevel = compression['compresslevel']
+                with zip_file.open(csv_name, 'w') as entry:
+                    with io.TextIOWrapper(entry, encoding='utf-8', newline='') as text_entry:
+                        csv_data.to_csv(text_entry, index=False)
+            
+            # Per-environment reports are written as each worker chunk completes
+            jobs = build_environment_report_jobs(results, recommendations, migration_params)
+            for completed, (env_name, pdf_bytes) in enumerate(iter_parallel_report_jobs('environment', jobs), 1):
+                if pdf_bytes:
+                    write_entry(f"Environment_Reports/{env_name}_Report.pdf", pdf_bytes)
+                if progress_callback:
+                    progress_callback(completed, len(jobs))
+        
+        zip_file_obj.seek(0)
+        return zip_file_obj
+        
+    except Exception as e:
+        print(f"Error creating streaming ZIP file: {e}")
+        zip_file_obj.close()
+        return None
+
 # Enhanced Environment Setup Interface
 def show_enhanced_environment_setup_with_cluster_config():
     """Enhanced environment setup with Writer/Reader configuration"""
@@ -10336,6 +16067,9 @@ def show_bulk_cluster_upload():
         - Storage specifications
         - Workload patterns
         - IOPS requirements
+        
+        Optional columns `Read_QPS`, `Write_QPS`, `Read_Service_Time_MS`, `Write_Service_Time_MS` and
+        `P95_Latency_SLO_MS` size writers and readers with an M/M/c queueing model against the latency SLO.
         """)
         
         # Generate enhanced template
@@ -10407,31 +16141,47 @@ def create_enhanced_cluster_template() -> pd.DataFrame:
 
 def process_cluster_data(df: pd.DataFrame) -> Dict:
     """Process uploaded cluster data"""
-    
-    environments = {}
-    
-    for _, row in df.iterrows():
-        env_name = str(row['Environment_Name'])
-        
-        environments[env_name] = {
-            'cpu_cores': int(row.get('CPU_Cores', 4)),
-            'ram_gb': int(row.get('RAM_GB', 16)),
-            'storage_gb': int(row.get('Storage_GB', 500)),
-            'iops_requirement': int(row.get('IOPS_Requirement', 3000)),
-            'peak_connections': int(row.get('Peak_Connections', 100)),
-            'daily_usage_hours': int(row.get('Daily_Usage_Hours', 24)),
-            'workload_pattern': str(row.get('Workload_Pattern', 'balanced')),
-            'read_write_ratio': int(row.get('Read_Write_Ratio', 70)),
-            'environment_type': str(row.get('Environment_Type', 'Production')).lower(),
-            'multi_az_writer': bool(row.get('Multi_AZ_Writer', True)),
-            'multi_az_readers': bool(row.get('Multi_AZ_Readers', False)),
-            'num_readers': int(row.get('Num_Readers', 1)) if pd.notna(row.get('Num_Readers')) else None,
-            'storage_encrypted': bool(row.get('Storage_Encrypted', True)),
-            'backup_retention': int(row.get('Backup_Retention_Days', 7)),
-            'auto_storage_scaling': bool(row.get('Auto_Storage_Scaling', True))
-        }
-    
-    return environments
+
+    def column(name, default):
+        # Missing columns and blank cells fall back to the template defaults
+        if name not in df.columns:
+            return pd.Series(default, index=df.index)
+        return df[name].fillna(default)
+
+    columns = {
+        'cpu_cores': column('CPU_Cores', 4).astype(int),
+        'ram_gb': column('RAM_GB', 16).astype(int),
+        'storage_gb': column('Storage_GB', 500).astype(int),
+        'iops_requirement': column('IOPS_Requirement', 3000).astype(int),
+        'peak_connections': column('Peak_Connections', 100).astype(int),
+        'daily_usage_hours': column('Daily_Usage_Hours', 24).astype(int),
+        'workload_pattern': column('Workload_Pattern', 'balanced').astype(str),
+        'read_write_ratio': column('Read_Write_Ratio', 70).astype(int),
+        'environment_type': column('Environment_Type', 'Production').astype(str).str.lower(),
+        'multi_az_writer': column('Multi_AZ_Writer', True).astype(bool),
+        'multi_az_readers': column('Multi_AZ_Readers', False).astype(bool),
+        'num_readers': pd.to_numeric(df['Num_Readers'], errors='coerce') if 'Num_Readers' in df.columns
+                       else pd.Series(np.nan, index=df.index),
+        'storage_encrypted': column('Storage_Encrypted', True).astype(bool),
+        'backup_retention': column('Backup_Retention_Days', 7).astype(int),
+        'auto_storage_scaling': column('Auto_Storage_Scaling', True).astype(bool)
+    }
+
+    # Optional measured load for queueing-model sizing; only carried when uploaded
+    for name, key in [('Read_QPS', 'read_qps'), ('Write_QPS', 'write_qps'),
+                      ('Read_Service_Time_MS', 'read_service_ms'), ('Write_Service_Time_MS', 'write_service_ms'),
+                      ('P95_Latency_SLO_MS', 'p95_latency_slo_ms')]:
+        if name in df.columns:
+            columns[key] = pd.to_numeric(df[name], errors='coerce')
+
+    records = pd.DataFrame(columns).astype(object)
+    records = records.where(records.notna(), None)
+    records['num_readers'] = pd.Series([int(n) if pd.notna(n) else None for n in columns['num_readers']],
+                                       index=df.index, dtype=object)
+    records.index = df['Environment_Name'].astype(str)
+    records = records[~records.index.duplicated(keep='last')]
+
+    return records.to_dict('index')
 
 def show_cluster_upload_summary(environment_specs: Dict):
     """Show summary of uploaded cluster configurations"""
@@ -10620,18 +16370,8 @@ def run_enhanced_migration_analysis():
     """Run enhanced migration analysis with Writer/Reader support"""
     
     try:
-        # Initialize enhanced analyzer
-        analyzer = EnhancedMigrationAnalyzer()
-        
-        # Step 1: Calculate enhanced recommendations
-        st.write("📊 Calculating cluster recommendations...")
-        recommendations = analyzer.calculate_enhanced_instance_recommendations(st.session_state.environment_specs)
-        st.session_state.enhanced_recommendations = recommendations
-        
-        # Step 2: Calculate enhanced costs
-        st.write("💰 Analyzing cluster costs...")
-        cost_analysis = analyzer.calculate_enhanced_migration_costs(recommendations, st.session_state.migration_params)
-        st.session_state.enhanced_analysis_results = cost_analysis
+        # Steps 1-2: cluster recommendations and costs; unchanged stages are reused
+        run_analysis_pipeline('enhanced')
         
         # Step 3: Generate cost comparison
         st.write("📈 Generating cost comparisons...")
@@ -10836,6 +16576,16 @@ def show_enhanced_environment_analysis():
                 st.write(f"Read/Write Ratio: {rec['read_write_ratio']}% reads")
                 st.write(f"Peak Connections: {rec['connections']}")
             
+            capacity = rec.get('capacity')
+            if capacity:
+                st.markdown("**📐 Queueing-Model Sizing**")
+                reader_p95 = f"{capacity['reader_p95_ms']:.1f} ms" if capacity['reader_p95_ms'] is not None else "n/a"
+                st.write(f"P95 latency: writer {capacity['writer_p95_ms']:.1f} ms, readers {reader_p95} "
+                         f"(SLO {capacity['p95_latency_slo_ms']:.0f} ms)")
+                st.write(f"Writer utilization: {capacity['writer_utilization']:.0%}")
+                if not capacity['meets_slo']:
+                    st.warning("⚠️ No writer/reader mix in the catalog meets the latency SLO; showing the largest fleet")
+            
             # Optimization recommendations
             st.markdown("**💡 Optimization Notes**")
             
@@ -10894,7 +16644,7 @@ def test_growth_setup():
         
         # Test growth analyzer
         try:
-            analyzer = GrowthAwareCostAnalyzer()
+            analyzer = get_shared_growth_analyzer()
             st.success("✅ GrowthAwareCostAnalyzer initialized successfully!")
         except Exception as e:
             st.error(f"❌ GrowthAwareCostAnalyzer error: {str(e)}")
@@ -10905,5 +16655,892 @@ def test_growth_setup():
         else:
             st.warning("⚠️ No growth analysis data in session state yet")
 
+# ===========================
+# RESERVED CAPACITY OPTIMIZER
+# ===========================
+
+# Local rate table: effective discount off on-demand and the share of each term's cost paid upfront
+RESERVED_INSTANCE_OFFERS = {
+    '1yr_no_upfront': {'term_years': 1, 'payment': 'No Upfront', 'discount': 0.31, 'upfront_share': 0.0},
+    '1yr_partial_upfront': {'term_years': 1, 'payment': 'Partial Upfront', 'discount': 0.34, 'upfront_share': 0.5},
+    '1yr_all_upfront': {'term_years': 1, 'payment': 'All Upfront', 'discount': 0.36, 'upfront_share': 1.0},
+    '3yr_no_upfront': {'term_years': 3, 'payment': 'No Upfront', 'discount': 0.50, 'upfront_share': 0.0},
+    '3yr_partial_upfront': {'term_years': 3, 'payment': 'Partial Upfront', 'discount': 0.54, 'upfront_share': 0.5},
+    '3yr_all_upfront': {'term_years': 3, 'payment': 'All Upfront', 'discount': 0.57, 'upfront_share': 1.0}
+}
+
+SAVINGS_PLAN_OFFERS = {
+    '1yr_no_upfront': {'term_years': 1, 'payment': 'No Upfront', 'discount': 0.20, 'upfront_share': 0.0},
+    '1yr_partial_upfront': {'term_years': 1, 'payment': 'Partial Upfront', 'discount': 0.22, 'upfront_share': 0.5},
+    '1yr_all_upfront': {'term_years': 1, 'payment': 'All Upfront', 'discount': 0.23, 'upfront_share': 1.0},
+    '3yr_no_upfront': {'term_years': 3, 'payment': 'No Upfront', 'discount': 0.35, 'upfront_share': 0.0},
+    '3yr_partial_upfront': {'term_years': 3, 'payment': 'Partial Upfront', 'discount': 0.37, 'upfront_share': 0.5},
+    '3yr_all_upfront': {'term_years': 3, 'payment': 'All Upfront', 'discount': 0.39, 'upfront_share': 1.0}
+}
+
+# RDS size-flexible reservations apply across sizes of a family in these normalized units (Nxlarge = 8N)
+RDS_SIZE_NORMALIZATION = {'micro': 0.5, 'small': 1.0, 'medium': 2.0, 'large': 4.0, 'xlarge': 8.0}
+
+class ReservedCapacityOptimizer:
+    """Reserved instance, savings plan and on-demand mix with the lowest cost over the growth horizon"""
+
+    HOURS_PER_YEAR = 8760
+    DAY_HOURS = np.arange(24)
+
+    def __init__(self, pricing_api: Optional['EnhancedAWSPricingAPI'] = None, ri_offers: Optional[Dict] = None,
+                 savings_plan_offers: Optional[Dict] = None, max_levels_per_family: int = 4096,
+                 max_savings_plan_levels: int = 4096):
+        self.pricing_api = pricing_api if pricing_api is not None else EnhancedAWSPricingAPI()
+        self.ri_offers = ri_offers or RESERVED_INSTANCE_OFFERS
+        self.savings_plan_offers = savings_plan_offers or SAVINGS_PLAN_OFFERS
+        self.max_levels_per_family = max_levels_per_family
+        self.max_savings_plan_levels = max_savings_plan_levels
+
+    @staticmethod
+    def normalization_units(instance_class: str) -> float:
+        """Normalized units of one instance of this class"""
+        size = instance_class.rsplit('.', 1)[-1]
+        if size in RDS_SIZE_NORMALIZATION:
+            return RDS_SIZE_NORMALIZATION[size]
+        if size.endswith('xlarge') and size[:-6].isdigit():
+            return 8.0 * int(size[:-6])
+        return RDS_SIZE_NORMALIZATION['xlarge']
+
+    def build_usage_frame(self, recommendations: Dict, growth_analysis: Optional[Dict], horizon_years: int) -> pd.DataFrame:
+        """One row per instance group (writer or readers) with its daily hours and per-year compute scaling"""
+
+        rows = []
+        for env_name, rec in recommendations.items():
+            daily_hours = float(rec.get('daily_usage_hours', 24) or 24)
+            writer = rec.get('writer') or rec
+            rows.append((env_name, writer.get('instance_class', 'db.r5.large'), bool(writer.get('multi_az', False)),
+                         1, daily_hours))
+            readers = rec.get('readers') or {}
+            if readers.get('count'):
+                rows.append((env_name, readers.get('instance_class', 'db.r5.large'), bool(readers.get('multi_az', False)),
+                             int(readers['count']), daily_hours))
+        frame = pd.DataFrame(rows, columns=['environment', 'instance_class', 'multi_az', 'count', 'daily_hours'])
+
+        # Year y of the term runs at the growth model's year_y compute scaling (year_0 is the migrated baseline)
+        projections = (growth_analysis or {}).get('yearly_projections') or {}
+        for year in range(horizon_years):
+            env_costs = (projections.get(f'year_{year}') or {}).get('environment_costs') or {}
+            scaling = {env_name: costs.get('resource_scaling', {}).get('compute_scaling', 1.0)
+                       for env_name, costs in env_costs.items()}
+            frame[f'scale_year_{year}'] = frame['environment'].map(scaling).fillna(1.0).astype(float)
+        return frame
+
+    def _unit_rates(self, frame: pd.DataFrame, region: str, engine: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Normalized units per row and the on-demand hourly rate of one unit, pricing each class once"""
+        deployment = np.where(frame['multi_az'].to_numpy() & ('aurora' not in engine), 2.0, 1.0)
+        units = frame['instance_class'].map(self.normalization_units).to_numpy(dtype=float) * deployment
+        unique = frame[['instance_class', 'multi_az']].drop_duplicates()
+        hourly = {(instance_class, az): self.pricing_api.get_rds_pricing(region, engine, instance_class, bool(az))['hourly']
+                  for instance_class, az in unique.itertuples(index=False, name=None)}
+        rates = np.array([hourly[pair] for pair in zip(frame['instance_class'], frame['multi_az'])], dtype=float)
+        return units * frame['count'].to_numpy(dtype=float), rates / units
+
+    @staticmethod
+    def _capacity_levels(demand: np.ndarray, step: float, max_levels: int) -> Tuple[np.ndarray, float]:
+        """Share of hours each stacked capacity level is in use, per year; demand is (years, hours of day)"""
+        peak = float(demand.max(initial=0.0))
+        if peak <= 0:
+            return np.zeros((0, demand.shape[0])), step
+        step = step * max(1, int(np.ceil(peak / (step * max_levels))))
+        levels = np.arange(int(np.ceil(peak / step - 1e-9)))[:, None, None]
+        return np.clip(demand[None] / step - levels, 0.0, 1.0).mean(axis=-1), step
+
+    def _offer_coefficients(self, offers: Dict, horizon_years: int, discount_rate: float) -> Tuple[List[str], np.ndarray]:
+        """Present cost per year of covering one on-demand dollar-hour for a full year, for each offer"""
+        years = np.arange(horizon_years)
+        start = (1 + discount_rate) ** -years.astype(float)
+        middle = (1 + discount_rate) ** -(years + 0.5)
+        names, rows = [], []
+        for name, offer in offers.items():
+            term = offer['term_years']
+            if term > horizon_years:
+                continue
+            rate = (1 - offer['discount']) * self.HOURS_PER_YEAR
+            share = offer['upfront_share']
+            if term == 1:
+                # Renewable each year, paying the upfront again at the start of every year it is bought
+                row = rate * (share * start + (1 - share) * middle)
+            else:
+                row = np.where(years < term, rate * (1 - share) * middle, 0.0)
+                row[0] += rate * share * term * start[0]
+            names.append(name)
+            rows.append(row)
+        return names, np.array(rows).reshape(len(rows), horizon_years)
+
+    def _commit_levels(self, usage: np.ndarray, level_rates: np.ndarray, offers: Dict, horizon_years: int,
+                       discount_rate: float) -> Dict:
+        """Cheapest commitment per capacity level; level costs are independent, so choosing each greedily is optimal"""
+
+        names, coefficients = self._offer_coefficients(offers, horizon_years, discount_rate)
+        terms = np.array([offers[name]['term_years'] for name in names])
+        middle = (1 + discount_rate) ** -(np.arange(horizon_years) + 0.5)
+        on_demand = usage * level_rates[:, None] * self.HOURS_PER_YEAR * middle[None, :]
+
+        # Yearly renewals: the cheapest one-year offer per year does not depend on the level, only the buy decision does
+        choice = np.zeros(usage.shape, dtype=int)
+        yearly_cost = on_demand.copy()
+        one_year = np.flatnonzero(terms == 1)
+        if one_year.size:
+            best = one_year[np.argmin(coefficients[one_year], axis=0)]
+            reserved_cost = level_rates[:, None] * coefficients[best, np.arange(horizon_years)][None, :]
+            buy = reserved_cost < on_demand
+            choice = np.where(buy, best[None, :] + 1, 0)
+            yearly_cost = np.where(buy, reserved_cost, on_demand)
+
+        # Longer terms start at migration and replace the yearly plan for the years they cover
+        total = yearly_cost.sum(axis=1)
+        for offer in np.flatnonzero(terms > 1):
+            term = terms[offer]
+            cost = level_rates * coefficients[offer, :term].sum() + yearly_cost[:, term:].sum(axis=1)
+            better = cost < total
+            total = np.where(better, cost, total)
+            choice[better, :term] = offer + 1
+
+        committed = choice > 0
+        commitment = np.where(committed, level_rates[:, None] * coefficients[np.maximum(choice - 1, 0),
+                                                                             np.arange(horizon_years)], 0.0)
+        return {
+            'names': names,
+            'choice': choice,
+            'commitment_cost': commitment,
+            'on_demand_cost': on_demand,
+            'remaining_on_demand_cost': np.where(committed, 0.0, on_demand)
+        }
+
+    def _purchase_rows(self, solution: Dict, offers: Dict, level_rates: np.ndarray, groups: np.ndarray,
+                       group_names: List[str]) -> pd.DataFrame:
+        """Aggregate level decisions into purchases by group, offer and start year"""
+        choice = solution['choice']
+        yearly = np.array([offers[name]['term_years'] == 1 for name in solution['names']], dtype=bool)
+        frames = []
+        for year in range(choice.shape[1]):
+            column = choice[:, year]
+            # Multi-year offers are bought once in year 0; one-year offers are bought again each year
+            starts = np.flatnonzero(column > 0)
+            if year > 0:
+                starts = starts[yearly[column[starts] - 1]]
+            if starts.size:
+                frames.append(pd.DataFrame({'group': groups[starts], 'offer': column[starts] - 1, 'start_year': year + 1,
+                                            'levels': 1, 'on_demand_hourly': level_rates[starts]}))
+        if not frames:
+            return pd.DataFrame(columns=['group', 'offer', 'start_year', 'levels', 'on_demand_hourly'])
+
+        purchases = pd.concat(frames, ignore_index=True).groupby(['group', 'offer', 'start_year'], as_index=False).sum()
+        offer_rows = [offers[solution['names'][i]] for i in purchases['offer']]
+        purchases['group'] = [group_names[g] for g in purchases['group']]
+        purchases['offer'] = [solution['names'][i] for i in purchases['offer']]
+        purchases['term_years'] = [offer['term_years'] for offer in offer_rows]
+        purchases['payment'] = [offer['payment'] for offer in offer_rows]
+        effective = purchases['on_demand_hourly'] * (1 - np.array([offer['discount'] for offer in offer_rows]))
+        share = np.array([offer['upfront_share'] for offer in offer_rows])
+        purchases['upfront'] = effective * self.HOURS_PER_YEAR * purchases['term_years'] * share
+        purchases['recurring_hourly'] = effective * (1 - share)
+        return purchases
+
+    @traced('analysis')
+    def optimize(self, recommendations: Dict, growth_analysis: Optional[Dict], migration_params: Dict,
+                 horizon_years: int = 3, discount_rate: float = 0.0, include_savings_plans: bool = True) -> Dict:
+        """Choose reservations per instance family, then a savings plan over what stays on-demand"""
+
+        started = time.perf_counter()
+        horizon_years = int(min(max(horizon_years, 1), 3))
+        frame = self.build_usage_frame(recommendations, growth_analysis, horizon_years)
+        if frame.empty:
+            return {'summary': {'environments': 0, 'on_demand_cost': 0.0, 'optimized_cost': 0.0, 'savings': 0.0,
+                                'savings_percent': 0.0, 'upfront_total': 0.0, 'reserved_coverage_percent': 0.0,
+                                'horizon_years': horizon_years, 'discount_rate': discount_rate},
+                    'reserved_instances': pd.DataFrame(), 'savings_plans': pd.DataFrame(), 'families': pd.DataFrame()}
+
+        region = migration_params.get('region', 'us-east-1')
+        engine = migration_params.get('target_engine', 'postgres')
+        units, unit_rates = self._unit_rates(frame, region, engine)
+        frame['family'] = frame['instance_class'].str.rsplit('.', n=1).str[0]
+        codes, families = pd.factorize(frame['family'])
+
+        # Hourly demand per family: a group running h hours a day is up for the first h hours of each day
+        occupancy = np.clip(frame['daily_hours'].to_numpy(dtype=float)[:, None] - self.DAY_HOURS[None, :], 0.0, 1.0)
+        scaling = frame[[f'scale_year_{year}' for year in range(horizon_years)]].to_numpy(dtype=float)
+        contribution = (units[:, None, None] * scaling[:, :, None] * occupancy[:, None, :]).reshape(len(frame), -1)
+        membership = np.zeros((len(families), len(frame)))
+        membership[codes, np.arange(len(frame))] = 1.0
+        demand = (membership @ contribution).reshape(len(families), horizon_years, 24)
+        family_rates = (membership @ (units * unit_rates)) / np.maximum(membership @ units, 1e-12)
+        size_of = frame.groupby('family')['instance_class'].agg(lambda classes: min(classes, key=self.normalization_units))
+        smallest = np.array([self.normalization_units(size_of[family]) for family in families])
+
+        usage, groups, steps = [], [], np.zeros(len(families))
+        for family in range(len(families)):
+            family_usage, steps[family] = self._capacity_levels(demand[family], smallest[family], self.max_levels_per_family)
+            usage.append(family_usage)
+            groups.append(np.full(len(family_usage), family))
+        usage = np.concatenate(usage)
+        groups = np.concatenate(groups)
+        level_rates = family_rates[groups] * steps[groups]
+
+        reserved = self._commit_levels(usage, level_rates, self.ri_offers, horizon_years, discount_rate)
+        covered_units = np.zeros((len(families), horizon_years))
+        np.add.at(covered_units, groups, (reserved['choice'] > 0) * steps[groups][:, None])
+        on_demand_cost = float(reserved['on_demand_cost'].sum())
+        optimized_cost = float(reserved['commitment_cost'].sum())
+        remaining = float(reserved['remaining_on_demand_cost'].sum())
+
+        ri_purchases = self._purchase_rows(reserved, self.ri_offers, level_rates, groups, list(families))
+        if not ri_purchases.empty:
+            step_of = dict(zip(families, steps))
+            ri_purchases = ri_purchases.rename(columns={'group': 'family'})
+            ri_purchases['normalized_units'] = ri_purchases['levels'] * ri_purchases['family'].map(step_of)
+            ri_purchases['instance_class'] = ri_purchases['family'].map(size_of)
+            ri_purchases['instance_count'] = (ri_purchases['normalized_units'] /
+                                              ri_purchases['instance_class'].map(self.normalization_units)).round(1)
+
+        # Savings plans apply after reservations, so they only see each hour's leftover on-demand spend
+        sp_purchases = pd.DataFrame()
+        if include_savings_plans:
+            leftover = (np.clip(demand - covered_units[:, :, None], 0.0, None) * family_rates[:, None, None]).sum(axis=0)
+            sp_usage, sp_step = self._capacity_levels(leftover, 0.01, self.max_savings_plan_levels)
+            if len(sp_usage):
+                plans = self._commit_levels(sp_usage, np.full(len(sp_usage), sp_step), self.savings_plan_offers,
+                                            horizon_years, discount_rate)
+                optimized_cost += float(plans['commitment_cost'].sum())
+                remaining = float(plans['remaining_on_demand_cost'].sum())
+                sp_purchases = self._purchase_rows(plans, self.savings_plan_offers, np.full(len(sp_usage), sp_step),
+                                                   np.zeros(len(sp_usage), dtype=int), ['Database Savings Plan'])
+                if not sp_purchases.empty:
+                    sp_purchases = sp_purchases.rename(columns={'group': 'plan', 'on_demand_hourly': 'on_demand_covered_hourly'})
+                    discount = np.array([self.savings_plan_offers[name]['discount'] for name in sp_purchases['offer']])
+                    sp_purchases['hourly_commitment'] = sp_purchases['on_demand_covered_hourly'] * (1 - discount)
+        optimized_cost += remaining
+
+        average_units = demand.mean(axis=-1)
+        family_table = pd.DataFrame({
+            'family': list(families),
+            'instance_groups': np.bincount(codes, minlength=len(families)),
+            'on_demand_hourly_per_unit': family_rates,
+            **{f'average_units_year_{year + 1}': average_units[:, year] for year in range(horizon_years)},
+            **{f'peak_units_year_{year + 1}': demand[:, year].max(axis=-1) for year in range(horizon_years)},
+            **{f'reserved_units_year_{year + 1}': covered_units[:, year] for year in range(horizon_years)}
+        })
+
+        covered_hours = np.minimum(demand, covered_units[:, :, None]).sum()
+        return {
+            'summary': {
+                'environments': int(frame['environment'].nunique()),
+                'instance_groups': len(frame),
+                'families': len(families),
+                'capacity_levels': int(len(usage)),
+                'horizon_years': horizon_years,
+                'discount_rate': discount_rate,
+                'on_demand_cost': on_demand_cost,
+                'optimized_cost': optimized_cost,
+                'savings': on_demand_cost - optimized_cost,
+                'savings_percent': (on_demand_cost - optimized_cost) / on_demand_cost * 100 if on_demand_cost else 0.0,
+                'upfront_total': float(sum(table['upfront'].sum() for table in (ri_purchases, sp_purchases)
+                                           if not table.empty)),
+                'reserved_coverage_percent': float(covered_hours / demand.sum() * 100) if demand.sum() else 0.0,
+                'solve_seconds': time.perf_counter() - started
+            },
+            'reserved_instances': ri_purchases,
+            'savings_plans': sp_purchases,
+            'families': family_table
+        }
+
+@st.cache_resource
+def get_shared_reserved_capacity_optimizer() -> ReservedCapacityOptimizer:
+    return ReservedCapacityOptimizer(get_shared_pricing_api())
+
+def show_reserved_capacity_plan():
+    """Reserved instance and savings plan purchases for the projected usage"""
+
+    st.markdown("#### 💳 Reserved Capacity Plan")
+
+    recommendations = st.session_state.get('recommendations') or st.session_state.get('enhanced_recommendations')
+    growth_analysis = st.session_state.get('growth_analysis')
+    if not recommendations:
+        st.info("💡 Run the migration analysis to plan reserved capacity.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        horizon_years = st.selectbox("Planning Horizon (years)", [3, 2, 1], key='ri_horizon_years')
+    with col2:
+        discount_rate = st.slider("Cost of Capital (%)", 0.0, 15.0, 0.0, 0.5, key='ri_discount_rate') / 100
+    with col3:
+        include_savings_plans = st.checkbox("Include Savings Plans", value=True, key='ri_include_savings_plans')
+
+    # Re-solve only when the inputs or settings change. Keyed on content, since the pipeline publishes copies and
+    # restored results are new objects, so ids say nothing about whether the analysis changed
+    inputs_digest = AnalysisPipeline.content_digest({
+        'recommendations': recommendations,
+        'growth_analysis': growth_analysis,
+        'migration_params': ReportArtifactCache._redact(st.session_state.get('migration_params') or {})
+    })
+    plan_key = (inputs_digest, horizon_years, discount_rate, include_savings_plans)
+    cached = st.session_state.get('reserved_capacity_plan')
+    if not cached or cached['key'] != plan_key:
+        try:
+            plan = get_shared_reserved_capacity_optimizer().optimize(
+                recommendations, growth_analysis, st.session_state.get('migration_params') or {},
+                horizon_years=horizon_years, discount_rate=discount_rate, include_savings_plans=include_savings_plans
+            )
+        except Exception as e:
+            st.error(f"Error optimizing reserved capacity: {str(e)}")
+            return
+        cached = {'key': plan_key, 'plan': plan}
+        st.session_state.reserved_capacity_plan = cached
+    plan = cached['plan']
+    summary = plan['summary']
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric(f"On-Demand ({horizon_years}yr)", f"${summary['on_demand_cost']:,.0f}")
+    with col2:
+        st.metric("Optimized Cost", f"${summary['optimized_cost']:,.0f}",
+                  delta=f"-{summary['savings_percent']:.1f}%", delta_color="inverse")
+    with col3:
+        st.metric("Upfront Payments", f"${summary['upfront_total']:,.0f}")
+    with col4:
+        st.metric("Reserved Coverage", f"{summary['reserved_coverage_percent']:.1f}%")
+
+    reserved_instances = plan['reserved_instances']
+    if not reserved_instances.empty:
+        st.markdown("**Reserved Instances (size-flexible within each family)**")
+        st.dataframe(pd.DataFrame({
+            'Family': reserved_instances['family'],
+            'Buy': [f"{count:g} × {instance_class}" for count, instance_class in
+                    zip(reserved_instances['instance_count'], reserved_instances['instance_class'])],
+            'Term': reserved_instances['term_years'].map(lambda years: f"{years}yr"),
+            'Payment': reserved_instances['payment'],
+            'Purchase Year': reserved_instances['start_year'],
+            'Upfront': reserved_instances['upfront'].map(lambda value: f"${value:,.0f}"),
+            'Hourly Fee': reserved_instances['recurring_hourly'].map(lambda value: f"${value:,.2f}")
+        }), use_container_width=True, hide_index=True)
+    else:
+        st.info("💡 Usage is too intermittent for reservations to beat on-demand.")
+
+    savings_plans = plan['savings_plans']
+    if not savings_plans.empty:
+        st.markdown("**Savings Plans (over the remaining on-demand spend)**")
+        st.dataframe(pd.DataFrame({
+            'Term': savings_plans['term_years'].map(lambda years: f"{years}yr"),
+            'Payment': savings_plans['payment'],
+            'Purchase Year': savings_plans['start_year'],
+            'Hourly Commitment': savings_plans['hourly_commitment'].map(lambda value: f"${value:,.2f}"),
+            'Upfront': savings_plans['upfront'].map(lambda value: f"${value:,.0f}")
+        }), use_container_width=True, hide_index=True)
+
+    st.caption(f"Solved {summary['capacity_levels']:,} capacity levels across {summary['families']} instance families "
+               f"for {summary['environments']:,} environments in {summary['solve_seconds'] * 1000:.0f} ms, "
+               f"using the local reserved rate table.")
+
+# ===========================
+# PORTFOLIO BATCH RUNNER
+# ===========================
+
+# Defaults for migration parameters a params file leaves out; these match the configuration page
+BATCH_DEFAULT_MIGRATION_PARAMS = {
+    'source_engine': 'oracle-ee',
+    'target_engine': 'postgres',
+    'data_size_gb': 1000,
+    'num_applications': 3,
+    'num_stored_procedures': 50,
+    'migration_timeline_weeks': 12,
+    'team_size': 5,
+    'team_expertise': 'medium',
+    'region': 'us-east-1',
+    'use_direct_connect': True,
+    'bandwidth_mbps': 1000,
+    'migration_budget': 500000,
+    'anthropic_api_key': None,
+    'estimated_migration_cost': 0,
+    'annual_data_growth': 15,
+    'annual_user_growth': 25,
+    'annual_transaction_growth': 20,
+    'growth_scenario': 'Moderate',
+    'seasonality_factor': 1.2,
+    'scaling_strategy': 'Auto-scaling'
+}
+
+def _batch_analyze_shard(environment_specs: Dict, migration_params: Dict) -> Tuple[Dict, Dict]:
+    """Worker: cluster recommendations and costs for one shard of the portfolio"""
+    analyzer = EnhancedMigrationAnalyzer()
+    recommendations = analyzer.calculate_enhanced_instance_recommendations(environment_specs)
+    cost_analysis = analyzer.calculate_enhanced_migration_costs(recommendations, migration_params)
+    return recommendations, cost_analysis
+
+def shard_environment_specs(environment_specs: Dict, shard_count: int) -> List[Dict]:
+    """Split specs into contiguous shards of near-equal size, keeping portfolio order"""
+    names = list(environment_specs)
+    shard_count = max(1, min(shard_count, len(names)))
+    bounds = np.linspace(0, len(names), shard_count + 1).astype(int)
+    return [{name: environment_specs[name] for name in names[start:end]}
+            for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+def run_portfolio_batch(environment_specs: Dict, migration_params: Optional[Dict] = None,
+                        workers: Optional[int] = None, shards_per_worker: int = 4, progress=None) -> Dict:
+    """Analyze a whole portfolio without a session: per-database stages on a process pool, portfolio stages once"""
+
+    migration_params = {**BATCH_DEFAULT_MIGRATION_PARAMS, **(migration_params or {})}
+    workers = max(1, workers or os.cpu_count() or 1)
+    shards = shard_environment_specs(environment_specs, workers * shards_per_worker)
+    started = time.perf_counter()
+
+    # Shards finish out of order; results are collected by index so the output keeps portfolio order
+    shard_results = [None] * len(shards)
+    if workers == 1 or len(shards) <= 1:
+        for i, shard in enumerate(shards):
+            shard_results[i] = _batch_analyze_shard(shard, migration_params)
+            if progress:
+                progress(i + 1, len(shards))
+    else:
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+            futures = {pool.submit(_batch_analyze_shard, shard, migration_params): i for i, shard in enumerate(shards)}
+            for done, future in enumerate(as_completed(futures), start=1):
+                shard_results[futures[future]] = future.result()
+                if progress:
+                    progress(done, len(shards))
+
+    recommendations = {}
+    cost_analysis = EnhancedMigrationAnalyzer().calculate_enhanced_migration_costs({}, migration_params)
+    environment_costs = {}
+    for shard_recommendations, shard_costs in shard_results:
+        recommendations.update(shard_recommendations)
+        environment_costs.update(shard_costs.get('environment_costs', {}))
+    monthly = float(sum(env['total_monthly'] for env in environment_costs.values()))
+    cost_analysis.update({
+        'monthly_aws_cost': monthly,
+        'annual_aws_cost': monthly * 12,
+        'environment_costs': environment_costs
+    })
+    shard_seconds = time.perf_counter() - started
+
+    # Risk, growth and transfer describe the portfolio as a whole, so they run once on the merged results
+    portfolio = {}
+    portfolio_stages = {
+        'risk_assessment': lambda: assess_migration_risks(migration_params, recommendations, cost_analysis),
+        'growth_analysis': lambda: get_shared_growth_analyzer().calculate_3_year_growth_projection(cost_analysis,
+                                                                                                   migration_params),
+        'transfer_analysis': lambda: get_shared_network_analyzer().calculate_transfer_analysis(migration_params),
+        'reserved_capacity': lambda: ReservedCapacityOptimizer(get_shared_pricing_api()).optimize(
+            recommendations, portfolio.get('growth_analysis'), migration_params)
+    }
+    for name, stage in portfolio_stages.items():
+        try:
+            portfolio[name] = stage()
+        except Exception as e:
+            print(f"Error in batch {name}: {e}")
+            portfolio[name] = {'error': str(e)}
+
+    return {
+        'recommendations': recommendations,
+        'cost_analysis': cost_analysis,
+        **portfolio,
+        'run': {
+            'databases': len(environment_specs),
+            'shards': len(shards),
+            'workers': workers,
+            'shard_seconds': shard_seconds,
+            'total_seconds': time.perf_counter() - started,
+            'pricing_version': get_pricing_version(),
+            'completed_at': datetime.now().isoformat()
+        }
+    }
+
+def _batch_json_default(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, pd.Timestamp)):
+        return value.isoformat()
+    return str(value)
+
+@functools.lru_cache(maxsize=None)
+def parquet_engine_available() -> bool:
+    """Whether pandas can write Parquet here; checked, and reported, once per process"""
+    try:
+        pd.io.parquet.get_engine('auto')
+        return True
+    except ImportError as e:
+        print(f"No usable Parquet engine ({str(e).splitlines()[0]}); writing batch tables as CSV. "
+              f"Install pyarrow from requirements.txt for Parquet output")
+        return False
+
+def write_batch_frame(frame: pd.DataFrame, path_base: str, output_format: str = 'parquet') -> str:
+    """Write one output table; Parquet falls back to CSV when no Parquet engine is installed"""
+    if output_format == 'parquet' and parquet_engine_available():
+        try:
+            frame.to_parquet(f"{path_base}.parquet")
+            return f"{path_base}.parquet"
+        except Exception as e:
+            print(f"Error writing Parquet ({str(e).splitlines()[0]}); writing CSV instead")
+    frame.to_csv(f"{path_base}.csv")
+    return f"{path_base}.csv"
+
+def write_portfolio_batch_outputs(results: Dict, output_dir: str, output_format: str = 'parquet') -> Dict[str, str]:
+    """Per-database tables plus a JSON summary of the portfolio-level analyses"""
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+
+    recommendations = pd.json_normalize(list(results['recommendations'].values()), sep='.')
+    recommendations.index = pd.Index(list(results['recommendations']), name='environment')
+    written['recommendations'] = write_batch_frame(recommendations, os.path.join(output_dir, 'recommendations'),
+                                                   output_format)
+
+    cost_analysis = results['cost_analysis']
+    environment_costs = pd.DataFrame.from_dict(cost_analysis['environment_costs'], orient='index')
+    environment_costs.index.name = 'environment'
+    written['environment_costs'] = write_batch_frame(environment_costs, os.path.join(output_dir, 'environment_costs'),
+                                                     output_format)
+
+    # Per-database growth becomes a (environment, year) table; the summary keeps the portfolio totals
+    growth_analysis = dict(results['growth_analysis'])
+    yearly = growth_analysis.get('yearly_projections')
+    if isinstance(yearly, dict):
+        growth_rows = []
+        for year, projection in yearly.items():
+            for env_name, env_costs in (projection.get('environment_costs') or {}).items():
+                growth_rows.append({'environment': env_name, 'year': year, **env_costs})
+        if growth_rows:
+            growth_frame = pd.json_normalize(growth_rows, sep='.').set_index(['environment', 'year'])
+            written['growth_projections'] = write_batch_frame(growth_frame, os.path.join(output_dir, 'growth_projections'),
+                                                              output_format)
+        growth_analysis['yearly_projections'] = {
+            year: {k: v for k, v in projection.items() if k != 'environment_costs'} for year, projection in yearly.items()
+        }
+
+    # Reserved capacity purchases are tables; the summary keeps the totals
+    reserved_capacity = results.get('reserved_capacity') or {}
+    for name in ('reserved_instances', 'savings_plans'):
+        table = reserved_capacity.get(name)
+        if isinstance(table, pd.DataFrame) and not table.empty:
+            written[name] = write_batch_frame(table, os.path.join(output_dir, name), output_format)
+
+    summary = {
+        'run': results['run'],
+        'monthly_aws_cost': cost_analysis['monthly_aws_cost'],
+        'annual_aws_cost': cost_analysis['annual_aws_cost'],
+        'migration_costs': cost_analysis.get('migration_costs'),
+        'transfer_costs': cost_analysis.get('transfer_costs'),
+        'risk_assessment': results['risk_assessment'],
+        'growth_analysis': growth_analysis,
+        'transfer_analysis': results['transfer_analysis'],
+        'reserved_capacity': reserved_capacity.get('summary', reserved_capacity)
+    }
+    summary_path = os.path.join(output_dir, 'summary.json')
+    with open(summary_path, 'w') as f:
+        json.dump(summary, f, indent=2, default=_batch_json_default)
+    written['summary'] = summary_path
+
+    return written
+
+def run_batch_cli(argv: Optional[List[str]] = None) -> int:
+    """python test.py batch portfolio.csv [--params params.json] [--output-dir DIR] [--workers N] [--format parquet|csv]"""
+
+    import argparse
+    parser = argparse.ArgumentParser(prog='test.py batch',
+                                     description='Headless portfolio analysis from a cluster CSV (Environment Setup template)')
+    parser.add_argument('portfolio_csv', help='Portfolio CSV with one row per database cluster')
+    parser.add_argument('--params', help='JSON file of migration parameters; omitted keys use the configuration defaults')
+    parser.add_argument('--output-dir', default='batch_output', help='Directory for the result tables and summary.json')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (default: all cores)')
+    parser.add_argument('--format', dest='output_format', choices=['parquet', 'csv'], default='parquet')
+    args = parser.parse_args(argv)
+
+    try:
+        environment_specs = process_cluster_data(pd.read_csv(args.portfolio_csv))
+        migration_params = {}
+        if args.params:
+            with open(args.params) as f:
+                migration_params = json.load(f)
+    except Exception as e:
+        print(f"Error loading batch inputs: {e}")
+        return 1
+
+    if not environment_specs:
+        print("Error: portfolio CSV contains no databases")
+        return 1
+
+    print(f"Analyzing {len(environment_specs):,} databases...")
+    results = run_portfolio_batch(
+        environment_specs, migration_params, workers=args.workers,
+        progress=lambda done, total: print(f"  shard {done}/{total}", flush=True)
+    )
+    written = write_portfolio_batch_outputs(results, args.output_dir, args.output_format)
+
+    run = results['run']
+    print(f"Monthly AWS cost: ${results['cost_analysis']['monthly_aws_cost']:,.0f} "
+          f"({run['databases']:,} databases, {run['shards']} shards on {run['workers']} workers, "
+          f"{run['total_seconds']:.1f}s)")
+    for name, path in written.items():
+        print(f"  {name}: {path}")
+    return 0
+
+# ===========================
+# ANALYZER HTTP SERVICE
+# ===========================
+
+class AnalyzerServiceError(Exception):
+    """Request error carrying the HTTP status to answer with"""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+class AnalyzerService:
+    """JSON engine endpoints with response caching, in-flight de-duplication and micro-batching"""
+
+    ENDPOINTS = {
+        'recommendations': ('environment_specs',),
+        'costs': ('recommendations',),
+        'transfer': (),
+        'growth': ('base_costs',)
+    }
+
+    def __init__(self, cache: Optional[SharedTTLCache] = None, workers: int = 4, max_batch: int = 64,
+                 batch_window_ms: float = 2.0):
+        self.cache = cache if cache is not None else SharedTTLCache(ttl_seconds=3600, max_entries=5000)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analyzer-service')
+        self.max_batch = max_batch
+        self.batch_window = batch_window_ms / 1000
+        self._pending = []          # (endpoint, body, future) waiting for the next batch
+        self._flush_handle = None
+        self._in_flight = {}        # request key -> future shared by identical concurrent requests
+        self.stats = {'requests': 0, 'cache_hits': 0, 'coalesced': 0, 'batches': 0, 'batched_requests': 0,
+                      'errors': 0}
+
+    @staticmethod
+    def request_key(endpoint: str, body: Dict) -> str:
+        """Hash of the endpoint, canonical body and pricing version"""
+        return AnalysisPipeline.content_digest({'endpoint': endpoint, 'body': body,
+                                                'pricing_version': get_pricing_version()})
+
+    @staticmethod
+    def encode(payload) -> bytes:
+        return json.dumps(payload, separators=(',', ':'), default=_batch_json_default).encode('utf-8')
+
+    def _validate(self, endpoint: str, body) -> Dict:
+        if endpoint not in self.ENDPOINTS:
+            raise AnalyzerServiceError(f"Unknown endpoint: {endpoint}", status=404)
+        if not isinstance(body, dict):
+            raise AnalyzerServiceError("Request body must be a JSON object")
+        for field in self.ENDPOINTS[endpoint]:
+            if not isinstance(body.get(field), dict):
+                raise AnalyzerServiceError(f"'{field}' must be a JSON object")
+        if not isinstance(body.get('migration_params', {}), dict):
+            raise AnalyzerServiceError("'migration_params' must be a JSON object")
+        return body
+
+    async def handle(self, endpoint: str, body) -> bytes:
+        """Encoded JSON response for one engine call"""
+
+        body = self._validate(endpoint, body)
+        self.stats['requests'] += 1
+        key = self.request_key(endpoint, body)
+
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.stats['cache_hits'] += 1
+            return cached
+
+        if key in self._in_flight:
+            self.stats['coalesced'] += 1
+            return await asyncio.shield(self._in_flight[key])
+
+        shared = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = shared
+        try:
+            response = self.encode(await self._submit(endpoint, body))
+            self.cache.set(key, response)
+            shared.set_result(response)
+            return response
+        except Exception as e:
+            self.stats['errors'] += 1
+            shared.set_exception(e)
+            shared.exception()     # waiters re-raise it; mark retrieved so the loop does not log it
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def handle_batch(self, operations) -> bytes:
+        """Several engine calls in one request; each result is independent"""
+
+        if not isinstance(operations, list):
+            raise AnalyzerServiceError("'operations' must be a list")
+
+        async def run(operation):
+            try:
+                if not isinstance(operation, dict):
+                    raise AnalyzerServiceError("Each operation must be a JSON object")
+                return await self.handle(operation.get('endpoint'), operation.get('body', {}))
+            except AnalyzerServiceError as e:
+                return self.encode({'error': str(e), 'status': e.status})
+            except Exception as e:
+                return self.encode({'error': str(e), 'status': 422})
+
+        parts = await asyncio.gather(*(run(operation) for operation in operations))
+        return b'{"results":[' + b','.join(parts) + b']}'
+
+    def _submit(self, endpoint: str, body: Dict) -> asyncio.Future:
+        # Requests arriving within the batch window share one executor hop
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((endpoint, body, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            self.stats['batches'] += 1
+            self.stats['batched_requests'] += len(batch)
+            asyncio.ensure_future(self._dispatch(batch))
+
+    async def _dispatch(self, batch: List[Tuple]):
+        loop = asyncio.get_running_loop()
+        try:
+            outcomes = await loop.run_in_executor(self.executor, self._run_batch,
+                                                  [(endpoint, body) for endpoint, body, _ in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        for (_, _, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def _run_batch(self, requests: List[Tuple[str, Dict]]) -> List:
+        """Worker thread: recommendation requests are merged into one engine call, the rest run in turn"""
+
+        outcomes = [None] * len(requests)
+        merged_specs = {}
+        for i, (endpoint, body) in enumerate(requests):
+            if endpoint == 'recommendations':
+                # Prefixes keep environments of different requests apart without changing their categorization
+                merged_specs.update({f"{i}\x1f{name}": specs for name, specs in body['environment_specs'].items()})
+
+        if merged_specs:
+            try:
+                merged = MigrationAnalyzer().calculate_instance_recommendations(merged_specs)
+                for i, (endpoint, body) in enumerate(requests):
+                    if endpoint == 'recommendations':
+                        outcomes[i] = {name: merged[f"{i}\x1f{name}"] for name in body['environment_specs']}
+            except Exception:
+                # One bad request must not fail the batch: fall back to running them separately
+                pass
+
+        for i, (endpoint, body) in enumerate(requests):
+            if outcomes[i] is not None:
+                continue
+            try:
+                outcomes[i] = self._run_engine(endpoint, body)
+            except Exception as e:
+                outcomes[i] = AnalyzerServiceError(f"{endpoint} analysis failed: {e}", status=422)
+        return outcomes
+
+    @staticmethod
+    def _run_engine(endpoint: str, body: Dict) -> Dict:
+        migration_params = body.get('migration_params') or {}
+        if endpoint == 'recommendations':
+            return MigrationAnalyzer().calculate_instance_recommendations(body['environment_specs'])
+        if endpoint == 'costs':
+            return MigrationAnalyzer().calculate_migration_costs(body['recommendations'], migration_params)
+        if endpoint == 'transfer':
+            return get_shared_network_analyzer().calculate_transfer_analysis(migration_params)
+        return get_shared_growth_analyzer().calculate_3_year_growth_projection(body['base_costs'], migration_params)
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'in_flight': len(self._in_flight), 'cache': self.cache.get_stats()}
+
+def create_analyzer_app(service: Optional[AnalyzerService] = None):
+    """ASGI app: POST /v1/{recommendations,costs,transfer,growth}, POST /v1/batch, GET /health"""
+
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse, Response
+    from starlette.routing import Route
+
+    service = service or AnalyzerService()
+
+    async def read_json(request):
+        try:
+            return json.loads(await request.body() or b'{}')
+        except ValueError:
+            raise AnalyzerServiceError("Request body is not valid JSON")
+
+    async def engine(request):
+        try:
+            body = await read_json(request)
+            return Response(await service.handle(request.path_params['endpoint'], body), media_type='application/json')
+        except AnalyzerServiceError as e:
+            return JSONResponse({'error': str(e)}, status_code=e.status)
+        except Exception as e:
+            print(f"Error in analyzer service: {e}")
+            return JSONResponse({'error': str(e)}, status_code=500)
+
+    async def batch(request):
+        try:
+            body = await read_json(request)
+            operations = body.get('operations') if isinstance(body, dict) else None
+            return Response(await service.handle_batch(operations), media_type='application/json')
+        except AnalyzerServiceError as e:
+            return JSONResponse({'error': str(e)}, status_code=e.status)
+
+    async def health(request):
+        return JSONResponse({'status': 'ok', **service.get_stats()})
+
+    app = Starlette(routes=[
+        Route('/health', health, methods=['GET']),
+        Route('/v1/batch', batch, methods=['POST']),
+        Route('/v1/{endpoint}', engine, methods=['POST'])
+    ])
+    app.state.analyzer_service = service
+    return app
+
+def run_service_cli(argv: Optional[List[str]] = None) -> int:
+    """python test.py serve [--host HOST] [--port PORT] [--workers N] [--batch-window-ms MS] [--max-batch N]"""
+
+    import argparse
+    parser = argparse.ArgumentParser(prog='test.py serve', description='Local JSON service for the migration analyzers')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8600)
+    parser.add_argument('--workers', type=int, default=4, help='Engine worker threads')
+    parser.add_argument('--batch-window-ms', type=float, default=2.0, help='How long to collect requests into a batch')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--cache-ttl', type=float, default=3600, help='Seconds a cached response stays valid')
+    args = parser.parse_args(argv)
+
+    try:
+        import uvicorn
+        app = create_analyzer_app(AnalyzerService(
+            cache=SharedTTLCache(ttl_seconds=args.cache_ttl, max_entries=5000), workers=args.workers,
+            max_batch=args.max_batch, batch_window_ms=args.batch_window_ms
+        ))
+    except ImportError as e:
+        print(f"Error: service mode needs starlette and uvicorn ({e})")
+        return 1
+
+    print(f"Analyzer service listening on http://{args.host}:{args.port}")
+    uvicorn.run(app, host=args.host, port=args.port, log_level='warning')
+    return 0
+
 if __name__ == "__main__":
+    # Headless modes: "python test.py batch ..." and "python test.py serve ..." run outside Streamlit
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(run_batch_cli(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'serve':
+        sys.exit(run_service_cli(sys.argv[2:]))
     main()
\ No newline at end of file